@@ -32,45 +32,6 @@ logging.addLevelName(logging.DEBUG - 1, 'VERBOSE1')
 logging.addLevelName(logging.DEBUG - 2, 'VERBOSE2')
 
 
-class CreateExpectedResponse(object):
-    def __init__(self, buffer, name, sendcommands, logger):
-        self._buffer = buffer
-        self._name = name
-        self._send_commands = sendcommands
-
-        self.logger = logger
-        self.logger.debug(
-            "Processing Response {}: Creating expected response. Buffer: {}. Name: {}. Sendcommands: {}".format(
-                self._name, re.sub('[\r\n]', ' --- ', self._buffer), self._name, self._send_commands))
-
-    def create_expected(self):
-        expectedresponse = []
-        try:
-            for resp in self._send_commands:
-                if resp.split(',', 2)[2].find('|') >= 0:
-                    splitresponse = resp.split(';')[0].split('|')
-                else:
-                    splitresponse = [resp]
-                splitresponse[0] = splitresponse[0].split(',', 2)[2]
-                for i in range(0, len(splitresponse)):
-                    splitresponse[i] = splitresponse[i].split(',')[0]
-                    if not self._buffer == '':
-                        splitresponse[i] = Translate(self._buffer.split("\r\n")[0], splitresponse[i], self._name, '', '', self.logger).wildcard()
-                        self.logger.log(VERBOSE2, "Processing Response {}: Splitresponse after wildcard {}: {}.".format(
-                            self._name, i, splitresponse[i]))
-                wildcardresponse = []
-                for wild in splitresponse:
-                    if '?' not in wild:
-                        wildcardresponse.append(wild)
-                splitresponse = '|'.join(wildcardresponse)
-                if not splitresponse == '':
-                    expectedresponse.append(splitresponse)
-        except Exception as err:
-            self.logger.error(
-                "Processing Response {}: Problems creating expected response list. Error: {}".format(self._name, err))
-        return expectedresponse
-
-
 class Translate(object):
     def __init__(self, code, dictentry, name, caller, specialparse, logger):
         self._code = code
@@ -83,84 +44,6 @@ class Translate(object):
 
         self.logger = logger
 
-    def wildcard(self):
-        if self._command.find('?') >= 1:
-            wildcard_replace = []
-            wildcard = []
-            command = self._command.split('*')[0]
-            unprocessed = command
-            command = command.replace('*{str}', '*')
-            command = realcommand = command.replace('?{str}', '?')
-            for i in range(9, 0, -1):
-                command = command.replace('?' * i, '?')
-            splitcommand = command.split('?')
-            splitreal = unprocessed.split('*')[0].split('?')[1:]
-            splitcommand = splitcommand[:-1] if splitcommand[len(splitcommand) - 1] == '' else splitcommand
-            splitreal = splitreal[:-1] if splitcommand[len(splitcommand) - 1] == '' else splitreal
-            self.logger.log(VERBOSE2,
-                            "Processing Wildcard {}: Command: {} (original: {}), Splitcommand: {}. Splitreal: {}. Data: {}".format(
-                                self._name, command, unprocessed, splitcommand, splitreal, self._data))
-            for i in range(0, len(splitcommand)):
-                try:
-                    data = self._data.split(splitcommand[i], 1)[1]
-                except Exception:
-                    break
-                try:
-                    toreplace = data[0:data.find(splitcommand[i + 1])] if data.find(splitcommand[i + 1]) >= 0 else data
-                    wildcard_replace.append(toreplace)
-                except Exception:
-                    wildcard_replace.append(data)
-                try:
-                    start = realcommand.find(splitcommand[i]) + len(splitcommand[i]) \
-                        if i == 0 and not splitcommand[i] == '' else 0
-                    try:
-                        end = start + realcommand[start:].find(splitcommand[i + 1])
-                        newstart = end + len(splitcommand[i + 1])
-                    except Exception:
-                        end = None
-                        newstart = 0
-                    wildcard.append(realcommand[start:end])
-                    realcommand = realcommand[newstart:]
-                except Exception:
-                    pass
-            if wildcard_replace:
-                self.logger.log(VERBOSE2,
-                                "Processing Wildcard {}: Wildcard replace: {}, Wildcard: {}.".format(
-                                    self._name, wildcard_replace, wildcard))
-                newstring = ''
-                for i in range(0, len(splitcommand)):
-                    try:
-                        self.logger.log(VERBOSE2,
-                                        "Processing Wildcard {}: replace {}, wildcard {}, splitreal {}".format(
-                                            self._name, wildcard_replace[i], wildcard[i], splitreal[i]))
-                        cond1 = len(wildcard_replace[i]) == len(wildcard[i])
-                        cond2 = '{str}' in splitreal[i]
-                        replace = True if ((cond1 or cond2) and not wildcard[i] == '') else False
-                    except Exception:
-                        replace = False
-                    try:
-                        if replace is True:
-                            newstring += splitcommand[i] + wildcard_replace[i]
-                            self.logger.log(VERBOSE2,
-                                            "Processing Wildcard {}: Replace {} by {}.".format(self._name, wildcard[i],
-                                                                                               wildcard_replace[i]))
-                        else:
-                            try:
-                                newstring += splitcommand[i] + wildcard[i]
-                            except Exception:
-                                newstring += splitcommand[i] + wildcard_replace[i]
-                    except Exception as err:
-                        newstring = unprocessed
-                        self.logger.log(VERBOSE2, "Processing Wildcard {}: Problem {}.".format(self._name, err))
-                        break
-            else:
-                newstring = unprocessed.split('*')[0]
-            self.logger.log(VERBOSE2, "Processing Wildcard {}: Command to compare: {}.".format(self._name, newstring))
-        else:
-            newstring = self._command.split('*')[0]
-
-        return newstring
-
     def translate(self):
         origcaller = self._caller
         caller = 'parse' if self._caller == 'writedict' else self._caller
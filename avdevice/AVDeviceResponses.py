@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2016 <Onkel Andy>                    <onkelandy@hotmail.com>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Plugin to control AV Devices via TCP and/or RS232
+#  Tested with Pioneer AV Receivers.
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import functools
+import logging
+import re
+
+VERBOSE1 = logging.DEBUG - 1
+VERBOSE2 = logging.DEBUG - 2
+
+
+@functools.lru_cache(maxsize=2048)
+def split_fields(text, separator=','):
+    """
+    Split a command string like 'command,query,response' (cached, the same commands are sent again and again)
+
+    :return: tuple of the fields
+    """
+    return tuple(text.split(separator))
+
+
+@functools.lru_cache(maxsize=16)
+def tidy_pattern(lineending):
+    """
+    Compiled regex to remove surrounding whitespace and duplicate line endings from a response
+    """
+    return re.compile(r'(^\s*[{0}]+|^\s*\Z)|(\s*\Z|\s*[{0}]+)'.format(lineending))
+
+
+def tidy(text, lineending):
+    return tidy_pattern(lineending).sub(lambda m: lineending if m.lastindex == 2 else '', text)
+
+
+class WildcardTemplate(object):
+    """
+    Precompiled wildcard handling of one response (Translate.wildcard() up to v1.6.4)
+
+    Everything that only depends on the response (splitting at the wildcards, the default
+    values of the wildcards) is done once, so applying the template to a received line
+    only has to look up the separators in the line.
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.default = command.split('*')[0]
+        self.static = command.find('?') < 1
+        if self.static:
+            return
+        unprocessed = self.default
+        realcommand = unprocessed.replace('*{str}', '*').replace('?{str}', '?')
+        command = realcommand
+        for i in range(9, 0, -1):
+            command = command.replace('?' * i, '?')
+        splitcommand = command.split('?')
+        splitreal = unprocessed.split('*')[0].split('?')[1:]
+        splitcommand = splitcommand[:-1] if splitcommand[len(splitcommand) - 1] == '' else splitcommand
+        splitreal = splitreal[:-1] if splitcommand[len(splitcommand) - 1] == '' else splitreal
+
+        wildcard = []
+        for i in range(0, len(splitcommand)):
+            start = realcommand.find(splitcommand[i]) + len(splitcommand[i]) \
+                if i == 0 and not splitcommand[i] == '' else 0
+            if i + 1 < len(splitcommand):
+                end = start + realcommand[start:].find(splitcommand[i + 1])
+                newstart = end + len(splitcommand[i + 1])
+            else:
+                end = None
+                newstart = 0
+            wildcard.append(realcommand[start:end])
+            realcommand = realcommand[newstart:]
+
+        # per wildcard: separator in front, separator behind, default value, replace by any length
+        self._parts = []
+        for i, separator in enumerate(splitcommand):
+            following = splitcommand[i + 1] if i + 1 < len(splitcommand) else None
+            anylength = '{str}' in splitreal[i] if i < len(splitreal) else None
+            self._parts.append((separator, following, wildcard[i], anylength))
+
+    def apply(self, line):
+        """
+        :param line: received line
+        :return: the response with the wildcards replaced by the values of the line (same as Translate.wildcard() up to v1.6.4)
+        """
+        if self.static:
+            return self.default
+        values = []
+        for separator, following, wildcard, anylength in self._parts:
+            if not separator or separator not in line:
+                break
+            data = line.split(separator, 1)[1]
+            if following is None:
+                values.append(data)
+            else:
+                position = data.find(following)
+                values.append(data[0:position] if position >= 0 else data)
+        if len(values) < len(self._parts):
+            # no values found or the line does not contain all parts of the response
+            return self.default
+        newstring = ''
+        for (separator, following, wildcard, anylength), value in zip(self._parts, values):
+            replace = anylength is not None and (anylength or len(value) == len(wildcard)) and not wildcard == ''
+            newstring += separator + (value if replace else wildcard)
+        return newstring
+
+
+@functools.lru_cache(maxsize=1024)
+def wildcard_template(command):
+    return WildcardTemplate(command)
+
+
+def wildcard(line, command):
+    """
+    Replace the wildcards of a response by the values of a received line
+    """
+    return wildcard_template(command).apply(line)
+
+
+@functools.lru_cache(maxsize=1024)
+def expected_parts(sendcommand):
+    """
+    Responses expected for a send command like 'command,query,response1|response2'
+
+    :raises IndexError: if the send command has no response field
+    """
+    if sendcommand.split(',', 2)[2].find('|') >= 0:
+        splitresponse = sendcommand.split(';')[0].split('|')
+    else:
+        splitresponse = [sendcommand]
+    splitresponse[0] = splitresponse[0].split(',', 2)[2]
+    return tuple(response.split(',')[0] for response in splitresponse)
+
+
+class CreateExpectedResponse(object):
+    def __init__(self, buffer, name, sendcommands, logger):
+        self._buffer = buffer
+        self._name = name
+        self._send_commands = sendcommands
+
+        self.logger = logger
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Processing Response {}: Creating expected response. Buffer: {}. Name: {}. Sendcommands: {}".format(
+                    self._name, re.sub('[\r\n]', ' --- ', self._buffer), self._name, self._send_commands))
+
+    def create_expected(self):
+        expectedresponse = []
+        line = self._buffer.split("\r\n")[0]
+        try:
+            for resp in self._send_commands:
+                splitresponse = expected_parts(resp)
+                if not self._buffer == '':
+                    splitresponse = [wildcard(line, response) for response in splitresponse]
+                    if self.logger.isEnabledFor(VERBOSE2):
+                        self.logger.log(VERBOSE2, "Processing Response {}: Splitresponse after wildcard: {}.".format(
+                            self._name, splitresponse))
+                splitresponse = '|'.join(wild for wild in splitresponse if '?' not in wild)
+                if not splitresponse == '':
+                    expectedresponse.append(splitresponse)
+        except Exception as err:
+            self.logger.error(
+                "Processing Response {}: Problems creating expected response list. Error: {}".format(self._name, err))
+        return expectedresponse
+
+
+class PrefixTrie(object):
+    """
+    Trie of responses to check whether a line starts with one of them
+    """
+
+    def __init__(self, keys=()):
+        self._root = {}
+        self._terminal = object()
+        self._count = 0
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return self._count
+
+    def add(self, key):
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+        if self._terminal not in node:
+            node[self._terminal] = True
+            self._count += 1
+
+    def matches(self, line):
+        """
+        :return: True if line starts with one of the keys, same as line.startswith(tuple(keys))
+        """
+        node = self._root
+        if self._terminal in node:
+            return True
+        for char in line:
+            node = node.get(char)
+            if node is None:
+                return False
+            if self._terminal in node:
+                return True
+        return False
+
+
+class ResponseIndex(object):
+    """
+    Compiled response commands of a device
+
+    The responses are split once into static ones and ones with wildcards ('?'). For every
+    received line only the wildcard responses are processed, the resulting wildcard dicts
+    are the same as with Translate.wildcard() up to v1.6.4. The responses
+    without remaining wildcards are kept in a prefix trie which is extended when a new
+    response shows up.
+    """
+
+    def __init__(self, response_commands, response_wildcards):
+        self._wildcards = response_wildcards
+        self._commands = list(response_commands)
+        self._static = {}
+        self._dynamic = []
+        for position, command in enumerate(self._commands):
+            template = wildcard_template(command)
+            if template.static:
+                self._static[template.default] = position
+            else:
+                self._dynamic.append((position, command, template))
+        self._clobbered = set()
+        self._primed = False
+        self._trie = PrefixTrie()
+        self.commands = PrefixTrie(self._commands)
+
+    def _add(self, key):
+        if '?' not in key:
+            self._trie.add(key)
+
+    def update(self, line):
+        """
+        Apply the wildcards of all responses to a received line and update the wildcard dicts
+        """
+        wildcards = self._wildcards['wildcard']
+        originals = self._wildcards['original']
+        if not self._primed:
+            for command in self._commands:
+                newentry = wildcard(line, command)
+                wildcards.update({newentry: command})
+                originals.update({command: newentry})
+            for key in wildcards:
+                self._add(key)
+            self._primed = True
+            return
+
+        written = {}
+        for position, command, template in self._dynamic:
+            newentry = template.apply(line)
+            originals[command] = newentry
+            written[newentry] = (position, command)
+        clobbered = set()
+        for newentry, (position, command) in written.items():
+            static = self._static.get(newentry)
+            if static is None or position > static:
+                if newentry not in wildcards:
+                    self._add(newentry)
+                wildcards[newentry] = command
+                if static is not None:
+                    clobbered.add(newentry)
+            else:
+                wildcards[newentry] = newentry
+        # static responses overwritten by the last line get their own entry back
+        for key in self._clobbered - clobbered:
+            if key not in written:
+                wildcards[key] = key
+        self._clobbered = clobbered
+
+    def matches(self, line):
+        """
+        :return: True if the line starts with one of the responses after processing the wildcards
+        """
+        return self._trie.matches(line)
+
+    def response_commands(self):
+        return [value for value in self._wildcards['wildcard'] if '?' not in value]
@@ -42,7 +42,11 @@ from .AVDeviceInit import ProcessVariables
 from .AVDeviceFunctions import CreateResponse
 from .AVDeviceFunctions import Translate
 from .AVDeviceFunctions import ConvertValue
-from .AVDeviceFunctions import CreateExpectedResponse
+from .AVDeviceResponses import CreateExpectedResponse
+from .AVDeviceResponses import ResponseIndex
+from .AVDeviceResponses import split_fields
+from .AVDeviceResponses import tidy as tidy_response
+from .AVDeviceResponses import wildcard
 from .webif import WebInterface
 
 VERBOSE1 = logging.DEBUG - 1
@@ -53,7 +57,7 @@ logging.addLevelName(logging.DEBUG - 2, 'VERBOSE2')
 
 class AVDevice(SmartPlugin):
     ALLOW_MULTIINSTANCE = True
-    PLUGIN_VERSION = "1.6.4"
+    PLUGIN_VERSION = "1.6.5"
 
     def __init__(self, smarthome):
         super().__init__()
@@ -81,6 +85,7 @@ class AVDevice(SmartPlugin):
             self._expected_response = []
             self._response_commands = {}
             self._response_wildcards = {'wildcard': {}, 'original': {}}
+            self._response_index = ResponseIndex({}, self._response_wildcards)
             self._number_of_zones = 0
             self._trigger_reconnect = True
             self._reconnect_counter = 0
@@ -553,10 +558,7 @@ class AVDevice(SmartPlugin):
         try:
             buffer = ''
 
-            def tidy(c): return re.sub(
-                r'(^\s*[{0}]+|^\s*\Z)|(\s*\Z|\s*[{0}]+)'.format(self._lineending_response),
-                lambda m: self._lineending_response if m.lastindex == 2 else '',
-                c)
+            def tidy(c): return tidy_response(c, self._lineending_response)
             try:
                 if self._rs232 and (socket == self._serialwrapper or socket == self._serial):
                     buffer = socket.readline().decode('utf-8') if socket == self._serial else socket.read()
@@ -710,20 +712,15 @@ class AVDevice(SmartPlugin):
 
                     line = re.sub('[\\n\\r]', '', line).strip()
                     responseforsending = False
-                    for entry in self._response_commands:
-                        newentry = Translate(line, entry, self._name, '', '', self.logger).wildcard()
-                        self._response_wildcards['wildcard'].update({newentry: entry})
-                        self._response_wildcards['original'].update({entry: newentry})
-                    responsecommands = list(self._response_wildcards['wildcard'].keys())
-                    responsecommands = [value for value in responsecommands if '?' not in value]
-                    self.logger.log(VERBOSE1,
-                                    "Processing Response {}: New Response Command list after processing wildcard: {}".format(
-                                        self._name, responsecommands))
+                    self._response_index.update(line)
+                    if self.logger.isEnabledFor(VERBOSE1):
+                        self.logger.log(VERBOSE1,
+                                        "Processing Response {}: New Response Command list after processing wildcard: {}".format(
+                                            self._name, self._response_index.response_commands()))
                     try:
                         for resp in ','.join(self._sendingcommand.split(';')[0].split(',')[2:]).split('|'):
                             resp = resp.split(',')[0]
-                            resp = Translate(line, resp, self._name, '', '', self.logger).wildcard() if len(line) == len(
-                                resp) else resp
+                            resp = wildcard(line, resp) if len(line) == len(resp) else resp
                             self.logger.log(VERBOSE2,
                                             "Processing Response {}: Testing sendingcommand {}. Line: {}, expected response: {}".format(
                                                 self._name, self._sendingcommand, line, resp))
@@ -736,7 +733,7 @@ class AVDevice(SmartPlugin):
                         displaycheck = expectedsplit[0] if buffer == '' else 'nodisplaycommandexpectedsofar'
                     except Exception:
                         displaycheck = 'nodisplaycommandexpectedsofar'
-                    cond1 = not line.startswith(tuple(responsecommands))
+                    cond1 = not self._response_index.matches(line)
                     cond2 = line not in self._error_response and responseforsending is False
                     cond3 = line.startswith(self._special_commands['Display']['Command'])
                     cond4 = self._response_buffer is not False and not line.startswith(displaycheck)
@@ -759,7 +756,7 @@ class AVDevice(SmartPlugin):
                             keyfound = False
                             compare = ','.join(self._send_commands[0].split(';')[0].split(',')[2:]).split('|')
                             for comp in compare:
-                                comp = Translate(line, comp.split(',')[0], self._name, '', '', self.logger).wildcard()
+                                comp = wildcard(line, comp.split(',')[0])
                                 keyfound = True if line.startswith(comp) else False
                             if keyfound is True:
                                 self.logger.log(VERBOSE1,
@@ -823,7 +820,7 @@ class AVDevice(SmartPlugin):
                 bufferlist = list(filter(lambda a: a != '', bufferlist))
                 newbuffer = [buf for buf in bufferlist if not buf.startswith(tuple(self._ignore_response))
                              and '' not in self._ignore_response
-                             and buf.startswith(tuple(self._response_commands))]
+                             and self._response_index.commands.matches(buf)]
                 bufferlist = newbuffer[-1 * max(min(len(newbuffer), maximum), 0):]
                 buffering = False
                 if bufferlist:
@@ -874,6 +871,7 @@ class AVDevice(SmartPlugin):
         self._sendingcommand = 'done'
         self._functions, self._number_of_zones, self._specialparse = self.init.read_commandfile()
         self._response_commands, self._special_commands = self.init.create_responsecommands()
+        self._response_index = ResponseIndex(self._response_commands, self._response_wildcards)
         self._power_commands = self.init.create_powercommands()
         self._query_commands, self._query_zonecommands = self.init.create_querycommands()
         self.logger.log(VERBOSE1,
@@ -2936,27 +2934,27 @@ class AVDevice(SmartPlugin):
         try:
             if not self._send_commands == []:
                 if command == 'command':
-                    to_send = self._send_commands[0].split(',')[0]
-                    expected_resp = self._send_commands[0].split(',')[2]
+                    to_send = split_fields(self._send_commands[0])[0]
+                    expected_resp = split_fields(self._send_commands[0])[2]
                 elif command == 'query':
-                    to_send = self._send_commands[0].split(',')[1]
-                    expected_resp = self._send_commands[0].split(',')[2]
+                    to_send = split_fields(self._send_commands[0])[1]
+                    expected_resp = split_fields(self._send_commands[0])[2]
                 else:
                     try:
-                        to_send = command.split(',')[0]
-                        expected_resp = command.split(',')[2]
+                        to_send = split_fields(command)[0]
+                        expected_resp = split_fields(command)[2]
                     except Exception:
                         to_send = command
                         expected_resp = 'empty'
                     command = 'Resendcommand'
-                commandlist = to_send.split('|')
+                commandlist = list(split_fields(to_send, '|'))
                 self.logger.log(VERBOSE1, "Sending {}: Starting to send {} {}. Caller: {}.".format(
                     self._name, command, to_send, caller))
                 try:
                     self._sendingcommand = self._send_commands[0]
                 except Exception:
                     self._sendingcommand = to_send
-                response = self._send_commands[0].split(',')[2].split('|')
+                response = list(split_fields(split_fields(self._send_commands[0])[2], '|'))
                 if not self._parsinginput:
                     self.logger.log(VERBOSE1, "Sending {}: Starting Parse Input. Expected response: {}".format(
                         self._name, response))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2016 <Onkel Andy>                    <onkelandy@hotmail.com>
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Tests of the response index of the avdevice plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import os
+import re
+import unittest
+
+from plugins.avdevice.AVDeviceResponses import ResponseIndex, PrefixTrie
+
+SAMPLES = {
+    'denon-avr6300': ['PWON', 'ZMON', 'SIDVD', 'MSDOLBY ATMOS', 'CVFL 50', 'Z2ON', 'Z250', 'MUOFF', 'PSBAS 50',
+                      'PSTRE 50', 'SLPOFF', 'PSTONE CTRL ON', 'MNMEN OFF', 'ECOAUTO', 'NSA1Now Playing', 'MV45',
+                      'MV505', 'MVMAX 80', 'Z235', 'unknown'],
+    'vsx-923': ['PWR0', 'MUT1', 'FN25', 'SR0009', 'LM0401', 'SPK1', 'GEH01020"Title"', 'GEH04022"Artist"',
+                'APR0', 'ATH1', 'TO1', 'HO0', 'RGBBD1BD', 'BA06', 'TR06', 'VOL080', 'VOL121', 'unknown'],
+    'oppo-udp203': ['@OK ON', '@UPW 1', '@UPL PLAY', '@UPL PAUS', '@UPL FFW1', '@UVL 25', '@UAT DT 01/05 ENG 5.1',
+                    '@UST 01/03 ENG', '@UTC 001 002 E 00:12:34', '@QTK OK 02/12', '@OK 00:03:21', 'unknown'],
+}
+
+
+def response_commands(model):
+    """
+    response commands of a model file as created by Init.create_responsecommands(), only the keys are needed
+    """
+    filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models', '{}.txt'.format(model))
+    commands = {}
+    with open(filename, encoding='utf-8') as f:
+        comment = 0
+        for line in f:
+            line = re.sub('[\\n\\r]', '', line)
+            line = re.sub(' *; *', ';', line)
+            if line == "'''":
+                comment = 1 - comment
+                continue
+            if comment or line == '' or line.startswith('#') or line.startswith('ZONE;'):
+                continue
+            row = line.split(';') + [''] * 11
+            if row[6].lower() not in ['r', 'rw']:
+                continue
+            for response in row[5].replace('*{str}', '*').replace('*{num}', '*').split('|'):
+                if not response:
+                    break
+                response = response.replace('?{str}', '?').replace('?{num}', '?')
+                cond1 = response.count('?') == 1 and response.count('*') == 0
+                cond2 = response.count('*') == 1
+                if (cond1 or cond2) and 'str' in row[10].split(','):
+                    response = re.sub('[?]', '*', response) if cond1 else response
+                commands[response.split('*')[0]] = []
+    return commands
+
+
+def reference_wildcard(line, response):
+    """
+    Translate.wildcard() up to v1.6.4 without logging: the response with the wildcards replaced by the values of the line
+    """
+    if response.find('?') >= 1:
+        wildcard_replace = []
+        wildcard = []
+        command = response.split('*')[0]
+        unprocessed = command
+        command = command.replace('*{str}', '*')
+        command = realcommand = command.replace('?{str}', '?')
+        for i in range(9, 0, -1):
+            command = command.replace('?' * i, '?')
+        splitcommand = command.split('?')
+        splitreal = unprocessed.split('*')[0].split('?')[1:]
+        splitcommand = splitcommand[:-1] if splitcommand[len(splitcommand) - 1] == '' else splitcommand
+        splitreal = splitreal[:-1] if splitcommand[len(splitcommand) - 1] == '' else splitreal
+        for i in range(0, len(splitcommand)):
+            try:
+                data = line.split(splitcommand[i], 1)[1]
+            except Exception:
+                break
+            try:
+                toreplace = data[0:data.find(splitcommand[i + 1])] if data.find(splitcommand[i + 1]) >= 0 else data
+                wildcard_replace.append(toreplace)
+            except Exception:
+                wildcard_replace.append(data)
+            try:
+                start = realcommand.find(splitcommand[i]) + len(splitcommand[i]) \
+                    if i == 0 and not splitcommand[i] == '' else 0
+                try:
+                    end = start + realcommand[start:].find(splitcommand[i + 1])
+                    newstart = end + len(splitcommand[i + 1])
+                except Exception:
+                    end = None
+                    newstart = 0
+                wildcard.append(realcommand[start:end])
+                realcommand = realcommand[newstart:]
+            except Exception:
+                pass
+        if wildcard_replace:
+            newstring = ''
+            for i in range(0, len(splitcommand)):
+                try:
+                    cond1 = len(wildcard_replace[i]) == len(wildcard[i])
+                    cond2 = '{str}' in splitreal[i]
+                    replace = True if ((cond1 or cond2) and not wildcard[i] == '') else False
+                except Exception:
+                    replace = False
+                try:
+                    if replace is True:
+                        newstring += splitcommand[i] + wildcard_replace[i]
+                    else:
+                        try:
+                            newstring += splitcommand[i] + wildcard[i]
+                        except Exception:
+                            newstring += splitcommand[i] + wildcard_replace[i]
+                except Exception:
+                    newstring = unprocessed
+                    break
+        else:
+            newstring = unprocessed.split('*')[0]
+    else:
+        newstring = response.split('*')[0]
+
+    return newstring
+
+
+def translate(commands, wildcards, line):
+    """
+    handling of a received line up to v1.6.4: every response command is processed by Translate.wildcard()
+    """
+    for entry in commands:
+        newentry = reference_wildcard(line, entry)
+        wildcards['wildcard'].update({newentry: entry})
+        wildcards['original'].update({entry: newentry})
+    responsecommands = [value for value in wildcards['wildcard'].keys() if '?' not in value]
+    return line.startswith(tuple(responsecommands))
+
+
+class TestResponseIndex(unittest.TestCase):
+
+    def test_same_result_as_translate(self):
+        for model, lines in SAMPLES.items():
+            commands = response_commands(model)
+            old = {'wildcard': {}, 'original': {}}
+            new = {'wildcard': {}, 'original': {}}
+            index = ResponseIndex(commands, new)
+            for line in lines:
+                with self.subTest(model=model, line=line):
+                    index.update(line)
+                    self.assertEqual(translate(commands, old, line), index.matches(line))
+                    self.assertEqual(old, new)
+
+    def test_unknown_line(self):
+        index = ResponseIndex(response_commands('vsx-923'), {'wildcard': {}, 'original': {}})
+        index.update('unknown')
+        self.assertFalse(index.matches('unknown'))
+
+
+class TestPrefixTrie(unittest.TestCase):
+
+    def test_matches(self):
+        trie = PrefixTrie(['VOL', 'PWR', 'FL'])
+        self.assertEqual(3, len(trie))
+        self.assertTrue(trie.matches('VOL121'))
+        self.assertTrue(trie.matches('PWR'))
+        self.assertFalse(trie.matches('VO'))
+        self.assertFalse(trie.matches('MUT1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,18 +19,21 @@
 #  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
 #########################################################################
 
+import collections
 import logging
 import time
 import threading
 
 from lib.model.smartplugin import SmartPlugin
 from lib.shtime import Shtime
+from .logfile import LogFile
+from .webif import WebInterface
 shtime = Shtime.get_instance()
 
 class DataLog(SmartPlugin):
 
     ALLOW_MULTIINSTANCE = True
-    PLUGIN_VERSION = '1.5.2'
+    PLUGIN_VERSION = '1.6.0'
 
     filepatterns = {}
     logpatterns = {}
@@ -73,7 +76,9 @@ class DataLog(SmartPlugin):
             raise Exception("Type of argument logpatterns unknown: {}".format(type(logpatterns)))
 
         for log in newfilepatterns:
-            ext = newfilepatterns[log].split('.')[-1]
+            # the log pattern of compressed files is chosen by the extension in front of '.gz'
+            ext = newfilepatterns[log].rsplit('.gz', 1)[0] if newfilepatterns[log].endswith('.gz') else newfilepatterns[log]
+            ext = ext.split('.')[-1]
             if ext in newlogpatterns:
                 self.filepatterns[log] = newfilepatterns[log]
                 self.logpatterns[log] = newlogpatterns[ext]
@@ -81,14 +86,28 @@ class DataLog(SmartPlugin):
                 self.logger.warn('DataLog: Ignoring log "{}", log pattern missing!'.format(log))
 
         self.cycle = int(cycle)
+        self.buffer_size = self.get_parameter_value('buffer_size')
+        self.overflow = self.get_parameter_value('overflow')
         self._items = {}
         self._buffer = {}
         self._buffer_lock = threading.Lock()
+        self._dump_lock = threading.Lock()
+        self._dump_triggered = False
+        self._started = time.time()
+
+        header = self.get_parameter_value('header')
+        self._files = {}
+        self._stats = {}
+        for log in self.filepatterns:
+            self._files[log] = LogFile(self.path, log, self.filepatterns[log], self.logpatterns[log], header)
+            self._stats[log] = {'received': 0, 'written': 0, 'dropped': 0, 'write_time': 0.0, 'last_dump': None}
 
         self.logger.info('DataLog: Initialized, logging to "{}"'.format(self.path))
         for log in self.filepatterns:
             self.logger.info('DataLog: Registered log "{}", file="{}", format="{}"'.format(log, self.filepatterns[log], self.logpatterns[log]))
 
+        self.init_webinterface(WebInterface)
+
     def run(self):
         self.alive = True
         self.scheduler_add('DataLog', self._dump, cycle=self.cycle)
@@ -96,6 +115,11 @@ class DataLog(SmartPlugin):
     def stop(self):
         self.alive = False
         self._dump()
+        for log in self._files:
+            try:
+                self._files[log].close()
+            except Exception as e:
+                self.logger.error('Error while closing {}: {}'.format(self._files[log].filename, e))
 
     def parse_item(self, item):
         if self.has_iattr(item.conf, 'datalog'):
@@ -112,7 +136,7 @@ class DataLog(SmartPlugin):
                     return None
 
                 if log not in self._buffer:
-                    self._buffer[log] = []
+                    self._buffer[log] = collections.deque(maxlen=self.buffer_size or None)
 
                 if item.property.path not in self._items:
                     self._items[item.property.path] = []
@@ -130,43 +154,62 @@ class DataLog(SmartPlugin):
         pass
 
     def update_item(self, item, caller=None, source=None, dest=None):
-        if caller != 'DataLog':
-            pass
-
         if item.property.path in self._items:
-            for log in self._items[item.property.path]:
-                self._buffer[log].append({ 'time' : shtime.now(), 'item' : item.property.path, 'value' : item() })
+            entry = (shtime.now(), item.property.path, item())
+            with self._buffer_lock:
+                for log in self._items[item.property.path]:
+                    buffer = self._buffer[log]
+                    stats = self._stats[log]
+                    stats['received'] += 1
+                    if len(buffer) == buffer.maxlen:
+                        # buffer full: the deque drops the oldest entry on append
+                        stats['dropped'] += 1
+                        if self.overflow == 'drop_newest':
+                            continue
+                        if self.overflow == 'dump' and not self._dump_triggered:
+                            self._dump_triggered = True
+                            self.scheduler_trigger('DataLog')
+                    buffer.append(entry)
 
     def _dump(self):
-        data = {}
-        now = shtime.now()
-        handles = {}
-
-        for log in self._buffer:
-            self._buffer_lock.acquire()
-            self.logger.debug('Dumping log "{}" with {} entries ...'.format(log, len(self._buffer[log])))
-            entries = self._buffer[log]
-            self._buffer[log] = []
-            self._buffer_lock.release()
-
-            if len(entries):
-                logpattern = self.logpatterns[log]
-
-                try:
-                    for entry in entries:
-                        filename = self.filepatterns[log].format(**{ 'log' : log, 'year' : entry['time'].year, 'month' : entry['time'].month, 'day' : entry['time'].day })
-
-                        if filename not in handles:
-                            handles[filename] = open(self.path + '/' + filename, 'a')
-
-                        data = entry
-                        data['stamp'] = data['time'].timestamp();
-                        handles[filename].write(logpattern.format(**data))
-
-                except Exception as e:
-                    self.logger.error('Error while writing to {}: {}'.format(filename, e))
-
-        for filename in handles:
-            handles[filename].close()
+        with self._dump_lock:
+            self._dump_triggered = False
+            for log in self._buffer:
+                with self._buffer_lock:
+                    entries = self._buffer[log]
+                    self._buffer[log] = collections.deque(maxlen=entries.maxlen)
+                self.logger.debug('Dumping log "{}" with {} entries ...'.format(log, len(entries)))
+
+                if len(entries):
+                    logfile = self._files[log]
+                    stats = self._stats[log]
+                    start = time.perf_counter()
+                    try:
+                        stats['written'] += logfile.write(entries)
+                    except Exception as e:
+                        self.logger.error('Error while writing to {}: {}'.format(logfile.filename, e))
+                        logfile.close()
+                    stats['write_time'] += time.perf_counter() - start
+                    stats['last_dump'] = shtime.now()
 
             self.logger.debug('Dump done!')
+
+    def get_statistics(self):
+        """
+        Statistics of the logs for the web interface
+
+        :return: list of dicts, one per log
+        """
+        uptime = max(time.time() - self._started, 1)
+        result = []
+        for log in self._files:
+            stats = dict(self._stats[log])
+            buffer = self._buffer.get(log)
+            stats['log'] = log
+            stats['filepattern'] = self.filepatterns[log]
+            stats['filename'] = self._files[log].filename
+            stats['buffered'] = len(buffer) if buffer is not None else 0
+            stats['rate'] = stats['received'] / uptime
+            stats['throughput'] = stats['written'] / stats['write_time'] if stats['write_time'] else 0
+            result.append(stats)
+        return result
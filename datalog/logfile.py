@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2013-     Oliver Hinckel                  github@ollisnet.de
+#########################################################################
+#  This file is part of SmartHomeNG.    https://github.com/smarthomeNG//
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+
+import gzip
+import os
+import string
+
+
+def header_line(logpattern):
+    """
+    Builds a header line from a log pattern, every placeholder is replaced by its name
+
+    '{time};{item};{value}\\n' gives 'time;item;value\\n'
+    """
+    header = ''
+    for literal, field, spec, conversion in string.Formatter().parse(logpattern):
+        header += literal + (field or '')
+    return header
+
+
+class LogFile():
+    """
+    Target file of one log
+
+    The file stays open across the dumps. The filename is only formatted again when the date
+    of an entry differs from the date of the previous one, the file is closed and the next one
+    opened when the filename changes (e.g. at midnight for daily files). Files ending with '.gz'
+    are written gzip compressed.
+    """
+
+    def __init__(self, path, log, filepattern, logpattern, header=False):
+        self.path = path
+        self.log = log
+        self.filepattern = filepattern
+        self.logpattern = logpattern
+        self.header = header_line(logpattern) if header else None
+        self.filename = None
+        self._date = None
+        self._handle = None
+
+    def _open(self, date):
+        filename = self.filepattern.format(log=self.log, year=date.year, month=date.month, day=date.day)
+        if filename == self.filename and self._handle is not None:
+            self._date = date
+            return
+        self.close()
+        self._date = date
+        self.filename = filename
+        filepath = os.path.join(self.path, filename)
+        empty = not os.path.exists(filepath) or os.path.getsize(filepath) == 0
+        if filename.endswith('.gz'):
+            self._handle = gzip.open(filepath, 'at')
+        else:
+            self._handle = open(filepath, 'a')
+        if self.header is not None and empty:
+            self._handle.write(self.header)
+
+    def write(self, entries):
+        """
+        Writes the entries and flushes the file
+
+        :param entries: iterable of (time, item, value) tuples
+        :return: number of entries written
+        """
+        count = 0
+        logpattern = self.logpattern
+        for time, item, value in entries:
+            if self._handle is None or time.date() != self._date:
+                self._open(time.date())
+            self._handle.write(logpattern.format(time=time, item=item, value=value, stamp=time.timestamp()))
+            count += 1
+        if self._handle is not None:
+            self._handle.flush()
+        return count
+
+    def close(self):
+        if self._handle is not None:
+            handle = self._handle
+            self._handle = None
+            self._date = None
+            handle.close()
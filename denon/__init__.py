@@ -50,6 +50,8 @@ from lib.model.sdp.command import SDPCommandParseStr
 from lib.item.items import Items
 from lib.item.item import Item
 
+from .reply_matcher import ReplyMatcher
+
 # from .webif import WebInterface
 
 builtins.SDP_standalone = False
@@ -58,11 +60,12 @@ builtins.SDP_standalone = False
 class denon(SmartDevicePlugin):
     """ Device class for Denon AV. """
 
-    PLUGIN_VERSION = '1.2.0'
+    PLUGIN_VERSION = '1.2.1'
 
     def _set_device_defaults(self):
         self._use_callbacks = True
         self._custom_inputnames = {}
+        self._reply_matcher = None
 
         # set our own preferences concerning connections
         if PLUGIN_ATTR_NET_HOST in self._parameters and self._parameters[PLUGIN_ATTR_NET_HOST]:
@@ -79,6 +82,10 @@ class denon(SmartDevicePlugin):
         b = b.decode('unicode-escape').encode()
         self._parameters[PLUGIN_ATTR_CONN_TERMINATOR] = b
 
+    def _post_init(self):
+        # match received data against the precompiled reply patterns
+        self._reply_matcher = ReplyMatcher.install(self._commands, self.logger)
+
     def _transform_send_data(self, data=None, **kwargs):
         if isinstance(data, dict):
             data['limit_response'] = self._parameters[PLUGIN_ATTR_CONN_TERMINATOR]
@@ -116,6 +123,8 @@ class denon(SmartDevicePlugin):
                 table = "VIDEOSELECT"
                 self.logger.debug(f'Updating videoselect lookup to: {merged_dict}')
                 self._commands.update_lookup_table(table, merged_dict)
+                if self._reply_matcher is not None:
+                    self._reply_matcher.rebuild()
                 for mode in ('rev', 'rci', 'list'):
                     try:
                         self.logger.debug(f'trying to set item for lookup {table} and mode {mode}.')
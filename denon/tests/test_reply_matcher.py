@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2016 <Onkel Andy>                    <onkelandy@hotmail.com>
+#########################################################################
+#  This file is part of SmartHomeNG
+#
+#  Tests of the reply matcher with the commands of the denon plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG  If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+
+import re
+import unittest
+
+from plugins.denon.commands import commands, lookups
+from plugins.denon.reply_matcher import ReplyMatcher, literal_runs
+
+# lookup tables of all models, as the core merges them for the configured model
+LOOKUPS = {}
+for tables in lookups.values():
+    LOOKUPS.update(tables)
+
+LINES = ['PWON', 'PWSTANDBY', 'ZMON', 'SIDVD', 'MSDOLBY ATMOS', 'SSINFAISFSV 48', 'CVFL 50', 'Z2ON', 'Z250',
+         'NSE1Now Playing', 'MUOFF', 'PSBAS 50', 'PSTRE 50', 'SLPOFF', 'NSE4Album', 'unknown'] + \
+        [f'MV{volume}' for volume in range(300, 700, 25)] + [f'MVMAX {volume}' for volume in range(70, 90, 5)]
+
+REPLIES = {'MV505': ['zone1.control.volume'],
+           'MVMAX 80': ['zone1.control.volumemax'],
+           'PWON': ['general.power'],
+           'Z250': ['zone2.control.volume'],
+           b'PWON': ['general.power'],
+           'unknown': []}
+
+
+def reply_patterns(commands, path=''):
+    """
+    reply patterns of all commands in definition order, placeholders substituted like SDPCommands does
+    """
+    for name, cmd in commands.items():
+        if not isinstance(cmd, dict):
+            continue
+        if 'read' not in cmd and 'write' not in cmd and 'reply_pattern' not in cmd:
+            yield from reply_patterns(cmd, path + name + '.')
+            continue
+        patterns = cmd.get('reply_pattern')
+        if not patterns:
+            continue
+        if not isinstance(patterns, list):
+            patterns = [patterns]
+        result = []
+        for pattern in patterns:
+            if pattern == '*':
+                pattern = re.escape(str(cmd.get('opcode', '')))
+            if '{LOOKUP}' in pattern and cmd.get('lookup') in LOOKUPS:
+                pattern = pattern.replace('{LOOKUP}', '(' + '|'.join(re.escape(str(key)) for key in LOOKUPS[cmd['lookup']]) + ')')
+            valid = cmd.get('cmd_settings', {}).get('valid_list_ci')
+            if '{VALID_LIST_CI}' in pattern and valid:
+                pattern = pattern.replace('{VALID_LIST_CI}', '(?i:' + '|'.join(re.escape(str(value)) for value in valid) + ')')
+            result.append(pattern)
+        yield path + name, result
+
+
+def linear(patterns, data):
+    """
+    matching as done by SDPCommands.get_commands_from_reply(): every pattern in turn
+    """
+    return [command for command, cmd_patterns in patterns if any(re.match(pattern, data) for pattern in cmd_patterns)]
+
+
+class TestReplyMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.patterns = list(reply_patterns(commands))
+        self.matcher = ReplyMatcher(self.patterns)
+
+    def test_same_result_as_linear_matching(self):
+        for line in LINES:
+            with self.subTest(line=line):
+                self.assertEqual(linear(self.patterns, line), self.matcher.match(line))
+
+    def test_replies(self):
+        for line, expected in REPLIES.items():
+            with self.subTest(line=line):
+                self.assertEqual(expected, self.matcher.get_commands_from_reply(line))
+
+
+class TestLiteralRuns(unittest.TestCase):
+
+    def test_prefix(self):
+        self.assertEqual(('MV', 'MV'), literal_runs(r'MV(\d{2,3})'))
+        self.assertEqual(('MVMAX ', 'MVMAX '), literal_runs(r'^MVMAX (\d+)'))
+
+    def test_placeholder_first(self):
+        self.assertEqual(('', ' mixer volume '), literal_runs(r'(\S+) mixer volume (\d+)'))
+
+    def test_ignore_case(self):
+        self.assertEqual(('', ''), literal_runs(r'(?i)PWON'))
+
+    def test_invalid(self):
+        self.assertEqual(('', ''), literal_runs('(MV'))
+
+
+if __name__ == '__main__':
+    unittest.main()
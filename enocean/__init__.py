@@ -39,7 +39,7 @@ from .webif import WebInterface
 
 class EnOcean(SmartPlugin):
     ALLOW_MULTIINSTANCE = False
-    PLUGIN_VERSION = "1.4.2"
+    PLUGIN_VERSION = "1.4.3"
 
     def __init__(self, sh):
         """ Initializes the plugin. """
@@ -64,6 +64,7 @@ class EnOcean(SmartPlugin):
         self._cmd_lock = threading.Lock()
         self._response_lock = threading.Condition()
         self._rx_items = {}
+        self._rx_parsers = {}       # (sender_id, choice as hex) -> list of (eep, parser function, items)
         self._used_tx_offsets = []
         self._unused_tx_offset = None
         self.UTE_listen = False
@@ -209,8 +210,10 @@ class EnOcean(SmartPlugin):
 
                     if rx_id not in self._rx_items:
                         self._rx_items[rx_id] = {rx_eep: [item]}
+                        self._add_rx_parser(rx_id, rx_eep)
                     elif rx_eep not in self._rx_items[rx_id]:
                         self._rx_items[rx_id][rx_eep] = [item]
+                        self._add_rx_parser(rx_id, rx_eep)
                     elif item not in self._rx_items[rx_id][rx_eep]:
                         self._rx_items[rx_id][rx_eep].append(item)
 
@@ -240,6 +243,11 @@ class EnOcean(SmartPlugin):
             # register item for event handling via smarthomeNG core. Needed for sending control actions:
             return self.update_item
 
+    def _add_rx_parser(self, rx_id, rx_eep):
+        # the first byte of the eep is the only way to find the right eep for a received packet (choice)
+        parsers = self._rx_parsers.setdefault((rx_id, rx_eep[:2]), [])
+        parsers.append((rx_eep, self.eep_parser.get_parser(rx_eep), self._rx_items[rx_id][rx_eep]))
+
     def update_item(self, item, caller=None, source=None, dest=None):
         if self.log_for_debug:
             self.logger.debug("update_item method called")
@@ -543,7 +551,8 @@ class EnOcean(SmartPlugin):
         sender_id = int.from_bytes(data[-5:-1], byteorder='big', signed=False)
         status = data[-1]
         repeater_cnt = status & 0x0F
-        self.logger.info("Radio message: choice = {:02x} / payload = [{}] / sender_id = {:08X} / status = {} / repeat = {}".format(choice, ', '.join(['0x%02x' % b for b in payload]), sender_id, status, repeater_cnt))
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Radio message: choice = {:02x} / payload = [{}] / sender_id = {:08X} / status = {} / repeat = {}".format(choice, ', '.join(['0x%02x' % b for b in payload]), sender_id, status, repeater_cnt))
 
         if len(optional) == 7:
             subtelnum = optional[0]
@@ -559,42 +568,40 @@ class EnOcean(SmartPlugin):
         if sender_id in self._rx_items:
             if self.log_for_debug:
                 self.logger.debug("Sender ID found in item list")
-            # iterate over all eep known for this id and get list of associated items
-            for eep, items in self._rx_items[sender_id].items():
-                # check if choice matches first byte in eep (this seems to be the only way to find right eep for this particular packet)
-                if eep.startswith("{:02X}".format(choice)):
-                    # call parser for particular eep - returns dictionary with key-value pairs
-                    results = self.eep_parser(eep, payload, status)
-                    if self.log_for_debug:
-                        self.logger.debug(f"Radio message results = {results}")
-                    if 'DEBUG' in results:
-                        self.logger.warning("DEBUG Info: processing radio message with data = [{}] / optional = [{}]".format(', '.join(['0x%02x' % b for b in data]), ', '.join(['0x%02x' % b for b in optional])))
-                        self.logger.warning(f"Radio message results = {results}")
-                        self.logger.warning("Radio message: choice = {:02x} / payload = [{}] / sender_id = {:08X} / status = {} / repeat = {}".format(choice, ', '.join(['0x%02x' % b for b in payload]), sender_id, status, repeater_cnt))
-
-                    for item in items:
-                        rx_key = item.conf['enocean_rx_key'].upper()
-                        if rx_key in results:
-                            if 'enocean_rocker_sequence' in item.conf:
-                                try:
-                                    if hasattr(item, '_enocean_rs_thread') and item._enocean_rs_thread.is_alive():
-                                        if results[rx_key]:
-                                            if self.log_for_debug:
-                                                self.logger.debug("Sending pressed event")
-                                            item._enocean_rs_events["PRESSED"].set()
-                                        else:
-                                            if self.log_for_debug:
-                                                self.logger.debug("Sending released event")
-                                            item._enocean_rs_events["RELEASED"].set()
-                                    elif results[rx_key]:
-                                        item._enocean_rs_events = {'PRESSED': threading.Event(), 'RELEASED': threading.Event()}
-                                        item._enocean_rs_thread = threading.Thread(target=self._rocker_sequence, name="enocean-rs", args=(item, sender_id, item.conf['enocean_rocker_sequence'].split(','), ))
-                                        # self.logger.info("starting enocean_rocker_sequence thread")
-                                        item._enocean_rs_thread.start()
-                                except Exception as e:
-                                    self.logger.error(f"Error handling enocean_rocker_sequence: {e}")
-                            else:
-                                item(results[rx_key], self.get_shortname(), f"{sender_id:08X}")
+            # iterate over all eep known for this id with the first byte matching choice and get list of associated items
+            for eep, parser, items in self._rx_parsers.get((sender_id, f"{choice:02X}"), ()):
+                # call parser for particular eep - returns dictionary with key-value pairs
+                results = parser(payload, status)
+                if self.log_for_debug:
+                    self.logger.debug(f"Radio message results = {results}")
+                if 'DEBUG' in results:
+                    self.logger.warning("DEBUG Info: processing radio message with data = [{}] / optional = [{}]".format(', '.join(['0x%02x' % b for b in data]), ', '.join(['0x%02x' % b for b in optional])))
+                    self.logger.warning(f"Radio message results = {results}")
+                    self.logger.warning("Radio message: choice = {:02x} / payload = [{}] / sender_id = {:08X} / status = {} / repeat = {}".format(choice, ', '.join(['0x%02x' % b for b in payload]), sender_id, status, repeater_cnt))
+
+                for item in items:
+                    rx_key = item.conf['enocean_rx_key'].upper()
+                    if rx_key in results:
+                        if 'enocean_rocker_sequence' in item.conf:
+                            try:
+                                if hasattr(item, '_enocean_rs_thread') and item._enocean_rs_thread.is_alive():
+                                    if results[rx_key]:
+                                        if self.log_for_debug:
+                                            self.logger.debug("Sending pressed event")
+                                        item._enocean_rs_events["PRESSED"].set()
+                                    else:
+                                        if self.log_for_debug:
+                                            self.logger.debug("Sending released event")
+                                        item._enocean_rs_events["RELEASED"].set()
+                                elif results[rx_key]:
+                                    item._enocean_rs_events = {'PRESSED': threading.Event(), 'RELEASED': threading.Event()}
+                                    item._enocean_rs_thread = threading.Thread(target=self._rocker_sequence, name="enocean-rs", args=(item, sender_id, item.conf['enocean_rocker_sequence'].split(','), ))
+                                    # self.logger.info("starting enocean_rocker_sequence thread")
+                                    item._enocean_rs_thread.start()
+                            except Exception as e:
+                                self.logger.error(f"Error handling enocean_rocker_sequence: {e}")
+                        else:
+                            item(results[rx_key], self.get_shortname(), f"{sender_id:08X}")
         elif sender_id <= self.tx_id + 127 and sender_id >= self.tx_id:
             if self.log_for_debug:
                 self.logger.debug("Received repeated enocean stick message")
@@ -22,6 +22,8 @@
 
 import logging
 
+from .eep_profiles import EEP_PROFILES, compile_profile
+
 
 class EEP_Parser():
 
@@ -34,116 +36,50 @@ class EEP_Parser():
         if not self.plg_logger:
             self.plg_logger = self.logger
 
+        # parser functions by eep, compiled on first use
+        self._parsers = {}
+
     def CanParse(self, eep):
-        found = callable(getattr(self, "_parse_eep_" + eep, None))
+        found = eep in EEP_PROFILES or callable(getattr(self, "_parse_eep_" + eep, None))
         if not found:
             self.logger.error(f"eep-parser: missing parser for eep {eep} - there should be a _parse_eep_{eep}-function!")
         return found
 
-    def __call__(self, eep, payload, status):
-        # self.logger.debug('Parser called with eep = {} / payload = {} / status = {}'.format(eep, ', '.join(hex(x) for x in payload), hex(status)))
-        try:
-            results = getattr(self, "_parse_eep_" + eep)(payload, status)
-        except Exception as e:
-            self.plg_logger.warning(f'EEP-Parser: error on parsing eep {eep}: {e}')
-            return
-
-        # self.logger.info('Parser returns {results}')
-        return results
-
-# Definitions for RORG =  A5 / ORG = 07
-
-    def _parse_eep_A5_02_01(self, payload, status):
-        return {'TMP': (0 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_02(self, payload, status):
-        return {'TMP': (10 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_03(self, payload, status):
-        return {'TMP': (20 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_04(self, payload, status):
-        return {'TMP': (30 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_05(self, payload, status):
-        return {'TMP': (40 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_06(self, payload, status):
-        return {'TMP': (50 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_07(self, payload, status):
-        return {'TMP': (60 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_08(self, payload, status):
-        return {'TMP': (70 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_09(self, payload, status):
-        return {'TMP': (80 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_0A(self, payload, status):
-        return {'TMP': (90 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_0B(self, payload, status):
-        return {'TMP': (100 - (payload[2] * 40 / 255))}
-
-    def _parse_eep_A5_02_10(self, payload, status):
-        return {'TMP': (20 - (payload[2] * 80 / 255))}
-
-    def _parse_eep_A5_02_11(self, payload, status):
-        return {'TMP': (30 - (payload[2] * 80 / 255))}
-
-    def _parse_eep_A5_02_12(self, payload, status):
-        return {'TMP': (40 - (payload[2] * 80 / 255))}
-
-    def _parse_eep_A5_02_13(self, payload, status):
-        return {'TMP': (50 - (payload[2] * 80 / 255))}
-
-    def _parse_eep_A5_02_14(self, payload, status):
-        return {'TMP': (60 - (payload[2] * 80 / 255))}
-
-    def _parse_eep_A5_02_15(self, payload, status):
-        return {'TMP': (70 - (payload[2] * 80 / 255))}
-
-    def _parse_eep_A5_02_16(self, payload, status):
-        return {'TMP': (80 - (payload[2] * 80 / 255))}
+    def get_parser(self, eep):
+        """
+        returns a function(payload, status) parsing telegrams of the eep
 
-    def _parse_eep_A5_02_17(self, payload, status):
-        return {'TMP': (90 - (payload[2] * 80 / 255))}
+        EEPs described in eep_profiles.py are compiled into a decoder, all others use their
+        _parse_eep_ function. Errors while parsing are logged and None is returned.
+        """
+        parser = self._parsers.get(eep)
+        if parser is not None:
+            return parser
 
-    def _parse_eep_A5_02_18(self, payload, status):
-        return {'TMP': (100 - (payload[2] * 80 / 255))}
-
-    def _parse_eep_A5_02_19(self, payload, status):
-        return {'TMP': (110 - (payload[2] * 80 / 255))}
-
-    def _parse_eep_A5_02_1A(self, payload, status):
-        return {'TMP': (120 - (payload[2] * 80 / 255))}
-
-    def _parse_eep_A5_02_1B(self, payload, status):
-        return {'TMP': (130 - (payload[2] * 80 / 255))}
+        if eep in EEP_PROFILES:
+            function = compile_profile(EEP_PROFILES[eep], "_parse_eep_" + eep)
+        else:
+            function = getattr(self, "_parse_eep_" + eep, None)
+            if function is None:
+                self.plg_logger.warning(f'EEP-Parser: error on parsing eep {eep}: no parser')
+                return lambda payload, status: None
 
-    def _parse_eep_A5_02_20(self, payload, status):
-        return {'TMP': (41.2 - (((payload[1] & 0x03) * 256.0 + payload[2]) * 51.2 / 1023))}
+        def parser(payload, status):
+            try:
+                return function(payload, status)
+            except Exception as e:
+                self.plg_logger.warning(f'EEP-Parser: error on parsing eep {eep}: {e}')
 
-    def _parse_eep_A5_02_30(self, payload, status):
-        return {'TMP': (62.3 - (((payload[1] & 0x03) * 256.0 + payload[2]) * 102.3 / 1023))}
+        self._parsers[eep] = parser
+        return parser
 
-    def _parse_eep_A5_04_01(self, payload, status):
-        result = {}
-        result['HUM'] = (payload[1] / 250.0 * 100)
-        result['TMP'] = (payload[2] / 250.0 * 40.0)
-        return result
+    def __call__(self, eep, payload, status):
+        # self.logger.debug('Parser called with eep = {} / payload = {} / status = {}'.format(eep, ', '.join(hex(x) for x in payload), hex(status)))
+        return self.get_parser(eep)(payload, status)
 
-    def _parse_eep_A5_04_02(self, payload, status):
-        # Energy (optional), humidity and temperature, for example eltako FBH65TFB
-        result = {}
-        # voltage of energy buffer in Volts
-        result['ENG'] = 0.47 + (payload[0] * 1.5 / 66)
-        # relative humidity in percent
-        result['HUM'] = (payload[1] / 250.0 * 100)
-        # temperature in degree Celsius from -20.0 degC - 60degC
-        result['TMP'] = -20.0 + (payload[2] / 250.0 * 80.0)
-        return result
+# Definitions for RORG =  A5 / ORG = 07
+# (EEPs consisting of plain data fields, e.g. A5_02_xx, A5_04_xx, A5_08_01, A5_3F_7F, D5_00_01 and F6_02_03,
+# are described in eep_profiles.py)
 
     def _parse_eep_A5_06_01(self, payload, status):
         # Brightness sensor, for example Eltako FAH60
@@ -179,16 +115,7 @@ class EEP_Parser():
             result['SVC'] = payload[0] / 255.0 * 5.0                  # supply voltage in volts
         result['ILL'] = (payload[1] << 2) + ((payload[2] & 0xC0) >> 6)    # 10 bit illumination in lux
         result['PIR'] = (payload[3] & 0x80) == 0x80                   # Movement flag, 1:motion detected
-        self.logger.debug(f"Occupancy: PIR:{result['PIR']} illumination: {result['ILL']}lx, voltage: {result['SVC']}V")
-        return result
-
-    def _parse_eep_A5_08_01(self, payload, status):
-        # Brightness and movement sensor, for example eltako FBH65TFB
-        self.logger.debug("Parsing A5_08_01: Movement sensor")
-        result = {}
-        result['BRI'] = payload[1] / 255.0 * 2048          # brightness in lux
-        result['MOV'] = not (payload[3] & 0x02) == 0x02    # movement
-        # self.logger.debug(f"Movement: {result['MOV']}, brightness: {result['BRI']}")
+        self.logger.debug("Occupancy: PIR:%s illumination: %slx, voltage: %sV", result['PIR'], result['ILL'], result['SVC'])
         return result
 
     def _parse_eep_A5_11_04(self, payload, status):
@@ -234,14 +161,14 @@ class EEP_Parser():
         else:
             self.logger.warning(f"Processing A5_12_01: Unknown enum ({div_enum}) for divisor")
 
-        self.logger.debug(f"Processing A5_12_01: divisor is {divisor}")
+        self.logger.debug("Processing A5_12_01: divisor is %s", divisor)
 
         if is_power:
             self.logger.debug("Processing A5_12_01: powermeter: Unit is Watts")
         else:
             self.logger.debug("Processing A5_12_01: powermeter: Unit is kWh")
         value = ((payload[0] << 16) + (payload[1] << 8) + payload[2]) / divisor
-        self.logger.debug(f"Processing A5_12_01: powermeter: {value} W")
+        self.logger.debug("Processing A5_12_01: powermeter: %s W", value)
 
         # It is confirmed by Eltako that with the use of multiple repeaters in an Eltako network, values can be corrupted in random cases.
         # Catching these random errors via plausibility check:
@@ -323,14 +250,6 @@ class EEP_Parser():
             results['SW'] = payload[4] & 1 << 0 == 1 << 0
         return results
 
-    def _parse_eep_A5_3F_7F(self, payload, status):
-        self.logger.debug("Processing A5_3F_7F")
-        results = {'DI_3': (payload[3] & 1 << 3) == 1 << 3, 'DI_2': (payload[3] & 1 << 2) == 1 << 2, 'DI_1': (payload[3] & 1 << 1) == 1 << 1, 'DI_0': (payload[3] & 1 << 0) == 1 << 0}
-        results['AD_0'] = (((payload[1] & 0x03) << 8) + payload[2]) * 1.8 / pow(2, 10)
-        results['AD_1'] = (payload[1] >> 2) * 1.8 / pow(2, 6)
-        results['AD_2'] = payload[0] * 1.8 / pow(2, 8)
-        return results
-
     def _parse_eep_A5_0G_03(self, payload, status):
         '''
         4 Byte communication(4BS) Telegramm
@@ -342,15 +261,16 @@ class EEP_Parser():
             MOVE: runtime of movement in s (with direction: "-" = up; "+" = down)
         '''
         self.logger.debug("eep-parser processing A5_0G_03 4BS telegram: shutter movement feedback")
-        self.logger.debug("eep-parser input payload = [{}]".format(', '.join(['0x%02X' % b for b in payload])))
-        self.logger.debug(f"eep-parser input status = {status}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("eep-parser input payload = [{}]".format(', '.join(['0x%02X' % b for b in payload])))
+        self.logger.debug("eep-parser input status = %s", status)
         results = {}
         runtime_s = ((payload[0] << 8) + payload[1]) / 10
         if payload[2] == 1:
-            self.logger.debug(f"Shutter moved {runtime_s} s 'upwards'")
+            self.logger.debug("Shutter moved %s s 'upwards'", runtime_s)
             results['MOVE'] = runtime_s * -1
         elif payload[2] == 2:
-            self.logger.debug(f"Shutter moved {runtime_s} s 'downwards'")
+            self.logger.debug("Shutter moved %s s 'downwards'", runtime_s)
             results['MOVE'] = runtime_s
         return results
 
@@ -392,13 +312,6 @@ class EEP_Parser():
             self.logger.debug('D2 Switch Channel B: on')
         return results
 
-# Definitions for RORG = D5 / ORG = 06
-
-    def _parse_eep_D5_00_01(self, payload, status):
-        # Window/Door Contact Sensor, for example Eltako FTK, FTKB
-        self.logger.debug("Processing D5_00_01: Door contact")
-        return {'STATUS': payload[0] & 0x01 == 0x01}
-
 # Definitions for RORG = F6 / ORG = 05
 
     def _parse_eep_F6_02_01(self, payload, status):
@@ -424,33 +337,8 @@ class EEP_Parser():
         self.logger.debug("Processing F6_02_02: Rocker Switch, 2 Rocker, Light and Blind Control - Application Style 2")
         return self._parse_eep_F6_02_01(payload, status)
 
-    def _parse_eep_F6_02_03(self, payload, status):
-        '''
-        Repeated switch communication(RPS) Telegramm
-        Status command from bidirectional actors, for example eltako FSUD-230, FSVA-230V or switches (for example Gira)
-        '''
-        self.logger.debug("Processing F6_02_03: Rocker Switch, 2 Rocker")
-        results = {}
-        # Button A1: Dimm light down
-        results['AI'] = payload[0] == 0x10
-        # Button A0: Dimm light up
-        results['AO'] = payload[0] == 0x30
-        # Button B1: Dimm light down
-        results['BI'] = payload[0] == 0x50
-        # Button B0: Dimm light up
-        results['BO'] = payload[0] == 0x70
-        if payload[0] == 0x70:
-            results['B'] = True
-        elif payload[0] == 0x50:
-            results['B'] = False
-        elif payload[0] == 0x30:
-            results['A'] = True
-        elif payload[0] == 0x10:
-            results['A'] = False
-        return results
-
     def _parse_eep_F6_10_00(self, payload, status):
-        self.logger.debug(f"Processing F6_10_00: Mechanical Handle sends payload {payload[0]}")
+        self.logger.debug("Processing F6_10_00: Mechanical Handle sends payload %s", payload[0])
         results = {}
         # Eltako defines 0xF0 for closed status. Enocean spec defines masking of lower 4 bit:
         if payload[0] & 0b11110000 == 0b11110000:
@@ -476,8 +364,9 @@ class EEP_Parser():
             B: status of the shutter actor (command) 
         '''
         self.logger.debug("Processing F6_0G_03: shutter actor")
-        self.logger.debug("payload = [{}]".format(', '.join(['0x%02X' % b for b in payload])))
-        self.logger.debug(f"status: {status}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("payload = [{}]".format(', '.join(['0x%02X' % b for b in payload])))
+        self.logger.debug("status: %s", status)
         results = {}
         if payload[0] == 0x70:
             results['POSITION'] = 0
@@ -491,5 +380,5 @@ class EEP_Parser():
         elif payload[0] == 0x02:
             results['STATUS'] = 'Start moving down'
             results['B'] = 2
-        self.logger.debug(f'parse_eep_F6_0G_03 returns: {results}')
+        self.logger.debug('parse_eep_F6_0G_03 returns: %s', results)
         return results
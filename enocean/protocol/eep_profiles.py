@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2013-2014 Robert Budde                   robert@ing-budde.de
+#  Copyright 2014 Alexander Schwithal                 aschwith
+#########################################################################
+#  Enocean plugin for SmartHomeNG.      https://github.com/smarthomeNG//
+#
+#  This plugin is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This plugin is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this plugin. If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+
+# declarative description of the EEPs which only consist of fixed data fields
+#
+# The fields are described like in the EnOcean Equipment Profiles: offset and size in bits,
+# counted from the most significant bit of the payload (DB3.7 for 4BS telegrams). EEPs with
+# conditional content (learn telegrams, status dependent fields, plausibility checks) are
+# implemented as _parse_eep_ functions in eep_parser.py.
+
+from collections import namedtuple
+
+
+# raw value of the field scaled linearly from valid range to scale
+Value = namedtuple('Value', ['key', 'offset', 'size', 'range', 'scale'])
+# single bit as bool, inverted if inverse is True
+Flag = namedtuple('Flag', ['key', 'offset', 'inverse'], defaults=[False])
+# raw value mapped by a dict, values not in the dict give default (without default the key is missing in the result)
+Enum = namedtuple('Enum', ['key', 'offset', 'size', 'values', 'default'], defaults=[None])
+
+
+EEP_PROFILES = {
+    # Temperature sensors, 8 bit, range 255..0 for 40 K (A5-02-01 to A5-02-0B) or 80 K (A5-02-10 to A5-02-1B)
+    **{f'A5_02_{n:02X}': (Value('TMP', 16, 8, (0, 255), (n * 10 - 10, n * 10 - 50)),) for n in range(0x01, 0x0C)},
+    **{f'A5_02_{n:02X}': (Value('TMP', 16, 8, (0, 255), (n * 10 - 140, n * 10 - 220)),) for n in range(0x10, 0x1C)},
+    # Temperature sensors, 10 bit
+    'A5_02_20': (Value('TMP', 14, 10, (0, 1023), (41.2, -10)),),
+    'A5_02_30': (Value('TMP', 14, 10, (0, 1023), (62.3, -40)),),
+    # Temperature and humidity sensor
+    'A5_04_01': (Value('HUM', 8, 8, (0, 250), (0, 100)),
+                 Value('TMP', 16, 8, (0, 250), (0, 40))),
+    # Energy (optional), humidity and temperature, for example eltako FBH65TFB
+    'A5_04_02': (Value('ENG', 0, 8, (0, 66), (0.47, 1.97)),
+                 Value('HUM', 8, 8, (0, 250), (0, 100)),
+                 Value('TMP', 16, 8, (0, 250), (-20, 60))),
+    # Brightness and movement sensor, for example eltako FBH65TFB
+    'A5_08_01': (Value('BRI', 8, 8, (0, 255), (0, 2048)),
+                 Flag('MOV', 30, inverse=True)),
+    # Digital and analog inputs
+    'A5_3F_7F': (Flag('DI_3', 28), Flag('DI_2', 29), Flag('DI_1', 30), Flag('DI_0', 31),
+                 Value('AD_0', 14, 10, (0, 1024), (0, 1.8)),
+                 Value('AD_1', 8, 6, (0, 64), (0, 1.8)),
+                 Value('AD_2', 0, 8, (0, 256), (0, 1.8))),
+    # Window/Door Contact Sensor, for example Eltako FTK, FTKB
+    'D5_00_01': (Flag('STATUS', 7),),
+    # Rocker switch, 2 rocker, status of bidirectional actors, for example eltako FSUD-230, FSVA-230V
+    'F6_02_03': (Enum('AI', 0, 8, {0x10: True}, False), Enum('AO', 0, 8, {0x30: True}, False),
+                 Enum('BI', 0, 8, {0x50: True}, False), Enum('BO', 0, 8, {0x70: True}, False),
+                 Enum('B', 0, 8, {0x70: True, 0x50: False}), Enum('A', 0, 8, {0x30: True, 0x10: False})),
+}
+
+
+def _raw(offset, size):
+    """
+    returns the expression extracting the raw value of a field from the payload
+    """
+    byte, bit = divmod(offset, 8)
+    mask = (1 << size) - 1
+    if bit + size <= 8:
+        # field within one byte
+        shift = 8 - bit - size
+        expression = f'payload[{byte}]' if shift == 0 else f'(payload[{byte}] >> {shift})'
+        return expression if mask == 0xFF else f'({expression} & {mask})'
+    last = (offset + size - 1) // 8
+    shift = 7 - (offset + size - 1) % 8
+    expression = ' + '.join(f'(payload[{i}] << {8 * (last - i)})' if i < last else f'payload[{i}]'
+                            for i in range(byte, last + 1))
+    return f'((({expression}) >> {shift}) & {mask})'
+
+
+def compile_profile(fields, name='parse'):
+    """
+    compiles the field descriptions of an EEP into a parser function(payload, status) -> dict
+
+    The fields are translated into the source of one function, so decoding a telegram costs
+    about the same as a handwritten _parse_eep_ function.
+    """
+    namespace = {}
+    lines = [f'def {name}(payload, status):', '    results = {}']
+    for i, field in enumerate(fields):
+        if isinstance(field, Value):
+            rmin, rmax = field.range
+            smin, smax = field.scale
+            raw = _raw(field.offset, field.size)
+            lines.append(f'    results[{field.key!r}] = {smin!r} + ({raw} - {rmin!r}) * {smax - smin!r} / {rmax - rmin!r}')
+        elif isinstance(field, Flag):
+            lines.append(f'    results[{field.key!r}] = {_raw(field.offset, 1)} {"!=" if field.inverse else "=="} 1')
+        elif isinstance(field, Enum):
+            namespace[f'values{i}'] = field.values
+            if field.default is None:
+                lines.append(f'    value = values{i}.get({_raw(field.offset, field.size)})')
+                lines.append('    if value is not None:')
+                lines.append(f'        results[{field.key!r}] = value')
+            else:
+                lines.append(f'    results[{field.key!r}] = values{i}.get({_raw(field.offset, field.size)}, {field.default!r})')
+        else:
+            raise ValueError(f'unknown field type {field}')
+    lines.append('    return results')
+    exec('\n'.join(lines), namespace)
+    return namespace[name]
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2013-2014 Robert Budde                   robert@ing-budde.de
+#  Copyright 2014 Alexander Schwithal                 aschwith
+#########################################################################
+#  Enocean plugin for SmartHomeNG.      https://github.com/smarthomeNG//
+#
+#  Tests of the compiled EEP profiles and of the receiving side
+#
+#  This plugin is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This plugin is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this plugin. If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+
+import logging
+import random
+import unittest
+
+from plugins.enocean import EnOcean
+from plugins.enocean.protocol import CRC
+from plugins.enocean.protocol.eep_parser import EEP_Parser
+from plugins.enocean.protocol.eep_profiles import EEP_PROFILES
+
+
+# the handwritten parsers which were replaced by the profiles in eep_profiles.py
+REFERENCE = {
+    **{f'A5_02_{n:02X}': lambda p, n=n: {'TMP': (n * 10 - 10) - (p[2] * 40 / 255)} for n in range(0x01, 0x0C)},
+    **{f'A5_02_{n:02X}': lambda p, n=n: {'TMP': (n * 10 - 140) - (p[2] * 80 / 255)} for n in range(0x10, 0x1C)},
+    'A5_02_20': lambda p: {'TMP': 41.2 - (((p[1] & 0x03) * 256.0 + p[2]) * 51.2 / 1023)},
+    'A5_02_30': lambda p: {'TMP': 62.3 - (((p[1] & 0x03) * 256.0 + p[2]) * 102.3 / 1023)},
+    'A5_04_01': lambda p: {'HUM': p[1] / 250.0 * 100, 'TMP': p[2] / 250.0 * 40.0},
+    'A5_04_02': lambda p: {'ENG': 0.47 + (p[0] * 1.5 / 66), 'HUM': p[1] / 250.0 * 100, 'TMP': -20.0 + (p[2] / 250.0 * 80.0)},
+    'A5_08_01': lambda p: {'BRI': p[1] / 255.0 * 2048, 'MOV': not (p[3] & 0x02) == 0x02},
+    'A5_3F_7F': lambda p: {'DI_3': (p[3] & 1 << 3) == 1 << 3, 'DI_2': (p[3] & 1 << 2) == 1 << 2,
+                           'DI_1': (p[3] & 1 << 1) == 1 << 1, 'DI_0': (p[3] & 1 << 0) == 1 << 0,
+                           'AD_0': (((p[1] & 0x03) << 8) + p[2]) * 1.8 / pow(2, 10),
+                           'AD_1': (p[1] >> 2) * 1.8 / pow(2, 6),
+                           'AD_2': p[0] * 1.8 / pow(2, 8)},
+    'D5_00_01': lambda p: {'STATUS': p[0] & 0x01 == 0x01},
+    'F6_02_03': lambda p: {'AI': p[0] == 0x10, 'AO': p[0] == 0x30, 'BI': p[0] == 0x50, 'BO': p[0] == 0x70,
+                           **({'B': p[0] == 0x70} if p[0] in (0x50, 0x70) else {}),
+                           **({'A': p[0] == 0x30} if p[0] in (0x10, 0x30) else {})},
+}
+
+
+class TestEEPProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = EEP_Parser(logging.getLogger(__name__))
+        self.random = random.Random(42)
+
+    def payloads(self, eep):
+        length = 1 if eep[:2] in ('D5', 'F6') else 4
+        yield [0] * length
+        yield [0xFF] * length
+        if eep == 'F6_02_03':
+            yield from ([value] for value in (0x10, 0x30, 0x50, 0x70, 0x00))
+        for _ in range(200):
+            yield [self.random.randrange(256) for _ in range(length)]
+
+    def test_profiles_described(self):
+        self.assertEqual(set(EEP_PROFILES), set(REFERENCE))
+        for eep in EEP_PROFILES:
+            self.assertTrue(self.parser.CanParse(eep))
+
+    def test_profiles_match_reference(self):
+        for eep, reference in REFERENCE.items():
+            parser = self.parser.get_parser(eep)
+            for payload in self.payloads(eep):
+                with self.subTest(eep=eep, payload=payload):
+                    expected = reference(payload)
+                    results = parser(payload, 0x30)
+                    self.assertEqual(set(results), set(expected))
+                    for key, value in expected.items():
+                        if isinstance(value, bool):
+                            self.assertIs(results[key], value)
+                        else:
+                            self.assertAlmostEqual(results[key], value, places=9)
+
+    def test_parser_cached(self):
+        self.assertIs(self.parser.get_parser('A5_02_05'), self.parser.get_parser('A5_02_05'))
+        self.assertIs(self.parser.get_parser('A5_12_01'), self.parser.get_parser('A5_12_01'))
+
+    def test_parse_error(self):
+        # too short payload is logged and gives None
+        with self.assertLogs(logging.getLogger(__name__), level='WARNING'):
+            self.assertIsNone(self.parser('A5_04_02', [0], 0x30))
+
+
+class Item():
+
+    def __init__(self, sender_id, eep, key):
+        self.conf = {'enocean_rx_id': f'{sender_id:08X}', 'enocean_rx_eep': eep, 'enocean_rx_key': key}
+        self.values = []
+
+    def __call__(self, value=None, caller=None, source=None):
+        self.values.append((value, caller, source))
+
+    def __str__(self):
+        return self.conf['enocean_rx_key']
+
+
+class Recording():
+    """ serial device replaying chunks of a recorded byte stream """
+
+    def __init__(self, plugin, chunks):
+        self._plugin = plugin
+        self._chunks = iter(chunks)
+
+    def read(self, size):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._plugin.alive = False
+            return b''
+        return chunk
+
+    def close(self):
+        pass
+
+
+class TestReceive(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+        self.crc = CRC()
+        plugin = EnOcean.__new__(EnOcean)
+        plugin.logger = self.logger
+        plugin.get_shortname = lambda: 'enocean'
+        plugin.tx_id = 0
+        plugin._rx_items = {}
+        plugin._rx_parsers = {}
+        plugin._used_tx_offsets = []
+        plugin._unused_tx_offset = None
+        plugin._log_unknown_msg = False
+        plugin._connect_retries = 0
+        plugin.UTE_listen = False
+        plugin.unknown_sender_id = 'None'
+        plugin.log_for_debug = False
+        plugin.eep_parser = EEP_Parser(self.logger)
+        plugin.crc = self.crc
+        self.plugin = plugin
+        self.items = {}
+        for sender_id, eep, keys in ((0x01800001, 'A5_02_05', ['TMP']),
+                                     (0x01800002, 'A5_04_02', ['ENG', 'HUM', 'TMP']),
+                                     (0x01800007, 'F6_02_03', ['A', 'B']),
+                                     (0x01800009, 'D2_01_12', ['STAT_A', 'STAT_B'])):
+            for key in keys:
+                item = Item(sender_id, eep, key)
+                plugin.parse_item(item)
+                self.items[(sender_id, key)] = item
+
+    def packet(self, sender_id, choice, payload):
+        data = bytes([choice] + payload) + sender_id.to_bytes(4, byteorder='big') + bytes([0x30])
+        optional = bytes([1, 0xFF, 0xFF, 0xFF, 0xFF, 60, 0])
+        header = len(data).to_bytes(2, byteorder='big') + bytes([len(optional), 0x01])
+        return bytes([0x55]) + header + bytes([self.crc(header)]) + data + optional + bytes([self.crc(data + optional)])
+
+    def replay(self, stream, size):
+        self.plugin._tcm = Recording(self.plugin, [stream[i:i + size] for i in range(0, len(stream), size)])
+        self.plugin.run()
+
+    def values(self, sender_id, key):
+        return [value for value, caller, source in self.items[(sender_id, key)].values]
+
+    def test_stream(self):
+        corrupted = bytearray(self.packet(0x01800001, 0xA5, [0, 0, 0x00, 0x08]))
+        corrupted[-1] ^= 0xFF
+        stream = b''.join([
+            b'\x00\x12',                                            # garbage before the first sync byte
+            self.packet(0x01800001, 0xA5, [0, 0, 0xFF, 0x08]),
+            self.packet(0x01900000, 0xA5, [1, 2, 3, 0x08]),          # unknown sender
+            self.packet(0x01800002, 0xA5, [66, 125, 250, 0x08]),
+            bytes(corrupted),                                       # crc error, dropped
+            self.packet(0x01800007, 0xF6, [0x30]),
+            self.packet(0x01800007, 0xF6, [0x50]),
+            self.packet(0x01800009, 0xD2, [0x04, 0x60, 0x80]),
+            self.packet(0x01800001, 0xA5, [0, 0, 0x80, 0x08]),
+        ])
+        # same result whether the stream is read at once, in serial sized chunks or byte by byte
+        for size in (len(stream), 1000, 7, 1):
+            with self.subTest(size=size):
+                for item in self.items.values():
+                    item.values.clear()
+                with self.assertLogs(self.logger, level='ERROR'):
+                    self.replay(stream, size)
+                self.assertEqual(self.values(0x01800001, 'TMP'), [0.0, 40 - 0x80 * 40 / 255])
+                self.assertAlmostEqual(self.values(0x01800002, 'ENG')[0], 1.97)
+                self.assertAlmostEqual(self.values(0x01800002, 'HUM')[0], 50.0)
+                self.assertAlmostEqual(self.values(0x01800002, 'TMP')[0], 60.0)
+                self.assertEqual(self.values(0x01800007, 'A'), [True])
+                self.assertEqual(self.values(0x01800007, 'B'), [False])
+                self.assertEqual(len(self.values(0x01800009, 'STAT_A')), 1)
+                self.assertEqual(self.plugin.unknown_sender_id, '01900000')
+                self.assertEqual(self.items[(0x01800001, 'TMP')].values[0][1:], ('enocean', '01800001'))
+
+    def test_choice_mismatch(self):
+        # a telegram of a known sender with another choice than its eep is ignored
+        self.replay(self.packet(0x01800001, 0xF6, [0x30]), 1000)
+        self.assertEqual(self.values(0x01800001, 'TMP'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
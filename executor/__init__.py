@@ -31,6 +31,7 @@ from lib.module import Modules
 from lib.item import Items
 from lib.model.smartplugin import SmartPlugin
 
+from .autocomplete import AutocompleteIndex
 from .webif import WebInterface
 
 
@@ -40,7 +41,7 @@ class Executor(SmartPlugin):
     the update functions for the items
     """
 
-    PLUGIN_VERSION = '1.2.1'
+    PLUGIN_VERSION = '1.4.0'
 
     def __init__(self, sh):
         """
@@ -57,7 +58,9 @@ class Executor(SmartPlugin):
 
         self._scripts = self.get_parameter_value('scripts')    #default is *executor_scripts*
         self._script_entries = self.get_parameter_value('script_entries')    #default is 6
-        self.logger.debug(f"{self._scripts=}, {self._script_entries=}")
+        self._profile_top = self.get_parameter_value('profile_top')    #default is 20
+        self._profile_time_budget = self.get_parameter_value('profile_time_budget')    #default is 0 (no limit)
+        self.logger.debug(f"{self._scripts=}, {self._script_entries=}, {self._profile_top=}, {self._profile_time_budget=}")
         try:
             vardir = sh.get_vardir()
             self.logger.debug(f"{vardir=}")
@@ -69,6 +72,8 @@ class Executor(SmartPlugin):
             self._scripts = None
             self.executor_scripts = None
 
+        self.autocomplete_index = AutocompleteIndex(sh, Items.get_instance(), self.logger)
+
         # no start without web interface
         if not self.init_webinterface():
             self.logger.warning(f"could not init webinterface")
@@ -83,6 +88,12 @@ class Executor(SmartPlugin):
         """
         self.logger.debug(f"Plugin '{self.get_fullname()}': run method called")
         self.alive = True
+        # build the autocomplete index before the editor asks for it
+        try:
+            self.autocomplete_index.invalidate()
+            self.autocomplete_index.refresh()
+        except Exception as e:
+            self.logger.warning(f"Exception {e}: could not build autocomplete index")
 
     def stop(self):
         """
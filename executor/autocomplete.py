@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2019-2022 Bernd Meiners                Bernd.Meiners@mail.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  This is the executor plugin to run with SmartHomeNG version 1.9 and
+#  upwards.
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import bisect
+import hashlib
+import json
+import threading
+import time
+
+from lib.model.smartplugin import SmartPlugin
+
+
+class AutocompleteIndex():
+    """
+    Sorted index of the item paths and plugin functions for the autocompletion of the editor
+
+    The index is built once and rebuilt only, when the items or plugins have changed. The
+    version of the index is a hash of the item paths and the configured plugin instances, it
+    is used as ETag by the web interface.
+
+    Hashing the item paths takes a while for large installations. As long as the number of
+    items and the plugin instances are unchanged, the paths are hashed at most every
+    REHASH_INTERVAL seconds, so items renamed by a reload show up with that delay.
+    """
+
+    REHASH_INTERVAL = 10
+
+    def __init__(self, sh, items, logger=None):
+        self._sh = sh
+        self._items = items
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._signature = None
+        self._quick_signature = None    # number of items and plugin instances at the last hashing
+        self._hashed = 0                # time of the last hashing
+        self.version = None
+        self._keys = []             # lower case completion texts, sorted
+        self._entries = []          # (text, kind) in the order of _keys
+        self._json = None
+
+
+    def _get_plugins(self):
+        # a reloaded plugin is a new instance and may offer other functions
+        return tuple((x.get_configname(), id(x)) for x in self._sh.plugins.get_instance().return_plugins() if isinstance(x, SmartPlugin))
+
+
+    def _get_signature(self, items, plugins):
+        # the paths themselves, as items may be renamed or replaced by a reload without changing their count
+        paths = hashlib.sha1()
+        for item in items:
+            paths.update(item.property.path.encode())
+            paths.update(b'\n')
+        return (paths.hexdigest(), plugins)
+
+
+    def invalidate(self):
+        """
+        Force a rebuild of the index on the next request
+        """
+        with self._lock:
+            self._signature = None
+            self._quick_signature = None
+
+
+    def refresh(self):
+        """
+        Rebuild the index, if items or plugins have changed
+
+        :return: version of the index
+        """
+        items = self._items.return_items()
+        quick_signature = (len(items), self._get_plugins())
+        now = time.monotonic()
+        with self._lock:
+            if self._signature is not None and quick_signature == self._quick_signature and now - self._hashed < self.REHASH_INTERVAL:
+                return self.version
+
+        signature = self._get_signature(items, quick_signature[1])
+        with self._lock:
+            self._quick_signature = quick_signature
+            self._hashed = now
+            if signature != self._signature:
+                self._build(signature)
+            return self.version
+
+
+    def _build(self, signature):
+        entries = []
+        for x in self._sh.plugins.get_instance().return_plugins():
+            if isinstance(x, SmartPlugin) and x.metadata is not None:
+                api = x.metadata.get_plugin_function_defstrings(with_type=True, with_default=True)
+                if api is not None:
+                    plugin_config_name = x.get_configname()
+                    for function in api:
+                        entries.append(("sh." + plugin_config_name + "." + function, 'Plugin'))
+        for item in self._items.return_items():
+            entries.append(("sh." + str(item.property.path) + "()", 'Item'))
+
+        entries.sort(key=lambda e: e[0].lower())
+        self._entries = entries
+        self._keys = [e[0].lower() for e in entries]
+        self._json = None
+        self._signature = signature
+        self.version = hashlib.sha1(repr(signature).encode()).hexdigest()[:16]
+        if self.logger is not None:
+            self.logger.info(f"Autocomplete index built with {len(entries)} entries (version {self.version})")
+
+
+    def complete(self, prefix, limit=200):
+        """
+        Return the entries starting with prefix (case insensitive)
+
+        The index is not refreshed, if it has already been built. Call refresh() once per request before.
+
+        :return: tuple (list of (text, kind), True if all matching entries are returned)
+        """
+        if self._signature is None:
+            self.refresh()
+        with self._lock:
+            keys, entries = self._keys, self._entries
+        prefix = prefix.lower()
+        start = bisect.bisect_left(keys, prefix)
+        stop = start
+        while stop < len(keys) and stop - start <= limit and keys[stop].startswith(prefix):
+            stop += 1
+        complete = stop - start <= limit
+        return entries[start:min(stop, start + limit)], complete
+
+
+    def get_json(self):
+        """
+        The index is not refreshed, if it has already been built. Call refresh() once per request before.
+
+        :return: the complete index in the format of the former get_autocomplete result
+        """
+        if self._signature is None:
+            self.refresh()
+        with self._lock:
+            if self._json is None:
+                self._json = json.dumps({'items': [e[0] for e in self._entries if e[1] == 'Item'],
+                                         'plugins': [e[0] for e in self._entries if e[1] == 'Plugin']})
+            return self._json
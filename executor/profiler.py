@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2019-2022 Bernd Meiners                Bernd.Meiners@mail.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  This is the executor plugin to run with SmartHomeNG version 1.9 and
+#  upwards.
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import cProfile
+import ctypes
+import datetime
+import json
+import os
+import pstats
+import threading
+import time
+
+try:
+    from lib.item.item import Item
+except ImportError:
+    Item = None
+
+
+class TimeBudgetExceeded(BaseException):
+    """
+    Raised in the thread running a profiled script, when the time budget is used up
+
+    Derived from BaseException, so that a script catching Exception is aborted nevertheless
+    """
+    pass
+
+
+class ScriptProfiler():
+    """
+    Runs python code with exec() under cProfile
+
+    Measures wall and cpu time of the executing thread, the functions with the highest cumulative
+    time and the number of item reads and writes. Item calls are counted by wrapping Item.__call__
+    while a script is profiled, only calls made by the profiling thread are counted.
+    """
+
+    # only one script is profiled at a time, Item.__call__ is patched for the whole process
+    _lock = threading.Lock()
+
+    def __init__(self, top=20, time_budget=0, logger=None):
+        """
+        :param top: number of functions to report
+        :param time_budget: wall time in seconds after which the script is aborted (0 = no limit)
+        """
+        self.top = top
+        self.time_budget = time_budget
+        self.logger = logger
+        self._abort_lock = threading.Lock()
+        self._running = False
+
+
+    def run(self, code, g, l):
+        """
+        Execute the code and return the profiling result
+
+        :return: dict with the results, key 'error' holds the error message (or '')
+        """
+        result = {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                  'error': '', 'aborted': False,
+                  'item_reads': {}, 'item_writes': {}}
+        with self._lock:
+            thread_id = threading.get_ident()
+            timer = None
+            if self.time_budget:
+                timer = threading.Timer(self.time_budget, self._abort, args=(thread_id,))
+                timer.daemon = True
+
+            restore = self._count_item_calls(thread_id, result['item_reads'], result['item_writes'])
+            profile = cProfile.Profile()
+            wall = time.perf_counter()
+            cpu = time.thread_time()
+            try:
+                self._running = True
+                if timer is not None:
+                    timer.start()
+                profile.enable()
+                try:
+                    exec(code, g, l)
+                finally:
+                    profile.disable()
+                    with self._abort_lock:
+                        # no exception may be raised after the script ended
+                        self._running = False
+                    if timer is not None:
+                        timer.cancel()
+            except TimeBudgetExceeded:
+                result['aborted'] = True
+                result['error'] = f"Script aborted after the time budget of {self.time_budget} s"
+            except Exception as e:
+                result['error'] = f"Error '{e}' while evaluating"
+            finally:
+                result['cpu_time'] = round(time.thread_time() - cpu, 4)
+                result['wall_time'] = round(time.perf_counter() - wall, 4)
+                restore()
+
+        result['functions'] = self._top_functions(profile)
+        return result
+
+
+    def _abort(self, thread_id):
+        """
+        Raise TimeBudgetExceeded in the thread running the script
+
+        The exception is raised with the next python bytecode, a blocking call (e.g. time.sleep)
+        is not interrupted.
+        """
+        with self._abort_lock:
+            if not self._running:
+                return
+            if self.logger is not None:
+                self.logger.warning(f"Profiled script exceeded the time budget of {self.time_budget} s, aborting it")
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id), ctypes.py_object(TimeBudgetExceeded))
+
+
+    def _count_item_calls(self, thread_id, reads, writes):
+        """
+        Wrap Item.__call__ to count the reads and writes of the profiling thread
+
+        :return: function to restore the original Item.__call__
+        """
+        if Item is None:
+            return lambda: None
+
+        original = Item.__call__
+
+        def counting_call(item, *args, **kwargs):
+            if threading.get_ident() == thread_id:
+                value = args[0] if args else kwargs.get('value')
+                counter = reads if value is None else writes
+                path = item.property.path
+                counter[path] = counter.get(path, 0) + 1
+            return original(item, *args, **kwargs)
+
+        Item.__call__ = counting_call
+
+        def restore():
+            Item.__call__ = original
+        return restore
+
+
+    def _top_functions(self, profile):
+        """
+        :return: list of the functions with the highest cumulative time
+        """
+        stats = pstats.Stats(profile).stats
+        functions = []
+        for (filename, line, name), (cc, nc, tt, ct, callers) in stats.items():
+            if name == "<method 'disable' of '_lsprof.Profiler' objects>":
+                continue
+            if filename == '~':
+                location = name
+            else:
+                location = f"{os.path.basename(filename)}:{line}({name})"
+            functions.append({'function': location, 'calls': nc,
+                              'tottime': round(tt, 4), 'cumtime': round(ct, 4)})
+        functions.sort(key=lambda f: f['cumtime'], reverse=True)
+        return functions[:self.top]
+
+
+def load_profiles(filepath):
+    """
+    Load the stored profiling results of a script
+
+    :return: list of results, oldest first
+    """
+    try:
+        with open(filepath) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def save_profile(filepath, result, keep=20):
+    """
+    Append a profiling result to the results stored for a script
+
+    :return: the previous result or None
+    """
+    profiles = load_profiles(filepath)
+    previous = profiles[-1] if profiles else None
+    profiles.append(result)
+    with open(filepath, 'w') as f:
+        json.dump(profiles[-keep:], f, indent=1)
+    return previous
+
+
+def format_report(result, previous=None):
+    """
+    Format a profiling result as text, with differences to the previous result if given
+    """
+    def delta(key):
+        if previous is None or key not in previous:
+            return ''
+        return f"  ({result[key] - previous[key]:+.4f} s to run of {previous['timestamp']})"
+
+    lines = ['', '--- Profile ---',
+             f"Wall time: {result['wall_time']:.4f} s{delta('wall_time')}",
+             f"CPU time:  {result['cpu_time']:.4f} s{delta('cpu_time')}"]
+    if result['aborted']:
+        lines.append('Aborted: time budget exceeded')
+
+    reads = result['item_reads']
+    writes = result['item_writes']
+    lines.append(f"Item reads: {sum(reads.values())}, item writes: {sum(writes.values())}")
+    for path in sorted(set(reads) | set(writes)):
+        lines.append(f"    {path}: {reads.get(path, 0)} read, {writes.get(path, 0)} written")
+
+    lines.append('')
+    lines.append(f"{'calls':>8} {'tottime':>9} {'cumtime':>9}  function")
+    for f in result['functions']:
+        lines.append(f"{f['calls']:>8} {f['tottime']:>9.4f} {f['cumtime']:>9.4f}  {f['function']}")
+    return '\n'.join(lines)
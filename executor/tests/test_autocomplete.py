@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2019-2022 Bernd Meiners                Bernd.Meiners@mail.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  Tests of the autocomplete index of the executor plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from plugins.executor import autocomplete
+from plugins.executor.autocomplete import AutocompleteIndex
+
+
+class MockItems:
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def return_items(self):
+        return [SimpleNamespace(property=SimpleNamespace(path=path)) for path in self.paths]
+
+
+class TestAutocompleteIndex(unittest.TestCase):
+
+    def index(self, paths):
+        plugins = SimpleNamespace(return_plugins=lambda: [])
+        sh = SimpleNamespace(plugins=SimpleNamespace(get_instance=lambda: plugins))
+        return AutocompleteIndex(sh, MockItems(paths))
+
+    def test_complete(self):
+        index = self.index(['living.light', 'living.Level', 'kitchen.light'])
+        entries, complete = index.complete('sh.living.l')
+        self.assertEqual([('sh.living.Level()', 'Item'), ('sh.living.light()', 'Item')], entries)
+        self.assertTrue(complete)
+
+        entries, complete = index.complete('sh.', limit=2)
+        self.assertEqual(2, len(entries))
+        self.assertFalse(complete)
+
+    def test_rebuild_on_renamed_items(self):
+        index = self.index(['living.light', 'kitchen.light'])
+        version = index.refresh()
+        self.assertEqual(version, index.refresh())
+
+        # reload with the same number of items, the paths are hashed again after REHASH_INTERVAL
+        index._items.paths = ['living.light', 'bath.light']
+        with mock.patch.object(autocomplete.time, 'monotonic', return_value=autocomplete.time.monotonic() + index.REHASH_INTERVAL):
+            self.assertNotEqual(version, index.refresh())
+        self.assertEqual([('sh.bath.light()', 'Item')], index.complete('sh.bath')[0])
+        self.assertEqual([], index.complete('sh.kitchen')[0])
+
+    def test_refresh_without_hashing(self):
+        index = self.index(['living.light', 'kitchen.light'])
+        version = index.refresh()
+        with mock.patch.object(autocomplete.hashlib, 'sha1') as sha1:
+            self.assertEqual(version, index.refresh())
+            self.assertEqual([('sh.living.light()', 'Item')], index.complete('sh.living')[0])
+            index.get_json()
+            sha1.assert_not_called()
+
+        # a changed number of items is noticed at once
+        index._items.paths.append('bath.light')
+        self.assertNotEqual(version, index.refresh())
+        self.assertEqual([('sh.bath.light()', 'Item')], index.complete('sh.bath')[0])
+
+    def test_invalidate(self):
+        index = self.index(['living.light'])
+        index.refresh()
+        index.invalidate()
+        self.assertIsNone(index._signature)
+        index.refresh()
+        self.assertEqual([('sh.living.light()', 'Item')], index.complete('sh.')[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2019-2022 Bernd Meiners                Bernd.Meiners@mail.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  Tests of the script profiler of the executor plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from plugins.executor import profiler
+from plugins.executor.profiler import ScriptProfiler, format_report, load_profiles, save_profile
+
+SCRIPT = '''
+def square(value):
+    return value * value
+
+def total(count):
+    return sum(square(value) for value in range(count))
+
+for run in range(3):
+    result = total(100)
+'''
+
+
+class MockItem:
+    """ Item whose calls are counted by the profiler """
+
+    def __init__(self, path, value=None):
+        self.property = SimpleNamespace(path=path)
+        self.value = value
+
+    def __call__(self, value=None, caller='Logic'):
+        if value is None:
+            return self.value
+        self.value = value
+
+
+class TestScriptProfiler(unittest.TestCase):
+
+    def function(self, result, location):
+        return next(f for f in result['functions'] if f['function'] == location)
+
+    def test_calls(self):
+        namespace = {}
+        result = ScriptProfiler(top=50).run(SCRIPT, namespace, namespace)
+        self.assertEqual(result['error'], '')
+        self.assertFalse(result['aborted'])
+        self.assertEqual(namespace['result'], sum(value * value for value in range(100)))
+        # the functions of the script are reported with the line they are defined in
+        self.assertEqual(self.function(result, '<string>:2(square)')['calls'], 300)
+        self.assertEqual(self.function(result, '<string>:5(total)')['calls'], 3)
+        self.assertEqual(self.function(result, '<string>:6(<genexpr>)')['calls'], 303)
+        self.assertEqual(self.function(result, '<built-in method builtins.sum>')['calls'], 3)
+        self.assertNotIn("<method 'disable' of '_lsprof.Profiler' objects>", [f['function'] for f in result['functions']])
+        # ordered by cumulative time, which includes the time of the called functions
+        cumtimes = [f['cumtime'] for f in result['functions']]
+        self.assertEqual(cumtimes, sorted(cumtimes, reverse=True))
+        self.assertGreaterEqual(self.function(result, '<string>:1(<module>)')['cumtime'], self.function(result, '<string>:5(total)')['cumtime'])
+        self.assertGreaterEqual(self.function(result, '<string>:5(total)')['cumtime'], self.function(result, '<string>:2(square)')['cumtime'])
+        self.assertGreaterEqual(result['wall_time'], 0)
+        self.assertGreaterEqual(result['cpu_time'], 0)
+
+    def test_top(self):
+        namespace = {}
+        result = ScriptProfiler(top=2).run(SCRIPT, namespace, namespace)
+        self.assertEqual(len(result['functions']), 2)
+
+    def test_error(self):
+        result = ScriptProfiler().run('x = 1\nraise ValueError("wrong")', {}, {})
+        self.assertEqual(result['error'], "Error 'wrong' while evaluating")
+        self.assertIn('<string>:1(<module>)', [f['function'] for f in result['functions']])
+
+    def test_item_calls(self):
+        items = {'living.light': MockItem('living.light', False), 'living.temp': MockItem('living.temp', 21.5)}
+        script = "for n in range(4):\n    t = sh['living.temp']()\nsh['living.light'](True)\nsh['living.light']()"
+        with mock.patch.object(profiler, 'Item', MockItem):
+            result = ScriptProfiler().run(script, {'sh': items}, {})
+            self.assertEqual(result['item_reads'], {'living.temp': 4, 'living.light': 1})
+            self.assertEqual(result['item_writes'], {'living.light': 1})
+            self.assertTrue(items['living.light'].value)
+            # Item.__call__ is restored after the script
+            self.assertIs(MockItem.__call__, MockItem.__dict__['__call__'])
+            items['living.temp']()
+            self.assertEqual(result['item_reads']['living.temp'], 4)
+
+    def test_time_budget(self):
+        start = time.perf_counter()
+        result = ScriptProfiler(time_budget=0.2).run('while True:\n    try:\n        pass\n    except Exception:\n        pass', {}, {})
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertTrue(result['aborted'])
+        self.assertEqual(result['error'], 'Script aborted after the time budget of 0.2 s')
+        # a script ending within the budget is not aborted later
+        result = ScriptProfiler(time_budget=0.2).run('x = 1', {}, {})
+        time.sleep(0.3)
+        self.assertFalse(result['aborted'])
+
+
+class TestReport(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def result(self, wall_time, timestamp='2024-03-30T10:00:00'):
+        return {'timestamp': timestamp, 'error': '', 'aborted': False, 'wall_time': wall_time, 'cpu_time': 0.25,
+                'item_reads': {'living.temp': 4, 'living.light': 1}, 'item_writes': {'living.light': 1},
+                'functions': [{'function': '<string>:1(<module>)', 'calls': 1, 'tottime': 0.0012, 'cumtime': 0.5},
+                              {'function': '<string>:2(square)', 'calls': 300, 'tottime': 0.25, 'cumtime': 0.25}]}
+
+    def test_format_report(self):
+        self.assertEqual(format_report(self.result(0.5)).split('\n'), [
+            '',
+            '--- Profile ---',
+            'Wall time: 0.5000 s',
+            'CPU time:  0.2500 s',
+            'Item reads: 5, item writes: 1',
+            '    living.light: 1 read, 1 written',
+            '    living.temp: 4 read, 0 written',
+            '',
+            '   calls   tottime   cumtime  function',
+            '       1    0.0012    0.5000  <string>:1(<module>)',
+            '     300    0.2500    0.2500  <string>:2(square)'])
+
+    def test_format_report_previous(self):
+        result = dict(self.result(0.5), aborted=True)
+        lines = format_report(result, self.result(0.75, '2024-03-29T10:00:00')).split('\n')
+        self.assertEqual(lines[2:5], ['Wall time: 0.5000 s  (-0.2500 s to run of 2024-03-29T10:00:00)',
+                                      'CPU time:  0.2500 s  (+0.0000 s to run of 2024-03-29T10:00:00)',
+                                      'Aborted: time budget exceeded'])
+
+    def test_format_profiled_script(self):
+        namespace = {}
+        lines = format_report(ScriptProfiler().run(SCRIPT, namespace, namespace)).split('\n')
+        self.assertEqual(lines[4], 'Item reads: 0, item writes: 0')
+        square = next(line for line in lines if line.endswith('<string>:2(square)'))
+        self.assertEqual(square.split()[0], '300')
+
+    def test_save_profile(self):
+        path = os.path.join(self.directory, 'script.py.profile.json')
+        self.assertEqual(load_profiles(path), [])
+        self.assertIsNone(save_profile(path, self.result(0.5, 'first')))
+        previous = save_profile(path, self.result(0.25, 'second'))
+        self.assertEqual(previous['timestamp'], 'first')
+        for number in range(3):
+            save_profile(path, self.result(0.1, str(number)), keep=3)
+        self.assertEqual([result['timestamp'] for result in load_profiles(path)], ['0', '1', '2'])
+        with open(path, 'w') as f:
+            f.write('{broken')
+        self.assertEqual(load_profiles(path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
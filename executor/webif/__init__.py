@@ -37,7 +37,8 @@ import os
 
 from lib.item import Items
 from lib.model.smartplugin import SmartPluginWebIf
-from lib.model.smartplugin import SmartPlugin
+
+from ..profiler import ScriptProfiler, save_profile, format_report
 
 
 # ------------------------------------------
@@ -193,18 +194,12 @@ class WebInterface(SmartPluginWebIf):
         self.logger.debug(f"{result=}")
         return result
 
-    @cherrypy.expose
-    def exec_code(self, eline, reload=None):
+    def get_exec_locals(self):
         """
-        evaluate a whole python block in eline
-
-        :return: result of the evaluation
+        :return: dict with the locals for the execution of code
         """
-        result = ""
         stub_logger = Stub(warning=print, info=print, debug=print, error=print, criticl=print, notice=print, dbghigh=print, dbgmed=print, dbglow=print)
-
-        g = {}
-        l = { 'sh': self.plugin.get_sh(),
+        return { 'sh': self.plugin.get_sh(),
             'time': time,
             'datetime': datetime,
             'random': random,
@@ -213,6 +208,18 @@ class WebInterface(SmartPluginWebIf):
             'logger': stub_logger,
             'logging': logging
             }
+
+    @cherrypy.expose
+    def exec_code(self, eline, reload=None):
+        """
+        evaluate a whole python block in eline
+
+        :return: result of the evaluation
+        """
+        result = ""
+
+        g = {}
+        l = self.get_exec_locals()
         self.logger.debug(f"Got request to evaluate {eline} (raw)")
         eline = urllib.parse.unquote(eline)
         self.logger.debug(f"Got request to evaluate {eline} (unquoted)")
@@ -228,6 +235,46 @@ class WebInterface(SmartPluginWebIf):
         self.logger.debug(f"{result=}")
         return result
 
+    @cherrypy.expose
+    def profile_code(self, eline, filename='', reload=None):
+        """
+        evaluate a whole python block in eline under the profiler
+
+        If filename is a script in the defined script path, the profiling result is stored
+        next to the script and compared to the result of the previous run
+
+        :return: result of the evaluation followed by the profiling report
+        """
+        g = {}
+        l = self.get_exec_locals()
+        eline = urllib.parse.unquote(eline)
+        self.logger.debug(f"Got request to profile {eline} (unquoted)")
+        profiler = ScriptProfiler(top=self.plugin._profile_top, time_budget=self.plugin._profile_time_budget, logger=self.logger)
+        with PrintCapture() as p:
+            res = profiler.run(eline, g, l)
+
+        previous = None
+        profilepath = self.get_profile_path(filename)
+        if profilepath is not None:
+            try:
+                previous = save_profile(profilepath, res)
+            except Exception as e:
+                self.logger.error(f"{profilepath} could not be saved, {e}")
+
+        result = ''.join(p.data) + res['error'] + format_report(res, previous)
+        self.logger.debug(f"{result=}")
+        return result
+
+    def get_profile_path(self, filename):
+        """returns the path of the file with the profiling results of a script from the defined script path or None"""
+        if self.plugin.executor_scripts is None or filename == '' or filename.startswith('examples/'):
+            return None
+        if '/' in filename or '\\' in filename or '..' in filename:
+            return None
+        if filename[-3:] == '.py':
+            filename = filename[:-3]
+        return os.path.join(self.plugin.executor_scripts, filename + '.profile.json')
+
     @cherrypy.expose
     def get_code(self, filename=''):
         """loads and returns the given filename from the defined script path"""
@@ -277,6 +324,9 @@ class WebInterface(SmartPluginWebIf):
                 if os.path.exists(filepath) and os.path.isfile(filepath):
                     os.remove(filepath)
                     self.logger.debug(f"{filepath} successfully deleted")
+                    profilepath = self.get_profile_path(filename)
+                    if profilepath is not None and os.path.isfile(profilepath):
+                        os.remove(profilepath)
                     return f"{filepath} successfully deleted"
                 else:
                     self.logger.debug(f"{filepath} was not deleted")
@@ -310,24 +360,36 @@ class WebInterface(SmartPluginWebIf):
         return json.dumps(files2 + files)
 
 
+    def not_modified(self, version):
+        """
+        set the ETag for the version of the autocomplete index
+
+        :return: True, if the browser already has this version
+        """
+        etag = f'"{version}"'
+        cherrypy.response.headers['ETag'] = etag
+        cherrypy.response.headers['Cache-Control'] = 'no-cache'
+        if cherrypy.request.headers.get('If-None-Match') == etag:
+            cherrypy.response.status = 304
+            return True
+        return False
+
     @cherrypy.expose
     def get_autocomplete(self):
-        _sh = self.plugin.get_sh()
-        plugins = _sh.plugins.get_instance()
-        plugin_list = []
-        for x in plugins.return_plugins():
-          if isinstance(x, SmartPlugin):
-            plugin_config_name = x.get_configname()
-            if x.metadata is not None:
-              api = x.metadata.get_plugin_function_defstrings(with_type=True, with_default=True)
-              if api is not None:
-                for function in api:
-                  plugin_list.append("sh."+plugin_config_name + "." + function)
-
-
-        myItems = _sh.return_items()
-        itemList = []
-        for item in myItems:
-          itemList.append("sh."+str(item.property.path)+"()")
-        retValue = {'items':itemList,'plugins':plugin_list}
-        return (json.dumps(retValue))
+        """returns the complete autocomplete index of items and plugin functions"""
+        index = self.plugin.autocomplete_index
+        if self.not_modified(index.refresh()):
+            return ''
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        return index.get_json()
+
+    @cherrypy.expose
+    def get_completions(self, prefix='', limit=200):
+        """returns the items and plugin functions starting with prefix"""
+        index = self.plugin.autocomplete_index
+        if self.not_modified(index.refresh()):
+            return ''
+        entries, complete = index.complete(prefix, int(limit))
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        return json.dumps({'version': index.version, 'prefix': prefix, 'complete': complete,
+                           'completions': entries})
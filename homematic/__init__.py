@@ -25,6 +25,7 @@
 
 import logging
 import threading
+import time
 
 from pyhomematic import HMConnection
 
@@ -43,7 +44,7 @@ class Homematic(SmartPlugin):
     the update functions for the items
     """
 
-    PLUGIN_VERSION = '1.5.2'
+    PLUGIN_VERSION = '1.5.3'
 #    ALLOW_MULTIINSTANCE = False
 
     connected = False
@@ -80,6 +81,16 @@ class Homematic(SmartPlugin):
         self.callbackHost = self.get_parameter_value('callbackHost')
         self.callbackPort = self.get_parameter_value('callbackPort')
         self.callbackPort_hmip = self.get_parameter_value('callbackPort_hmip')
+        self.suppress_unchanged = self.get_parameter_value('suppress_unchanged')
+
+        # items and the dispatch index have to exist before the event server is started
+        self.hm_items = []
+        self._event_index = {}          # (address:channel, value_key) -> list of hm_items entries
+        self._item_index = {}           # item path -> hm_items entry
+        self._last_values = {}          # (address:channel, value_key) -> last value received
+        self._force_update_keys = set() # datapoints that must never be suppressed
+        self._stats_lock = threading.Lock()
+        self.reset_event_statistics()
 
         self.port = 2001
         self.port_hmip = 2010
@@ -155,8 +166,6 @@ class Homematic(SmartPlugin):
         #                self.hm.stop()
         #                return
 
-        self.hm_items = []
-
         self.init_webinterface(WebInterface)
 
         return
@@ -249,7 +258,13 @@ class Homematic(SmartPlugin):
                 hm_node = None
 
             # store item and device information for plugin instance
-            self.hm_items.append( [str(item.property.path), item, hm_address, hm_channel, hm_function, hm_node, dev_type] )
+            hm_entry = [str(item.property.path), item, hm_address, hm_channel, hm_function, hm_node, dev_type]
+            self.hm_items.append(hm_entry)
+            event_key = (hm_address + ':' + str(hm_channel), hm_function)
+            self._event_index.setdefault(event_key, []).append(hm_entry)
+            self._item_index[hm_entry[0]] = hm_entry
+            if getattr(item.property, 'enforce_updates', False):
+                self._force_update_keys.add(event_key)
 
             # Initialize item from HomeMatic
             if dev is not None:
@@ -312,14 +327,17 @@ class Homematic(SmartPlugin):
         if caller != 'homematic':
             if self.has_iattr(item.conf, 'hm_address'):
 #               self.hm_items[] = [str(item), item, hm_address, hm_channel, hm_function, hm_node]
-                myitem = None
-                for i in self.hm_items:
-                    if item == i[1]:
-                        myitem = i
-                        self.logger.info("update_item: Test: item='{}', caller='{}', hm_function={}, itemvalue='{}'".format(item, caller, i[4], item()))
+                myitem = self._item_index.get(item.property.path)
+                if myitem is not None:
+                    self.logger.info("update_item: Test: item='{}', caller='{}', hm_function={}, itemvalue='{}'".format(item, caller, myitem[4], item()))
 
                 self.logger.info("update_item: Todo: Called with value '{}' for item '{}' from caller '{}', source '{}' and dest '{}'".format(item(), item, caller, source, dest))
 
+                if myitem is not None:
+                    # the value reported by the ccu after this write may equal the last received value,
+                    # it must not be suppressed, as the item has been changed in between
+                    self._last_values.pop((myitem[2] + ':' + str(myitem[3]), myitem[4]), None)
+
                 dev_id = self.get_iattr_value(item.conf, 'hm_address')
                 dev = self.hm.devices[self.hm_id].get(dev_id)
 
@@ -431,21 +449,61 @@ class Homematic(SmartPlugin):
 
         This method is called whenever the HomeMatic ccu processs an event
         """
-        defined = False
-        for i in self.hm_items:
-            if address == i[2]+':'+str(i[3]):
-                if value_key == i[4]:
-                    self.logger.info("eventcallback: address={}, {}='{}' -> {}".format(address, value_key, value, i[0]))
-                    src = self.get_instance_name()
-                    if src != '':
-                        src += ':'
-                    src += address
-                    i[1](value, self.get_shortname(), src)
-#                    i[1](value, 'HomeMatic')
-                    defined = True
-
-        if not defined:
+        start = time.perf_counter()
+        event_key = (address, value_key)
+        entries = self._event_index.get(event_key)
+        if entries is None:
             self.logger.debug("eventcallback: Ohne item Zuordnung: interface_id = '{}', address = '{}', {} = '{}'".format(interface_id, address, value_key, value))
+            self._count_event(start, 'unassigned')
+            return
+
+        # PRESS_* events are actions, they carry the same value every time and must always be dispatched
+        if self.suppress_unchanged and not value_key.startswith('PRESS_') and event_key not in self._force_update_keys:
+            if event_key in self._last_values and self._last_values[event_key] == value:
+                self._count_event(start, 'suppressed')
+                return
+        self._last_values[event_key] = value
+
+        src = self.get_instance_name()
+        if src != '':
+            src += ':'
+        src += address
+        for i in entries:
+            self.logger.info("eventcallback: address={}, {}='{}' -> {}".format(address, value_key, value, i[0]))
+            i[1](value, self.get_shortname(), src)
+        self._count_event(start, 'dispatched')
+
+    def _count_event(self, start, counter):
+        duration = time.perf_counter() - start
+        with self._stats_lock:
+            self._event_stats['events'] += 1
+            self._event_stats[counter] += 1
+            self._event_stats['dispatch_time'] += duration
+            if duration > self._event_stats['dispatch_max']:
+                self._event_stats['dispatch_max'] = duration
+
+    def reset_event_statistics(self):
+        """
+        Resets the counters for received events and dispatch latency
+        """
+        with self._stats_lock:
+            self._event_stats = {'since': time.time(), 'events': 0, 'dispatched': 0, 'suppressed': 0,
+                                 'unassigned': 0, 'dispatch_time': 0.0, 'dispatch_max': 0.0}
+
+    def get_event_statistics(self):
+        """
+        Returns statistics of the events received from the ccu since start (or the last reset)
+
+        :return: dict with event counters, events per second and dispatch latency in ms
+        :rtype: dict
+        """
+        with self._stats_lock:
+            stats = dict(self._event_stats)
+        elapsed = max(time.time() - stats['since'], 1)
+        stats['events_per_second'] = round(stats['events'] / elapsed, 2)
+        stats['dispatch_avg_ms'] = round(stats['dispatch_time'] * 1000 / stats['events'], 3) if stats['events'] else 0
+        stats['dispatch_max_ms'] = round(stats['dispatch_max'] * 1000, 3)
+        return stats
 
 
 # ------------------------------------------
@@ -46,6 +46,7 @@ from lib.item import Items
 from .webif import WebInterface
 
 from .discover_bridges import discover_bridges
+from .command_scheduler import CommandScheduler
 
 # If a needed package is imported, which might be not installed in the Python environment,
 # add it to a requirements.txt file within the plugin's directory
@@ -59,7 +60,7 @@ class HueApiV2(SmartPlugin):
     the update functions for the items
     """
 
-    PLUGIN_VERSION = '3.0.1'    # (must match the version specified in plugin.yaml)
+    PLUGIN_VERSION = '3.0.2'    # (must match the version specified in plugin.yaml)
 
     hue_sensor_state_values          = ['daylight', 'temperature', 'presence', 'lightlevel', 'status']
 
@@ -91,6 +92,12 @@ class HueApiV2(SmartPlugin):
         # polled for value changes by adding a scheduler entry in the run method of this plugin
         self._default_transition_time = int(float(self.get_parameter_value('default_transitionTime'))*1000)
 
+        # light and group commands are merged and rate limited before they are sent to the bridge
+        self.command_scheduler = CommandScheduler(self,
+                                                  window=self.get_parameter_value('command_window'),
+                                                  light_rate=self.get_parameter_value('max_light_commands'),
+                                                  group_rate=self.get_parameter_value('max_group_commands'))
+
         self.discovered_bridges = []
         self.bridge = {}
 
@@ -205,11 +212,15 @@ class HueApiV2(SmartPlugin):
                 # catch exception to prevent plugin_coro from unwanted termination
                 self.logger.exception(f"Exception in initialize_items_from_bridge(): {ex}")
 
+            scheduler_task = asyncio.create_task(self.command_scheduler.run())
+
             # block: wait until a stop command is received by the queue
             #queue_item = await self.run_queue.get()
             #queue_item = await self.get_command_from_run_queue()
             await self.wait_for_asyncio_termination()
 
+            scheduler_task.cancel()
+
         self.alive = False
         self.logger.info("plugin_coro: Plugin is stopped (self.alive=False)")
 
@@ -605,32 +616,17 @@ class HueApiV2(SmartPlugin):
             hue_transition_time = int(float(config_data['transition_time']) * 1000)
 
         if config_data['function'] == 'on':
-            try:
-                if value:
-                    self.run_asyncio_coro(self.v2bridge.lights.turn_on(config_data['id'], hue_transition_time), return_exeption=True)
-                else:
-                    self.run_asyncio_coro(self.v2bridge.lights.turn_off(config_data['id'], hue_transition_time), return_exeption=True)
-            except Exception as ex:
-                self.logger.error(f"update_light_from_item: id={config_data['id']}, {config_data['function']}, {value=} - Exception {ex}")
+            self.command_scheduler.queue_light(config_data['id'], hue_transition_time, on=bool(value))
         elif config_data['function'] == 'bri':
             if float(value) <= 100:
-                try:
-                    self.run_asyncio_coro(self.v2bridge.lights.set_brightness(config_data['id'], float(value), hue_transition_time), return_exeption=True)
-                except Exception as ex:
-                    self.logger.error(f"update_light_from_item: id={config_data['id']}, {config_data['function']}, {value=} - Exception {ex}")
+                self.command_scheduler.queue_light(config_data['id'], hue_transition_time, on=True, brightness=float(value))
             else:
                 self.logger.error(f"{item.property.path}: Can't set brightness of light {config_data['id']} to {value} - out of range")
         elif config_data['function'] == 'xy' and isinstance(value, list) and len(value) == 2:
-            try:
-                self.run_asyncio_coro(self.v2bridge.lights.set_color(config_data['id'], value[0], value[1], hue_transition_time), return_exeption=True)
-            except Exception as ex:
-                self.logger.error(f"update_light_from_item: id={config_data['id']}, {config_data['function']}, {value=} - Exception {ex}")
+            self.command_scheduler.queue_light(config_data['id'], hue_transition_time, on=True, color_xy=(value[0], value[1]))
         elif config_data['function'] == 'ct':
             if float(value) >= 153 and float(value) <= 500:
-                try:
-                    self.run_asyncio_coro(self.v2bridge.lights.set_color_temperature(config_data['id'], value, hue_transition_time), return_exeption=True)
-                except Exception as ex:
-                    self.logger.error(f"update_light_from_item: id={config_data['id']}, {config_data['function']}, {value=} - Exception {ex}")
+                self.command_scheduler.queue_light(config_data['id'], hue_transition_time, on=True, color_temp=value)
             else:
                 self.logger.error(f"{item.property.path}: Can't set color temperature of light {config_data['id']} to {value} - out of range")
         elif config_data['function'] == 'dict':
@@ -648,10 +644,7 @@ class HueApiV2(SmartPlugin):
                     transition_time = hue_transition_time
                 else:
                     transition_time = int(float(transition_time)*1000)
-                try:
-                    self.run_asyncio_coro(self.v2bridge.lights.set_state(config_data['id'], on, bri, xy, ct, transition_time=transition_time), return_exeption=True)
-                except Exception as ex:
-                    self.logger.error(f"update_light_from_item: id={config_data['id']}, {config_data['function']}, {on=}, {bri=}, {xy=}, {ct=} - Exception {ex}")
+                self.command_scheduler.queue_light(config_data['id'], transition_time, on=on, brightness=bri, color_xy=xy, color_temp=ct)
         elif config_data['function'] == 'bri_inc':
             if float(value) >= -100 and float(value) <= 100:
                 if float(value) < 0:
@@ -706,13 +699,13 @@ class HueApiV2(SmartPlugin):
 
         #self.logger.notice(f"update_group_from_item: function={config_data['function']}, hue_transition_time={hue_transition_time}, id={config_data['id']}")
         if config_data['function'] == 'on':
-            self.run_asyncio_coro(self.v2bridge.groups.grouped_light.set_state(config_data['id'], on=value, transition_time=hue_transition_time))
+            self.command_scheduler.queue_group(config_data['id'], hue_transition_time, on=bool(value))
         elif config_data['function'] == 'bri':
-            self.run_asyncio_coro(self.v2bridge.groups.grouped_light.set_state(config_data['id'], on=True, brightness=float(value), transition_time=hue_transition_time))
+            self.command_scheduler.queue_group(config_data['id'], hue_transition_time, on=True, brightness=float(value))
         elif config_data['function'] == 'xy' and isinstance(value, list) and len(value) == 2:
-            self.run_asyncio_coro(self.v2bridge.groups.grouped_light.set_state(config_data['id'], on=True, color_xy=value, transition_time=hue_transition_time))
+            self.command_scheduler.queue_group(config_data['id'], hue_transition_time, on=True, color_xy=(value[0], value[1]))
         elif config_data['function'] == 'ct':
-            self.run_asyncio_coro(self.v2bridge.groups.grouped_light.set_state(config_data['id'], on=True, color_temp=value, transition_time=hue_transition_time))
+            self.command_scheduler.queue_group(config_data['id'], hue_transition_time, on=True, color_temp=value)
         elif config_data['function'] == 'dict':
             if value != {}:
                 on = value.get('on', None)
@@ -730,7 +723,7 @@ class HueApiV2(SmartPlugin):
                     transition_time = hue_transition_time
                 else:
                     transition_time = int(float(transition_time)*1000)
-                self.run_asyncio_coro(self.v2bridge.groups.grouped_light.set_state(config_data['id'], on, bri, xy, ct, transition_time=transition_time))
+                self.command_scheduler.queue_group(config_data['id'], transition_time, on=on, brightness=bri, color_xy=xy, color_temp=ct)
         elif config_data['function'] == 'bri_inc':
             self.logger.warning(f"Groups: {config_data['function']} not implemented in aiohue")
         elif config_data['function'] == 'alert':
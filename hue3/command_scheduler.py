@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2024      Martin Sinn                         m.sinn@gmx.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  hue3 plugin to run with SmartHomeNG
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import asyncio
+import threading
+import time
+
+from collections import deque
+
+
+class TokenBucket:
+    """
+    Simple token bucket to limit the number of requests per second
+    """
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.timestamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+        self.timestamp = now
+
+    def available(self):
+        self._refill()
+        return self.tokens >= 1
+
+    async def acquire(self):
+        self._refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+
+class CommandScheduler:
+    """
+    Collects state changes for lights and groups and sends them to the bridge
+
+    Item updates for the same light (or group) that arrive within a short window are merged
+    into a single request, the requests are sent in the order the changes arrived. The requests are sent within the rate limits of the bridge
+    (light and grouped_light commands are limited separately). If all lights of a room or zone
+    are to be set to the same state, a single grouped_light command is sent instead.
+
+    queue_light() and queue_group() may be called from any thread, run() has to be
+    executed in the asyncio eventloop of the plugin.
+    """
+
+    def __init__(self, plugin, window=0.1, light_rate=10, group_rate=1):
+        self.plugin = plugin
+        self.logger = plugin.logger
+        self.window = window
+        self._light_bucket = TokenBucket(light_rate)
+        self._group_bucket = TokenBucket(group_rate)
+
+        self._lock = threading.Lock()
+        self._pending = []              # queued changes in order of arrival: (resource, id, state dict, transition time, time queued)
+        self._loop = None
+        self._wakeup = None
+
+        self._requests = deque()        # timestamps of the requests sent to the bridge (last 60 seconds)
+        self.stats = {'queued': 0, 'light_requests': 0, 'group_requests': 0, 'grouped': 0,
+                      'errors': 0, 'latency_sum': 0.0, 'latency_max': 0.0}
+
+
+    def queue_light(self, light_id, transition_time, **state):
+        self._queue('light', light_id, transition_time, state)
+
+    def queue_group(self, group_id, transition_time, **state):
+        self._queue('group', group_id, transition_time, state)
+
+    def _queue(self, resource, resource_id, transition_time, state):
+        state = {k: v for k, v in state.items() if v is not None}
+        with self._lock:
+            self._pending.append((resource, resource_id, state, transition_time, time.monotonic()))
+            self.stats['queued'] += 1
+            if self._loop is not None:
+                try:
+                    self._loop.call_soon_threadsafe(self._wakeup.set)
+                except RuntimeError:
+                    # the eventloop has already been closed, the plugin is stopping
+                    pass
+
+
+    async def run(self):
+        """
+        Coroutine that sends the queued commands, has to run as a task in the plugin's eventloop
+        """
+        with self._lock:
+            self._wakeup = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+            if self._pending:
+                self._wakeup.set()
+        try:
+            while True:
+                await self._wakeup.wait()
+                # give the other updates of a scene/logic the chance to be merged
+                await asyncio.sleep(self.window)
+                self._wakeup.clear()
+                with self._lock:
+                    pending = self._pending
+                    self._pending = []
+                await self._flush(self._merge(pending))
+        finally:
+            with self._lock:
+                self._loop = None
+                self._wakeup = None
+
+
+    def _merge(self, pending):
+        """
+        Merge the queued changes of each light/group into one command, keeping the order of arrival
+
+        A change is only merged into the previous command of the same light/group, if no command
+        affecting the same lights has been queued in between. Attributes of light commands that
+        are overridden by a later command of a group containing the light are dropped.
+
+        :return: list of commands [resource, id, state dict, time of first queued change]
+        """
+        commands = []
+        mergeable = {}      # (resource, id) -> command later changes may be merged into
+        members = {}        # grouped_light id -> set of light ids, None if unknown
+        for resource, resource_id, state, transition_time, queued in pending:
+            command = mergeable.get((resource, resource_id))
+            if command is None:
+                command = [resource, resource_id, {}, queued]
+                commands.append(command)
+                mergeable[(resource, resource_id)] = command
+            merged = command[2]
+            # color_xy and color_temp are mutually exclusive, the last one set wins
+            if 'color_xy' in state:
+                merged.pop('color_temp', None)
+            if 'color_temp' in state:
+                merged.pop('color_xy', None)
+            merged.update(state)
+            merged['transition_time'] = transition_time
+
+            if resource == 'group':
+                lights = self._group_members(resource_id, members)
+                overridden = set(state)
+                if overridden.intersection(('color_xy', 'color_temp')):
+                    overridden.update(('color_xy', 'color_temp'))
+                for key, other in list(mergeable.items()):
+                    if key[0] == 'light' and (lights is None or key[1] in lights):
+                        # later changes of the light have to be sent after this group command
+                        del mergeable[key]
+                        if lights is not None:
+                            for attribute in overridden:
+                                other[2].pop(attribute, None)
+            else:
+                for key in list(mergeable):
+                    if key[0] == 'group':
+                        lights = self._group_members(key[1], members)
+                        if lights is None or resource_id in lights:
+                            # later changes of the group have to be sent after this light command
+                            del mergeable[key]
+
+        # commands whose attributes have all been overridden are not sent
+        return [command for command in commands if set(command[2]) - {'transition_time'}]
+
+
+    def _group_members(self, group_id, members):
+        """
+        Return the ids of the lights of a grouped_light, None if they are unknown
+        """
+        if group_id not in members:
+            try:
+                members[group_id] = {light.id for light in self.plugin.v2bridge.groups.grouped_light.get_lights(group_id)}
+            except Exception as ex:
+                self.logger.info(f"CommandScheduler: Unable to get the lights of group {group_id} - {ex}")
+                members[group_id] = None
+        return members[group_id]
+
+
+    async def _flush(self, commands):
+        if commands and all(command[0] == 'light' for command in commands):
+            # only lights are changed (e.g. by a scene), lights set to the same state may be sent as group command
+            lights = {command[1]: (command[2], command[3]) for command in commands}
+            for group_id, light_ids in self._find_groups(lights):
+                state, queued = lights[light_ids[0]]
+                queued = min(lights[light_id][1] for light_id in light_ids)
+                commands = [command for command in commands if command[1] not in light_ids]
+                await self._group_bucket.acquire()
+                self.stats['grouped'] += len(light_ids)
+                self.logger.info(f"CommandScheduler: Sending {state} for {len(light_ids)} lights as grouped_light command to {group_id}")
+                await self._send('group', group_id, state, queued, self.plugin.v2bridge.groups.grouped_light.set_state)
+
+        for resource, resource_id, state, queued in commands:
+            if resource == 'group':
+                await self._group_bucket.acquire()
+                await self._send('group', resource_id, state, queued, self.plugin.v2bridge.groups.grouped_light.set_state)
+            else:
+                await self._light_bucket.acquire()
+                await self._send('light', resource_id, state, queued, self.plugin.v2bridge.lights.set_state)
+
+
+    def _find_groups(self, lights):
+        """
+        Find grouped_lights whose lights all have to be set to the same state
+
+        Only used, if the bridge currently has budget for a group command. Larger groups are preferred.
+
+        :return: list of tuples (grouped_light id, list of light ids)
+        """
+        if len(lights) < 2 or not self._group_bucket.available():
+            return []
+        candidates = []
+        try:
+            for group in self.plugin.v2bridge.groups.grouped_light:
+                light_ids = [light.id for light in self.plugin.v2bridge.groups.grouped_light.get_lights(group.id)]
+                if len(light_ids) >= 2 and all(light_id in lights for light_id in light_ids):
+                    candidates.append((group.id, light_ids))
+        except Exception as ex:
+            self.logger.info(f"CommandScheduler: Unable to get the lights of the groups - {ex}")
+            return []
+
+        result = []
+        used = set()
+        for group_id, light_ids in sorted(candidates, key=lambda c: len(c[1]), reverse=True):
+            if used.intersection(light_ids):
+                continue
+            state = lights[light_ids[0]][0]
+            if all(lights[light_id][0] == state for light_id in light_ids[1:]):
+                result.append((group_id, light_ids))
+                used.update(light_ids)
+                # only one group command per flush fits into the rate budget of the bridge
+                break
+        return result
+
+
+    async def _send(self, resource, resource_id, state, queued, set_state):
+        now = time.monotonic()
+        latency = now - queued
+        self._requests.append(now)
+        self.stats[resource + '_requests'] += 1
+        self.stats['latency_sum'] += latency
+        if latency > self.stats['latency_max']:
+            self.stats['latency_max'] = latency
+        try:
+            await set_state(resource_id, **state)
+        except Exception as ex:
+            self.stats['errors'] += 1
+            self.logger.error(f"CommandScheduler: {resource} id={resource_id}, {state=} - Exception {ex}")
+
+
+    def get_statistics(self):
+        """
+        Return the request rate and queue latency of the commands sent to the bridge
+
+        :return: dict with counters, requests per second (last 60 seconds) and latency in ms
+        """
+        now = time.monotonic()
+        while self._requests and now - self._requests[0] > 60:
+            self._requests.popleft()
+        stats = dict(self.stats)
+        requests = stats['light_requests'] + stats['group_requests']
+        stats['requests_per_second'] = round(len(self._requests) / 60, 2)
+        stats['latency_avg_ms'] = round(stats['latency_sum'] * 1000 / requests) if requests else 0
+        stats['latency_max_ms'] = round(stats['latency_max'] * 1000)
+        with self._lock:
+            stats['pending'] = len(self._pending)
+        return stats
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2024      Martin Sinn                         m.sinn@gmx.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  Tests of the command scheduler of the hue3 plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import asyncio
+import logging
+import unittest
+from types import SimpleNamespace
+
+from plugins.hue3.command_scheduler import CommandScheduler
+
+
+class MockBridge:
+    """
+    Records the commands sent, group 'g1' contains the lights 'l1' and 'l2'
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.groups = SimpleNamespace(grouped_light=self)
+        self.lights = SimpleNamespace(set_state=self.set_light)
+
+    def __iter__(self):
+        return iter([SimpleNamespace(id='g1')])
+
+    def get_lights(self, group_id):
+        return [SimpleNamespace(id='l1'), SimpleNamespace(id='l2')]
+
+    async def set_state(self, group_id, **state):
+        self.sent.append(('group', group_id, state))
+
+    async def set_light(self, light_id, **state):
+        self.sent.append(('light', light_id, state))
+
+
+class TestCommandScheduler(unittest.TestCase):
+
+    def scheduler(self):
+        plugin = SimpleNamespace(logger=logging.getLogger(__name__), v2bridge=MockBridge())
+        return CommandScheduler(plugin, window=0, light_rate=100, group_rate=100)
+
+    def flush(self, scheduler):
+        async def run():
+            task = asyncio.create_task(scheduler.run())
+            await asyncio.sleep(0.05)
+            task.cancel()
+        asyncio.run(run())
+        return scheduler.plugin.v2bridge.sent
+
+    def test_merge_light(self):
+        scheduler = self.scheduler()
+        scheduler.queue_light('l1', 0, on=True)
+        scheduler.queue_light('l1', 400, brightness=50.0)
+        scheduler.queue_light('l1', 400, color_xy=(0.6, 0.3))
+        scheduler.queue_light('l1', 400, color_temp=300)
+        self.assertEqual([('light', 'l1', {'on': True, 'brightness': 50.0, 'color_temp': 300, 'transition_time': 400})],
+                         self.flush(scheduler))
+
+    def test_order_light_then_group(self):
+        scheduler = self.scheduler()
+        scheduler.queue_light('l1', 0, on=True, color_xy=(0.6, 0.3))
+        scheduler.queue_group('g1', 0, on=False)
+        self.assertEqual([('light', 'l1', {'color_xy': (0.6, 0.3), 'transition_time': 0}),
+                          ('group', 'g1', {'on': False, 'transition_time': 0})],
+                         self.flush(scheduler))
+
+    def test_order_group_then_light(self):
+        scheduler = self.scheduler()
+        scheduler.queue_group('g1', 0, on=False)
+        scheduler.queue_light('l1', 0, on=True)
+        scheduler.queue_group('g1', 0, brightness=20.0)
+        self.assertEqual([('group', 'g1', {'on': False, 'transition_time': 0}),
+                          ('light', 'l1', {'on': True, 'transition_time': 0}),
+                          ('group', 'g1', {'brightness': 20.0, 'transition_time': 0})],
+                         self.flush(scheduler))
+
+    def test_overridden_light_dropped(self):
+        scheduler = self.scheduler()
+        scheduler.queue_light('l1', 0, on=True)
+        scheduler.queue_light('l3', 0, on=True)
+        scheduler.queue_group('g1', 0, on=False)
+        self.assertEqual([('light', 'l3', {'on': True, 'transition_time': 0}),
+                          ('group', 'g1', {'on': False, 'transition_time': 0})],
+                         self.flush(scheduler))
+
+    def test_lights_sent_as_group(self):
+        scheduler = self.scheduler()
+        scheduler.queue_light('l1', 0, on=True)
+        scheduler.queue_light('l2', 0, on=True)
+        self.assertEqual([('group', 'g1', {'on': True, 'transition_time': 0})], self.flush(scheduler))
+        self.assertEqual(2, scheduler.stats['grouped'])
+
+    def test_queue_after_stop(self):
+        scheduler = self.scheduler()
+        self.flush(scheduler)
+        scheduler.queue_light('l1', 0, on=True)
+        self.assertEqual(1, scheduler.get_statistics()['pending'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2024      Martin Sinn                         m.sinn@gmx.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  Tests of the light commands queued by the hue3 plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import logging
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from plugins.hue3 import HueApiV2
+from plugins.hue3.command_scheduler import CommandScheduler
+
+
+class TestUpdateLight(unittest.TestCase):
+
+    def setUp(self):
+        self.plugin = HueApiV2.__new__(HueApiV2)
+        self.plugin.logger = logging.getLogger(__name__)
+        self.plugin._default_transition_time = 400
+        self.plugin.command_scheduler = CommandScheduler(self.plugin, window=0)
+
+    def update(self, function, value):
+        item = mock.Mock(return_value=value)
+        config_data = {'id': 'l1', 'resource': 'light', 'function': function, 'transition_time': None}
+        self.plugin.update_light_from_item(config_data, item)
+
+    def merged(self):
+        return [(resource, resource_id, state) for resource, resource_id, state, queued
+                in self.plugin.command_scheduler._merge(self.plugin.command_scheduler._pending)]
+
+    def test_off_then_brightness(self):
+        self.update('on', False)
+        self.update('bri', 50)
+        self.assertEqual(self.merged(), [('light', 'l1', {'on': True, 'brightness': 50.0, 'transition_time': 400})])
+
+    def test_off_then_color(self):
+        for function, value, state in (('xy', [0.6, 0.3], {'color_xy': (0.6, 0.3)}), ('ct', 300, {'color_temp': 300})):
+            with self.subTest(function=function):
+                self.plugin.command_scheduler._pending = []
+                self.update('on', False)
+                self.update(function, value)
+                self.assertEqual(self.merged(), [('light', 'l1', dict(state, on=True, transition_time=400))])
+
+    def test_dict_keeps_on(self):
+        # without on, bri, xy and ct in the dict the on state of the light is not changed
+        self.update('on', False)
+        self.update('dict', {'transition_time': 1})
+        self.assertEqual(self.merged(), [('light', 'l1', {'on': False, 'transition_time': 1000})])
+        self.plugin.command_scheduler._pending = []
+        self.update('on', False)
+        self.update('dict', {'bri': 30})
+        self.assertEqual(self.merged(), [('light', 'l1', {'on': True, 'brightness': 30, 'transition_time': 400})])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,17 +23,94 @@ import logging
 import datetime
 import os
 import errno
+import bisect
+import requests
 import dateutil.tz
 import dateutil.rrule
 import dateutil.relativedelta
 from lib.model.smartplugin import SmartPlugin
 from lib.shtime import Shtime
-from lib.network import Http, Network
+from lib.network import Network
 from bin.smarthome import VERSION
 
 
+class OccurrenceIndex:
+    """
+    Sorted index of all event occurrences of one calendar within a rolling window
+
+    Recurring events are expanded once when the index is built. Range queries and
+    the check whether an event is active at a given time are answered by bisecting
+    the sorted start times instead of iterating all events.
+    """
+
+    def __init__(self, start, end, occurrences, active=None):
+        """
+        :param occurrences: list of (start, end, recurring, number of the event, revent)
+        :param active: timeframe (start, end) of the events checked by is_active(), as selected
+                       by iCal._filter_events() for the current day
+        """
+        self.start = start
+        self.end = end
+        self._occurrences = sorted(occurrences, key=lambda o: o[0])
+        self._starts = [o[0] for o in self._occurrences]
+        self._max_duration = max((o[1] - o[0] for o in self._occurrences), default=datetime.timedelta(0))
+
+        # union of the occurrence intervals of the current day for the "active now" lookup.
+        # Events without duration are active until the end of their starting minute
+        self._busy_starts = []
+        self._busy_ends = []
+        selected = self._select(*active) if active is not None else self._occurrences
+        for o_start, o_end, _, _, _ in sorted(selected, key=lambda o: o[0]):
+            if o_start == o_end:
+                o_end = o_end.replace(second=59, microsecond=999)
+            if self._busy_ends and o_start <= self._busy_ends[-1]:
+                if o_end > self._busy_ends[-1]:
+                    self._busy_ends[-1] = o_end
+            else:
+                self._busy_starts.append(o_start)
+                self._busy_ends.append(o_end)
+
+    def __len__(self):
+        return len(self._occurrences)
+
+    def covers(self, start, end):
+        return self.start <= start and end <= self.end
+
+    def is_active(self, now):
+        pos = bisect.bisect_right(self._busy_starts, now) - 1
+        return pos >= 0 and now <= self._busy_ends[pos]
+
+    def _select(self, start, end):
+        """
+        Return the occurrences selected by the rules of iCal._filter_events, in the order of the events
+        """
+        selected = []
+        first = bisect.bisect_left(self._starts, start - self._max_duration)
+        last = bisect.bisect_right(self._starts, end)
+        for occurrence in self._occurrences[first:last]:
+            o_start, o_end, recurring = occurrence[:3]
+            if recurring:
+                if not start <= o_start <= end:
+                    continue
+            elif not ((start < o_start < end) or (o_start < start and o_end > start)):
+                continue
+            selected.append(occurrence)
+        # _filter_events iterates the events and the occurrences of every event by start
+        selected.sort(key=lambda o: o[3])
+        return selected
+
+    def between(self, start, end):
+        """
+        Return occurrences in the same structure and order as iCal._filter_events
+        """
+        revents = {}
+        for o_start, _, _, _, revent in self._select(start, end):
+            revents.setdefault(o_start.date(), []).append(dict(revent))
+        return revents
+
+
 class iCal(SmartPlugin):
-    PLUGIN_VERSION = "1.6.4"
+    PLUGIN_VERSION = "1.6.5"
     ALLOW_MULTIINSTANCE = False
     DAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
     FREQ = ("YEARLY", "MONTHLY", "WEEKLY", "DAILY", "HOURLY", "MINUTELY", "SECONDLY")
@@ -46,13 +123,13 @@ class iCal(SmartPlugin):
         try:
             self.shtime = Shtime.get_instance()
             self.handle_login = self.get_parameter_value('handle_login')
-            try:
-                self.dl = Http(timeout=self.get_parameter_value('timeout'), hide_login=self.handle_login)
-            except:
-                self.dl = Http(hide_login=self.handle_login)
+            self._timeout = self.get_parameter_value('timeout')
             self._items = []
             self._icals = {}
             self._ical_aliases = {}
+            self._indexes = {}
+            self._sources = {}
+            self._index_days = self.get_parameter_value('index_days')
             self._cycle = self.get_parameter_value('cycle')
             calendars = self.get_parameter_value('calendars')
             config_dir = self.get_parameter_value('directory')
@@ -122,10 +199,14 @@ class iCal(SmartPlugin):
     def __call__(self, ics='', delta=1, offset=0, username=None, password=None, prio=1, verify=True):
         if ics in self._ical_aliases:
             self.logger.debug('iCal retrieve events by alias {0} -> {1}'.format(ics, self._ical_aliases[ics]))
-            return self._filter_events(self._icals[self._ical_aliases[ics]], delta, offset)
+            ics = self._ical_aliases[ics]
 
         if ics in self._icals:
             self.logger.debug('iCal retrieve cached events {0}'.format(ics))
+            start, end = self._get_timeframe(delta, offset)
+            index = self._get_index(ics)
+            if index.covers(start, end):
+                return index.between(start, end)
             return self._filter_events(self._icals[ics], delta, offset)
 
         self.logger.debug('iCal retrieve events {0}'.format(ics))
@@ -136,39 +217,69 @@ class iCal(SmartPlugin):
             if len(self._items):
                 now = self.shtime.now()
 
-                events = {}
-                for calendar in self._icals:
-                    events[calendar] = self._filter_events(self._icals[calendar], 0, 0)
-
                 for item in self._items:
                     calendar = item.conf['ical_calendar']
 
                     if calendar in self._ical_aliases:
                         calendar = self._ical_aliases[calendar]
 
-                    val = False
-                    for date in events[calendar]:
-                        for event in events[calendar][date]:
-                            if event['Start'] <= now <= event['End'] or (event['Start'] == event['End'] and event['Start'] <= now <= event['End'].replace(second=59, microsecond=999)):
-                                val = True
-                                break
-
-                    item(val)
+                    item(self._get_index(calendar).is_active(now))
 
     def _update_calendars(self):
         for uri in self._icals:
-            self._icals[uri] = self._read_events(uri)
+            events = self._read_events(uri, only_changed=True)
+            if events is None:
+                self.logger.debug('Calendar {0} unchanged'.format(Network.clean_uri(uri, self.handle_login)))
+                continue
+            self._icals[uri] = events
+            self._indexes.pop(uri, None)
             self.logger.debug('Updated calendar {0}'.format(Network.clean_uri(uri, self.handle_login)))
 
         if len(self._icals):
             self._update_items()
 
-    def _filter_events(self, events, delta=1, offset=0, prio=1):
+    def _get_timeframe(self, delta=1, offset=0):
         now = self.shtime.now()
         offset = offset - 1  # start at 23:59:59 the day before
         delta += 1  # extend delta for negative offset
         start = now.replace(hour=23, minute=59, second=59, microsecond=0) + datetime.timedelta(days=offset)
         end = start + datetime.timedelta(days=delta)
+        return start, end
+
+    def _get_index(self, uri):
+        """
+        Return the occurrence index of a calendar, (re)building it if the calendar changed or the day rolled over
+        """
+        today = self.shtime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        index = self._indexes.get(uri)
+        if index is None or index.start != today - datetime.timedelta(days=1):
+            index = self._build_index(self._icals.get(uri, {}), today - datetime.timedelta(days=1),
+                                      today + datetime.timedelta(days=self._index_days + 1), self._get_timeframe(0, 0))
+            self._indexes[uri] = index
+            self.logger.debug('Built occurrence index for {0} with {1} entries'.format(Network.clean_uri(uri, self.handle_login), len(index)))
+        return index
+
+    def _build_index(self, events, start, end, active=None):
+        occurrences = []
+        for number, event in enumerate(events.values()):
+            e_start = event['DTSTART']
+            e_end = event['DTEND']
+            properties = {}
+            for prop in self.PROPERTIES:
+                if prop in event:
+                    properties[prop.capitalize()] = event[prop]
+            if 'RRULE' in event and (event['RRULE'] is not None):
+                e_duration = e_end - e_start
+                for e_rstart in event['RRULE'].between(start, end, inc=True):
+                    if e_rstart not in event['EXDATES']:
+                        revent = {'Start': e_rstart, 'End': e_rstart + e_duration, **properties}
+                        occurrences.append((e_rstart, e_rstart + e_duration, True, number, revent))
+            elif e_end > start and e_start < end:
+                occurrences.append((e_start, e_end, False, number, {'Start': e_start, 'End': e_end, **properties}))
+        return OccurrenceIndex(start, end, occurrences, active)
+
+    def _filter_events(self, events, delta=1, offset=0, prio=1):
+        start, end = self._get_timeframe(delta, offset)
         revents = {}
         for event in events:
             event = events[event]
@@ -202,23 +313,36 @@ class iCal(SmartPlugin):
                         revents[date].append(revent)
         return revents
 
-    def _read_events(self, ics, username=None, password=None, prio=1, verify=True):
+    def _read_events(self, ics, username=None, password=None, prio=1, verify=True, only_changed=False):
+        """
+        Read and parse a calendar
+
+        :param only_changed: return None instead of parsing again if the online calendar (ETag/Last-Modified) or the local file (mtime) did not change since the last read
+        """
+        source = ics
         if ics.startswith('http'):
             _, _, cal = ics.partition('//')
             name = '{}.ics'.format(cal.split('/')[0].replace('.', '_'))
             for entry in self._ical_aliases:
                 name = '{}.ics'.format(entry) if ics == self._ical_aliases[entry] else name
             filename = '{}/{}'.format(self._directory, name)
-            auth = 'HTTPBasicAuth' if username else None
-            downloaded = self.dl.download(url=ics, local=filename, params={username: username, password: password}, verify=verify, auth=auth)
+            downloaded = self._download(ics, filename, username, password, verify)
             if downloaded is False:
-                self.logger.error('Could not download online ics file {0}.'.format(ics))
-                return {}
-            self.logger.debug('Online ics {} successfully downloaded to {}'.format(Network.clean_uri(ics, self.handle_login), filename))
+                self.logger.error('Could not download online ics file {0}.'.format(Network.clean_uri(ics, self.handle_login)))
+                return None if only_changed else {}
+            if downloaded is None:
+                if only_changed:
+                    return None
+            else:
+                self.logger.debug('Online ics {} successfully downloaded to {}'.format(Network.clean_uri(ics, self.handle_login), filename))
             ics = os.path.normpath(filename)
         try:
             ics = ics.replace('\\', os.sep).replace('/', os.sep)
             ics = '{}/{}'.format(self._directory, ics) if self._directory not in ics else ics
+            mtime = os.path.getmtime(ics)
+            if only_changed and not source.startswith('http') and self._sources.get(source, {}).get('mtime') == mtime:
+                return None
+            self._sources.setdefault(source, {})['mtime'] = mtime
             with open(ics, 'r') as f:
                 ical = f.read()
                 self.logger.debug('Read offline ical file {}'.format(ics))
@@ -228,6 +352,34 @@ class iCal(SmartPlugin):
 
         return self._parse_ical(ical, ics, prio)
 
+    def _download(self, url, filename, username=None, password=None, verify=True):
+        """
+        Download an online calendar, asking the server to only send it if it changed since the last download
+
+        :return: True if downloaded, None if the calendar is unchanged (HTTP 304), False on error
+        """
+        source = self._sources.setdefault(url, {})
+        headers = {}
+        if os.path.isfile(filename):
+            if source.get('etag'):
+                headers['If-None-Match'] = source['etag']
+            if source.get('last_modified'):
+                headers['If-Modified-Since'] = source['last_modified']
+        auth = (username, password) if username else None
+        try:
+            response = requests.get(url, headers=headers, auth=auth, verify=verify, timeout=self._timeout)
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+            with open(filename, 'wb') as f:
+                f.write(response.content)
+        except Exception as e:
+            self.logger.warning('Problem downloading {0}: {1}'.format(Network.clean_uri(url, self.handle_login), e))
+            return False
+        source['etag'] = response.headers.get('ETag')
+        source['last_modified'] = response.headers.get('Last-Modified')
+        return True
+
     # parse different date formats used in google calendar. Timezone is either coded in time field cointaining ('T') or in separate TZID field.
     def _parse_date(self, val, dtzinfo, par=''):
 
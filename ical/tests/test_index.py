@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2013 Marcus Popp                              marcus@popp.mx
+#########################################################################
+#  This file is part of SmartHomeNG.    https://github.com/smarthomeNG//
+#
+#  Tests of the occurrence index of the ical plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+
+import datetime
+import logging
+import unittest
+from unittest import mock
+
+import dateutil.tz
+
+from plugins.ical import iCal
+
+TZ = dateutil.tz.gettz('Europe/Berlin')
+ICS = 'test.ics'
+
+
+def vevent(uid, summary, *lines):
+    return ['BEGIN:VEVENT', 'UID:' + uid, 'SUMMARY:' + summary] + list(lines) + ['END:VEVENT']
+
+
+CALENDAR = '\n'.join(['BEGIN:VCALENDAR', 'VERSION:2.0'] +
+    vevent('single', 'Meeting', 'DTSTART;TZID=Europe/Berlin:20240330T100000', 'DTEND;TZID=Europe/Berlin:20240330T110000',
+           'LOCATION:Office', 'DESCRIPTION:Weekly review') +
+    # starts exactly at 23:59:59, the start of the old timeframe of the next day
+    vevent('edge-start', 'Edge start', 'DTSTART;TZID=Europe/Berlin:20240330T235959', 'DTEND;TZID=Europe/Berlin:20240331T010000') +
+    # ends exactly at 23:59:59
+    vevent('edge-end', 'Edge end', 'DTSTART;TZID=Europe/Berlin:20240330T120000', 'DTEND;TZID=Europe/Berlin:20240330T235959') +
+    # without DTEND, zero length
+    vevent('reminder', 'Reminder', 'DTSTART;TZID=Europe/Berlin:20240331T120000') +
+    # recurring over midnight with an excluded and a moved occurrence
+    vevent('nightly', 'Nightly', 'DTSTART;TZID=Europe/Berlin:20240325T220000', 'DTEND;TZID=Europe/Berlin:20240326T020000',
+           'RRULE:FREQ=DAILY;COUNT=20', 'EXDATE;TZID=Europe/Berlin:20240331T220000') +
+    vevent('nightly', 'Nightly moved', 'RECURRENCE-ID;TZID=Europe/Berlin:20240401T220000',
+           'DTSTART;TZID=Europe/Berlin:20240401T230000', 'DTEND;TZID=Europe/Berlin:20240402T000000') +
+    vevent('allday', 'Easter', 'DTSTART;VALUE=DATE:20240331', 'DTEND;VALUE=DATE:20240401') +
+    vevent('vacation', 'Vacation', 'DTSTART;TZID=Europe/Berlin:20240320T080000', 'DTEND;TZID=Europe/Berlin:20240329T120000') +
+    vevent('weekly', 'Sports', 'DTSTART;TZID=Europe/Berlin:20240301T070000', 'DTEND;TZID=Europe/Berlin:20240301T073000',
+           'RRULE:FREQ=WEEKLY;BYDAY=MO,FR;UNTIL=20241231T000000Z') +
+    # recurring with zero length, without end of the series
+    vevent('alarm', 'Alarm', 'DTSTART;TZID=Europe/Berlin:20240328T060000', 'DTEND;TZID=Europe/Berlin:20240328T060000',
+           'RRULE:FREQ=DAILY') +
+    vevent('october', 'Night shift', 'DTSTART;TZID=Europe/Berlin:20241026T020000', 'DTEND;TZID=Europe/Berlin:20241026T040000',
+           'RRULE:FREQ=DAILY;COUNT=4') +
+    ['END:VCALENDAR'])
+
+
+def times(first, last, minutes):
+    """
+    local times from first to last (UTC) every minutes, across changes of the daylight saving time
+    """
+    now = first
+    while now < last:
+        yield now.astimezone(TZ)
+        now += datetime.timedelta(minutes=minutes)
+
+
+SPRING = (datetime.datetime(2024, 3, 28, 23, tzinfo=datetime.timezone.utc), datetime.datetime(2024, 4, 3, tzinfo=datetime.timezone.utc))
+AUTUMN = (datetime.datetime(2024, 10, 25, 22, tzinfo=datetime.timezone.utc), datetime.datetime(2024, 10, 29, tzinfo=datetime.timezone.utc))
+
+
+class TestOccurrenceIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.now = None
+        plugin = iCal.__new__(iCal)
+        plugin.logger = logging.getLogger(__name__)
+        plugin.shtime = mock.Mock()
+        plugin.shtime.now.side_effect = lambda: self.now
+        plugin.shtime.tzinfo.return_value = TZ
+        plugin.handle_login = 'show'
+        plugin.alive = True
+        plugin._items = []
+        plugin._ical_aliases = {}
+        plugin._indexes = {}
+        plugin._index_days = 3
+        plugin._icals = {ICS: plugin._parse_ical(CALENDAR, ICS, 1)}
+        self.plugin = plugin
+
+    def active(self, now):
+        """ _update_items() before the index """
+        for events in self.plugin._filter_events(self.plugin._icals[ICS], 0, 0).values():
+            for event in events:
+                if event['Start'] <= now <= event['End'] or (event['Start'] == event['End'] and event['Start'] <= now <= event['End'].replace(second=59, microsecond=999)):
+                    return True
+        return False
+
+    def test_calendar(self):
+        events = self.plugin._icals[ICS]
+        self.assertEqual(len(events), 11)
+        self.assertEqual(len(events['nightly']['EXDATES']), 2)
+
+    def test_is_active(self):
+        for first, last in (SPRING, AUTUMN):
+            for now in times(first, last, 10):
+                self.now = now
+                with self.subTest(now=now):
+                    self.assertEqual(self.plugin._get_index(ICS).is_active(now), self.active(now))
+
+    def test_is_active_edges(self):
+        # within the minute of events without duration, at the start and the end of events
+        for now in (datetime.datetime(2024, 3, 30, 23, 59, 59, tzinfo=TZ), datetime.datetime(2024, 3, 31, 0, 0, 0, tzinfo=TZ),
+                    datetime.datetime(2024, 3, 31, 1, 0, 0, tzinfo=TZ), datetime.datetime(2024, 3, 31, 12, 0, 59, tzinfo=TZ),
+                    datetime.datetime(2024, 3, 31, 12, 1, 0, tzinfo=TZ), datetime.datetime(2024, 3, 30, 6, 0, 30, tzinfo=TZ),
+                    datetime.datetime(2024, 4, 1, 1, 30, tzinfo=TZ), datetime.datetime(2024, 4, 1, 23, 30, tzinfo=TZ)):
+            self.now = now
+            with self.subTest(now=now):
+                self.assertEqual(self.plugin._get_index(ICS).is_active(now), self.active(now))
+
+    def test_between(self):
+        for first, last in (SPRING, AUTUMN):
+            for now in times(first, last, 60):
+                self.now = now
+                index = self.plugin._get_index(ICS)
+                for delta in range(4):
+                    for offset in range(-1, 3):
+                        start, end = self.plugin._get_timeframe(delta, offset)
+                        if not index.covers(start, end):
+                            continue
+                        with self.subTest(now=now, delta=delta, offset=offset):
+                            expected = self.plugin._filter_events(self.plugin._icals[ICS], delta, offset)
+                            revents = index.between(start, end)
+                            self.assertEqual(revents, expected)
+                            # same order of the days and of the events of a day
+                            self.assertEqual(list(revents), list(expected))
+                            self.assertEqual([[list(event) for event in events] for events in revents.values()],
+                                             [[list(event) for event in events] for events in expected.values()])
+
+    def test_exdate(self):
+        self.now = datetime.datetime(2024, 3, 31, 9, tzinfo=TZ)
+        starts = [event['Start'] for event in self.plugin(ICS, 1, 0)[datetime.date(2024, 3, 31)]]
+        self.assertNotIn(datetime.datetime(2024, 3, 31, 22, tzinfo=TZ), starts)
+        self.now = datetime.datetime(2024, 4, 1, 9, tzinfo=TZ)
+        summaries = [event['Summary'] for event in self.plugin(ICS, 1, 0)[datetime.date(2024, 4, 1)]]
+        self.assertIn('Nightly moved', summaries)
+        self.assertEqual(summaries.count('Nightly'), 0)
+
+    def test_call(self):
+        # within the index and beyond the index, where the events are filtered directly
+        self.now = datetime.datetime(2024, 3, 30, 9, tzinfo=TZ)
+        index = self.plugin._get_index(ICS)
+        for delta, offset, covered in ((1, 0, True), (2, 1, True), (1, 3, False), (5, 0, False), (1, 30, False)):
+            with self.subTest(delta=delta, offset=offset):
+                self.assertEqual(index.covers(*self.plugin._get_timeframe(delta, offset)), covered)
+                with mock.patch.object(self.plugin, '_filter_events', wraps=self.plugin._filter_events) as filter_events:
+                    revents = self.plugin(ICS, delta, offset)
+                self.assertEqual(filter_events.called, not covered)
+                self.assertEqual(revents, self.plugin._filter_events(self.plugin._icals[ICS], delta, offset))
+
+    def test_index_rebuilt(self):
+        self.now = datetime.datetime(2024, 3, 30, 9, tzinfo=TZ)
+        index = self.plugin._get_index(ICS)
+        self.now = datetime.datetime(2024, 3, 30, 23, 59, 59, tzinfo=TZ)
+        self.assertIs(self.plugin._get_index(ICS), index)
+        self.now = datetime.datetime(2024, 3, 31, 0, 0, 0, tzinfo=TZ)
+        self.assertIsNot(self.plugin._get_index(ICS), index)
+
+    def test_update_items(self):
+        item = mock.Mock()
+        item.conf = {'ical_calendar': ICS}
+        self.plugin._items = [item]
+        self.now = datetime.datetime(2024, 3, 30, 10, 30, tzinfo=TZ)
+        self.plugin._update_items()
+        item.assert_called_once_with(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
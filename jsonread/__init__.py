@@ -25,6 +25,8 @@
 
 import logging
 import json
+import functools
+import threading
 import requests
 from requests_file import FileAdapter
 import pyjq
@@ -34,13 +36,16 @@ from .webif import WebInterface
 
 
 class JSONREAD(SmartPlugin):
-    PLUGIN_VERSION = "1.0.4"
+    PLUGIN_VERSION = "1.1.0"
+
+    DEFAULT_SOURCE = 'default'
 
     def __init__(self, sh):
         """
         Initializes the plugin
         @param url: URL of the json data to fetch
         @param cycle: the polling interval in seconds
+        @param sources: additional named json sources, each with own url and optional cycle
         """
         # Call init code of parent class (SmartPlugin)
         super().__init__()
@@ -51,16 +56,40 @@ class JSONREAD(SmartPlugin):
 
         self._url = self.get_parameter_value('url')
         self._cycle = self.get_parameter_value('cycle')
-        self._session = requests.Session()
-        self._session.mount('file://', FileAdapter())
         self._items = {}
-        self._lastresult = {}
-        self._lastresultstr = ""
-        self._lastresultjq = ""
+        self._filters = {}
+        self._sources = {}
+
+        if self._url:
+            self._add_source(self.DEFAULT_SOURCE, self._url, self._cycle)
+        sources = self.get_parameter_value('sources') or {}
+        for name, source in sources.items():
+            if isinstance(source, dict):
+                self._add_source(name, source.get('url'), int(source.get('cycle', self._cycle)))
+            else:
+                self._add_source(name, source, self._cycle)
+        if not self._sources:
+            self.logger.error("Neither url nor sources are configured")
+            self._init_complete = False
+            return
 
         # if plugin should start even without web interface
         self.init_webinterface(WebInterface)
 
+    def _add_source(self, name, url, cycle):
+        if not url:
+            self.logger.error("No url given for source '{}'".format(name))
+            return
+        session = requests.Session()
+        session.mount('file://', FileAdapter())
+        self._sources[name] = {'url': url, 'cycle': cycle, 'session': session, 'items': {},
+                               'etag': None, 'last_modified': None, 'result': {}, 'generation': 0,
+                               'rendered': None, 'lock': threading.Lock()}
+
+    def _get_scheduler_name(self, name):
+        if name == self.DEFAULT_SOURCE:
+            return self.get_fullname()
+        return "{}_{}".format(self.get_fullname(), name)
 
     def run(self):
         """
@@ -68,46 +97,79 @@ class JSONREAD(SmartPlugin):
         """
         self.logger.debug("Run method called")
         self.alive = True
-        self.scheduler_add(self.get_fullname(), self.poll_device, cycle=self._cycle)
+        # every source has its own scheduler entry, so sources are polled independently and concurrently
+        for name, source in self._sources.items():
+            self.scheduler_add(self._get_scheduler_name(name), functools.partial(self.poll_device, name), cycle=source['cycle'])
 
     def stop(self):
         self.logger.debug("Stop method called")
-        self.scheduler_remove(self.get_fullname() )
+        for name in self._sources:
+            self.scheduler_remove(self._get_scheduler_name(name))
         self.alive = False
 
     def parse_item(self, item):
         if self.has_iattr(item.conf, 'jsonread_filter'):
-            self._items[item] = self.get_iattr_value(item.conf, 'jsonread_filter')
+            name = self.get_iattr_value(item.conf, 'jsonread_source') or self.DEFAULT_SOURCE
+            if name not in self._sources:
+                self.logger.error("Item {}: unknown jsonread_source '{}'".format(item.property.path, name))
+                return
+            jq_filter = self.get_iattr_value(item.conf, 'jsonread_filter')
+            try:
+                self._get_filter(jq_filter)
+            except Exception as ex:
+                self.logger.error("Item {}: jq filter '{}' could not be compiled: {}".format(item.property.path, jq_filter, ex))
+                return
+            self._items[item] = jq_filter
+            self._sources[name]['items'][item] = jq_filter
 
-    def poll_device(self):
+    def _get_filter(self, jq_filter):
+        """
+        Returns the compiled jq program for a filter, it is compiled only once for all items using it
+        """
+        script = self._filters.get(jq_filter)
+        if script is None:
+            script = pyjq.compile(jq_filter)
+            self._filters[jq_filter] = script
+        return script
+
+    def poll_device(self, name=DEFAULT_SOURCE):
+        source = self._sources[name]
+        url = source['url']
+        headers = {}
+        if source['etag']:
+            headers['If-None-Match'] = source['etag']
+        if source['last_modified']:
+            headers['If-Modified-Since'] = source['last_modified']
         try:
-            response = self._session.get(self._url)
+            response = source['session'].get(url, headers=headers)
 
         except Exception as ex:
-            self.logger.error("Exception when sending GET request for {}: {}".format(self._url,str(ex)))
+            self.logger.error("Exception when sending GET request for {}: {}".format(url,str(ex)))
+            return
+
+        if response.status_code == 304:
+            self.logger.debug("Data from '{}' unchanged".format(url))
             return
 
         if response.status_code != 200:
-            self.logger.error("Bad response code from GET '{}': {}".format(self._url, response.status_code))
+            self.logger.error("Bad response code from GET '{}': {}".format(url, response.status_code))
             return
 
         try:
             json_obj = response.json()
         except Exception as ex:
-            self.logger.error("Response from '{}' doesn't look like json '{}'".format(self._url, str(response.content)[:30]))
+            self.logger.error("Response from '{}' doesn't look like json '{}'".format(url, str(response.content)[:30]))
             return
 
-        try:
-            self._lastresult = json_obj
-            self._lastresultstr = json.dumps(self._lastresult, indent=4, sort_keys=True)
-            self._lastresultjq = '\n'.join(str(x) for x in pathes(self._lastresult))
-        except Exception as ex:
-            self.logger.error("Could not change '{}' into pretty json string'{}'".format(self._lastresult,self._lastresultstr))
-            self._lastresultstr = "<empty due to failure>"
+        source['etag'] = response.headers.get('ETag')
+        source['last_modified'] = response.headers.get('Last-Modified')
+        with source['lock']:
+            source['result'] = json_obj
+            source['generation'] += 1
 
-        for k in self._items.keys():
+        for k in source['items'].keys():
             try:
-                jqres = pyjq.first(self._items[k], json_obj)
+                jqres = self._get_filter(source['items'][k]).first(json_obj)
 
             except Exception as ex:
                 self.logger.error("jq filter failed: {}'".format(str(ex)))
@@ -115,6 +177,44 @@ class JSONREAD(SmartPlugin):
 
             k(jqres)
 
+    def _render_source(self, name):
+        """
+        Returns the pretty printed json and the jq pathes of the last reading of a source.
+        They are only needed by the web interface and thus rendered on request, once per reading.
+        """
+        source = self._sources[name]
+        with source['lock']:
+            if source['rendered'] is None or source['rendered'][0] != source['generation']:
+                try:
+                    resultstr = json.dumps(source['result'], indent=4, sort_keys=True)
+                    resultjq = '\n'.join(str(x) for x in pathes(source['result']))
+                except Exception as ex:
+                    self.logger.error("Could not change '{}' into pretty json string: {}".format(source['result'], ex))
+                    resultstr = "<empty due to failure>"
+                    resultjq = ""
+                source['rendered'] = (source['generation'], resultstr, resultjq)
+            return source['rendered'][1], source['rendered'][2]
+
+    def _render_all(self, index):
+        if len(self._sources) == 1:
+            return self._render_source(next(iter(self._sources)))[index]
+        return '\n\n'.join("# {} ({})\n{}".format(name, source['url'], self._render_source(name)[index])
+                            for name, source in self._sources.items())
+
+    @property
+    def _lastresult(self):
+        if len(self._sources) == 1:
+            return next(iter(self._sources.values()))['result']
+        return {name: source['result'] for name, source in self._sources.items()}
+
+    @property
+    def _lastresultstr(self):
+        return self._render_all(0)
+
+    @property
+    def _lastresultjq(self):
+        return self._render_all(1)
+
 # just a helper function
 
 def pathes( d, stem=""):
@@ -45,6 +45,8 @@ from lib.model.sdp.globals import (JSON_MOVE_KEYS, PLUGIN_ATTR_CMD_CLASS, PLUGIN
 
 from lib.model.smartdeviceplugin import SmartDevicePlugin, Standalone
 
+from .reply_matcher import ReplyMatcher
+
 # from .webif import WebInterface
 
 
@@ -83,7 +85,7 @@ class kodi(SmartDevicePlugin):
           another place, in ``commands.py`` and/or the item configuration.
     """
 
-    PLUGIN_VERSION = '1.7.3'
+    PLUGIN_VERSION = '1.7.4'
 
     def _set_device_defaults(self):
         self._use_callbacks = True
@@ -105,6 +107,9 @@ class kodi(SmartDevicePlugin):
         # the SDPCommands class and not listed in commands.py
         self._special_commands = {'read': ['info.player'], 'write': ['status.update']}
 
+        # match the JSON RPC methods against the precompiled reply patterns
+        self._reply_matcher = ReplyMatcher.install(self._commands, self.logger)
+
     def on_connect(self, by=None):
         super().on_connect(by)
         self._update_status()
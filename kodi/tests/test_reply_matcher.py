@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2023-      Sebastian Helms           Morg @ knx-user-forum
+#########################################################################
+#  This file is part of SmartHomeNG
+#
+#  Tests of the reply matcher with the commands of the kodi plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG  If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+
+import re
+import unittest
+
+from plugins.kodi.commands import commands
+from plugins.kodi.reply_matcher import ReplyMatcher
+
+# the reply patterns of kodi are the opcodes ('*'), the plugin matches the JSON RPC methods against them
+LINES = sorted({cmd['opcode'] for group in commands.values() for cmd in group.values() if isinstance(cmd, dict) and 'opcode' in cmd}) + \
+        ['Player.OnPlay', 'unknown']
+
+REPLIES = {'player': ['info.player'],
+           'media': ['info.state', 'info.media'],
+           'unknown': []}
+
+
+def reply_patterns(commands, path=''):
+    """
+    reply patterns of all commands in definition order, placeholders substituted like SDPCommands does
+    """
+    for name, cmd in commands.items():
+        if not isinstance(cmd, dict):
+            continue
+        if 'read' not in cmd and 'write' not in cmd and 'reply_pattern' not in cmd:
+            yield from reply_patterns(cmd, path + name + '.')
+            continue
+        patterns = cmd.get('reply_pattern')
+        if not patterns:
+            continue
+        if not isinstance(patterns, list):
+            patterns = [patterns]
+        result = []
+        for pattern in patterns:
+            if pattern == '*':
+                pattern = re.escape(str(cmd.get('opcode', '')))
+            result.append(pattern)
+        yield path + name, result
+
+
+def linear(patterns, data):
+    """
+    matching as done by SDPCommands.get_commands_from_reply(): every pattern in turn
+    """
+    return [command for command, cmd_patterns in patterns if any(re.match(pattern, data) for pattern in cmd_patterns)]
+
+
+class TestReplyMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.patterns = list(reply_patterns(commands))
+        self.matcher = ReplyMatcher(self.patterns)
+
+    def test_same_result_as_linear_matching(self):
+        for line in LINES:
+            with self.subTest(line=line):
+                self.assertEqual(linear(self.patterns, line), self.matcher.match(line))
+
+    def test_replies(self):
+        for line, expected in REPLIES.items():
+            with self.subTest(line=line):
+                self.assertEqual(expected, self.matcher.get_commands_from_reply(line))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -48,13 +48,15 @@ from lib.model.sdp.globals import (CUSTOM_SEP, PLUGIN_ATTR_NET_HOST, PLUGIN_ATTR
 from lib.model.smartdeviceplugin import SmartDevicePlugin, Standalone
 from lib.model.sdp.command import SDPCommandParseStr
 
+from .reply_matcher import ReplyMatcher
+
 import urllib.parse
 
 
 class lms(SmartDevicePlugin):
     """ Device class for Logitech Mediaserver/Squeezebox function. """
 
-    PLUGIN_VERSION = '2.0.0'
+    PLUGIN_VERSION = '2.0.1'
 
     def _set_device_defaults(self):
         self.custom_commands = 1
@@ -81,6 +83,10 @@ class lms(SmartDevicePlugin):
                 self._parameters['web_host'] = f'http://{host}'
         self._parameters['CURRENT_LIST_ID'] = {}
 
+    def _post_init(self):
+        # match received data against the precompiled reply patterns
+        self._reply_matcher = ReplyMatcher.install(self._commands, self.logger)
+
     def on_connect(self, by=None):
         self.logger.debug(f"Activating listen mode after connection.")
         self.send_command('server.listenmode', True)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2022 <Onkel Andy>                    <onkelandy@hotmail.com>
+#########################################################################
+#  This file is part of SmartHomeNG
+#
+#  Compiled reply pattern matching for the SmartDevicePlugin AV plugins
+#  (denon, pioneer, lms, kodi)
+#
+#  Plugins must not import modules of other plugins, every plugin using the matcher has
+#  its own copy of this file. Keep the copies identical.
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG  If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+
+import re
+import threading
+
+try:
+    from re import _parser as sre_parse
+except ImportError:     # Python < 3.11
+    import sre_parse
+
+
+def literal_runs(pattern):
+    """
+    returns the literal text at the start of a regex and the longest literal text
+    every match has to contain
+
+    Only top level literals are considered, groups, alternatives and repeated parts end a run.
+    For case insensitive patterns no literals are returned.
+
+    :param pattern: regular expression
+    :return: tuple (prefix, anchor)
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, TypeError, ValueError):
+        return '', ''
+    state = getattr(parsed, 'state', None) or getattr(parsed, 'pattern', None)
+    if state is not None and state.flags & re.IGNORECASE:
+        return '', ''
+
+    prefix = None
+    runs = []
+    run = []
+    for op, av in parsed:
+        if op is sre_parse.AT and av is sre_parse.AT_BEGINNING and prefix is None and not run:
+            continue
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if prefix is None:
+            prefix = ''.join(run)
+        runs.append(''.join(run))
+        run = []
+    if prefix is None:
+        prefix = ''.join(run)
+    runs.append(''.join(run))
+    return prefix, max(runs, key=len)
+
+
+class ReplyMatcher():
+    """
+    Finds the commands matching a reply of the device
+
+    The reply patterns of all commands are compiled once. Patterns starting with literal text
+    are indexed by the first characters of this text, patterns starting with a placeholder
+    (e.g. the player id of lms) are grouped by the longest literal text they contain. So a
+    received line is only matched against the few patterns which can match at all.
+
+    The patterns are taken as stored in the commands, i.e. with lookups and custom patterns
+    already substituted. The commands are returned in the order of the command definitions.
+    """
+
+    def __init__(self, patterns=None, logger=None, prefix_len=4):
+        """
+        :param patterns: iterable of (command, pattern or list of patterns) in command order
+        :param prefix_len: number of characters used as key of the prefix index
+        """
+        self.logger = logger
+        self._prefix_len = prefix_len
+        self._lock = threading.Lock()
+        self._commands = None
+        self._original = None
+        self._prefixes = {}         # key length -> {key: [(order, prefix, regex, command)]}
+        self._lengths = []
+        self._anchors = {}          # anchor -> [(order, regex, command)]
+        self._wildcards = []        # [(order, regex, command)]
+        self.pattern_count = 0
+        if patterns is not None:
+            self.build(patterns)
+
+    @classmethod
+    def install(cls, commands, logger=None):
+        """
+        Build a matcher for a SDPCommands object and use it for get_commands_from_reply()
+
+        :param commands: SDPCommands object of the plugin
+        :return: the matcher, None if it could not be built (the original method is kept then)
+        """
+        matcher = cls(logger=logger)
+        matcher._commands = commands
+        try:
+            matcher.rebuild()
+        except Exception as e:
+            if logger is not None:
+                logger.warning(f'Could not build reply matcher, using default matching: {e}')
+            return None
+        matcher._original = commands.get_commands_from_reply
+        commands.get_commands_from_reply = matcher.get_commands_from_reply
+        return matcher
+
+    def rebuild(self):
+        """
+        Rebuild the matcher from the commands, e.g. after a lookup table has been changed
+        """
+        if self._commands is None:
+            return
+
+        def patterns(cmd):
+            result = getattr(cmd, 'reply_pattern', None)
+            if not isinstance(result, (list, tuple)):
+                result = [result]
+            # '*' stands for the opcode of the command
+            return [re.escape(str(getattr(cmd, 'opcode', ''))) if pattern == '*' else pattern for pattern in result]
+
+        self.build((name, patterns(cmd)) for name, cmd in self._commands._commands.items())
+
+    def build(self, patterns):
+        prefixes = {}
+        anchors = {}
+        wildcards = []
+        count = 0
+        for order, (command, cmd_patterns) in enumerate(patterns):
+            if not cmd_patterns:
+                continue
+            if not isinstance(cmd_patterns, (list, tuple)):
+                cmd_patterns = [cmd_patterns]
+            for pattern in cmd_patterns:
+                if not pattern or not isinstance(pattern, str):
+                    continue
+                try:
+                    regex = re.compile(pattern)
+                except re.error as e:
+                    if self.logger is not None:
+                        self.logger.warning(f'Invalid reply pattern {pattern} for command {command}: {e}')
+                    continue
+                count += 1
+                prefix, anchor = literal_runs(pattern)
+                if prefix:
+                    key = prefix[:self._prefix_len]
+                    prefixes.setdefault(len(key), {}).setdefault(key, []).append((order, prefix, regex, command))
+                elif len(anchor) > 1:
+                    anchors.setdefault(anchor, []).append((order, regex, command))
+                else:
+                    wildcards.append((order, regex, command))
+
+        with self._lock:
+            self._prefixes = prefixes
+            self._lengths = sorted(prefixes, reverse=True)
+            self._anchors = anchors
+            self._wildcards = wildcards
+            self.pattern_count = count
+        if self.logger is not None:
+            self.logger.debug(f'Reply matcher built for {count} patterns: {sum(len(b) for t in prefixes.values() for b in t.values())} '
+                              f'indexed by prefix, {sum(len(b) for b in anchors.values())} by text, {len(wildcards)} unindexed')
+
+    def match(self, data):
+        """
+        :param data: reply of the device
+        :return: list of the commands whose reply pattern matches
+        """
+        with self._lock:
+            prefixes, lengths, anchors, wildcards = self._prefixes, self._lengths, self._anchors, self._wildcards
+        hits = []
+        for length in lengths:
+            bucket = prefixes[length].get(data[:length])
+            if bucket:
+                for order, prefix, regex, command in bucket:
+                    if data.startswith(prefix) and regex.match(data):
+                        hits.append((order, command))
+        for anchor, bucket in anchors.items():
+            if anchor in data:
+                for order, regex, command in bucket:
+                    if regex.match(data):
+                        hits.append((order, command))
+        for order, regex, command in wildcards:
+            if regex.match(data):
+                hits.append((order, command))
+
+        if len(hits) > 1:
+            hits.sort()
+        commands = []
+        for order, command in hits:
+            if command not in commands:
+                commands.append(command)
+        return commands
+
+    def get_commands_from_reply(self, data):
+        """
+        replacement for SDPCommands.get_commands_from_reply()
+        """
+        if isinstance(data, (bytes, bytearray)):
+            data = str(data.decode())
+        if not isinstance(data, str):
+            return self._original(data) if self._original is not None else []
+        return self.match(data)
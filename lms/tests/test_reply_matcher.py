@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2022 <Onkel Andy>                    <onkelandy@hotmail.com>
+#########################################################################
+#  This file is part of SmartHomeNG
+#
+#  Tests of the reply matcher with the commands of the lms plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG  If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+
+import re
+import unittest
+
+from plugins.lms.commands import commands, lookups
+from plugins.lms.reply_matcher import ReplyMatcher
+
+# lookup tables of all models, as the core merges them for the configured model
+LOOKUPS = {}
+for tables in lookups.values():
+    LOOKUPS.update(tables)
+
+# custom pattern 1 of the plugin: the player id (mac address)
+CUSTOM_PATTERN1 = '(?:[0-9a-fA-F]{2}[-:]){5}[0-9a-fA-F]{2}'
+
+LINES = [f'00:04:20:12:34:56 mixer volume {volume}' for volume in range(10, 60, 10)] + \
+        [f'00:04:20:12:34:56 time {seconds}.25' for seconds in range(100, 140, 10)] + \
+        ['00:04:20:12:34:56 playlist newsong Song Title 3', '00:04:20:12:34:56 playlist pause 0',
+         '00:04:20:12:34:56 playlist index 3', '00:04:20:12:34:56 prefset server power 1',
+         'players 0 100 count:2', 'listen 1', 'version 8.3.1', 'unknown']
+
+REPLIES = {'00:04:20:12:34:56 mixer volume 30': ['player.control.volume'],
+           '00:04:20:12:34:56 playlist pause 0': ['player.control.playmode'],
+           'version 8.3.1': ['server.version'],
+           'unknown': []}
+
+
+def reply_patterns(commands, path=''):
+    """
+    reply patterns of all commands in definition order, placeholders substituted like SDPCommands does
+    """
+    for name, cmd in commands.items():
+        if not isinstance(cmd, dict):
+            continue
+        if 'read' not in cmd and 'write' not in cmd and 'reply_pattern' not in cmd:
+            yield from reply_patterns(cmd, path + name + '.')
+            continue
+        patterns = cmd.get('reply_pattern')
+        if not patterns:
+            continue
+        if not isinstance(patterns, list):
+            patterns = [patterns]
+        result = []
+        for pattern in patterns:
+            if pattern == '*':
+                pattern = re.escape(str(cmd.get('opcode', '')))
+            if '{LOOKUP}' in pattern and cmd.get('lookup') in LOOKUPS:
+                pattern = pattern.replace('{LOOKUP}', '(' + '|'.join(re.escape(str(key)) for key in LOOKUPS[cmd['lookup']]) + ')')
+            valid = cmd.get('cmd_settings', {}).get('valid_list_ci')
+            if '{VALID_LIST_CI}' in pattern and valid:
+                pattern = pattern.replace('{VALID_LIST_CI}', '(?i:' + '|'.join(re.escape(str(value)) for value in valid) + ')')
+            pattern = pattern.replace('{CUSTOM_PATTERN1}', CUSTOM_PATTERN1)
+            result.append(pattern)
+        yield path + name, result
+
+
+def linear(patterns, data):
+    """
+    matching as done by SDPCommands.get_commands_from_reply(): every pattern in turn
+    """
+    return [command for command, cmd_patterns in patterns if any(re.match(pattern, data) for pattern in cmd_patterns)]
+
+
+class TestReplyMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.patterns = list(reply_patterns(commands))
+        self.matcher = ReplyMatcher(self.patterns)
+
+    def test_same_result_as_linear_matching(self):
+        for line in LINES:
+            with self.subTest(line=line):
+                self.assertEqual(linear(self.patterns, line), self.matcher.match(line))
+
+    def test_replies(self):
+        for line, expected in REPLIES.items():
+            with self.subTest(line=line):
+                self.assertEqual(expected, self.matcher.get_commands_from_reply(line))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,12 +23,16 @@
 #########################################################################
 
 
+from functools import partial
+
 from lib.model.mqttplugin import *
 from lib.item import Items
 
 from lib.utils import Utils
 
 from .webif import WebInterface
+from .topic_dispatch import TopicTrie, JsonPath, topic_covers, replay
+from .publish_queue import PublishQueue
 
 
 class Mqtt2(MqttPlugin):
@@ -37,7 +41,7 @@ class Mqtt2(MqttPlugin):
     the update functions for the items
     """
 
-    PLUGIN_VERSION = '2.0.6'
+    PLUGIN_VERSION = '2.0.8'
 
 
     def __init__(self, sh, *args, **kwargs):
@@ -70,6 +74,14 @@ class Mqtt2(MqttPlugin):
 
         self.inittopics = {}
 
+        # items with mqtt_json_path: one subscription per topic (pattern), one message is routed to many items
+        self._json_trie = TopicTrie()
+        self._json_owner = {}               # topic pattern -> subscribed pattern covering it
+
+        # outbound publishes are coalesced and rate limited
+        self._publish_queue = PublishQueue(self, self.get_parameter_value('publish_rate_limits'), self.get_parameter_value('publish_dedup'))
+        self._publish_queue_item_path = self.get_parameter_value('publish_queue_item')
+
         # if plugin should start even without web interface
         if self._init_complete:
             self.init_webinterface(WebInterface)
@@ -88,7 +100,9 @@ class Mqtt2(MqttPlugin):
         # They will not shutdown properly. (It's a python bug)
 
         # start subscription to all topics
+        self._add_json_subscriptions()
         self.start_subscriptions()
+        self._publish_queue.start()
 
         return
 
@@ -102,6 +116,7 @@ class Mqtt2(MqttPlugin):
 
         # stop subscription to all topics
         self.stop_subscriptions()
+        self._publish_queue.stop()
 
         return
 
@@ -119,6 +134,11 @@ class Mqtt2(MqttPlugin):
                         with the item, caller, source and dest as arguments and in case of the knx plugin the value
                         can be sent to the knx with a knx write function within the knx plugin.
         """
+        if self._publish_queue_item_path and item.property.path == self._publish_queue_item_path:
+            self.logger.debug(f"publish queue item {item.property.path} registered")
+            self._publish_queue.depth_item = item
+            return
+
         # check for topic prefixes
         topic_prefix_in = ''
         topic_prefix_out = ''
@@ -183,11 +203,17 @@ class Mqtt2(MqttPlugin):
 
         # subscribe to configured topics
         if self.has_iattr(item.conf, 'mqtt_topic_in'):
-            # add subscription
             topic = self.get_iattr_value(item.conf, 'mqtt_topic_in')
-            payload_type = item.property.type
-            bool_values = self.get_iattr_value(item.conf, 'mqtt_bool_values')
-            self.add_subscription(topic, payload_type, bool_values, item)
+            if self.has_iattr(item.conf, 'mqtt_json_path'):
+                # value is extracted from a json payload, the topic is subscribed only once for all items
+                json_path = JsonPath(self.get_iattr_value(item.conf, 'mqtt_json_path'))
+                self._json_trie.add(topic, (topic, item, json_path))
+                self.logger.debug(f"Item '{item.property.path}' gets '{json_path.path}' from payload of topic '{topic}'")
+            else:
+                # add subscription
+                payload_type = item.property.type
+                bool_values = self.get_iattr_value(item.conf, 'mqtt_bool_values')
+                self.add_subscription(topic, payload_type, bool_values, item)
 
         if self.has_iattr(item.conf, 'mqtt_topic_out'):
             # initialize topics if configured
@@ -243,7 +269,69 @@ class Mqtt2(MqttPlugin):
                 qos = self.get_iattr_value(item.conf, 'mqtt_qos')
                 if qos:
                     qos = int(qos)
-                self.publish_topic(topic, item(), item, qos, retain, bool_values)
+                self._publish_queue.publish(topic, item(), item, qos, retain, bool_values)
+
+        elif caller == self.get_shortname():
+            # value has been received from the broker
+            self._publish_queue.confirm(item)
+
+
+    def _add_json_subscriptions(self):
+        """
+        Subscribe to the topics of items with mqtt_json_path
+
+        Topics which are covered by the wildcard topic of another item are not subscribed
+        separately, messages for them are dispatched by the subscription covering them.
+        """
+        patterns = self._json_trie.patterns()
+        for pattern in patterns:
+            owner = pattern
+            covered = True
+            while covered:
+                covered = False
+                for other in patterns:
+                    if other != owner and topic_covers(other, owner) and not topic_covers(owner, other):
+                        owner = other
+                        covered = True
+                        break
+            self._json_owner[pattern] = owner
+
+        for subscription in set(self._json_owner.values()):
+            self.add_subscription(subscription, 'dict', callback=partial(self.on_json_message, subscription))
+
+
+    def on_json_message(self, subscription, topic, payload, qos=None, retain=None):
+        """
+        Callback function for subscriptions of items with mqtt_json_path
+
+        :param subscription: subscribed topic (pattern) the message was received for
+        :param topic: received topic
+        :param payload: decoded payload
+        """
+        for pattern, item, json_path in self._json_trie.match(topic):
+            if self._json_owner.get(pattern) != subscription:
+                continue
+            try:
+                value = json_path.extract(payload)
+            except KeyError:
+                self.logger.debug(f"on_json_message: '{json_path.path}' not in payload of topic '{topic}' for item '{item.property.path}'")
+                continue
+            item(value, self.get_shortname(), topic)
+
+
+    def replay_capture(self, filename, repeat=1):
+        """
+        Replay a recorded message capture through the subscriptions of items with mqtt_json_path
+
+        Items are updated as for received messages, so use it on a test system only.
+
+        :param filename: capture file (output of 'mosquitto_sub -v -t "#"' or json lines)
+        :param repeat: number of times the capture is replayed
+        :return: dict with number of messages, duration and messages/s
+        """
+        routes = [(subscription, partial(self.on_json_message, subscription), 'dict', None)
+                  for subscription in set(self._json_owner.values())]
+        return replay(self.get_fullname(), filename, routes, repeat, self.logger)
 
 
     def poll_device(self):
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2017-2018  Martin Sinn                         m.sinn@gmx.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Tests of the outbound publish queue
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import logging
+import unittest
+from types import SimpleNamespace
+
+from plugins.mqtt.publish_queue import PublishQueue
+
+
+class MockPlugin:
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.published = []
+
+    def publish_topic(self, topic, payload, item=None, qos=None, retain=False, bool_values=None):
+        self.published.append((topic, payload))
+
+    def get_fullname(self):
+        return 'mqtt'
+
+    def get_shortname(self):
+        return 'mqtt'
+
+
+class MockItem:
+
+    def __init__(self, path, value=None):
+        self.property = SimpleNamespace(path=path)
+        self.value = value
+
+    def __call__(self, value=None, caller=None):
+        if value is None:
+            return self.value
+        self.value = value
+
+
+class TestPublishQueue(unittest.TestCase):
+
+    def test_bucket_per_device(self):
+        queue = PublishQueue(MockPlugin(), {'zigbee2mqtt/+': 2})
+        self.assertEqual('zigbee2mqtt/lamp1', queue._get_bucket('zigbee2mqtt/lamp1/set'))
+        self.assertEqual('zigbee2mqtt/lamp2', queue._get_bucket('zigbee2mqtt/lamp2/set'))
+        self.assertIsNone(queue._get_bucket('tasmota/lamp1/set'))
+
+    def test_bucket_first_level(self):
+        # a single + covers the first topic level only, all topics of a base topic share one bucket
+        queue = PublishQueue(MockPlugin(), {'+': 5})
+        self.assertEqual('zigbee2mqtt', queue._get_bucket('zigbee2mqtt/lamp1/set'))
+        self.assertEqual('zigbee2mqtt', queue._get_bucket('zigbee2mqtt/lamp2/set'))
+
+    def test_longest_prefix_wins(self):
+        queue = PublishQueue(MockPlugin(), {'cmnd': 10, 'cmnd/+/POWER': 1})
+        self.assertEqual('cmnd/plug/POWER', queue._get_bucket('cmnd/plug/POWER'))
+        self.assertEqual('cmnd', queue._get_bucket('cmnd/plug/Dimmer'))
+
+    def test_rate_limit(self):
+        queue = PublishQueue(MockPlugin(), {'zigbee2mqtt/+': 2})
+        bucket = queue._get_bucket('zigbee2mqtt/lamp1/set')
+        now = queue._buckets[bucket][2]
+        self.assertEqual(0, queue._take_token(bucket, now))
+        self.assertEqual(0, queue._take_token(bucket, now))
+        self.assertAlmostEqual(0.5, queue._take_token(bucket, now))
+        self.assertEqual(0, queue._take_token(bucket, now + 0.5))
+
+    def test_coalesce(self):
+        plugin = MockPlugin()
+        queue = PublishQueue(plugin)
+        # no worker thread, the publishes stay in the queue
+        queue._running = True
+        item = MockItem('light.level')
+        queue.publish('zigbee2mqtt/lamp1/set', 10, item)
+        queue.publish('zigbee2mqtt/lamp1/set', 20, item)
+        queue.publish('zigbee2mqtt/bridge/request', 'a')
+        queue.publish('zigbee2mqtt/bridge/request', 'b')
+        self.assertEqual(3, queue.depth())
+        self.assertEqual(1, queue.stats['coalesced'])
+        self.assertEqual([20, 'a', 'b'], [entry[1] for entry in queue._pending.values()])
+
+    def test_dedup(self):
+        queue = PublishQueue(MockPlugin(), dedup=True)
+        queue._running = True
+        item = MockItem('light.on', True)
+        queue.confirm(item)
+        queue.publish('zigbee2mqtt/lamp1/set', True, item)
+        self.assertEqual(0, queue.depth())
+        self.assertEqual(1, queue.stats['deduplicated'])
+
+    def test_publish_without_worker(self):
+        plugin = MockPlugin()
+        queue = PublishQueue(plugin)
+        queue.publish('tele/plug/STATE', 'x')
+        self.assertEqual([('tele/plug/STATE', 'x')], plugin.published)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -29,6 +29,7 @@ from lib.module import Modules
 from lib.model.smartplugin import *
 
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 import logging
@@ -43,7 +44,7 @@ class OneWire(SmartPlugin):
     the update functions for the items
     """
 
-    PLUGIN_VERSION = '1.9.5'
+    PLUGIN_VERSION = '1.9.6'
 
     _flip = {0: '1', False: '1', 1: '0', True: '0', '0': True, '1': False}
 
@@ -117,8 +118,10 @@ class OneWire(SmartPlugin):
         self.host = self.get_parameter_value('host')
         self.port = self.get_parameter_value('port')
 
-        # init the Communication part which is a parent class we inherited from
-        self.owbase = owbase.OwBase(self.host, self.port)
+        # init the Communication part: a small pool of connections to owserver, iButton and I/O polling
+        # get dedicated connections from the pool so they are not delayed by the sensor cycle
+        self._pool = owbase.OwPool(self.host, self.port, self.get_parameter_value('connections'))
+        self.owbase = self._pool.main
 
         # need to get a list of sensors with an alias
         self.read_alias_definitions()
@@ -146,6 +149,9 @@ class OneWire(SmartPlugin):
         self._last_discovery = []           # contains the latest results of discovery. If it does not change
                                             # the listing won't be processed again
         self._iButton_Strategy_set = False  # Will be set to True as soon as first discovery is finished and iButtons and iButton Master are known
+        self._bus_listings = {}             # directory listing of each bus at the latest discovery, unchanged buses are not processed again
+        self._loops = []                    # threads of the iButton and I/O loops
+        self._cycle_times = {}              # duration of the latest cycles of 'sensor', 'discovery', 'io' and 'ibutton'
 
         """
         self._sensors will contain something like 
@@ -184,8 +190,10 @@ class OneWire(SmartPlugin):
         self.logger.debug("Stop method called")
         self.scheduler_remove('sensor_discovery')
         self.scheduler_remove('sensor_read')
-        self.scheduler_remove('sensor-io')          # this can be caused by a trigger in _discovery()
-        self.owbase.close()
+        for thread in self._loops:
+            thread.join(timeout=2)
+        self._loops = []
+        self._pool.close()
 
     """
     Owserver keeps a list of alias definitions. The following are utility functions to handle alias names with item definitions.
@@ -284,8 +292,10 @@ class OneWire(SmartPlugin):
             return
         # speed up logging for time critical sections only
         debugLog = self.logger.isEnabledFor(logging.DEBUG)
+        owb = self._pool.dedicated('io')
+        start = time.perf_counter()
         try:
-            for addr in self._ios:
+            for addr in list(self._ios):
                 for key in self._ios[addr]:
                     if key.startswith('O'):  # ignore output
                         continue
@@ -300,10 +310,10 @@ class OneWire(SmartPlugin):
                         if not self.alive:
                             return
                         if key == 'B':
-                            entries = [entry.split("/")[-2] for entry in self.owbase.dir('/uncached')]
+                            entries = [entry.split("/")[-2] for entry in owb.dir('/uncached')]
                             value = (addr in entries)
                         else:
-                            value = self._flip[self.owbase.read('/uncached' + path).decode()]
+                            value = self._flip[owb.read('/uncached' + path).decode()]
                         self.stopevent.wait(self._parasitic_power_wait)
                     except ConnectionError as e:
                         self.logger.warning(f"_io_cycle: 'raise' {self._ios[addr][key]['readerrors']}. problem connecting to {addr}-{key}, error: {e}")
@@ -322,6 +332,7 @@ class OneWire(SmartPlugin):
                         item(value, self.get_shortname(), path)
         except ConnectionError as e:
             self.logger.warning(f"_io_cycle: Problem reading {addr}, connection-error: {e}")
+        self._add_cycle_time('io', time.perf_counter() - start)
 
     """
     The iButton loop is for iButton devices which are often used as extension to a key ring. 
@@ -340,11 +351,14 @@ class OneWire(SmartPlugin):
 
     def _ibutton_cycle(self):
         """
-        This queries
+        This queries the buses with an iButton master on a dedicated connection and updates the items
+        of the iButtons. The duration of the cycle is kept as detection latency (without button_wait)
         """
         found = []
         error = False
-        for bus in self._ibutton_buses:
+        owb = self._pool.dedicated('ibutton')
+        start = time.perf_counter()
+        for bus in list(self._ibutton_buses):
             if not self.alive:
                 self.logger.error(f"Self not alive (bus={bus})")
                 break
@@ -352,7 +366,7 @@ class OneWire(SmartPlugin):
             name = self._ibutton_buses[bus]
             ignore = ['interface', 'simultaneous', 'alarm'] + self._intruders + list(self._ibutton_masters.keys())
             try:
-                entries = self.owbase.dir(path)
+                entries = owb.dir(path)
             except Exception:
                 #time.sleep(self._parasitic_power_wait)
                 self.stopevent.wait(self._parasitic_power_wait)
@@ -372,6 +386,7 @@ class OneWire(SmartPlugin):
             for ibutton in self._ibuttons:
                 if ibutton not in found:
                     self._ibuttons[ibutton]['B']['item'](False, '1-Wire')
+        self._add_cycle_time('ibutton', time.perf_counter() - start)
 
     def ibutton_hook(self, ibutton, name):
         pass
@@ -393,6 +408,22 @@ class OneWire(SmartPlugin):
             return
 
         start = time.time()
+        with self._pool.connection() as owb:
+            self._read_sensors(owb, debugLog)
+        cycletime = time.time() - start
+        self._add_cycle_time('sensor', cycletime)
+        if self.log_counter_cycle_time > 0 or self.log_counter_cycle_time == -1:
+            if debugLog:
+                self.logger.debug(f"sensor cycle takes {cycletime:.2f} seconds for {len(self._sensors)} sensors, average is {cycletime/len(self._sensors):.2f} per sensor")
+            if self.log_counter_cycle_time > 0:
+                self.log_counter_cycle_time -= 1
+            if self.log_counter_cycle_time == 0 and debugLog:
+                self.logger.debug("Logging counter for sensor cycle time reached zero and stops now")
+
+    def _read_sensors(self, owb, debugLog):
+        """
+        Reads all sensors defined in items using a connection of the pool
+        """
         for addr in self._sensors:
             if not self.alive:
                 self.logger.debug(f"'self' not alive (sensor={addr})")
@@ -405,7 +436,7 @@ class OneWire(SmartPlugin):
                         self.logger.debug(f"_sensor_cycle: no item path found for mapping '{addr}-{key}'")
                     continue
                 try:
-                    value = self.owbase.read('/uncached' + path).decode()
+                    value = owb.read('/uncached' + path).decode()
                     self.stopevent.wait(self._parasitic_power_wait)
                     value = float(value)
                     if key.startswith('T') and value == 85:
@@ -435,18 +466,37 @@ class OneWire(SmartPlugin):
                         # Sollte NIE passieren, ist dann ein Programmierfehler im Plugin
                         self.logger.error(f"_sensor_cycle: No associated item found for device {addr} / key {key}")
 
-        cycletime = time.time() - start
-        if self.log_counter_cycle_time > 0 or self.log_counter_cycle_time == -1:
-            if debugLog:
-                self.logger.debug(f"sensor cycle takes {cycletime:.2f} seconds for {len(self._sensors)} sensors, average is {cycletime/len(self._sensors):.2f} per sensor")
-            if self.log_counter_cycle_time > 0:
-                self.log_counter_cycle_time -= 1
-            if self.log_counter_cycle_time == 0 and debugLog:
-                self.logger.debug("Logging counter for sensor cycle time reached zero and stops now")
+    def _add_cycle_time(self, name, duration):
+        """
+        Keeps the duration of the cycles of the sensor cycle, discovery, I/O and iButton loops for the web interface
+        """
+        stats = self._cycle_times.get(name)
+        if stats is None:
+            stats = self._cycle_times[name] = {'count': 0, 'last': 0.0, 'max': 0.0, 'total': 0.0}
+        stats['count'] += 1
+        stats['last'] = duration
+        stats['total'] += duration
+        if duration > stats['max']:
+            stats['max'] = duration
 
+    def get_cycle_time(self, name):
+        """
+        Returns the duration of the latest cycle, the average and the maximum in seconds for
+        'sensor', 'discovery', 'io' or 'ibutton', None if there was no cycle yet
+        """
+        stats = self._cycle_times.get(name)
+        if not stats:
+            return None
+        return {'last': stats['last'], 'avg': stats['total'] / stats['count'], 'max': stats['max'], 'count': stats['count']}
 
-    def _discovery_process_bus(self, path):
 
+    def _discovery_process_bus(self, path, owb):
+        """
+        Reads the directory of one bus and processes the devices if the listing changed since the last discovery
+
+        :param path: path of the bus like '/bus.0/'
+        :param owb: connection to owserver used for this bus
+        """
         bus = path.split("/")[-2]
         self.logger.dbghigh(f"Discovery: Processing of data for bus {bus} started")
         if bus not in self._buses:
@@ -456,11 +506,16 @@ class OneWire(SmartPlugin):
 
         try:
             # read one single bus directory
-            sensors = self.owbase.dir(path)
+            sensors = owb.dir(path)
         except Exception as e:
             self.logger.info(f"_discovery_process_bus: Problem reading {bus}, error: {e}")
             return
 
+        if self._bus_listings.get(bus) == sorted(sensors):
+            self.logger.debug(f"Discovery: listing of bus {bus} did not change")
+            return
+        self._bus_listings[bus] = sorted(sensors)
+
         self.logger.info(f"Discovery: On bus {bus}  {len(sensors)} sensors found: {sensors}")
 
         for sensor in sensors:
@@ -473,7 +528,7 @@ class OneWire(SmartPlugin):
             addr = sensor.split("/")[-2]
             if addr not in self._buses[bus]:
                 try:
-                    keys, sensortype = self.owbase.identify_sensor(sensor)
+                    keys, sensortype = owb.identify_sensor(sensor)
                 except Exception as e:
                     self.logger.warning(f"identify_sensor({sensor}) - Exception: {e}")
                 self.logger.debug(f"_discovery_process_bus: Sensor {sensor} - keys {keys}")
@@ -513,7 +568,7 @@ class OneWire(SmartPlugin):
                     for ch in ['A', 'B']:
                         if 'I' + ch in table[addr] and 'O' + ch in keys:  # set to 0 and delete output PIO
                             try:
-                                self.owbase.write(sensor + keys['O' + ch], 0)
+                                owb.write(sensor + keys['O' + ch], 0)
                             except Exception as e:
                                 self.logger.info(f"_discovery_process_bus: problem setting {sensor}{keys['O' + ch]} as input: {e}")
                             del (keys['O' + ch])
@@ -539,7 +594,7 @@ class OneWire(SmartPlugin):
                     for ch in ['A', 'B', '0', '1', '2', '3', '4', '5', '6', '7']:  # init PIO
                         if 'O' + ch in table[addr]:
                             try:
-                                self.owbase.write(table[addr][key]['path'], self._flip[table[addr][key]['item']()])
+                                owb.write(table[addr][key]['path'], self._flip[table[addr][key]['item']()])
                             except Exception as e:
                                 self.logger.info(f"_discovery_process_bus: problem setting output {sensor}{keys['O' + ch]}: {e}")
                 else:
@@ -554,14 +609,16 @@ class OneWire(SmartPlugin):
         """
         This is called by scheduler just right after starting the plugin.
         The Items have already been parsed here.
-        The result of the first query to the top directory listing is saved for the next discovery.
-        If the next call takes places it will be checked if there is something changed in top level directory.
-        The rest of the discovery will be skipped if now changes are found.
+        The buses are processed concurrently, each with its own connection of the pool. The directory
+        listing of each bus is saved for the next discovery, only buses with a changed listing are
+        processed again.
         """
         self.logger.dbghigh("Discovery started")
         self._intruders = []  # reset intrusion detection
+        start = time.perf_counter()
         try:
-            listing = self.owbase.dir('/')
+            with self._pool.connection() as owb:
+                listing = owb.dir('/')
         except Exception as e:
             self.logger.error(f"_discovery: listing '/' failed with error '{e}'")
             return
@@ -570,24 +627,24 @@ class OneWire(SmartPlugin):
             self.logger.warning(f"_discovery: listing '{listing}' is not a list.")
             return
 
-        if self._last_discovery == sorted(listing):
-            self.logger.debug("listing did not change, no need to proceed, exit discovery")
-            return
+        if self._last_discovery != sorted(listing):
+            self.logger.debug(f"listing changed: '{listing}'. Save for next discovery cycle")
+            self._last_discovery = sorted(listing)
 
-        self.logger.debug(f"listing changed: '{listing}'. Save for next discovery cycle")
-        self._last_discovery = sorted(listing)
-
-        for path in listing:
-            if not self.alive:
-                self.logger.warning("self.alive is False")
-                break
-
-            # just examine one bus after the next
-            if path.startswith('/bus.'):
-                self._discovery_process_bus(path)
+        buses = [path for path in listing if path.startswith('/bus.')]
+        if buses:
+            with ThreadPoolExecutor(max_workers=min(len(buses), self._pool.size), thread_name_prefix='onewire-discovery') as executor:
+                for future in [executor.submit(self._discovery_process_pooled, path) for path in buses]:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.logger.error(f"_discovery: processing of bus failed with error '{e}'")
 
-        else: # for did not end prematurely with break or something else
+        if not self.alive:
+            self.logger.warning("self.alive is False")
+        else:
             self._discovered = True
+            self._add_cycle_time('discovery', time.perf_counter() - start)
             self.logger.dbghigh("Discovery finished")
 
         # get a list of all directory entries from owserver
@@ -608,15 +665,22 @@ class OneWire(SmartPlugin):
                             else:
                                 self._ios[addr] = {key: {'item': self._ibuttons[addr][key]['item'], 'path': '/' + addr}}
                 self._ibuttons = {}
-            if self._ibutton_masters == {} and self._ios == {}:
-                return
-            elif self._ibutton_masters != {} and self._ios != {}:
-                self.scheduler_trigger('sensor-io', self._io_loop, '1w', prio=5)
-                self._ibutton_loop()
-            elif self._ios != {}:
-                self._io_loop()
-            elif self._ibutton_masters != {}:
-                self._ibutton_loop()
+            # the loops run in their own threads, so the discovery keeps running in its cycle
+            if self._ios != {}:
+                self._start_loop(self._io_loop)
+            if self._ibutton_masters != {}:
+                self._start_loop(self._ibutton_loop)
+
+    def _discovery_process_pooled(self, path):
+        if not self.alive:
+            return
+        with self._pool.connection() as owb:
+            self._discovery_process_bus(path, owb)
+
+    def _start_loop(self, target):
+        thread = threading.Thread(target=target)
+        self._loops.append(thread)
+        thread.start()
 
     def parse_item(self, item):
         """
@@ -702,7 +766,7 @@ class OneWire(SmartPlugin):
             try:
                 # code to execute, only if the item has not been changed by this plugin:
                 self.logger.debug(f"update_item: update item: {item.property.path}, item has been changed outside this plugin")
-                self.owbase.write(item._ow_path['path'], self._flip[item()])
+                self._pool.dedicated('io').write(item._ow_path['path'], self._flip[item()])
             except Exception as e:
                 self.logger.warning(f"update_item: problem setting output {item._ow_path['path']}: {e}")
 
@@ -379,3 +379,86 @@ class OwBase(object):
                 self.logger.warning(f"1-Wire: unknown sensor {addr} {typ}")
             return None, typ
         return None, typ
+
+
+class OwPool(object):
+    """
+    Small pool of connections to owserver
+
+    The shared connections are used by the sensor cycle, the discovery and for writing outputs.
+    Dedicated connections (e.g. for the iButton and I/O polling) are only used by their owner, so
+    a slow sensor read on the shared connections does not delay them.
+    """
+
+    def __init__(self, host='127.0.0.1', port=4304, size=2):
+        self.logger = logging.getLogger(__name__)
+        self.host = host
+        self.port = port
+        self.size = max(int(size), 1)
+        self._lock = threading.Condition()
+        self._idle = []
+        self._created = []
+        self._dedicated = {}
+        # the first connection is also used for requests outside the pool (alias list, web interface)
+        self.main = self._create()
+
+    def _create(self):
+        connection = OwBase(self.host, self.port)
+        self._created.append(connection)
+        self._idle.append(connection)
+        return connection
+
+    def acquire(self, timeout=None):
+        """
+        Returns an idle shared connection, a new one is opened as long as the pool is not exhausted
+        """
+        with self._lock:
+            if not self._idle and len(self._created) < self.size:
+                self._create()
+            if not self._lock.wait_for(lambda: self._idle, timeout):
+                raise owex("no owserver connection available")
+            return self._idle.pop()
+
+    def release(self, connection):
+        with self._lock:
+            self._idle.append(connection)
+            self._lock.notify()
+
+    def connection(self):
+        """
+        Context manager for a shared connection::
+
+            with pool.connection() as owb:
+                owb.read(path)
+        """
+        return _PooledConnection(self)
+
+    def dedicated(self, name):
+        """
+        Returns the dedicated connection for name, it is opened on first use
+        """
+        with self._lock:
+            if name not in self._dedicated:
+                self._dedicated[name] = OwBase(self.host, self.port)
+            return self._dedicated[name]
+
+    def close(self):
+        with self._lock:
+            for connection in self._created + list(self._dedicated.values()):
+                connection.close()
+
+
+class _PooledConnection(object):
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._connection = None
+
+    def __enter__(self):
+        self._connection = self._pool.acquire()
+        return self._connection
+
+    def __exit__(self, *exc):
+        self._pool.release(self._connection)
+        self._connection = None
+        return False
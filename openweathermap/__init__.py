@@ -26,6 +26,7 @@ import logging
 import requests
 import json
 import math
+import time
 import functools
 
 from datetime import datetime, timedelta, timezone
@@ -49,7 +50,7 @@ class OpenWeatherMapNoValueSoftException(Exception):
 
 
 class OpenWeatherMap(SmartPlugin):
-    PLUGIN_VERSION = "1.8.8"
+    PLUGIN_VERSION = "1.8.9"
 
     _base_url = 'https://api.openweathermap.org/'
     _base_img_url = 'https://tile.openweathermap.org/map/%s/%s/%s/%s.png?appid=%s'
@@ -164,6 +165,10 @@ class OpenWeatherMap(SmartPlugin):
         self._cycle = int(self.get_parameter_value('cycle'))
         self._items = {}
         self._raw_items = {}
+        self._compiled_matchstrings = {}
+        self._virtual_tokens = {}
+        self._virtual_pools = {}
+        self._update_statistics = {'duration': 0, 'updated': 0, 'skipped': 0}
 
         self._request_weather = False
         self._request_forecast = False
@@ -291,71 +296,68 @@ class OpenWeatherMap(SmartPlugin):
         self.__query_api_if(self._data_source_key_back4day,
                             only_if=self._request_back4day, delta_t=-4)
 
-    def get_value_with_meta(self, owm_matchstring, correlation_hint=""):
+    def __compile_matchstring(self, owm_matchstring, correlation_hint=""):
+        """
+        Translates a matchstring into its data source and the path within the downloaded json.
+        This is done only once per matchstring, later calls return the cached result.
+
+        :return: tuple (kind, data source key, wrk_typ, translated path, path tokens, was_ok)
+        """
+        compiled = self._compiled_matchstrings.get(owm_matchstring)
+        if compiled is not None:
+            return compiled
+
         s = owm_matchstring
-        wrk_typ = "WRONG"
-        ret_val = None
+        data_source_key = None
         was_ok = True
 
         if s.startswith('forecast/daily/'):
-            ret_val = self.get_daily_forecast(s)
-            wrk_typ = "forecast [calculation]"
-            return (ret_val, wrk_typ, s, True)
+            compiled = ('daily_forecast', self._data_source_key_forecast, "forecast [calculation]", s, None, True)
         elif s.startswith('virtual/'):
-            ret_val = self.__get_virtual_value(s[8:], correlation_hint)
-            wrk_typ = "virtual [calculation]"
-            return (ret_val, wrk_typ, s, True)
+            compiled = ('virtual', None, "virtual [calculation]", s, None, True)
+        if compiled is not None:
+            self._compiled_matchstrings[owm_matchstring] = compiled
+            return compiled
 
+        kind = 'path'
         if s.startswith('forecast/'):
-            wrk = self._data_sources[self._data_source_key_forecast]['data']
-            wrk_typ = self._data_source_key_forecast
+            data_source_key = self._data_source_key_forecast
             s = s.replace("forecast/", "list/")
         elif s.startswith('uvi_'):
-            wrk = self._data_sources[self._data_source_key_uvi]['data']
-            wrk_typ = self._data_source_key_uvi
+            data_source_key = self._data_source_key_uvi
             s = s.replace("uvi_", "")
         elif s.startswith('current/'):
-            wrk = self._data_sources[self._data_source_key_onecall]['data']
-            wrk_typ = self._data_source_key_onecall
+            data_source_key = self._data_source_key_onecall
         elif s.startswith('airpollution/forecast/'):
-            wrk = self._data_sources[self._data_source_key_airpollution_forecast]['data']
             prefix = f"airpollution/forecast/"
             s = s.replace(prefix, "list/")
-            wrk_typ = self._data_source_key_airpollution_forecast
+            data_source_key = self._data_source_key_airpollution_forecast
         elif s.startswith('airpollution/day/-'):
             minus_days = s[18]
-            wrk = self._data_sources[f"airpollution-{minus_days}"]['data']
             prefix = f"airpollution/day/-{minus_days}"
             s = s.replace(f"{prefix}/hour/", "list/")
-            wrk_typ = f"airpollution-{minus_days}"
+            data_source_key = f"airpollution-{minus_days}"
         elif s.startswith('airpollution/hour/'):
-            wrk = self._data_sources[self._data_source_key_airpollution_forecast]['data']
             prefix = f"airpollution/hour/"
             s = s.replace(prefix, "list/")
-            wrk_typ = self._data_source_key_airpollution_forecast
+            data_source_key = self._data_source_key_airpollution_forecast
         elif s.startswith('airpollution/'):
-            wrk = self._data_sources[self._data_source_key_airpollution_current]['data']
             s = s.replace("airpollution/", "list/0/")
-            wrk_typ = self._data_source_key_airpollution_current
+            data_source_key = self._data_source_key_airpollution_current
         elif s.startswith('alerts'):
-            wrk = self._data_sources[self._data_source_key_onecall]['data']
-            if "alerts" not in wrk:
-                wrk.update({'alerts': [self._placebo_alarm]})
-            wrk_typ = self._data_source_key_onecall
+            kind = 'alerts'
+            data_source_key = self._data_source_key_onecall
         elif s in self._origins_onecall:
-            wrk = self._data_sources[self._data_source_key_onecall]['data']
-            wrk_typ = self._data_source_key_onecall
+            data_source_key = self._data_source_key_onecall
         elif s.startswith('day/-'):
             minus_days = s[5]
-            wrk = self._data_sources[f"onecall-{minus_days}"]['data']
             prefix = f"day/-{minus_days}"
             s = s.replace(f"{prefix}/hour/", "hourly/")
             # wierd to have a "current" in historic data :-)
             if not s.endswith('/eto'):
                 s = s.replace(f"{prefix}/", "current/")
-            wrk_typ = f"onecall-{minus_days}"
+            data_source_key = f"onecall-{minus_days}"
         elif s.startswith('day/'):
-            wrk = self._data_sources[self._data_source_key_onecall]['data']
             try:
                 new_day = int(s[4])
                 s = s.replace(s[0:5], 'daily/' + str(new_day))
@@ -364,9 +366,8 @@ class OpenWeatherMap(SmartPlugin):
                 was_ok = False
                 self.logger.warning(
                     f"{correlation_hint}Missing integer after 'day/' assuming 'day/0/' in matchstring {owm_matchstring}")
-            wrk_typ = self._data_source_key_onecall
+            data_source_key = self._data_source_key_onecall
         elif s.startswith('hour/'):
-            wrk = self._data_sources[self._data_source_key_onecall]['data']
             try:
                 new_day = int(s[5])
                 s = s.replace(s[0:6], 'hourly/' + str(new_day))
@@ -375,49 +376,68 @@ class OpenWeatherMap(SmartPlugin):
                 was_ok = False
                 self.logger.warning(
                     f"{correlation_hint}Missing integer after 'hour/' assuming 'hour/0/' in matchstring {owm_matchstring}")
-            wrk_typ = self._data_source_key_onecall
+            data_source_key = self._data_source_key_onecall
         else:
-            wrk_typ = self._data_source_key_weather
-            wrk = self._data_sources[self._data_source_key_weather]['data']
+            data_source_key = self._data_source_key_weather
+        wrk_typ = data_source_key
+
+        tokens = tuple(s.split('/'))
+        if (s.startswith("current/") or s.startswith("daily/") or s.startswith("day/")) and s.endswith('/eto'):
+            kind = 'eto'
+            s = s.replace("current/", "day/0/")
+            s = s.replace("daily/", "day/")
+            wrk_typ = "onecall [eto-calculation]"
+        elif (s.startswith("current/") or s.startswith("daily/") or s.startswith("day/") or s.startswith("hour/")) and \
+                (s.endswith('/wind_speed/beaufort') or s.endswith('/wind_speed/description') or
+                 s.endswith('/wind_gust/beaufort') or s.endswith('/wind_gust/description')):
+            kind = 'beaufort' if s.endswith('/beaufort') else 'beaufort_description'
+            wrk_typ = "onecall [bft-calculation]"
+            # the wind speed is read from the path without the suffix, the path itself is kept for messages
+            tokens = tuple(s.replace('/beaufort', '').replace('/description', '').split('/'))
+
+        compiled = (kind, data_source_key, wrk_typ, s, tokens, was_ok)
+        self._compiled_matchstrings[owm_matchstring] = compiled
+        return compiled
+
+    def __get_dependencies(self, owm_matchstring):
+        """
+        Returns the data source keys a matchstring is calculated from
+        """
+        kind, data_source_key, _, s, _, _ = self.__compile_matchstring(owm_matchstring)
+        if kind == 'virtual':
+            if s.startswith('virtual/past'):
+                return {key for key in self._data_sources if key.startswith('onecall-')}
+            return {self._data_source_key_onecall}
+        return {data_source_key}
+
+    def get_value_with_meta(self, owm_matchstring, correlation_hint=""):
+        kind, data_source_key, wrk_typ, s, tokens, was_ok = self.__compile_matchstring(owm_matchstring, correlation_hint)
+        ret_val = None
+
+        if kind == 'daily_forecast':
+            ret_val = self.get_daily_forecast(s)
+            return (ret_val, wrk_typ, s, True)
+        elif kind == 'virtual':
+            ret_val = self.__get_virtual_value(s[8:], correlation_hint)
+            return (ret_val, wrk_typ, s, True)
+
+        wrk = self._data_sources[data_source_key]['data']
+        if kind == 'alerts' and "alerts" not in wrk:
+            wrk.update({'alerts': [self._placebo_alarm]})
 
         try:
-            if (s.startswith("current/") or s.startswith("daily/") or s.startswith("day/")) and s.endswith('/eto'):
-                s = s.replace("current/", "day/0/")
-                s = s.replace("daily/", "day/")
+            if kind == 'eto':
                 ret_val = self.__calculate_eto(s, correlation_hint)
-                wrk_typ = "onecall [eto-calculation]"
-            elif (s.startswith("current/") or s.startswith("daily/") or s.startswith("day/") or s.startswith("hour/")) and (s.endswith('/wind_speed/beaufort') or s.endswith('/wind_speed/description')):
-                wrk_typ = "onecall [bft-calculation]"
-                mps_string = s.replace('/wind_speed/beaufort', '/wind_speed')
-                mps_string = mps_string.replace(
-                    '/wind_speed/description', '/wind_speed')
-                wind_mps, updated_s = self.__get_val_from_dict(
-                    mps_string, wrk, correlation_hint, owm_matchstring)
+            elif kind in ('beaufort', 'beaufort_description'):
+                wind_mps, s = self.__get_val_from_dict(
+                    s, wrk, correlation_hint, owm_matchstring, tokens)
                 bft_val = self.get_beaufort_number(wind_mps)
-                if s.endswith('/beaufort'):
+                if kind == 'beaufort':
                     ret_val = bft_val
-                elif s.endswith('/description'):
-                    ret_val = self.get_beaufort_description(bft_val)
                 else:
-                    raise Exception(f"Cannot make sense of {s}")
-                s = updated_s
-            elif (s.startswith("current/") or s.startswith("daily/") or s.startswith("day/") or s.startswith("hour/")) and (s.endswith('/wind_gust/beaufort') or s.endswith('/wind_gust/description')):
-                wrk_typ = "onecall [bft-calculation]"
-                mps_string = s.replace('/wind_gust/beaufort', '/wind_gust')
-                mps_string = mps_string.replace(
-                    '/wind_gust/description', '/wind_gust')
-                wind_mps, updated_s = self.__get_val_from_dict(
-                    mps_string, wrk, correlation_hint, owm_matchstring)
-                bft_val = self.get_beaufort_number(wind_mps)
-                if s.endswith('/beaufort'):
-                    ret_val = bft_val
-                elif s.endswith('/description'):
                     ret_val = self.get_beaufort_description(bft_val)
-                else:
-                    raise Exception(f"Cannot make sense of {s}")
-                s = updated_s
             else:
-                ret_val, s = self.__get_val_from_dict(s, wrk, correlation_hint, owm_matchstring)
+                ret_val, s = self.__get_val_from_dict(s, wrk, correlation_hint, owm_matchstring, tokens)
         except Exception as e:
             was_ok = False
             ret_val = e
@@ -441,15 +461,30 @@ class OpenWeatherMap(SmartPlugin):
         Updates information on diverse items
         """
         self._download_data()
+        start = time.perf_counter()
+
+        changed = set()
+        for data_source_key, data_source in self._data_sources.items():
+            if data_source.get('changed'):
+                data_source['changed'] = False
+                changed.add(data_source_key)
+        if changed:
+            self._virtual_pools = {}
 
         for item_path, owm_item_data in self._raw_items.items():
             data_source_key, item = owm_item_data
+            if data_source_key not in changed:
+                continue
             raw = json.dumps(self._data_sources[data_source_key]['data'], indent=4)
             item(raw, self.get_shortname(), f"raw // {data_source_key}")
-            pass
 
+        updated = skipped = 0
         for item_path, owm_item_data in self._items.items():
             owm_matchstring, item = owm_item_data
+            if owm_matchstring not in self._origins_layer and changed.isdisjoint(self.__get_dependencies(owm_matchstring)):
+                skipped += 1
+                continue
+            updated += 1
             if owm_matchstring in self._origins_layer:
                 ret_val = self.__build_url('owm_layer', item)
                 wrk_typ = 'owm_layer'
@@ -484,6 +519,8 @@ class OpenWeatherMap(SmartPlugin):
                 except Exception as e:
                     self.logger.error("%s FATAL: owm-string: %s, Error: %s" % (item, owm_matchstring, e))
 
+        self._update_statistics = {'duration': round((time.perf_counter() - start) * 1000, 1), 'updated': updated, 'skipped': skipped}
+        self.logger.debug(f"Updated {updated} items in {self._update_statistics['duration']} ms, skipped {skipped} items with unchanged data sources")
         return
 
     def __calculate_eto(self, s, correlation_hint):
@@ -546,6 +583,8 @@ class OpenWeatherMap(SmartPlugin):
         return eTo
 
     def __tokenize_matchstring(self, virtual_ms):
+        if virtual_ms in self._virtual_tokens:
+            return self._virtual_tokens[virtual_ms]
         tokens = virtual_ms.split('/')
         if tokens[0].startswith("next"):
             mode = 'next'
@@ -559,13 +598,39 @@ class OpenWeatherMap(SmartPlugin):
         self.logger.debug(
             f"transformed {virtual_ms} into: M:{mode}, n:{numbers}, u:{unit}, O:{operation}, DF: {data_field}")
 
-        return (mode, int(numbers), unit, operation, data_field)
+        self._virtual_tokens[virtual_ms] = (mode, int(numbers), unit, operation, data_field)
+        return self._virtual_tokens[virtual_ms]
 
     def __get_virtual_value(self, virtual_ms, correlation_hint):
-        pool = []
         mode, number, unit, operation, data_field = self.__tokenize_matchstring(
             virtual_ms)
 
+        # all operations (min, max, avg, ...) over the same values share one pool per download
+        pool_key = (mode, number, unit, data_field)
+        pool = self._virtual_pools.get(pool_key)
+        if pool is None:
+            pool = self.__get_virtual_pool(virtual_ms, mode, number, unit, data_field, correlation_hint)
+            self._virtual_pools[pool_key] = pool
+
+        if operation == "max":
+            return max(pool)
+        elif operation == "min":
+            return min(pool)
+        elif operation == "avg":
+            if len(pool) == 0:
+                return 0
+            return round(functools.reduce(lambda x, y: x + y, pool) / len(pool), 2)
+        elif operation == "sum":
+            if len(pool) == 0:
+                return 0
+            return round(functools.reduce(lambda x, y: x + y, pool), 2)
+        elif operation == "all":
+            return list(pool)
+        else:
+            return f"Unknown operation '{operation}' in match_string '{virtual_ms}'"
+
+    def __get_virtual_pool(self, virtual_ms, mode, number, unit, data_field, correlation_hint):
+        pool = []
         if mode == 'next':
             if unit == 'h':
                 if number > 48:
@@ -599,25 +664,10 @@ class OpenWeatherMap(SmartPlugin):
                         pass
             pool = pool[-hours:]
 
-        self.logger.debug(
-            f"{correlation_hint} {virtual_ms}  Pool: {pformat(pool, width=4000)}")
-
-        if operation == "max":
-            return max(pool)
-        elif operation == "min":
-            return min(pool)
-        elif operation == "avg":
-            if len(pool) == 0:
-                return 0
-            return round(functools.reduce(lambda x, y: x + y, pool) / len(pool), 2)
-        elif operation == "sum":
-            if len(pool) == 0:
-                return 0
-            return round(functools.reduce(lambda x, y: x + y, pool), 2)
-        elif operation == "all":
-            return pool
-        else:
-            return f"Unknown operation '{operation}' in match_string '{virtual_ms}'"
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                f"{correlation_hint} {virtual_ms}  Pool: {pformat(pool, width=4000)}")
+        return pool
 
     def __handle_fail(self, last_popped, current_leaf, successful_path, original_match_string, correlation_hint):
         missing_child_path = last_popped if len(current_leaf) == 0 else f"{last_popped}/{'/'.join(current_leaf)}"
@@ -651,9 +701,10 @@ class OpenWeatherMap(SmartPlugin):
         raise OpenWeatherMapNoValueHardException(
             f"Missing child '{last_popped}' after '{'/'.join(successful_path)}' (complete path missing: {missing_child_path})")
 
-    def __get_val_from_dict(self, s, wrk, correlation_hint, original_match_string):
+    def __get_val_from_dict(self, s, wrk, correlation_hint, original_match_string, tokens=None):
         """
         Uses string s as a path to navigate to the requested value in dict wrk.
+        If given, the already splitted path tokens are used instead of splitting s again.
         """
 
         # Check if dictionary data in variable wrk are invalid. This occurs, if download fails.
@@ -663,7 +714,7 @@ class OpenWeatherMap(SmartPlugin):
 
         successful_path = []
         last_popped = None
-        sp = s.split('/')
+        sp = list(tokens) if tokens is not None else s.split('/')
         while True:
             if (len(sp) == 0) or (wrk is None):
                 if wrk is None:
@@ -801,11 +852,18 @@ class OpenWeatherMap(SmartPlugin):
                     f"Response for {data_source_key} from {url} was too short to be meaningful ({num_bytes} bytes): '{response.content}'")
                 return False
             try:
+                content_hash = hash(response.content)
+                if content_hash == self._data_sources[data_source_key].get('hash'):
+                    self._data_sources[data_source_key]['fetched'] = datetime.now()
+                    self.logger.debug(f"Data for {data_source_key} unchanged since last download")
+                    return True
                 json_obj = response.json()
 
                 self._data_sources[data_source_key]['url'] = url
                 self._data_sources[data_source_key]['fetched'] = datetime.now()
                 self._data_sources[data_source_key]['data'] = json_obj
+                self._data_sources[data_source_key]['hash'] = content_hash
+                self._data_sources[data_source_key]['changed'] = True
                 return True
             except json.JSONDecodeError as decode_error:
                 self.logger.error(
@@ -845,6 +903,10 @@ class OpenWeatherMap(SmartPlugin):
 
             self._items[item.property.path] = (owm_ms, item)
 
+            # translate the matchstring now, so invalid matchstrings are reported at startup
+            if owm_ms not in self._origins_layer:
+                self.__compile_matchstring(owm_ms, f"{item.property.path} ")
+
             if owm_ms in self._origins_weather:
                 self._request_weather = True
             elif owm_ms.startswith('uvi_'):
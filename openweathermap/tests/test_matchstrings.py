@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+#
+#########################################################################
+#  Copyright 2018 René Frieß                      rene.friess(a)gmail.com
+#  Updated in 2021 by Jens Höppner to make use of one-call API
+#########################################################################
+#
+#  This file is part of SmartHomeNG.
+#
+#  Tests of the compiled matchstrings of the openweathermap plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import copy
+import functools
+import logging
+import time
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from plugins.openweathermap import OpenWeatherMap
+
+PARAMETERS = {'key': 'test', 'latitude': '52.52', 'longitude': '13.40', 'altitude': '34', 'lang': 'de',
+              'units': 'metric', 'api_version': 2.5, 'softfail_precipitation': 'number=0',
+              'softfail_wind_gust': 'relative=../wind_speed', 'cycle': 900}
+
+HOUR = 3600
+
+
+def weather(number):
+    return [{'id': 800 + number % 4, 'main': 'Clouds', 'description': f'Wolken {number % 4}', 'icon': '04d'}]
+
+
+def hourly(dt, number):
+    hour = {'dt': dt, 'temp': round(8 + 6 * ((number * 7) % 11) / 10, 2), 'feels_like': 6.1, 'pressure': 1000 + number % 30,
+            'humidity': 40 + number % 50, 'dew_point': 2.3, 'uvi': round((number % 12) / 3, 2), 'clouds': number % 100,
+            'visibility': 10000, 'wind_speed': round(((number * 13) % 170) / 10, 2), 'wind_deg': (number * 37) % 360,
+            'weather': weather(number), 'pop': round((number % 10) / 10, 1)}
+    if number % 3:
+        hour['wind_gust'] = round(hour['wind_speed'] * 1.6, 2)
+    if number % 4 == 1:
+        hour['rain'] = {'1h': round((number % 7) / 5, 2)}
+    return hour
+
+
+def responses(now):
+    """
+    responses of the api (one call api 2.5 and free api) as they are saved to the raw data files
+    """
+    start = int(now.timestamp()) // HOUR * HOUR
+    onecall = {'lat': 52.52, 'lon': 13.4, 'timezone': 'Europe/Berlin', 'timezone_offset': 7200,
+               'current': dict(hourly(start, 5), sunrise=start - 5 * HOUR, sunset=start + 7 * HOUR),
+               'hourly': [hourly(start + number * HOUR, number) for number in range(48)],
+               'daily': []}
+    del onecall['current']['wind_gust']
+    for day in range(8):
+        dt = start + day * 24 * HOUR
+        entry = {'dt': dt, 'sunrise': dt - 5 * HOUR, 'sunset': dt + 7 * HOUR, 'moon_phase': day / 8,
+                 'temp': {'day': 14.0 + day, 'min': 5.5 + day / 2, 'max': 17.25 + day, 'night': 7.0, 'eve': 12.5, 'morn': 6.0},
+                 'feels_like': {'day': 13.0, 'night': 6.0, 'eve': 11.5, 'morn': 5.0},
+                 'pressure': 1012 + day, 'humidity': 55 + day * 3, 'dew_point': 4.5, 'wind_speed': 2.5 + day * 1.75,
+                 'wind_deg': 200 + day, 'weather': weather(day), 'clouds': 20 * day % 100, 'pop': day / 10, 'uvi': 1.5 + day / 4}
+        if day % 2:
+            entry['rain'] = 0.4 * day
+        if day != 4:
+            entry['wind_gust'] = 4.5 + day * 2
+        onecall['daily'].append(entry)
+
+    data = {'onecall': onecall}
+    for days_back in range(5):
+        day = start - days_back * 24 * HOUR
+        first = day - day % (24 * HOUR)
+        current = dict(hourly(day, 20 + days_back), sunrise=first + 4 * HOUR, sunset=first + 18 * HOUR)
+        data[f'onecall-{days_back}'] = {'lat': 52.52, 'lon': 13.4, 'timezone': 'Europe/Berlin', 'timezone_offset': 7200,
+                                        'current': current,
+                                        'hourly': [hourly(first + number * HOUR, number + days_back * 24) for number in range(24)]}
+
+    data['weather'] = {'coord': {'lon': 13.4, 'lat': 52.52}, 'weather': weather(2), 'base': 'stations',
+                       'main': {'temp': 12.3, 'feels_like': 11.1, 'temp_min': 10.5, 'temp_max': 14.0, 'pressure': 1018, 'humidity': 71},
+                       'visibility': 10000, 'wind': {'speed': 4.1, 'deg': 250}, 'clouds': {'all': 75}, 'dt': start,
+                       'sys': {'type': 2, 'id': 2011538, 'country': 'DE', 'sunrise': start - 5 * HOUR, 'sunset': start + 7 * HOUR},
+                       'timezone': 7200, 'id': 2950159, 'name': 'Berlin', 'cod': 200}
+    data['forecast'] = {'cod': '200', 'cnt': 40, 'city': {'id': 2950159, 'name': 'Berlin'},
+                        'list': [{'dt': start + number * 3 * HOUR,
+                                  'main': {'temp': 9.0 + number % 9, 'temp_min': 8.0 + number % 5, 'temp_max': 11.0 + number % 7,
+                                           'pressure': 1010 + number % 6, 'humidity': 60 + number % 20},
+                                  'weather': weather(number), 'wind': {'speed': 2.0 + number % 4, 'deg': 180}, 'pop': 0}
+                                 for number in range(40)]}
+    data['uvi'] = {'lat': 52.52, 'lon': 13.4, 'date_iso': now.isoformat(), 'date': start, 'value': 3.77}
+
+    def pollution(dt, number):
+        return {'dt': dt, 'main': {'aqi': 1 + number % 5},
+                'components': {'co': 200.27 + number, 'no': 0.1, 'no2': 12.5 + number % 9, 'o3': 60.8, 'so2': 1.1,
+                               'pm2_5': 4.5 + number % 3, 'pm10': 6.7, 'nh3': 0.8}}
+
+    data['airpollution_current'] = {'coord': {'lon': 13.4, 'lat': 52.52}, 'list': [pollution(start, 0)]}
+    data['airpollution_forecast'] = {'coord': {'lon': 13.4, 'lat': 52.52},
+                                     'list': [pollution(start + number * HOUR, number) for number in range(96)]}
+    for days_back in range(1, 5):
+        data[f'airpollution-{days_back}'] = {'coord': {'lon': 13.4, 'lat': 52.52},
+                                             'list': [pollution(start - (days_back * 24 - number) * HOUR, number) for number in range(24)]}
+    return data
+
+
+MATCHSTRINGS = [
+    # weather
+    'main/temp', 'main/humidity', 'wind/speed', 'sys/sunrise', 'name', 'clouds/all', 'coord/lat',
+    'weather/0/description', 'weather/description', 'rain/1h', 'snow/3h', 'wind/gust', 'missing/child',
+    # one call
+    'lat', 'timezone', 'timezone_offset', 'current/temp', 'current/weather/0/main', 'current/uvi', 'current/rain/1h',
+    'current/wind_speed/beaufort', 'current/wind_speed/description', 'current/wind_gust/beaufort', 'current/eto',
+    'hour/0/temp', 'hour/47/pop', 'hour/48/temp', 'hour/x/temp', 'hour/3/wind_gust', 'hour/4/wind_gust',
+    'hour/12/wind_gust/description', 'hour/7/wind_speed/beaufort', 'hour/5/rain/1h', 'hour/6/rain/1h',
+    'day/0/temp/max', 'day/7/temp/min', 'day/8/temp/min', 'day/x/temp/day', 'day/2/weather/0/icon', 'day/1/rain',
+    'day/2/rain', 'day/4/wind_gust', 'day/3/wind_speed/beaufort', 'day/5/wind_gust/description', 'day/0/eto', 'day/1/eto',
+    'alerts/@count', 'alerts/0/event', 'alerts/0/description',
+    # one call timemachine
+    'day/-0/temp', 'day/-1/temp', 'day/-1/hour/5/temp', 'day/-3/hour/23/wind_speed', 'day/-4/humidity', 'day/-2/eto',
+    'day/-1/hour/24/temp',
+    # free forecast
+    'forecast/0/main/temp', 'forecast/39/dt', 'forecast/40/dt', 'forecast/daily/0/main/temp_max',
+    'forecast/daily/1/main/temp_min', 'forecast/daily/2/main/temp', 'forecast/daily/x/main/temp',
+    # uvi and air pollution
+    'uvi_value', 'uvi_date', 'airpollution/main/aqi', 'airpollution/components/pm2_5',
+    'airpollution/forecast/5/components/no2', 'airpollution/hour/3/main/aqi', 'airpollution/day/-2/hour/4/components/co',
+    'airpollution/day/-4/hour/23/main/aqi',
+    # virtual
+    'virtual/next12h/max/temp', 'virtual/next12h/min/temp', 'virtual/next12h/avg/temp', 'virtual/next24h/sum/rain/1h',
+    'virtual/next48h/all/pop', 'virtual/next3d/sum/rain', 'virtual/next6d/avg/temp/max', 'virtual/next4d/all/wind_gust',
+    'virtual/past12h/avg/temp', 'virtual/past12h/max/temp', 'virtual/past2d/min/temp', 'virtual/past24h/sum/rain/1h',
+    'virtual/past3d/all/humidity', 'virtual/next2h/median/temp', 'virtual/next49h/max/temp', 'virtual/next7d/max/uvi',
+]
+
+
+class ReferenceOpenWeatherMap(OpenWeatherMap):
+    """
+    translates the matchstrings on every call and computes the pool of each virtual value
+    on its own, as the plugin did before the matchstrings were compiled
+    """
+
+    def get_value_with_meta(self, owm_matchstring, correlation_hint=""):
+        get_val_from_dict = self._OpenWeatherMap__get_val_from_dict
+        s = owm_matchstring
+        wrk_typ = "WRONG"
+        ret_val = None
+        was_ok = True
+
+        if s.startswith('forecast/daily/'):
+            ret_val = self.get_daily_forecast(s)
+            wrk_typ = "forecast [calculation]"
+            return (ret_val, wrk_typ, s, True)
+        elif s.startswith('virtual/'):
+            ret_val = self.get_virtual_value(s[8:], correlation_hint)
+            wrk_typ = "virtual [calculation]"
+            return (ret_val, wrk_typ, s, True)
+
+        if s.startswith('forecast/'):
+            wrk = self._data_sources[self._data_source_key_forecast]['data']
+            wrk_typ = self._data_source_key_forecast
+            s = s.replace("forecast/", "list/")
+        elif s.startswith('uvi_'):
+            wrk = self._data_sources[self._data_source_key_uvi]['data']
+            wrk_typ = self._data_source_key_uvi
+            s = s.replace("uvi_", "")
+        elif s.startswith('current/'):
+            wrk = self._data_sources[self._data_source_key_onecall]['data']
+            wrk_typ = self._data_source_key_onecall
+        elif s.startswith('airpollution/forecast/'):
+            wrk = self._data_sources[self._data_source_key_airpollution_forecast]['data']
+            s = s.replace("airpollution/forecast/", "list/")
+            wrk_typ = self._data_source_key_airpollution_forecast
+        elif s.startswith('airpollution/day/-'):
+            minus_days = s[18]
+            wrk = self._data_sources[f"airpollution-{minus_days}"]['data']
+            s = s.replace(f"airpollution/day/-{minus_days}/hour/", "list/")
+            wrk_typ = f"airpollution-{minus_days}"
+        elif s.startswith('airpollution/hour/'):
+            wrk = self._data_sources[self._data_source_key_airpollution_forecast]['data']
+            s = s.replace("airpollution/hour/", "list/")
+            wrk_typ = self._data_source_key_airpollution_forecast
+        elif s.startswith('airpollution/'):
+            wrk = self._data_sources[self._data_source_key_airpollution_current]['data']
+            s = s.replace("airpollution/", "list/0/")
+            wrk_typ = self._data_source_key_airpollution_current
+        elif s.startswith('alerts'):
+            wrk = self._data_sources[self._data_source_key_onecall]['data']
+            if "alerts" not in wrk:
+                wrk.update({'alerts': [self._placebo_alarm]})
+            wrk_typ = self._data_source_key_onecall
+        elif s in self._origins_onecall:
+            wrk = self._data_sources[self._data_source_key_onecall]['data']
+            wrk_typ = self._data_source_key_onecall
+        elif s.startswith('day/-'):
+            minus_days = s[5]
+            wrk = self._data_sources[f"onecall-{minus_days}"]['data']
+            prefix = f"day/-{minus_days}"
+            s = s.replace(f"{prefix}/hour/", "hourly/")
+            if not s.endswith('/eto'):
+                s = s.replace(f"{prefix}/", "current/")
+            wrk_typ = f"onecall-{minus_days}"
+        elif s.startswith('day/'):
+            wrk = self._data_sources[self._data_source_key_onecall]['data']
+            try:
+                new_day = int(s[4])
+                s = s.replace(s[0:5], 'daily/' + str(new_day))
+            except:
+                s = s.replace('day/', 'daily/0/')
+                was_ok = False
+            wrk_typ = self._data_source_key_onecall
+        elif s.startswith('hour/'):
+            wrk = self._data_sources[self._data_source_key_onecall]['data']
+            try:
+                new_day = int(s[5])
+                s = s.replace(s[0:6], 'hourly/' + str(new_day))
+            except:
+                s = s.replace('hour/', 'hourly/0/')
+                was_ok = False
+            wrk_typ = self._data_source_key_onecall
+        else:
+            wrk_typ = self._data_source_key_weather
+            wrk = self._data_sources[self._data_source_key_weather]['data']
+
+        try:
+            if (s.startswith("current/") or s.startswith("daily/") or s.startswith("day/")) and s.endswith('/eto'):
+                s = s.replace("current/", "day/0/")
+                s = s.replace("daily/", "day/")
+                ret_val = self._OpenWeatherMap__calculate_eto(s, correlation_hint)
+                wrk_typ = "onecall [eto-calculation]"
+            elif (s.startswith("current/") or s.startswith("daily/") or s.startswith("day/") or s.startswith("hour/")) and \
+                    (s.endswith('/wind_speed/beaufort') or s.endswith('/wind_speed/description')):
+                wrk_typ = "onecall [bft-calculation]"
+                mps_string = s.replace('/wind_speed/beaufort', '/wind_speed')
+                mps_string = mps_string.replace('/wind_speed/description', '/wind_speed')
+                wind_mps, updated_s = get_val_from_dict(mps_string, wrk, correlation_hint, owm_matchstring)
+                bft_val = self.get_beaufort_number(wind_mps)
+                if s.endswith('/beaufort'):
+                    ret_val = bft_val
+                elif s.endswith('/description'):
+                    ret_val = self.get_beaufort_description(bft_val)
+                else:
+                    raise Exception(f"Cannot make sense of {s}")
+                s = updated_s
+            elif (s.startswith("current/") or s.startswith("daily/") or s.startswith("day/") or s.startswith("hour/")) and \
+                    (s.endswith('/wind_gust/beaufort') or s.endswith('/wind_gust/description')):
+                wrk_typ = "onecall [bft-calculation]"
+                mps_string = s.replace('/wind_gust/beaufort', '/wind_gust')
+                mps_string = mps_string.replace('/wind_gust/description', '/wind_gust')
+                wind_mps, updated_s = get_val_from_dict(mps_string, wrk, correlation_hint, owm_matchstring)
+                bft_val = self.get_beaufort_number(wind_mps)
+                if s.endswith('/beaufort'):
+                    ret_val = bft_val
+                elif s.endswith('/description'):
+                    ret_val = self.get_beaufort_description(bft_val)
+                else:
+                    raise Exception(f"Cannot make sense of {s}")
+                s = updated_s
+            else:
+                ret_val, s = get_val_from_dict(s, wrk, correlation_hint, owm_matchstring)
+        except Exception as e:
+            was_ok = False
+            ret_val = e
+
+        return (ret_val, wrk_typ, s, was_ok)
+
+    def get_virtual_value(self, virtual_ms, correlation_hint):
+        pool = []
+        mode, number, unit, operation, data_field = self._OpenWeatherMap__tokenize_matchstring(virtual_ms)
+
+        if mode == 'next':
+            if unit == 'h':
+                if number > 48:
+                    raise Exception("Cannot get value further than 48h in future, switch unit to 'd' to see further into the future")
+                for hr in range(0, number):
+                    val = self.get_value(f'hour/{hr}/{data_field}', correlation_hint)
+                    if not isinstance(val, Exception):
+                        pool.append(val)
+            elif unit == 'd':
+                if number > 6:
+                    raise Exception("Cannot get value further than 6d in future")
+                for day in range(0, number):
+                    val = self.get_value(f'day/{day}/{data_field}', correlation_hint)
+                    if not isinstance(val, Exception):
+                        pool.append(val)
+        elif mode == 'past':
+            hours = number * 24 if unit == 'd' else number
+            days_back = int(hours / 24) + 1
+            for day_back in range(days_back, -1, -1):
+                for hr in range(0, 24):
+                    try:
+                        val = self.get_value(f'day/-{day_back}/hour/{hr}/{data_field}', correlation_hint)
+                        if not isinstance(val, Exception):
+                            pool.append(val)
+                    except:
+                        pass
+            pool = pool[-hours:]
+
+        if operation == "max":
+            return max(pool)
+        elif operation == "min":
+            return min(pool)
+        elif operation == "avg":
+            if len(pool) == 0:
+                return 0
+            return round(functools.reduce(lambda x, y: x + y, pool) / len(pool), 2)
+        elif operation == "sum":
+            if len(pool) == 0:
+                return 0
+            return round(functools.reduce(lambda x, y: x + y, pool), 2)
+        elif operation == "all":
+            return pool
+        else:
+            return f"Unknown operation '{operation}' in match_string '{virtual_ms}'"
+
+
+def create_plugin(cls, data):
+    with mock.patch('plugins.openweathermap.Shtime') as shtime, \
+            mock.patch.object(cls, 'get_parameter_value', side_effect=PARAMETERS.get, create=True), \
+            mock.patch.object(cls, 'init_webinterface', create=True):
+        shtime.get_instance.return_value.utcfromtimestamp.side_effect = lambda ts: datetime.fromtimestamp(ts, timezone.utc)
+        plugin = cls(mock.Mock())
+    plugin.logger = logging.getLogger(__name__)
+    plugin.get_shortname = mock.Mock(return_value='owm')
+    plugin.get_iattr_value = lambda conf, attr: conf.get(attr)
+    plugin._download_data = mock.Mock()
+    for data_source_key, response in data.items():
+        plugin._data_sources[data_source_key].update(data=copy.deepcopy(response), changed=True)
+    return plugin
+
+
+def result(plugin, owm_matchstring):
+    """ get_value_with_meta() with exceptions made comparable """
+    try:
+        ret_val, wrk_typ, s, was_ok = plugin.get_value_with_meta(owm_matchstring, 'test ')
+    except Exception as e:
+        return ('raised', type(e), str(e))
+    if isinstance(ret_val, Exception):
+        ret_val = (type(ret_val), str(ret_val))
+    return (ret_val, wrk_typ, s, was_ok)
+
+
+def create_item(path, owm_matchstring):
+    item = mock.Mock()
+    item.conf = {'owm_matchstring': owm_matchstring}
+    item.property.path = path
+    return item
+
+
+class TestMatchstrings(unittest.TestCase):
+
+    def setUp(self):
+        logging.getLogger(__name__).setLevel(logging.CRITICAL)
+        self.data = responses(datetime.now())
+        self.plugin = create_plugin(OpenWeatherMap, self.data)
+        self.reference = create_plugin(ReferenceOpenWeatherMap, self.data)
+
+    def test_value_with_meta(self):
+        for owm_matchstring in MATCHSTRINGS:
+            with self.subTest(owm_matchstring=owm_matchstring):
+                expected = result(self.reference, owm_matchstring)
+                self.assertEqual(result(self.plugin, owm_matchstring), expected)
+                # again from the compiled matchstring and the shared virtual pools
+                self.assertEqual(result(self.plugin, owm_matchstring), expected)
+
+    def test_reference_values(self):
+        # the fixtures reach the interesting branches of the reference
+        self.assertEqual(result(self.reference, 'main/temp'), (12.3, 'weather', 'main/temp', True))
+        self.assertEqual(result(self.reference, 'rain/1h')[0], 0)
+        self.assertEqual(result(self.reference, 'hour/x/temp')[3], False)
+        self.assertEqual(result(self.reference, 'hour/3/wind_gust')[0], self.data['onecall']['hourly'][3]['wind_speed'])
+        self.assertEqual(result(self.reference, 'alerts/@count')[0], 0)
+        self.assertEqual(len(result(self.reference, 'virtual/past3d/all/humidity')[0]), 72)
+        self.assertIsInstance(result(self.reference, 'day/-2/eto')[0], float)
+        self.assertIsInstance(result(self.reference, 'forecast/daily/0/main/temp_max')[0], float)
+        self.assertEqual(result(self.reference, 'virtual/next49h/max/temp')[0], 'raised')
+
+    def test_compiled_once(self):
+        self.plugin.get_value_with_meta('day/2/temp/max')
+        self.plugin.get_value_with_meta('day/1/temp/max')
+        # later calls use the compiled matchstring
+        self.plugin._compiled_matchstrings['day/1/temp/max'] = self.plugin._compiled_matchstrings['day/2/temp/max']
+        self.assertEqual(self.plugin.get_value('day/1/temp/max'), self.data['onecall']['daily'][2]['temp']['max'])
+
+    def test_parse_item(self):
+        self.plugin.parse_item(create_item('wetter.morgen', 'temp/max'))
+        self.plugin.parse_item(create_item('wetter.morgen.max', 'day/1/temp/max'))
+        self.assertIn('day/1/temp/max', self.plugin._compiled_matchstrings)
+        self.assertTrue(self.plugin._request_daily)
+
+    def test_update(self):
+        items = {}
+        for number, owm_matchstring in enumerate(MATCHSTRINGS):
+            # a missing value stops _update
+            if owm_matchstring == 'forecast/daily/x/main/temp':
+                continue
+            item = create_item(f'wetter.item{number}', owm_matchstring)
+            self.plugin.parse_item(item)
+            items[owm_matchstring] = item
+        self.plugin._update()
+        self.assertEqual(self.plugin._update_statistics['updated'], len(items))
+        for owm_matchstring, item in items.items():
+            expected = result(self.reference, owm_matchstring)
+            with self.subTest(owm_matchstring=owm_matchstring):
+                if expected[0] == 'raised' or isinstance(expected[0], tuple):
+                    item.assert_not_called()
+                else:
+                    item.assert_called_once_with(expected[0], 'owm', f"{expected[1]} // {expected[2]}")
+
+        # without new data all items are skipped
+        for item in items.values():
+            item.reset_mock()
+        self.plugin._update()
+        self.assertEqual(self.plugin._update_statistics, dict(self.plugin._update_statistics, updated=0, skipped=len(items)))
+        self.assertFalse(any(item.called for item in items.values()))
+
+        # only the items depending on a changed data source are updated
+        self.plugin._data_sources['uvi']['changed'] = True
+        self.plugin._update()
+        self.assertEqual(self.plugin._update_statistics['updated'], 2)
+        self.assertEqual([owm_matchstring for owm_matchstring, item in items.items() if item.called], ['uvi_value', 'uvi_date'])
+
+    def test_benchmark(self):
+        # many items with the same matchstrings, as several visu pages using the same values
+        owm_matchstrings = [owm_matchstring for owm_matchstring in MATCHSTRINGS if result(self.reference, owm_matchstring)[0] != 'raised'] * 5
+
+        def run(plugin):
+            start = time.perf_counter()
+            values = [plugin.get_value(owm_matchstring) for owm_matchstring in owm_matchstrings]
+            return time.perf_counter() - start, values
+
+        reference_duration, expected = run(self.reference)
+        duration, values = run(self.plugin)
+        self.assertEqual([repr(value) for value in values], [repr(value) for value in expected])
+        logging.getLogger(__name__).info(f"{len(owm_matchstrings)} matchstrings: {duration * 1000:.1f} ms, "
+                                         f"before {reference_duration * 1000:.1f} ms")
+        self.assertLess(duration, reference_duration)
+
+
+if __name__ == '__main__':
+    unittest.main()
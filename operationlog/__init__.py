@@ -27,10 +27,10 @@
 
 import logging
 import threading
+import time
 import datetime
 import lib.log
 import os
-import pickle
 import ast
 
 from lib.module import Modules
@@ -39,12 +39,13 @@ from lib.item import Items
 from lib.shtime import Shtime
 
 from .AutoBlindLoggerOLog import AbLogger
+from .cache_journal import CacheJournal
 
 class OperationLog(SmartPlugin, AbLogger):
     _log = None
     _items = {}
 
-    PLUGIN_VERSION = "1.3.6"
+    PLUGIN_VERSION = "1.3.8"
 
     def __init__(self, sh):
         # Call init code of parent class (SmartPlugin)
@@ -90,11 +91,14 @@ class OperationLog(SmartPlugin, AbLogger):
         self._log = lib.log.Log(self.get_sh(), self.name, self.mapping, self._maxlen)
         self._path = self.name
         self._cachefile = None
+        self._journal = None
+        self._log_lock = threading.Lock()
         self.__myLogger = None
         self._logcache = None
 
         self._item_conf = {}
         self._logic_conf = {}
+        self._eval_stats = {}
         self.__date = None
         self.__fname = None
 
@@ -131,15 +135,18 @@ class OperationLog(SmartPlugin, AbLogger):
                 os.rename(old_cache_file, self._cachefile)
                 if self.logger.isEnabledFor(logging.DEBUG):
                     self.logger.debug("OperationLog {}: moved cache from {} to {}".format(self.name, old_cache_file, self._cachefile))
+            self._journal = CacheJournal(self.logger, self._cachefile, self._maxlen)
             try:
-                self.__last_change, self._logcache = _cache_read(self._cachefile, self.shtime.tzinfo())
+                self.__last_change, self._logcache = self._journal.read(self.shtime.tzinfo())
                 self.load(self._logcache)
                 if self.logger.isEnabledFor(logging.DEBUG):
                     self.logger.debug("OperationLog {}: read cache: {}".format(self.name, self._logcache))
+                # start with an empty journal
+                self._journal.compact(self._log.export(int(self._maxlen)))
             except Exception:
                 try:
-                    _cache_write(self.logger, self._cachefile, self._log.export(int(self._maxlen)))
-                    _cache_read(self._cachefile, self.shtime.tzinfo())
+                    self._journal.compact(self._log.export(int(self._maxlen)))
+                    self._journal.read(self.shtime.tzinfo())
                     self.logger.info("OperationLog {}: generated cache file".format(self.name))
                 except Exception as e:
                     self.logger.warning("OperationLog {}: problem reading cache: {}".format(self._path, e))
@@ -166,20 +173,24 @@ class OperationLog(SmartPlugin, AbLogger):
         shtime = Shtime.get_instance()
         for item_id in self._item_conf:
             if 'olog_eval' in self._item_conf[item_id]:
-                for (ind, eval_str) in enumerate(self._item_conf[item_id]['olog_eval']):
+                for (ind, eval_code) in enumerate(self._item_conf[item_id]['olog_code']):
+                    eval_str = self._item_conf[item_id]['olog_eval'][ind]
                     try:
-                        eval(eval_str)
+                        eval(eval_code)
                     except Exception as e:
                         self.logger.warning('olog: could not evaluate {} for item: {}, {}'.format(eval_str, item_id, e))
                         self._item_conf[item_id]['olog_eval'][ind] = "'--'"
+                        self._item_conf[item_id]['olog_code'][ind] = self.compile_eval("'--'")
         for logic_name in self._logic_conf:
             if 'olog_eval' in self._logic_conf[logic_name]:
-                for (ind, eval_str) in enumerate(self._logic_conf[logic_name]['olog_eval']):
+                for (ind, eval_code) in enumerate(self._logic_conf[logic_name]['olog_code']):
+                    eval_str = self._logic_conf[logic_name]['olog_eval'][ind]
                     try:
-                        eval(eval_str)
+                        eval(eval_code)
                     except Exception as e:
                         self.logger.warning('olog: could not evaluate {} for logic: {}, {}'.format(eval_str, logic_name, e))
                         self._logic_conf[logic_name]['olog_eval'][ind] = "'--'"
+                        self._logic_conf[logic_name]['olog_code'][ind] = self.compile_eval("'--'")
 
         self.alive = True
 
@@ -189,6 +200,9 @@ class OperationLog(SmartPlugin, AbLogger):
         """
         self.logger.debug("Stop method called")
         self.alive = False
+        if self._journal is not None:
+            self._journal.compact(self._log.export(int(self._maxlen)))
+            self._journal.close()
 
     def parse_item(self, item):
         """
@@ -221,6 +235,7 @@ class OperationLog(SmartPlugin, AbLogger):
                 eval_parse = self.parse_eval("item.conf, item {}".format(id), olog_txt)
                 self._item_conf[id]['olog_txt'] = eval_parse['olog_txt']
                 self._item_conf[id]['olog_eval'] = eval_parse['olog_eval']
+                self._item_conf[id]['olog_code'] = eval_parse['olog_code']
                 if len(self._item_conf[id]['olog_eval']) != 0:
                     self.logger.info('Item: {}, olog evaluating: {}'.format(id, self._item_conf[id]['olog_eval']))
 
@@ -270,15 +285,19 @@ class OperationLog(SmartPlugin, AbLogger):
                 eval_parse = self.parse_eval("logic {}".format(logic.name), logic.conf['olog_txt'])
                 olog_txt = eval_parse['olog_txt']
                 olog_eval = eval_parse['olog_eval']
+                olog_code = eval_parse['olog_code']
             else:
                 olog_txt = "Logic {logic.name} triggered"
                 olog_eval = []
+                olog_code = []
             self._logic_conf[logic.name]['olog_txt'] = olog_txt
             self._logic_conf[logic.name]['olog_eval'] = olog_eval
+            self._logic_conf[logic.name]['olog_code'] = olog_code
             return self.trigger_logic
 
     def parse_eval(self, info, olog_txt):
         olog_eval = []
+        olog_code = []
         pos = -1
         while True:
             pos = olog_txt.find('{eval=', pos + 1)
@@ -290,10 +309,49 @@ class OperationLog(SmartPlugin, AbLogger):
                 self.logger.warning('olog: did not find ending } for eval in '.format(info))
                 break
             eval_str = olog_txt[start + 1:pos]
+            try:
+                eval_code = self.compile_eval(eval_str)
+            except SyntaxError as e:
+                self.logger.warning('olog: could not compile {} for {}, {}'.format(eval_str, info, e))
+                eval_str = "'--'"
+                eval_code = self.compile_eval(eval_str)
             olog_eval.append(eval_str)
+            olog_code.append(eval_code)
             olog_txt = olog_txt[:start - 4] + olog_txt[pos:]
             pos = start
-        return {'olog_txt' : olog_txt, 'olog_eval' : olog_eval}
+        return {'olog_txt' : olog_txt, 'olog_eval' : olog_eval, 'olog_code' : olog_code}
+
+    def compile_eval(self, eval_str):
+        """
+        Compiles an olog eval expression once, so it does not have to be parsed on every log entry
+
+        :param eval_str: expression as given between {eval= and }
+        :return: code object to be evaluated in update_item or trigger_logic
+        """
+        self._eval_stats[eval_str] = {'count': 0, 'total': 0.0, 'max': 0.0}
+        return compile(eval_str.strip(), '<olog_eval>', 'eval')
+
+    def _record_eval(self, eval_str, duration):
+        stats = self._eval_stats.setdefault(eval_str, {'count': 0, 'total': 0.0, 'max': 0.0})
+        stats['count'] += 1
+        stats['total'] += duration
+        if duration > stats['max']:
+            stats['max'] = duration
+
+    def get_eval_statistics(self):
+        """
+        Returns the runtime statistics of all olog eval expressions, slowest (by total time) first
+
+        :return: list of dicts with expression, count, total, average and max time in ms
+        """
+        result = []
+        for eval_str, stats in sorted(self._eval_stats.items(), key=lambda e: e[1]['total'], reverse=True):
+            result.append({'expression': eval_str,
+                           'count': stats['count'],
+                           'total': round(stats['total'] * 1000, 3),
+                           'average': round(stats['total'] * 1000 / stats['count'], 3) if stats['count'] else 0,
+                           'max': round(stats['max'] * 1000, 3)})
+        return result
 
     def __call__(self, param1=None, param2=None):
         if isinstance(param1, list) and isinstance(param2, type(None)):
@@ -374,15 +432,17 @@ class OperationLog(SmartPlugin, AbLogger):
                                 if self._item_conf[id]['olog_rules']["*"] is None:
                                     return
                         self._item_conf[id]['olog_eval_res'] = []
-                        for expr in self._item_conf[id]['olog_eval']:
-                            self._item_conf[id]['olog_eval_res'].append(eval(expr))
+                        for (expr, code) in zip(self._item_conf[id]['olog_eval'], self._item_conf[id]['olog_code']):
+                            start = time.perf_counter()
+                            self._item_conf[id]['olog_eval_res'].append(eval(code))
+                            self._record_eval(expr, time.perf_counter() - start)
                         try:
                             pname = str(item.return_parent())
                             pid = item.return_parent().property.path
                         except Exception:
                             pname = ''
                             pid = ''
-                        time = shtime.now().strftime("%H:%M:%S")
+                        time_str = shtime.now().strftime("%H:%M:%S")
                         date = shtime.now().strftime("%d.%m.%Y")
                         stamp = shtime.now().timestamp()
                         now = str(shtime.now())
@@ -395,7 +455,7 @@ class OperationLog(SmartPlugin, AbLogger):
                                                                                   'pname': pname,
                                                                                   'id': id,
                                                                                   'item': id,
-                                                                                  'time': time,
+                                                                                  'time': time_str,
                                                                                   'date': date,
                                                                                   'stamp': stamp,
                                                                                   'now': now,
@@ -417,7 +477,12 @@ class OperationLog(SmartPlugin, AbLogger):
         if self.name == logic.conf['olog'] and logic.name in self._logic_conf:
             olog_txt = self._logic_conf[logic.name]['olog_txt']
             olog_eval = self._logic_conf[logic.name]['olog_eval']
-            eval_res = [eval(expr) for expr in olog_eval]
+            olog_code = self._logic_conf[logic.name]['olog_code']
+            eval_res = []
+            for (expr, code) in zip(olog_eval, olog_code):
+                start = time.perf_counter()
+                eval_res.append(eval(code))
+                self._record_eval(expr, time.perf_counter() - start)
             logvalues = [olog_txt.format(*eval_res, **{'plugin' : self, 'logic' : logic, 'by' : by, 'source' : source, 'dest' : dest})]
             self.log(logvalues, 'INFO' if 'olog_level' not in logic.conf else logic.conf['olog_level'])
 
@@ -437,7 +502,14 @@ class OperationLog(SmartPlugin, AbLogger):
                 else:
                     values_txt = map(str, logvalues)
                     log.append(' '.join(values_txt))
-            self._log.add(log)
+            with self._log_lock:
+                self._log.add(log)
+                if self._journal is not None:
+                    # append only the new entry, the whole log is written when the journal is compacted
+                    try:
+                        self._journal.append(dict(zip(self._log.mapping, log)), lambda: self._log.export(int(self._maxlen)))
+                    except Exception as e:
+                        self.logger.warning("OperationLog {}: could not update cache {}".format(self._path, e))
             # consider to write the log entry to
             if self._logtofile:
                 self.update_logfilename()
@@ -446,42 +518,8 @@ class OperationLog(SmartPlugin, AbLogger):
                 else:
                     self.__myLogger.info('{}: {}', log[2], ''.join(log[3:]))
 
-            if self._cache is True:
-                try:
-                    _cache_write(self.logger, self._cachefile, self._log.export(int(self._maxlen)))
-                except Exception as e:
-                    self.logger.warning("OperationLog {}: could not update cache {}".format(self._path, e))
-
             if self.additional_logger:
                 if level == "NONE":
                     level = "INFO"
                 self.additional_logger.log(logging.getLevelName(level), ' '.join(map(str, logvalues)))
 
-
-
-#####################################################################
-# Cache Methods
-#####################################################################
-def _cache_read(filename, tz):
-    """
-    This loads the cache from a file
-
-    :param filename: file to load from
-    :param tz: timezone
-    :return: [description]
-    :rtype: a tuple with datetime and values from file
-    """
-    ts = os.path.getmtime(filename)
-    dt = datetime.datetime.fromtimestamp(ts, tz)
-    value = None
-    with open(filename, 'rb') as f:
-        value = pickle.load(f)
-    return (dt, value)
-
-
-def _cache_write(logger, filename, value):
-    try:
-        with open(filename, 'wb') as f:
-            pickle.dump(value, f)
-    except IOError:
-        logger.warning("Could not write to {}".format(filename))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+# Copyright 2016- Jan Troelsen                            jan@troelsen.de
+# Copyright 2017- Oliver Hinckel                       github@ollisnet.de
+# Copyright 2020- Bernd Meiners                     Bernd.Meiners@mail.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  OperationLog
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+
+import collections
+import datetime
+import os
+import pickle
+import threading
+
+
+#####################################################################
+# Cache Methods
+#####################################################################
+def cache_read(filename, tz):
+    """
+    This loads the cache snapshot from a file
+
+    :param filename: file to load from
+    :param tz: timezone
+    :return: [description]
+    :rtype: a tuple with datetime and values from file
+    """
+    ts = os.path.getmtime(filename)
+    dt = datetime.datetime.fromtimestamp(ts, tz)
+    value = None
+    with open(filename, 'rb') as f:
+        value = pickle.load(f)
+    return (dt, value)
+
+
+def cache_write(logger, filename, value):
+    """
+    This writes the cache snapshot to a file
+
+    The snapshot is written to a temporary file first, so a crash while writing does not destroy the cache
+
+    :return: True, if the snapshot has been written
+    """
+    try:
+        with open(filename + '.tmp', 'wb') as f:
+            pickle.dump(value, f)
+        os.replace(filename + '.tmp', filename)
+        return True
+    except IOError:
+        logger.warning("Could not write to {}".format(filename))
+        return False
+
+
+class CacheJournal():
+    """
+    Cache of an operation log consisting of a snapshot and an append-only journal
+
+    The snapshot (file <cachefile>) holds the exported log as before (newest entry first). Every new
+    log entry is appended to the journal (file <cachefile>.journal) as one pickle record, so a log
+    entry costs one small write, independent of maxlen. When the journal holds maxlen records,
+    it is compacted: the snapshot is rewritten and the journal is truncated.
+    """
+
+    def __init__(self, logger, filename, maxlen):
+        self.logger = logger
+        self.filename = filename
+        self.journal_filename = filename + '.journal'
+        self.maxlen = int(maxlen)
+        self._journal = None
+        self._records = 0
+        self._lock = threading.Lock()
+
+
+    def read(self, tz):
+        """
+        Read the snapshot and replay the journal
+
+        The journal is read record by record, only the last maxlen entries are kept in memory.
+        An incomplete last record (e.g. after a power loss) is ignored.
+
+        :return: tuple with datetime of the last change and the entries (newest first)
+        """
+        snapshot_exists = os.path.isfile(self.filename)
+        if not snapshot_exists and not os.path.isfile(self.journal_filename):
+            raise FileNotFoundError(self.filename)
+
+        entries = collections.deque(maxlen=self.maxlen)
+        dt = None
+        if snapshot_exists:
+            dt, value = cache_read(self.filename, tz)
+            entries.extend(reversed(value))
+
+        if os.path.isfile(self.journal_filename):
+            dt = datetime.datetime.fromtimestamp(os.path.getmtime(self.journal_filename), tz)
+            with open(self.journal_filename, 'rb') as f:
+                while True:
+                    try:
+                        entries.append(pickle.load(f))
+                    except EOFError:
+                        break
+                    except (pickle.UnpicklingError, ValueError, TypeError, AttributeError) as e:
+                        self.logger.warning("Ignoring incomplete record at the end of {}: {}".format(self.journal_filename, e))
+                        break
+        entries.reverse()
+        return (dt, list(entries))
+
+
+    def append(self, entry, export):
+        """
+        Append a log entry to the journal
+
+        :param entry: log entry as dict
+        :param export: function returning the whole log, called for a compaction
+        """
+        with self._lock:
+            try:
+                if self._journal is None:
+                    self._journal = open(self.journal_filename, 'ab')
+                pickle.dump(entry, self._journal)
+                self._journal.flush()
+                self._records += 1
+            except IOError:
+                self.logger.warning("Could not write to {}".format(self.journal_filename))
+                return
+            if self._records >= self.maxlen:
+                self._compact(export())
+
+
+    def compact(self, value):
+        """
+        Write the snapshot and truncate the journal
+
+        :param value: exported log (newest entry first)
+        """
+        with self._lock:
+            self._compact(value)
+
+    def _compact(self, value):
+        if not cache_write(self.logger, self.filename, value):
+            # keep the journal, it holds the entries that are missing in the snapshot
+            return
+        try:
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_filename, 'wb')
+            self._records = 0
+        except IOError:
+            self._journal = None
+            self.logger.warning("Could not truncate {}".format(self.journal_filename))
+
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2016- Jan Troelsen                            jan@troelsen.de
+#  Copyright 2017- Oliver Hinckel                       github@ollisnet.de
+#  Copyright 2020- Bernd Meiners                     Bernd.Meiners@mail.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  Tests of the cache journal of the operationlog plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import collections
+import logging
+import os
+import tempfile
+import unittest
+
+from plugins.operationlog.cache_journal import CacheJournal
+
+MAPPING = ['time', 'thread', 'level', 'message']
+
+
+class TestCacheJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'oplog')
+        self.logger = logging.getLogger(__name__)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def fill(self, maxlen, count):
+        """
+        Appends count entries like the plugin does, returns the in-memory log (newest first)
+        """
+        log = collections.deque(maxlen=maxlen)
+        journal = CacheJournal(self.logger, self.filename, maxlen)
+        for i in range(count):
+            entry = dict(zip(MAPPING, [i, 'Main', 'INFO', 'Fenster {} geöffnet'.format(i)]))
+            log.appendleft(entry)
+            journal.append(entry, lambda: list(log))
+        journal.close()
+        return list(log)
+
+    def test_missing(self):
+        with self.assertRaises(FileNotFoundError):
+            CacheJournal(self.logger, self.filename, 10).read(None)
+
+    def test_journal_only(self):
+        log = self.fill(10, 5)
+        self.assertFalse(os.path.exists(self.filename))
+        dt, entries = CacheJournal(self.logger, self.filename, 10).read(None)
+        self.assertEqual(log, entries)
+
+    def test_compaction(self):
+        log = self.fill(10, 25)
+        self.assertTrue(os.path.exists(self.filename))
+        dt, entries = CacheJournal(self.logger, self.filename, 10).read(None)
+        self.assertEqual(log, entries)
+        self.assertEqual(24, entries[0]['time'])
+
+    def test_incomplete_record(self):
+        log = self.fill(10, 5)
+        with open(self.filename + '.journal', 'ab') as f:
+            f.write(b'\x80\x04\x95')
+        dt, entries = CacheJournal(self.logger, self.filename, 10).read(None)
+        self.assertEqual(log, entries)
+
+    def test_compact(self):
+        log = self.fill(10, 5)
+        journal = CacheJournal(self.logger, self.filename, 10)
+        journal.compact(log)
+        journal.close()
+        self.assertEqual(0, os.path.getsize(self.filename + '.journal'))
+        self.assertEqual(log, CacheJournal(self.logger, self.filename, 10).read(None)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,15 +28,70 @@
 import os
 import sys
 import datetime
+import logging
 import tempfile
 import unittest
+from unittest import mock
 
 from tests import common
 from tests.mock.core import MockSmartHome
 
 from plugins.operationlog import OperationLog
 
-# name your test class accordingly and replace MyPlugin
 
 class TestOperationLog(unittest.TestCase):
-    pass
+
+    def plugin(self):
+        # only the attributes used by parse_item and update_item, without log files and cache
+        plugin = OperationLog.__new__(OperationLog)
+        plugin.logger = logging.getLogger(__name__)
+        plugin.name = 'oplog'
+        plugin.alive = True
+        plugin._items = []
+        plugin._item_conf = {}
+        plugin._logic_conf = {}
+        plugin._eval_stats = {}
+        plugin.get_sh = mock.Mock(return_value=None)
+        plugin.get_shortname = mock.Mock(return_value='operationlog')
+        plugin.log = mock.Mock()
+        return plugin
+
+    def item(self, value, olog_txt):
+        item = mock.MagicMock()
+        item.conf = {'olog': 'oplog', 'olog_txt': olog_txt}
+        item.property.path = 'test.item'
+        item.property.value = value
+        item.return_value = value
+        item.type.return_value = 'num'
+        item.prev_age.return_value = 1.5
+        item.return_parent.side_effect = Exception('no parent')
+        item.__str__.return_value = 'Test Item'
+        return item
+
+    def update(self, plugin, item):
+        shtime = mock.Mock()
+        shtime.now.return_value = datetime.datetime(2024, 5, 1, 12, 30, 15)
+        with mock.patch('plugins.operationlog.Shtime.get_instance', return_value=shtime):
+            plugin.update_item(item, caller='test')
+        plugin.log.assert_called_once()
+        return plugin.log.call_args[0][0]
+
+    def test_update_item_eval(self):
+        plugin = self.plugin()
+        item = self.item(21, '{name} is {value} ({eval=item() * 2}) at {time}')
+        self.assertIsNotNone(plugin.parse_item(item))
+
+        logvalues = self.update(plugin, item)
+        self.assertEqual(['Test Item is 21 (42) at 12:30:15'], logvalues)
+
+        statistics = plugin.get_eval_statistics()
+        self.assertEqual(1, len(statistics))
+        self.assertEqual('item() * 2', statistics[0]['expression'])
+        self.assertEqual(1, statistics[0]['count'])
+
+    def test_update_item_eval_syntax_error(self):
+        plugin = self.plugin()
+        item = self.item(3, 'value {eval=value +}')
+        plugin.parse_item(item)
+
+        self.assertEqual(['value --'], self.update(plugin, item))
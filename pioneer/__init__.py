@@ -45,6 +45,8 @@ from lib.model.sdp.globals import (PLUGIN_ATTR_NET_HOST, PLUGIN_ATTR_CONNECTION,
 from lib.model.smartdeviceplugin import SmartDevicePlugin, Standalone
 from lib.model.sdp.command import SDPCommandParseStr
 
+from .reply_matcher import ReplyMatcher
+
 # from .webif import WebInterface
 
 builtins.SDP_standalone = False
@@ -53,7 +55,7 @@ builtins.SDP_standalone = False
 class pioneer(SmartDevicePlugin):
     """ Device class for Pioneer AV function. """
 
-    PLUGIN_VERSION = '1.0.3'
+    PLUGIN_VERSION = '1.0.4'
 
     def _set_device_defaults(self):
         # set our own preferences concerning connections
@@ -71,6 +73,10 @@ class pioneer(SmartDevicePlugin):
         b = b.decode('unicode-escape').encode()
         self._parameters[PLUGIN_ATTR_CONN_TERMINATOR] = b
 
+    def _post_init(self):
+        # match received data against the precompiled reply patterns
+        self._reply_matcher = ReplyMatcher.install(self._commands, self.logger)
+
     def _transform_send_data(self, data=None, **kwargs):
         if isinstance(data, dict):
             data['limit_response'] = self._parameters[PLUGIN_ATTR_CONN_TERMINATOR]
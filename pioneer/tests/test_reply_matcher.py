@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2022 <Onkel Andy>                    <onkelandy@hotmail.com>
+#########################################################################
+#  This file is part of SmartHomeNG
+#
+#  Tests of the reply matcher with the commands of the pioneer plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG  If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+
+import re
+import unittest
+
+from plugins.pioneer.commands import commands, lookups
+from plugins.pioneer.reply_matcher import ReplyMatcher
+
+# lookup tables of all models, as the core merges them for the configured model
+LOOKUPS = {}
+for tables in lookups.values():
+    LOOKUPS.update(tables)
+
+LINES = ['PWR0', 'PWR1', 'MUT1', 'FN25', 'SR0009', 'LM0401', 'SPK1', 'Z2MUT1', 'ZV50', 'unknown'] + \
+        [f'VOL{volume:03d}' for volume in range(80, 160, 10)] + \
+        ['FL02' + ''.join(f'{ord(c):02X}' for c in text) for text in ('VOLUME -30.5 ', 'HDMI 1       ', 'STEREO       ')]
+
+REPLIES = {'VOL120': ['zone1.control.volume'],
+           'PWR0': ['zone1.control.power'],
+           'unknown': []}
+
+
+def reply_patterns(commands, path=''):
+    """
+    reply patterns of all commands in definition order, placeholders substituted like SDPCommands does
+    """
+    for name, cmd in commands.items():
+        if not isinstance(cmd, dict):
+            continue
+        if 'read' not in cmd and 'write' not in cmd and 'reply_pattern' not in cmd:
+            yield from reply_patterns(cmd, path + name + '.')
+            continue
+        patterns = cmd.get('reply_pattern')
+        if not patterns:
+            continue
+        if not isinstance(patterns, list):
+            patterns = [patterns]
+        result = []
+        for pattern in patterns:
+            if pattern == '*':
+                pattern = re.escape(str(cmd.get('opcode', '')))
+            if '{LOOKUP}' in pattern and cmd.get('lookup') in LOOKUPS:
+                pattern = pattern.replace('{LOOKUP}', '(' + '|'.join(re.escape(str(key)) for key in LOOKUPS[cmd['lookup']]) + ')')
+            valid = cmd.get('cmd_settings', {}).get('valid_list_ci')
+            if '{VALID_LIST_CI}' in pattern and valid:
+                pattern = pattern.replace('{VALID_LIST_CI}', '(?i:' + '|'.join(re.escape(str(value)) for value in valid) + ')')
+            result.append(pattern)
+        yield path + name, result
+
+
+def linear(patterns, data):
+    """
+    matching as done by SDPCommands.get_commands_from_reply(): every pattern in turn
+    """
+    return [command for command, cmd_patterns in patterns if any(re.match(pattern, data) for pattern in cmd_patterns)]
+
+
+class TestReplyMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.patterns = list(reply_patterns(commands))
+        self.matcher = ReplyMatcher(self.patterns)
+
+    def test_same_result_as_linear_matching(self):
+        for line in LINES:
+            with self.subTest(line=line):
+                self.assertEqual(linear(self.patterns, line), self.matcher.match(line))
+
+    def test_replies(self):
+        for line, expected in REPLIES.items():
+            with self.subTest(line=line):
+                self.assertEqual(expected, self.matcher.get_commands_from_reply(line))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,6 +27,7 @@
 import datetime
 import os
 import json
+import time
 
 from lib.model.smartplugin import *
 from lib.item import Items
@@ -37,6 +38,12 @@ from .webif import WebInterface
 
 # If a needed package is imported, which might be not installed in the Python environment,
 # add it to a requirements.txt file within the plugin's directory
+try:
+    from .controller_engine import ControllerEngine
+    import numpy as np
+    NUMPY_IMPORTED = True
+except ImportError:
+    NUMPY_IMPORTED = False
 
 
 class Rtr2(SmartPlugin):
@@ -45,7 +52,7 @@ class Rtr2(SmartPlugin):
     the update functions for the items
     """
 
-    PLUGIN_VERSION = '2.2.0'    # (must match the version specified in plugin.yaml), use '1.0.0' for your initial plugin Release
+    PLUGIN_VERSION = '2.3.0'    # (must match the version specified in plugin.yaml), use '1.0.0' for your initial plugin Release
 
     _rtr = {}  # dict containing data of the rtrs. Key is the attribute rtr2_id
 
@@ -81,6 +88,13 @@ class Rtr2(SmartPlugin):
         self.default_min_output = self.get_parameter_value('min_output')
         self.default_max_output = self.get_parameter_value('max_output')
 
+        self.controller_engine = self.get_parameter_value('controller_engine')
+        if self.controller_engine == 'vectorized' and not NUMPY_IMPORTED:
+            self.logger.warning("Python package 'numpy' is not installed, using controller_engine 'single' instead of 'vectorized'")
+            self.controller_engine = 'single'
+        self._engine = None             # ControllerEngine for all rtrs (controller_engine 'vectorized')
+        self._engine_rtrs = []          # rtrs stepped by the ControllerEngine (in the order of the arrays)
+
         self.cache_read_tried = False # Only write cache on shutdown, if a cache read has been tried on start
 
         # cycle time in seconds, only needed, if hardware/interface needs to be
@@ -265,6 +279,10 @@ class Rtr2(SmartPlugin):
         changes on it's own, but has to be polled to get the actual status.
         It is called by the scheduler which is set within run() method.
         """
+        if self.controller_engine == 'vectorized':
+            self.update_all_rtrs_vectorized()
+            return
+
         for r in self._rtr:
             # validate
             pass
@@ -273,6 +291,48 @@ class Rtr2(SmartPlugin):
             self._rtr[r].update()
 
 
+    def update_all_rtrs_vectorized(self):
+        """
+        Step the controllers of all rtrs in one tick with the ControllerEngine
+
+        All controller outputs are calculated first and then written to the actuator items
+        in one pass, so the valves of all rooms are updated together.
+        """
+        rtrs = [rtr for rtr in self._rtr.values() if rtr.temp_actual_item is not None]
+        if not rtrs:
+            return
+        controllers = [rtr.controller for rtr in rtrs]
+        Kp = [c._Kp for c in controllers]
+        Ki = [c._Ki for c in controllers]
+        if self._engine is None or rtrs != self._engine_rtrs:
+            self._engine = ControllerEngine(Kp, Ki, eSum=[c._eSum for c in controllers],
+                                            output=[c.output for c in controllers],
+                                            initialized=[c.last_input is not None for c in controllers])
+            self._engine_rtrs = rtrs
+        elif Kp != self._engine.Kp.tolist() or Ki != self._engine.Ki.tolist():
+            # gains may have been changed (e.g. restored from cache)
+            self._engine.set_gains(Kp, Ki)
+
+        now = time.time()
+        w = np.array([c._temperature.set_temp for c in controllers], dtype=float)
+        x = np.array([rtr.temp_actual_item() for rtr in rtrs], dtype=float)
+        Ta = now - np.array([c.last_time for c in controllers], dtype=float)
+        outputs, active = self._engine.step(w, x, Ta)
+
+        # keep the state of the controller objects in sync (for web interface and cache)
+        for i, c in enumerate(controllers):
+            c._set_temp = float(w[i])
+            c.current_time = c.last_time = now
+            if active[i]:
+                c.last_input = float(x[i])
+                c._eSum = float(self._engine.eSum[i])
+                c.output = float(outputs[i])
+
+        # synchronized write of the valve outputs
+        for i, rtr in enumerate(rtrs):
+            rtr.set_output(float(outputs[i]) if active[i] else None)
+
+
     def valve_protection(self):
         """
         Open and close valves of all RTRs periodically to protect them
@@ -482,37 +542,42 @@ class Rtr_object():
     def update(self):
         self.logger.info(f"rtr {self.id}: update called")
         if self.temp_actual_item is not None:
-            # If valve protection is active, overrule lock and controler values
-            if self.valve_protect_active:
-                dummy = self.controller.update(self.temp_actual_item())
-                output = 100
-                if (self.setting_max_output_item is not None) and (output > self.setting_max_output_item()):
-                    output = self.setting_max_output_item()
-                self._update_item(self.control_output_item, output)
-                self._update_item(self.heating_status_item, self.heating)
-            # test if RTR is locked
-            elif (self.lock_status_item is not None) and self.lock_status_item:
-                # if RTR is locked, set output to 0
-                dummy = self.controller.update(self.temp_actual_item())
-                self._update_item(self.control_output_item, 0)
-                self._update_item(self.heating_status_item, False)
-            else:
-                # regular opertion: Set output to conroller result
-                output = self.controller.update(self.temp_actual_item())
-                # test if controller has been fully initialized
-                if output is not None:
-                    # test if a min- od max output is set
-                    if (self.setting_max_output_item is not None) and (output > self.setting_max_output_item()):
-                        output = self.setting_max_output_item()
-                    if (self.setting_min_output_item is not None) and (output < self.setting_min_output_item()):
-                        output = self.setting_min_output_item()
-                    # set output value
-                    self._update_item(self.control_output_item, output)
-                    self._update_item(self.heating_status_item, self.heating)
+            self.set_output(self.controller.update(self.temp_actual_item()))
         self.logger.info(f"rtr {self.id}: update finished")
         return
 
 
+    def set_output(self, output):
+        """
+        Write the controller result to the actuator, considering valve protection, lock and min/max output
+
+        :param output: controller result (None, if the controller has not been fully initialized)
+        """
+        # If valve protection is active, overrule lock and controler values
+        if self.valve_protect_active:
+            output = 100
+            if (self.setting_max_output_item is not None) and (output > self.setting_max_output_item()):
+                output = self.setting_max_output_item()
+            self._update_item(self.control_output_item, output)
+            self._update_item(self.heating_status_item, self.heating)
+        # test if RTR is locked
+        elif (self.lock_status_item is not None) and self.lock_status_item:
+            # if RTR is locked, set output to 0
+            self._update_item(self.control_output_item, 0)
+            self._update_item(self.heating_status_item, False)
+        # test if controller has been fully initialized
+        elif output is not None:
+            # regular opertion: Set output to conroller result
+            # test if a min- od max output is set
+            if (self.setting_max_output_item is not None) and (output > self.setting_max_output_item()):
+                output = self.setting_max_output_item()
+            if (self.setting_min_output_item is not None) and (output < self.setting_min_output_item()):
+                output = self.setting_min_output_item()
+            # set output value
+            self._update_item(self.control_output_item, output)
+            self._update_item(self.heating_status_item, self.heating)
+
+
     # ----------------------------------------------------------------------
     # Methods to update status
     #
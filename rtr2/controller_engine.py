@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      Martin Sinn                         m.sinn@gmx.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  rtr2 plugin to run with SmartHomeNG version 1.8 and upwards.
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import numpy as np
+
+
+class ControllerEngine():
+    """
+    Steps the PI controllers of all rtrs of a plugin instance in one tick
+
+    Setpoints, actual values, integrators and gains are held in arrays (one element per
+    controller). The calculation is the same as in Pi_controller.update()
+    """
+
+    def __init__(self, Kp, Ki, eSum=None, output=None, initialized=None):
+        """
+        :param Kp: proportional gains (one per controller)
+        :param Ki: integral gains in minutes (one per controller)
+        :param eSum: initial sum of the control errors
+        :param output: initial outputs
+        :param initialized: controllers which already received an actual value
+        """
+        self.size = len(Kp)
+        self.set_gains(Kp, Ki)
+        self.eSum = np.zeros(self.size) if eSum is None else np.array(eSum, dtype=float)
+        self.output = np.zeros(self.size) if output is None else np.array(output, dtype=float)
+        self.initialized = np.zeros(self.size, dtype=bool) if initialized is None else np.array(initialized, dtype=bool)
+        self._all_initialized = bool(self.initialized.all())
+
+
+    def set_gains(self, Kp, Ki):
+        """
+        Set the gains of the controllers (the derived factors are only calculated here)
+        """
+        self.Kp = np.array(Kp, dtype=float)
+        self.Ki = np.array(Ki, dtype=float)
+        self._gain = 100.0 / self.Kp
+        self._i_factor = 1.0 / (60.0 * self.Ki)
+        self._eSum_limit = self.Kp * 60.0 * self.Ki       # eSum at an output of 100%
+
+
+    def step(self, w, x, Ta):
+        """
+        Calculate new actuator values for all controllers
+
+        Controllers that never received an actual value other than 0 are skipped (as in
+        Pi_controller.update()), their output and eSum are not changed.
+
+        :param w: setpoint values
+        :param x: current values
+        :param Ta: scanning time in seconds (scalar or one value per controller)
+        :return: tuple (outputs, mask of the controllers that have been updated)
+        """
+        if self._all_initialized:
+            active = self.initialized
+        else:
+            active = self.initialized | (x != 0)
+            self.initialized = active
+            self._all_initialized = bool(active.all())
+
+        e = w - x
+        eSum = self.eSum + e * Ta
+        y = (eSum * self._i_factor + e) * self._gain
+
+        # limit the new actuator values to [0 ... 100]
+        np.copyto(eSum, self._eSum_limit, where=y > 100.0)
+        np.minimum(y, 100.0, out=y)
+        np.copyto(eSum, 0.0, where=(y < 0.0) | (eSum < 0.0))
+        np.maximum(y, 0.0, out=y)
+        np.round(y, 2, out=y)
+
+        if self._all_initialized:
+            self.eSum = eSum
+            self.output = y
+        else:
+            np.copyto(self.eSum, eSum, where=active)
+            np.copyto(self.output, y, where=active)
+        return self.output, active
+
+
+    def __repr__(self):
+        return f"ControllerEngine, {self.size} PI-controllers, Kp={self.Kp}, Ki={self.Ki}, eSum={np.round(self.eSum, 4)}, output={self.output}"
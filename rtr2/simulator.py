@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      Martin Sinn                         m.sinn@gmx.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  rtr2 plugin to run with SmartHomeNG version 1.8 and upwards.
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Offline thermal plant simulator to benchmark controller settings
+
+Every room is a simple thermal model: the heater (radiator or floor heating) follows the valve
+with a time constant and the room loses heat to the outside with a second time constant.
+Many rooms (or many Kp/Ki variations of the same room) are simulated at once with the
+ControllerEngine, a year of control at a 60 s cycle takes about 15 seconds, nearly
+independent of the number of rooms.
+
+Run from the plugin directory, like test.py:
+
+    python3 simulator.py                       # compare some Kp/Ki settings for one room type
+    python3 simulator.py --days 30 --cycle 10
+    python3 simulator.py --Kp 3 4 5 --Ki 100 120 150 --room_tau 50 --heater_tau 3   # floor heating
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from controller_engine import ControllerEngine
+
+
+class ThermalPlant():
+    """
+    Thermal model for a number of rooms (one element per room in all arrays)
+    """
+
+    def __init__(self, rooms, room_tau=30.0, heater_tau=0.5, heater_gain=4.0, start_temp=20.0):
+        """
+        :param rooms: number of rooms
+        :param room_tau: time constant of the heat loss of the room (hours)
+        :param heater_tau: time constant of the heater following the valve (hours)
+        :param heater_gain: temperature rise per hour at full heating output, if the room has outside temperature (K/h)
+        :param start_temp: initial room temperature
+        """
+        self.rooms = rooms
+        self.room_tau = np.broadcast_to(np.asarray(room_tau, dtype=float) * 3600.0, rooms).copy()
+        self.heater_tau = np.broadcast_to(np.asarray(heater_tau, dtype=float) * 3600.0, rooms).copy()
+        self.heater_gain = np.broadcast_to(np.asarray(heater_gain, dtype=float) / 3600.0, rooms).copy()
+        self.temp = np.full(rooms, float(start_temp))
+        self.heat = np.zeros(rooms)             # heater output 0..1
+        self._dt = None
+
+
+    def step(self, valve, outside_temp, dt):
+        """
+        Advance the model by dt seconds
+
+        :param valve: valve positions 0..100
+        :param outside_temp: outside temperature
+        :param dt: time step in seconds
+        :return: room temperatures
+        """
+        if dt != self._dt:
+            # factors for the time step (the time step does not change during a simulation)
+            self._dt = dt
+            self._heat_factor = dt / self.heater_tau
+            self._valve_factor = 0.01 * self._heat_factor
+            self._loss_factor = dt / self.room_tau
+            self._gain_factor = dt * self.heater_gain
+        self.heat += valve * self._valve_factor - self.heat * self._heat_factor
+        self.temp += (outside_temp - self.temp) * self._loss_factor + self.heat * self._gain_factor
+        return self.temp
+
+
+def outside_temperatures(steps, cycle, mean=9.0, year_amplitude=9.0, day_amplitude=4.0):
+    """
+    Outside temperature for every step of the simulation (coldest in mid January and at 5 o'clock)
+    """
+    t = np.arange(steps) * (cycle / 86400.0)        # time in days
+    return mean - year_amplitude * np.cos(2 * np.pi * (t - 15) / 365.0) - day_amplitude * np.cos(2 * np.pi * (t % 1 - 5 / 24.0))
+
+
+def setpoints(steps, cycle, comfort=21.0, night_reduction=3.0, comfort_start=6, comfort_end=22):
+    """
+    Setpoint for every step of the simulation (comfort mode during the day, night mode else)
+    """
+    hour = (np.arange(steps) * (cycle / 3600.0)) % 24
+    return np.where((hour >= comfort_start) & (hour < comfort_end), comfort, comfort - night_reduction)
+
+
+def simulate(Kp, Ki, days=365, cycle=60, sensor_resolution=0.1, **plant_settings):
+    """
+    Simulate the control of rooms with the given controller settings
+
+    :param Kp: proportional gains (one per room)
+    :param Ki: integral gains in minutes (one per room)
+    :param days: simulated time
+    :param cycle: cycle time of the controllers in seconds
+    :param sensor_resolution: resolution of the temperature sensors (as sent by knx sensors)
+    :param plant_settings: settings for ThermalPlant (scalars or one value per room)
+    :return: dict with benchmark values (arrays with one value per room) and the runtime
+    """
+    rooms = len(Kp)
+    steps = int(days * 86400 / cycle)
+    outside = outside_temperatures(steps, cycle)
+    w_all = setpoints(steps, cycle)
+    in_comfort = w_all == w_all.max()
+
+    plant = ThermalPlant(rooms, **plant_settings)
+    engine = ControllerEngine(Kp, Ki)
+
+    abs_error = np.zeros(rooms)
+    max_overshoot = np.zeros(rooms)
+    valve_travel = np.zeros(rooms)
+    energy = np.zeros(rooms)
+    comfort_steps = int(in_comfort.sum())
+    valve = np.zeros(rooms)
+
+    start = time.perf_counter()
+    temp = plant.temp
+    for i in range(steps):
+        w = w_all[i]
+        x = np.round(temp * (1 / sensor_resolution)) * sensor_resolution
+        new_valve = engine.step(w, x, cycle)[0]
+        valve_travel += np.abs(new_valve - valve)
+        valve = new_valve
+        energy += valve
+        temp = plant.step(valve, outside[i], cycle)
+        if in_comfort[i]:
+            error = temp - w
+            abs_error += np.abs(error)
+            np.maximum(max_overshoot, error, out=max_overshoot)
+    runtime = time.perf_counter() - start
+
+    return {'rooms': rooms,
+            'steps': steps,
+            'runtime': round(runtime, 2),
+            'mean_abs_error': abs_error / max(comfort_steps, 1),
+            'max_overshoot': max_overshoot,
+            'valve_travel': valve_travel / 100.0,              # full valve strokes
+            'energy': energy * cycle / 3600.0 / 100.0,         # full load hours
+            }
+
+
+def benchmark(Kp_values, Ki_values, **kwargs):
+    """
+    Simulate all combinations of Kp and Ki in one run and print the results
+    """
+    combinations = [(Kp, Ki) for Kp in Kp_values for Ki in Ki_values]
+    result = simulate([c[0] for c in combinations], [c[1] for c in combinations], **kwargs)
+    print(f"{result['rooms']} controllers, {result['steps']} steps simulated in {result['runtime']} s")
+    print(f"{'Kp':>6} {'Ki':>6} | {'mean |e|':>9} {'overshoot':>9} {'strokes':>8} {'full load h':>11}")
+    for i, (Kp, Ki) in enumerate(combinations):
+        print(f"{Kp:>6} {Ki:>6} | {result['mean_abs_error'][i]:>9.3f} {result['max_overshoot'][i]:>9.2f} "
+              f"{result['valve_travel'][i]:>8.0f} {result['energy'][i]:>11.0f}")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='rtr2 thermal plant simulator')
+    parser.add_argument('--days', type=float, default=365)
+    parser.add_argument('--cycle', type=float, default=60, help='cycle time of the controllers in seconds')
+    parser.add_argument('--Kp', type=float, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--Ki', type=float, nargs='+', default=[60, 120, 150])
+    parser.add_argument('--room_tau', type=float, default=30.0, help='time constant of the room (hours)')
+    parser.add_argument('--heater_tau', type=float, default=0.5, help='time constant of the heater (hours)')
+    args = parser.parse_args()
+
+    benchmark(args.Kp, args.Ki, days=args.days, cycle=args.cycle, room_tau=args.room_tau, heater_tau=args.heater_tau)
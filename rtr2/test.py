@@ -77,3 +77,11 @@ t = Temperature(m, init, defaults)
 print(t)
 
 #test_set_temp()
+
+
+def test_simulation(days=30):
+    # simulate the same room with different controller settings (see simulator.py)
+    from simulator import benchmark
+    benchmark([2, 4, 8], [60, 120], days=days)
+
+#test_simulation()
@@ -29,6 +29,7 @@ from lib.model.mqttplugin import *
 from lib.item import Items
 
 from .webif import WebInterface
+from .publish_queue import PublishQueue
 
 import inspect
 
@@ -39,7 +40,7 @@ class Shelly(MqttPlugin):
     the update functions for the items
     """
 
-    PLUGIN_VERSION = '1.8.3'
+    PLUGIN_VERSION = '1.8.4'
 
 
     def __init__(self, sh):
@@ -71,6 +72,10 @@ class Shelly(MqttPlugin):
         # Initialization code goes here
         self.shelly_devices = {}    # dict to store information about discovered shelly devices
 
+        # outbound publishes are coalesced and rate limited
+        self._publish_queue = PublishQueue(self, self.get_parameter_value('publish_rate_limits'), self.get_parameter_value('publish_dedup'))
+        self._publish_queue_item_path = self.get_parameter_value('publish_queue_item')
+
         # add subscription to get Gen 1 device announces (gets Gen2 announces, if device is configured correctly)
         self.add_subscription('shellies/announce', 'dict', callback=self.on_mqtt_announce)
         # not all Gen1 devices answer to 'shellies/announce', so we need another subscription 'shellies/<shelly_id>/announce'
@@ -109,6 +114,7 @@ class Shelly(MqttPlugin):
         self.alive = True
 
         self.start_subscriptions()
+        self._publish_queue.start()
 
         # Gen1 & Gen2 API
         self.publish_topic('shellies/command', 'announce')
@@ -131,6 +137,7 @@ class Shelly(MqttPlugin):
 
         # stop subscription to all topics
         self.stop_subscriptions()
+        self._publish_queue.stop()
 
         return
 
@@ -148,6 +155,11 @@ class Shelly(MqttPlugin):
                         with the item, caller, source and dest as arguments and in case of the knx plugin the value
                         can be sent to the knx with a knx write function within the knx plugin.
         """
+        if self._publish_queue_item_path and item.property.path == self._publish_queue_item_path:
+            self.logger.debug(f"publish queue item {item.property.path} registered")
+            self._publish_queue.depth_item = item
+            return
+
         if not self.has_iattr(item.conf, 'shelly_id'):
             return
 
@@ -294,7 +306,11 @@ class Shelly(MqttPlugin):
         """
         self.logger.debug(f"update_item: {item.property.path}")
 
-        if self.alive and caller != self.get_shortname():
+        if caller == self.get_shortname():
+            # value has been received from the device
+            self._publish_queue.confirm(item)
+
+        elif self.alive:
             # code to execute if the plugin is not stopped
             # and only, if the item has not been changed by this this plugin:
             config_data = self.get_item_config(item)
@@ -311,10 +327,10 @@ class Shelly(MqttPlugin):
                 self.update_Gen1_from_item(item, config_data)
             elif config_data.get('gen', None) == '2':
                 # Handle Gen2 device
-                self.request_gen2_switch(config_data['shelly_id'], config_data['shelly_group'], item())
+                self.request_gen2_switch(config_data['shelly_id'], config_data['shelly_group'], item(), item)
             elif config_data.get('gen', None) == '3':
                 # Handle Gen3 device (in the same way as for gen 2 devices)
-                self.request_gen2_switch(config_data['shelly_id'], config_data['shelly_group'], item())
+                self.request_gen2_switch(config_data['shelly_id'], config_data['shelly_group'], item(), item)
 
             else:
                 shelly_id = self.get_iattr_value(item.conf, 'shelly_id')
@@ -333,7 +349,7 @@ class Shelly(MqttPlugin):
             if not shelly_relay:
                 shelly_relay = '0'
             topic = 'shellies/' + shelly_type + '-' + shelly_id + '/relay/' + shelly_relay + '/command'
-            self.publish_topic(topic, item(), item, bool_values=['off', 'on'])
+            self._publish_queue.publish(topic, item(), item, bool_values=['off', 'on'])
 
 
         # handle new configuration mode for Gen1 device
@@ -343,7 +359,7 @@ class Shelly(MqttPlugin):
 
             if shelly_group.startswith('switch:'):
                 topic += '/relay/' + shelly_group.split(':')[1] + '/command'
-                self.publish_topic(topic, item(), bool_values=['off', 'on'])
+                self._publish_queue.publish(topic, item(), bool_values=['off', 'on'], for_item=item)
 
             elif shelly_group.startswith('color:') or shelly_group.startswith('white:') or shelly_group.startswith('light:'):
                 topic += '/' + shelly_group.split(':')[0] + '/' + shelly_group.split(':')[1]
@@ -352,13 +368,13 @@ class Shelly(MqttPlugin):
                     topic += '/command'
                     if self.gen1debug:
                         self.logger.info(f"update_Gen1_from_item: topic={topic} payload={['off', 'on'][item()]}")
-                    self.publish_topic(topic, item(), bool_values=['off', 'on'])
+                    self._publish_queue.publish(topic, item(), bool_values=['off', 'on'], for_item=item)
                 else:
                     topic += '/set'
                     payload = {shelly_attr: item()}
                     if self.gen1debug:
                         self.logger.info(f"update_Gen1_from_item: topic={topic} payload={payload}")
-                    self.publish_topic(topic, payload)
+                    self._publish_queue.publish(topic, payload, for_item=item)
 
             else:
                 self.logger.warning(f"update_Gen1_from_item: Output to group {shelly_group} is not supported")
@@ -932,16 +948,17 @@ class Shelly(MqttPlugin):
                 self.logger.info("handle_gen2_events: " + self.translate("Unbehandelte Event Nachricht") + f" param '{param}'= {params[param]}  ---  from {shelly_id}")
 
 
-    def send_gen2_request(self, shelly_id, payload):
+    def send_gen2_request(self, shelly_id, payload, item=None):
         """
         Send a request to a Gen2 device
         :param shelly_id:
         :param payload:
+        :param item: item the request is sent for (waiting requests for the same item are replaced)
 
         :return:
         """
         self.logger.dbgmed(f"send_gen2_request: topic={'shellies/gen2/' + shelly_id + '/rpc'} - payload={payload}")
-        self.publish_topic('shellies/gen2/' + shelly_id + '/rpc', payload)
+        self._publish_queue.publish('shellies/gen2/' + shelly_id + '/rpc', payload, for_item=item)
         return
 
 
@@ -960,13 +977,14 @@ class Shelly(MqttPlugin):
 
     from typing import Union
 
-    def request_gen2_switch(self, shelly_id: str, group: Union[int, str], onoff: bool):
+    def request_gen2_switch(self, shelly_id: str, group: Union[int, str], onoff: bool, item=None):
         """
         Request status information from a shelly Gen2 device
 
         :param shelly_id: Id of the shelly device
         :param switch: Switch number on the device
         :param onoff: New state
+        :param item: item the switch request is sent for
         """
         if group.split(':')[0] != 'switch':
             self.logger.error(f"request_gen2_switch: Unexpected shelly_group '{group}'")
@@ -974,7 +992,7 @@ class Shelly(MqttPlugin):
 
         switch = int(group.split(':')[1])
         payload = {'id': 4712, 'src': 'shellies/gen2/status', 'method': 'Switch.Set', "params": {"id": switch, "on": onoff}}
-        self.send_gen2_request(shelly_id, payload)
+        self.send_gen2_request(shelly_id, payload, item)
         return
 
 
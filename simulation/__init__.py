@@ -34,21 +34,25 @@
 #  0.5  Added feature to select which caller is written to the simulation file
 #  0.6  Added WebGUI and Clear Data File function
 #  0.7  Implemented new way of parameter handling (taken from plugin.yaml). Fixed IF statement for empty caller list
+#  1.6.0 Events are kept in a binary event store with one segment per day, the text file is imported
+#        on the first start and can be exported/imported by the web interface
 #
 ##########################################################################
 
 import logging
+import os
 from datetime import datetime, timedelta
 from lib.model.smartplugin import *
 from lib.shtime import Shtime
 from lib.module import Modules
 from lib.item import Items
 from lib.scheduler import Scheduler
+from .eventstore import EventStore
 
 
 class Simulation(SmartPlugin):
     ALLOW_MULTIINSTANCE = False
-    PLUGIN_VERSION = "1.5.1"
+    PLUGIN_VERSION = "1.6.0"
 
     def __init__(self, sh, *args, **kwargs):
         self.logger = logging.getLogger(__name__)
@@ -63,6 +67,8 @@ class Simulation(SmartPlugin):
         else:
             self._callers = self.get_parameter_value('callers')
         self._items = []
+        self._position = None
+        self._store = self._open_store()
         self.scheduler_add('midnight', self._midnight, cron='0 0 * *', prio=3)
 
         if not self.init_webinterface():
@@ -78,12 +84,25 @@ class Simulation(SmartPlugin):
 
     def stop(self):
         self.logger.info('Exit Simulation')
-        try:
-            self.file.close()
-        except:
-            self.logger.error('No file to close')
+        self._store.close()
         self.alive = False
 
+    # --------------------------------- _open_store ---------------------------------
+    # Opens the event store next to the data file. On the first start the events of
+    # the data file (text format of the releases up to 1.5) are imported.
+
+    def _open_store(self):
+        directory = self._datafile + '.store'
+        imported = os.path.isdir(directory)
+        store = EventStore(directory)
+        if not imported and os.path.isfile(self._datafile):
+            try:
+                count = store.import_text(self._datafile, self.logger)
+                self.logger.info('Imported {} events from {}'.format(count, self._datafile))
+            except IOError as error:
+                self.logger.error('Cannot import {}: {}'.format(self._datafile, error))
+        return store
+
     # --------------------------------- parse_item ----------------------------------
     def parse_item(self, item):
         if 'sim' in item.conf:
@@ -112,16 +131,12 @@ class Simulation(SmartPlugin):
     def update_item(self, item, caller=None, source=None, dest=None):
         if (item.conf['sim'] == 'track') and (self.state() == 2) and (self._callers is None or caller in self._callers):
             now = self.shtime.now()
-            day = now.day
-            self.file.write(now.strftime('%a;%H:%M:%S'))
-            self.file.write(';')
-            self.file.write(item.property.path)
-            self.file.write(';')
-            self.file.write('{}'.format(item()))
-            self.file.write(';')
-            self.file.write(caller)
-            self.file.write('\n')
-            self.file.flush()
+            try:
+                self._store.append(now.hour * 3600 + now.minute * 60 + now.second, now.strftime('%a'),
+                                   item.property.path, item(), caller)
+            except (IOError, ValueError) as error:
+                self.logger.error('Cannot write event to {}: {}'.format(self._store.directory, error))
+                return None
             self._message_item(
                 'Last event recorded: {}<br>{}   {}'.format(now.strftime('%H:%M:%S'), item.property.path, item(), 'Simulation'))
             return None
@@ -164,10 +179,8 @@ class Simulation(SmartPlugin):
         self._message_item('Recording', caller='Simulation')
         self.logger.debug('starting record')
         self.recording = True
-        try:
-            self.file = open(self._datafile, 'a')
-        except IOError as error:
-            self.logger.error('Cannot open file {} for writing: {}'.format(self._datafile, error))
+        if not os.access(self._store.directory, os.W_OK):
+            self.logger.error('Cannot write to {}'.format(self._store.directory))
             self._message_item('cannot write to file', 'Simulation')
             self.state(0, 'Simulation')
 
@@ -177,20 +190,17 @@ class Simulation(SmartPlugin):
         self.scheduler_remove('startrecord')
         self._message_item('', caller='Simulation')
         self.logger.debug('stop record')
-        try:
-            self.file.close()
-        except:
-            self.logger.error('Not running')
+        self._store.close()
 
     # ----------------------------- _start_playbacl ---------------------------------
     def _start_playback(self):
         self.state(4, 'Simulation')
         self.logger.debug('Starting playback')
+        self._store.close()
         try:
-            self.file = open(self._datafile, 'r')
-            self._wind_until_now()
-            self._set_item()
-        except IOError as error:
+            if self._wind_until_now():
+                self._set_item()
+        except (IOError, ValueError) as error:
             self.logger.error('NoFile {}'.format(error))
             self._message_item('No File', 'Simulation')
             self.state(0, 'Simulation')
@@ -201,10 +211,7 @@ class Simulation(SmartPlugin):
         self.logger.debug('Stopping playback')
         self.scheduler_remove('simulate')
         self._message_item('Playback stopped', 'Simulation')
-        try:
-            self.file.close()
-        except:
-            self.logger.error('No fileto close')
+        self._position = None
 
     # --------------------------------- _set_item -----------------------------------
     # Is called by the scheduler. Sets the item, reads the next event and
@@ -224,17 +231,14 @@ class Simulation(SmartPlugin):
                 item(value, caller='Simulation')
             except:
                 self.logger.error('Skipped unknown item: {}'.format(target))
-        entry = self.file.readline()
-        if entry in ['NextDay', 'NextDay\n']:
-            entry = self.file.readline()
-        if entry != '':
-            day = entry.split(';')[0]
-            time = entry.split(';')[1]
-            target = entry.split(';')[2]
-            value = entry.split(';')[3]
-            hour = int(time.split(':')[0])
-            minute = int(time.split(':')[1])
-            seconds = int(time.split(':')[2])
+        if self._position is not None:
+            event = self._store.event(self._position)
+            self._position = self._store.next_position(self._position)
+            day = event.day
+            time = event.time
+            target = event.item
+            value = event.value
+            hour, minute, seconds = event.seconds // 3600, event.seconds // 60 % 60, event.seconds % 60
             now = self.shtime.now()
             next = now.replace(hour=hour, minute=minute, second=seconds)
             dif = next - now
@@ -251,31 +255,17 @@ class Simulation(SmartPlugin):
             self.state(0, 'Simulation')
 
     # ------------------------------ windnuntil_now --------------------------------
-    # Reads the events from the file and skips until a time stamp is reached
-    # that is past the actual time
+    # Searches the first event with a time stamp that is past the actual time
 
     def _wind_until_now(self):
-        next = 0
-        now = 1
-        while next < now:
-            pos = self.file.tell()
-            entry = self.file.readline()
-            if entry == 'NextDay\n':
-                entry = self.file.readline()
-            if entry != '':
-                time = entry.split(';')[1]
-                hour = int(time.split(':')[0])
-                minute = int(time.split(':')[1])
-                seconds = int(time.split(':')[2])
-                now = self.shtime.now()
-                next = now.replace(hour=hour, minute=minute, second=seconds)
-                dif = next - now
-            else:
-                self.logger.info('End of file reached, simulation ended')
-                self._message_item('Simulation ended', 'Simulation')
-                self.state(0, 'Simulation')
-                return None
-        self.file.seek(pos)
+        now = self.shtime.now()
+        self._position = self._store.find(now.hour * 3600 + now.minute * 60 + now.second)
+        if self._position is None:
+            self.logger.info('End of file reached, simulation ended')
+            self._message_item('Simulation ended', 'Simulation')
+            self.state(0, 'Simulation')
+            return False
+        return True
 
     # -------------------------------- do_nothing ----------------------------------
     def _do_nothing(self):
@@ -288,8 +278,7 @@ class Simulation(SmartPlugin):
     def _midnight(self):
         self.logger.debug('Midnight')
         if self.state() == 2:
-            self.file.write('NextDay\n')
-            self.file.flush()
+            self._store.next_day()
             if self.tank() > 13:
                 self._remove_first_day()
             else:
@@ -297,59 +286,22 @@ class Simulation(SmartPlugin):
                 self.tank(tank + 1)
 
     # -------------------------------- _get_tank ----------------------------------
-    # Returns the number of days in the  event file
+    # Returns the number of days in the event store
 
     def _get_tank(self):
         self._lastentry = datetime.strptime('0:0:0', '%H:%M:%S')
-        try:
-            self.file = open(self._datafile, 'r')
-        except IOError as error:
-            self.logger.error('NoFile {}'.format(error))
-            return 0
-        entry = 'bla'
-        tank = 0;
-        while entry != '':
-            entry = self.file.readline()
-            if entry in ['NextDay', 'NextDay\n']:
-                tank = tank + 1
-            else:
-                if entry != '':
-                    self._lastentry = datetime.strptime(entry.split(';')[1], '%H:%M:%S')
-        self.file.close()
-        return tank
+        last = self._store.last_event()
+        if last is not None:
+            self._lastentry = datetime.strptime(last.time, '%H:%M:%S')
+        return self._store.days()
 
     # ------------------------------ _remove_first_day ------------------------------
-    # Removes the forst day from the event file. It is called when the
-    # 15th day is finioshed at midnight.
+    # Removes the first day from the event store. It is called when the
+    # 15th day is finished at midnight.
 
     def _remove_first_day(self):
         self.logger.debug('Remove Day')
-        self.file.close()
-        #        try:
-        self.file = open(self._datafile, 'r')
-        #        except IOError as error:
-        #        self.logger.error('NoFile {}'.format(error))
-        #        try:
-        self.tempfile = open('/tmp/simulation.tmp', 'w')
-        #        except IOError as error:
-        #        self.logger.error('Canot open tempfile: {}'.format(error))
-        entry = 'bla'
-        while (entry not in ['NextDay','NextDay\n']) and (entry != ''):
-            entry = self.file.readline()
-        while (entry != ''):
-            entry = self.file.readline()
-            self.tempfile.write(entry)
-        self.file.close()
-        self.tempfile.close()
-        self.tempfile = open('/tmp/simulation.tmp', 'r')
-        self.file = open(self._datafile, 'w')
-        entry = 'bla'
-        while (entry != ''):
-            entry = self.tempfile.readline()
-            self.file.write(entry)
-        self.file.close()
-        self.tempfile.close()
-        self.file = open(self._datafile, 'a')
+        self._store.remove_first_day()
 
     # state_selector state, control
     #                       (0,1): _remove_first_day,
@@ -372,13 +324,23 @@ class Simulation(SmartPlugin):
 
     def _clear_file(self):
         self.logger.debug('Clear File')
-        self.file.close()
-
-        self.file = open(self._datafile, 'w')
-        self.file.write('')
-        self.file.close()
+        if self.state() == 4:
+            self._stop_playback()
+        self._store.clear()
         self.tank(0)
 
+    def _export_file(self):
+        self.logger.debug('Export events to {}'.format(self._datafile))
+        self._store.export_text(self._datafile)
+
+    def _import_file(self):
+        self.logger.debug('Import events from {}'.format(self._datafile))
+        if self.state() == 4:
+            self._stop_playback()
+        count = self._store.import_text(self._datafile, self.logger)
+        self.tank(self._get_tank())
+        return count
+
     def init_webinterface(self):
         """"
         Initialize the web interface for this plugin
@@ -458,12 +420,15 @@ class WebInterface(SmartPluginWebIf):
             if len(self.plugin._datafile) > 0:
                 self.plugin._clear_file()
         elif cmd == 'show_data_file':
+            data_file_content = list(self.plugin._store.export_lines())
+        elif cmd == 'export_data_file':
             try:
-                file = open(self.plugin._datafile, 'r')
-
-                for line in file:
-                    data_file_content.append(line)
-                file.close()
+                self.plugin._export_file()
+            except IOError as error:
+                self.logger.error('Cannot export to {}: {}'.format(self.plugin._datafile, error))
+        elif cmd == 'import_data_file':
+            try:
+                self.plugin._import_file()
             except IOError as error:
                 self.logger.error('NoFile {}'.format(error))
 
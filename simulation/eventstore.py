@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+# Copyright 2013 KNX-User-Forum e.V.            http://knx-user-forum.de/
+#########################################################################
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#  Binary event store of the simulation plugin
+#
+#  The events are stored in a directory with one segment file per day. The segments are
+#  numbered, a new one is started at midnight (the 'NextDay' line of the text format) and
+#  the oldest day is removed by deleting its segment. Every event is a fixed size record:
+#
+#    seconds of the day  uint32
+#    day                 uint16  symbol id of the weekday name ('%a', as in the text format)
+#    item                uint16  symbol id of the item path
+#    caller              uint16  symbol id of the caller
+#    type                uint8   VALUE_INT, VALUE_FLOAT, VALUE_BOOL or VALUE_STR
+#    value               float64 value, 0/1 for bool, symbol id for str
+#
+#  The strings are kept in the file 'symbols', one per line, the line number is the id.
+#  The ids used by a day are written to '<segment>.sym' (uint16 each) when the day is
+#  completed, so the store knows for every symbol the number of days using it without
+#  reading the events. When removing the oldest day releases symbols, the highest ids still
+#  in use are moved into the released ones. Only the days using a moved id are rewritten and
+#  the table doesn't fill up over time.
+#  Because of the fixed record size the events of a day can be read from a memory map and
+#  the position of a time is found by bisection.
+#
+##########################################################################
+
+import bisect
+import collections
+import mmap
+import os
+import re
+import struct
+import threading
+
+HEADER = struct.Struct('<4sH')
+RECORD = struct.Struct('<IHHHBd')
+SYMBOL_ID = struct.Struct('<H')
+MAGIC = b'SIMD'
+VERSION = 1
+
+VALUE_INT = 0
+VALUE_FLOAT = 1
+VALUE_BOOL = 2
+VALUE_STR = 3
+
+SYMBOLS = 'symbols'
+COMPACT_LIMIT = 0xF000          # size of the symbol table from which unused symbols are always dropped
+SEGMENT = re.compile(r'^(\d{8})\.day$')
+
+
+class Event(object):
+    """
+    Event as read from the store
+    """
+    __slots__ = ('seconds', 'day', 'item', 'value', 'caller')
+
+    def __init__(self, seconds, day, item, value, caller):
+        self.seconds = seconds
+        self.day = day
+        self.item = item
+        self.value = value
+        self.caller = caller
+
+    @property
+    def time(self):
+        return '{:02d}:{:02d}:{:02d}'.format(self.seconds // 3600, self.seconds // 60 % 60, self.seconds % 60)
+
+    def text(self):
+        """
+        :return: the event as line of the text format
+        """
+        return '{};{};{};{};{}\n'.format(self.day, self.time, self.item, self.value, self.caller)
+
+
+class Segment(object):
+    """
+    Events of one day, read through a memory map
+    """
+
+    def __init__(self, number, filename):
+        self.number = number
+        self.filename = filename
+        self.symbols = set()        # ids of the symbols used by the events
+        self._file = None
+        self._map = None
+        self._size = None
+
+    def __len__(self):
+        self._open()
+        return self._size
+
+    def _open(self):
+        if self._size is not None:
+            return
+        size = os.path.getsize(self.filename)
+        count = max(size - HEADER.size, 0) // RECORD.size
+        if count:
+            self._file = open(self.filename, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._size = count
+
+    def record(self, index):
+        self._open()
+        return RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+
+    def records(self):
+        """
+        :return: iterator of all records
+        """
+        self._open()
+        if not self._size:
+            return iter(())
+        return RECORD.iter_unpack(self._map[HEADER.size:HEADER.size + self._size * RECORD.size])
+
+    def seconds(self, index):
+        self._open()
+        return struct.unpack_from('<I', self._map, HEADER.size + index * RECORD.size)[0]
+
+    def find(self, seconds):
+        """
+        :return: index of the first event at or after seconds of the day
+        """
+        return bisect.bisect_left(_Seconds(self), seconds)
+
+    @property
+    def symbols_file(self):
+        return self.filename[:-len('.day')] + '.sym'
+
+    def scan_symbols(self):
+        """
+        :return: ids of the symbols used by the events, read from the events
+        """
+        symbols = set()
+        for seconds, day, item, caller, kind, value in self.records():
+            symbols.update((day, item, caller))
+            if kind == VALUE_STR:
+                symbols.add(int(value))
+        return symbols
+
+    def load_symbols(self):
+        """
+        reads the ids of the symbols from the symbols file of the segment, the events are read if it is missing
+        """
+        try:
+            with open(self.symbols_file, 'rb') as f:
+                data = f.read()
+            self.symbols = set(struct.unpack('<{}H'.format(len(data) // SYMBOL_ID.size), data))
+        except OSError:
+            self.symbols = self.scan_symbols()
+            self.save_symbols()
+
+    def write_symbols(self):
+        """
+        writes the ids of the symbols to a temporary file
+
+        :return: tuple (temporary file, symbols file of the segment)
+        """
+        with open(self.symbols_file + '.tmp', 'wb') as f:
+            f.write(struct.pack('<{}H'.format(len(self.symbols)), *sorted(self.symbols)))
+        return self.symbols_file + '.tmp', self.symbols_file
+
+    def save_symbols(self):
+        os.replace(*self.write_symbols())
+
+    def remove(self):
+        self.close()
+        os.remove(self.filename)
+        if os.path.exists(self.symbols_file):
+            os.remove(self.symbols_file)
+
+    def close(self):
+        """
+        releases the memory map, it is mapped again on the next read (e.g. after events were appended)
+        """
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = None
+        self._file = None
+        self._size = None
+
+
+class _Seconds(object):
+    """
+    sequence view of the times of a segment for bisect
+    """
+
+    def __init__(self, segment):
+        self._segment = segment
+
+    def __len__(self):
+        return len(self._segment)
+
+    def __getitem__(self, index):
+        return self._segment.seconds(index)
+
+
+class EventStore(object):
+    """
+    Day segmented event store
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._symbols = []
+        self._symbol_ids = {}
+        self._refcounts = collections.Counter()     # symbol id -> number of segments using it
+        self._segments = []
+        self._writer = None
+        self._load()
+
+    # ------------------------------------ storage ------------------------------------
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        filename = os.path.join(self.directory, SYMBOLS)
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    symbol = line.rstrip('\n')
+                    self._symbol_ids.setdefault(symbol, len(self._symbols))
+                    self._symbols.append(symbol)
+        numbers = sorted(int(match.group(1)) for match in map(SEGMENT.match, os.listdir(self.directory)) if match)
+        self._segments = [Segment(number, self._segment_file(number)) for number in numbers]
+        for segment in self._segments[:-1]:
+            segment.load_symbols()
+        if self._segments:
+            # the current day is still written, its symbols file is written at the end of the day
+            self._segments[-1].symbols = self._segments[-1].scan_symbols()
+        for segment in self._segments:
+            self._refcounts.update(segment.symbols)
+
+    def _segment_file(self, number):
+        return os.path.join(self.directory, '{:08d}.day'.format(number))
+
+    def _symbol(self, text):
+        text = str(text).replace('\n', ' ')
+        symbol = self._symbol_ids.get(text)
+        if symbol is None:
+            symbol = len(self._symbols)
+            if symbol > 0xFFFF:
+                raise ValueError('Too many different items, callers and values in event store')
+            with open(os.path.join(self.directory, SYMBOLS), 'a', encoding='utf-8') as f:
+                f.write(text + '\n')
+            self._symbols.append(text)
+            self._symbol_ids[text] = symbol
+        return symbol
+
+    def _new_segment(self):
+        number = self._segments[-1].number + 1 if self._segments else 0
+        filename = self._segment_file(number)
+        with open(filename, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION))
+        self._segments.append(Segment(number, filename))
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def close(self):
+        with self._lock:
+            self._close_writer()
+            for segment in self._segments:
+                segment.close()
+
+    # ------------------------------------ writing ------------------------------------
+
+    def _encode(self, value):
+        if isinstance(value, bool):
+            return VALUE_BOOL, float(value)
+        if isinstance(value, int) and abs(value) < 2 ** 53:
+            return VALUE_INT, float(value)
+        if isinstance(value, float):
+            return VALUE_FLOAT, value
+        return VALUE_STR, float(self._symbol(value))
+
+    def _decode(self, kind, value):
+        if kind == VALUE_BOOL:
+            return bool(value)
+        if kind == VALUE_INT:
+            return int(value)
+        if kind == VALUE_FLOAT:
+            return value
+        return self._symbols[int(value)]
+
+    def _record(self, segment, seconds, day, item, value, caller):
+        kind, number = self._encode(value)
+        symbols = (self._symbol(day), self._symbol(item), self._symbol(caller))
+        self._use(segment, symbols + (int(number),) if kind == VALUE_STR else symbols)
+        return RECORD.pack(seconds, *symbols, kind, number)
+
+    def _use(self, segment, symbols):
+        for symbol in symbols:
+            if symbol not in segment.symbols:
+                segment.symbols.add(symbol)
+                self._refcounts[symbol] += 1
+
+    def append(self, seconds, day, item, value, caller):
+        """
+        Appends an event to the current day
+
+        :param seconds: seconds of the day
+        :param day: name of the weekday
+        :param item: path of the item
+        :param value: value of the item
+        :param caller: caller of the item change
+        """
+        with self._lock:
+            if not self._segments:
+                self._new_segment()
+            segment = self._segments[-1]
+            record = self._record(segment, seconds, day, item, value, caller)
+            if self._writer is None:
+                self._writer = open(segment.filename, 'ab')
+            self._writer.write(record)
+            self._writer.flush()
+            segment.close()
+
+    def next_day(self):
+        """
+        Starts a new day
+        """
+        with self._lock:
+            self._close_writer()
+            if not self._segments:
+                self._new_segment()
+            self._segments[-1].save_symbols()
+            self._new_segment()
+
+    def remove_first_day(self):
+        """
+        Removes the oldest day
+        """
+        with self._lock:
+            if len(self._segments) < 2:
+                return
+            self._close_writer()
+            segment = self._segments.pop(0)
+            segment.remove()
+            released = False
+            for symbol in segment.symbols:
+                self._refcounts[symbol] -= 1
+                if not self._refcounts[symbol]:
+                    del self._refcounts[symbol]
+                    released = True
+            if released or (len(self._symbols) > COMPACT_LIMIT and len(self._refcounts) < len(self._symbols)):
+                self._compact()
+
+    def _compact(self):
+        """
+        Drops the symbols not used by the events of the store
+
+        The highest ids still in use are moved into the unused ones, so the ids stay below the
+        number of used symbols. Only the segments using a moved id are rewritten. The rewritten
+        segments and the new symbol table are written to temporary files first and replace the
+        old files afterwards.
+        """
+        count = len(self._refcounts)
+        free = (number for number in range(count) if number not in self._refcounts)
+        moved = {number: next(free) for number in range(count, len(self._symbols)) if number in self._refcounts}
+        symbols = self._symbols[:count]
+        for number, new in moved.items():
+            symbols[new] = self._symbols[number]
+
+        replace = []
+        for segment in self._segments:
+            if segment.symbols.isdisjoint(moved):
+                continue
+            filename = segment.filename + '.tmp'
+            with open(filename, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION))
+                records = []
+                for seconds, day, item, caller, kind, value in segment.records():
+                    if kind == VALUE_STR:
+                        value = float(moved.get(int(value), int(value)))
+                    records.append(RECORD.pack(seconds, moved.get(day, day), moved.get(item, item),
+                                               moved.get(caller, caller), kind, value))
+                f.write(b''.join(records))
+            replace.append((filename, segment.filename))
+            segment.close()
+            segment.symbols = {moved.get(symbol, symbol) for symbol in segment.symbols}
+            if segment is not self._segments[-1]:
+                replace.append(segment.write_symbols())
+        filename = os.path.join(self.directory, SYMBOLS)
+        with open(filename + '.tmp', 'w', encoding='utf-8') as f:
+            f.writelines(symbol + '\n' for symbol in symbols)
+        replace.append((filename + '.tmp', filename))
+        for source, target in replace:
+            os.replace(source, target)
+
+        self._refcounts = collections.Counter({moved.get(symbol, symbol): refs for symbol, refs in self._refcounts.items()})
+        self._symbols = symbols
+        self._symbol_ids = {}
+        for number, symbol in enumerate(symbols):
+            self._symbol_ids.setdefault(symbol, number)
+
+    def clear(self):
+        with self._lock:
+            self._close_writer()
+            for segment in self._segments:
+                segment.remove()
+            self._segments = []
+            self._symbols = []
+            self._symbol_ids = {}
+            self._refcounts = collections.Counter()
+            open(os.path.join(self.directory, SYMBOLS), 'w').close()
+
+    # ------------------------------------ reading ------------------------------------
+
+    def days(self):
+        """
+        :return: number of completed days (number of 'NextDay' lines of the text format)
+        """
+        return max(len(self._segments) - 1, 0)
+
+    def event(self, position):
+        """
+        :param position: tuple (segment index, event index)
+        :return: the event
+        """
+        seconds, day, item, caller, kind, value = self._segments[position[0]].record(position[1])
+        symbols = self._symbols
+        return Event(seconds, symbols[day], symbols[item], self._decode(kind, value), symbols[caller])
+
+    def last_event(self):
+        """
+        :return: last recorded event, None if the store is empty
+        """
+        with self._lock:
+            for index in range(len(self._segments) - 1, -1, -1):
+                count = len(self._segments[index])
+                if count:
+                    return self.event((index, count - 1))
+        return None
+
+    def next_position(self, position):
+        """
+        :return: position of the event following position, None at the end of the store
+        """
+        segment, index = position
+        index += 1
+        while segment < len(self._segments):
+            if index < len(self._segments[segment]):
+                return segment, index
+            segment += 1
+            index = 0
+        return None
+
+    def find(self, seconds):
+        """
+        :return: position of the first event of the store at or after seconds of the day, None if
+                 there is none
+        """
+        with self._lock:
+            for index, segment in enumerate(self._segments):
+                count = len(segment)
+                if count and segment.seconds(count - 1) >= seconds:
+                    return index, segment.find(seconds)
+        return None
+
+    def events(self):
+        """
+        :return: generator of all events, None between the days
+        """
+        for index in range(len(self._segments)):
+            if index > 0:
+                yield None
+            for event in range(len(self._segments[index])):
+                yield self.event((index, event))
+
+    # --------------------------------- text format ----------------------------------
+
+    def export_lines(self):
+        """
+        :return: generator of the lines of the text format
+        """
+        for event in self.events():
+            yield 'NextDay\n' if event is None else event.text()
+
+    def export_text(self, filename):
+        with open(filename, 'w') as f:
+            f.writelines(self.export_lines())
+
+    @staticmethod
+    def _parse_value(text):
+        if text in ('True', 'False'):
+            return text == 'True'
+        try:
+            if str(int(text)) == text:
+                return int(text)
+        except ValueError:
+            pass
+        try:
+            if repr(float(text)) == text:
+                return float(text)
+        except ValueError:
+            pass
+        return text
+
+    def import_text(self, filename, logger=None):
+        """
+        Replaces the events of the store by the events of a file in the text format
+
+        :return: number of imported events
+        """
+        count = 0
+        with self._lock:
+            self.clear()
+            self._new_segment()
+            writer = open(self._segments[-1].filename, 'ab')
+            try:
+                with open(filename, 'r') as f:
+                    for line in f:
+                        line = line.rstrip('\n')
+                        if line == 'NextDay':
+                            writer.close()
+                            self._segments[-1].save_symbols()
+                            self._new_segment()
+                            writer = open(self._segments[-1].filename, 'ab')
+                            continue
+                        fields = line.split(';')
+                        try:
+                            hour, minute, second = (int(part) for part in fields[1].split(':'))
+                            writer.write(self._record(self._segments[-1], hour * 3600 + minute * 60 + second, fields[0],
+                                                      fields[2], self._parse_value(fields[3]), fields[4] if len(fields) > 4 else ''))
+                            count += 1
+                        except (IndexError, ValueError) as e:
+                            if line and logger is not None:
+                                logger.warning('Skipping invalid line "{}" of {}: {}'.format(line, filename, e))
+            finally:
+                writer.close()
+            if len(self._segments) == 1 and not len(self._segments[0]):
+                self.clear()
+        return count
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+# Copyright 2013 KNX-User-Forum e.V.            http://knx-user-forum.de/
+#########################################################################
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#  Tests of the event store of the simulation plugin
+#
+##########################################################################
+
+import collections
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from plugins.simulation.eventstore import EventStore
+
+LINES = [
+    'Mon;06:30:00;EG.Flur.Licht;True;KNX\n',
+    'Mon;07:15:10;EG.Bad.Heizung;21.5;uzsu\n',
+    'Mon;22:00:00;EG.Wohnen.Szene;Abend;Visu\n',
+    'NextDay\n',
+    'Tue;06:30:05;EG.Flur.Licht;False;KNX\n',
+    'Tue;12:00:00;EG.Bad.Heizung;19;uzsu\n',
+    'NextDay\n',
+    'Wed;08:00:00;OG.Kind.Licht;True;Visu\n',
+]
+
+
+class TestEventStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = EventStore(os.path.join(self.directory, 'store'))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def import_lines(self, lines):
+        filename = os.path.join(self.directory, 'data.txt')
+        with open(filename, 'w') as f:
+            f.writelines(lines)
+        return self.store.import_text(filename)
+
+    def reopen(self):
+        self.store.close()
+        self.store = EventStore(self.store.directory)
+
+    def test_import_export(self):
+        self.assertEqual(self.import_lines(LINES), 6)
+        self.assertEqual(list(self.store.export_lines()), LINES)
+        self.assertEqual(self.store.days(), 2)
+        self.reopen()
+        self.assertEqual(list(self.store.export_lines()), LINES)
+
+    def test_value_types(self):
+        self.import_lines(LINES)
+        values = [event.value for event in self.store.events() if event is not None]
+        self.assertEqual(values, [True, 21.5, 'Abend', False, 19, True])
+        self.assertIs(values[0], True)
+        self.assertIsInstance(values[4], int)
+
+    def test_append(self):
+        self.store.append(3600, 'Mon', 'EG.Flur.Licht', True, 'KNX')
+        self.store.append(7200, 'Mon', 'EG.Flur.Licht', False, 'KNX')
+        self.store.next_day()
+        self.store.append(1800, 'Tue', 'EG.Flur.Licht', 'an', 'Visu')
+        self.assertEqual(self.store.days(), 1)
+        last = self.store.last_event()
+        self.assertEqual((last.day, last.time, last.item, last.value, last.caller),
+                         ('Tue', '00:30:00', 'EG.Flur.Licht', 'an', 'Visu'))
+        self.reopen()
+        self.assertEqual(self.store.last_event().value, 'an')
+
+    def test_find(self):
+        self.import_lines(LINES)
+        self.assertEqual(self.store.find(0), (0, 0))
+        self.assertEqual(self.store.find(7 * 3600), (0, 1))
+        self.assertEqual(self.store.find(23 * 3600), None)
+        position = self.store.find(22 * 3600)
+        self.assertEqual(self.store.event(position).value, 'Abend')
+        position = self.store.next_position(position)
+        self.assertEqual(position, (1, 0))
+        self.assertEqual(self.store.next_position((2, 0)), None)
+
+    def test_remove_first_day(self):
+        self.import_lines(LINES)
+        self.store.remove_first_day()
+        self.assertEqual(list(self.store.export_lines()), LINES[4:])
+        # symbols used only by the removed day are dropped
+        self.assertNotIn('Abend', self.store._symbols)
+        self.assertNotIn('EG.Wohnen.Szene', self.store._symbols)
+        self.reopen()
+        self.assertEqual(list(self.store.export_lines()), LINES[4:])
+        self.store.append(60, 'Wed', 'EG.Wohnen.Szene', 'Nacht', 'Visu')
+        self.assertEqual(self.store.last_event().text(), 'Wed;00:01:00;EG.Wohnen.Szene;Nacht;Visu\n')
+
+    def test_symbols_compacted(self):
+        # more different strings over all days than fit into the symbol table, but not at a time
+        per_day = 30000
+        for day in range(4):
+            for number in range(per_day):
+                self.store.append(number, 'Mon', 'EG.Text', 'value {} {}'.format(day, number), 'Visu')
+            self.store.next_day()
+            if day >= 1:
+                self.store.remove_first_day()
+            self.assertLessEqual(len(self.store._symbols), per_day + 3)
+        self.reopen()
+        events = [event for event in self.store.events() if event is not None]
+        self.assertEqual(len(events), per_day)
+        self.assertEqual(events[0].value, 'value 3 0')
+        self.assertEqual(events[-1].value, 'value 3 {}'.format(per_day - 1))
+
+    def assertSymbolsConsistent(self):
+        # the symbol ids of the segments and the reference counts match the events
+        refcounts = collections.Counter()
+        for segment in self.store._segments:
+            self.assertEqual(segment.symbols, segment.scan_symbols())
+            refcounts.update(segment.symbols)
+        self.assertEqual(self.store._refcounts, refcounts)
+        self.assertEqual(len(self.store._symbols), len(refcounts))
+
+    def test_symbol_files(self):
+        self.import_lines(LINES)
+        segments = self.store._segments
+        self.assertTrue(all(os.path.exists(segment.symbols_file) for segment in segments[:-1]))
+        self.assertFalse(os.path.exists(segments[-1].symbols_file))
+        self.assertSymbolsConsistent()
+        # a missing symbols file is rebuilt from the events
+        os.remove(segments[0].symbols_file)
+        self.reopen()
+        self.assertTrue(os.path.exists(self.store._segments[0].symbols_file))
+        self.assertSymbolsConsistent()
+        self.store.next_day()
+        self.assertTrue(os.path.exists(self.store._segments[-2].symbols_file))
+        self.store.remove_first_day()
+        self.assertFalse(os.path.exists(segments[0].symbols_file))
+
+    def test_remove_without_released_symbols(self):
+        # the symbols of the removed day are still used, nothing is rewritten
+        self.import_lines(LINES[4:] + ['NextDay\n'] + LINES[4:])
+        with mock.patch.object(EventStore, '_compact') as compact:
+            self.store.remove_first_day()
+        compact.assert_not_called()
+        self.assertEqual(list(self.store.export_lines()), LINES[7:] + ['NextDay\n'] + LINES[4:])
+
+    def test_rotation(self):
+        # recording with days of new and recurring strings, only the segments using moved ids are rewritten
+        generator = random.Random(4)
+        days = []
+        for day in range(12):
+            lines = []
+            for number in range(200):
+                value = generator.choice([generator.random(), generator.randint(0, 5), True,
+                                          'Szene {}'.format(generator.randint(0, 20)), 'Text {} {}'.format(day, number)])
+                caller = generator.choice(['KNX', 'Visu', 'Caller {}'.format(day)])
+                line = (number * 60, 'Mon', 'EG.Item{}'.format(generator.randint(0, 30)), value, caller)
+                self.store.append(*line)
+                lines.append('Mon;{:02d}:{:02d}:00;{};{};{}\n'.format(number // 60, number % 60, line[2], value, caller))
+            days.append(lines)
+            self.store.next_day()
+            if len(days) > 5:
+                days.pop(0)
+                self.store.remove_first_day()
+                self.assertSymbolsConsistent()
+        self.assertEqual(list(self.store.export_lines()), [line for lines in days for line in lines + ['NextDay\n']])
+        self.reopen()
+        self.assertSymbolsConsistent()
+        self.assertEqual(list(self.store.export_lines()), [line for lines in days for line in lines + ['NextDay\n']])
+
+    def test_clear(self):
+        self.import_lines(LINES)
+        self.store.clear()
+        self.assertEqual(list(self.store.events()), [])
+        self.assertIsNone(self.store.last_event())
+        self.assertEqual(self.store._symbols, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,7 +38,6 @@ import requests
 from requests.utils import quote
 from collections import OrderedDict
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from queue import Empty
 from urllib.parse import unquote
 
 from . import utils
@@ -47,7 +46,6 @@ from .soco import *
 from .soco.exceptions import SoCoUPnPException
 from .soco.music_services import MusicService
 from .soco.data_structures import to_didl_string, DidlItem, DidlMusicTrack
-from .soco.events import event_listener
 from .soco.music_services.data_structures import get_class
 from .soco.snapshot import Snapshot
 from .soco.xml import XML
@@ -55,11 +53,12 @@ from .soco.plugins.sharelink import ShareLinkPlugin
 
 import xmltodict
 from tinytag import TinyTag
-from gtts import gTTS
 
 from lib.model.smartplugin import SmartPlugin
 from lib.item import Items
 
+from .listener import event_listener
+from .tts_cache import TTSCache
 from .webif import WebInterface
 
 _create_speaker_lock = threading.Lock()                         # make speaker object creation thread-safe
@@ -179,139 +178,49 @@ class SimpleHttpServer:
         self.waitForThread()
 
 
-def renew_error_callback(exception):  # events_twisted: failure
-    msg = f'Error received on autorenew: {exception}'
-    # Redundant, as the exception will be logged by the events module
-    self.logger.error(msg)
-
-    # ToDo possible improvement: Do not do periodic renew but do proper disposal on renew failure here instead. sub.renew(requested_timeout=10)
+class SubscriptionHandler(object):
+    """
+    Subscription of one service of a speaker
 
+    The events are received by the central event listener and passed to the endpoint by its
+    dispatcher thread, there is no thread per subscription. The event listener renews the
+    subscription until unsubscribe() is called.
+    """
 
-class SubscriptionHandler(object):
-    def __init__(self, endpoint, service, logger, threadName):
+    def __init__(self, endpoint, service, logger, name):
         self._lock = threading.Lock()
-        self._thread = None
         self._service = service
         self._endpoint = endpoint
         self._event = None
-        self._signal = threading.Event()
         self.logger = logger
-        self._threadName = threadName
+        self.name = name
+        self.active = False             # subscription requested and not unsubscribed
+        self.event_count = 0
+        self.last_event = None
 
     def subscribe(self):
-        self.logger.dbglow(f"start subscribe for endpoint {self._endpoint}")
-        if 'eventAvTransport' in self._threadName:
-            self.logger.dbghigh(f"subscribe(): endpoint av event detected. Enabling debugging logs")
-            debug = 1
-        else:
-            debug = 0
-
-        if debug:
-            self.logger.dbghigh(f"subscribe(): start for endpoint {self._endpoint}")
-
+        self.logger.dbglow(f"subscribe(): start for {self.name}")
         with self._lock:
-            if debug:
-                self.logger.dbghigh(f"subscribe(): clearing signal Event for endpoint {self._endpoint}")
-            self._signal.clear()
-            
-            # Check if signal was cleared correctly:
-            if self._signal.is_set():
-                self.logger.error(f"subscribe(): Event could not be cleared correctly for service {self._service}")
-            else:
-                self.logger.dbghigh(f"subscribe(): Event cleared successfully. Thread can be started for service {self._service}")
-
-            try:
-                self._event = self._service.subscribe(auto_renew=False)
-                # No benefits of automatic renew could be observed. 
-                # self._event = self._service.subscribe(auto_renew=True)
-
-            except Exception as e:
-                self.logger.error(f"Exception in subscribe(): {e}")
-            if self._event:
-                if debug:
-                    self.logger.dbghigh(f"subscribe(): event valid, starting new thread for endpoint {self._endpoint}")
-
-                try:
-                    self._event.auto_renew_fail = renew_error_callback
-                    self._thread = threading.Thread(target=self._endpoint, name=self._threadName, args=(self,))
-                    self._thread.setDaemon(True)
-                    self._thread.start()
-                    self.logger.debug(f"start subscribe finished successfully")
-                    if not self._thread.is_alive(): 
-                        self.logger.error("Critical error in subscribe method: Thread could not be startet and is not alive.")
-                    else:
-                        if debug:
-                            self.logger.dbghigh(f"Debug subscribe: Thread startet successfully for service {self._service}")
-
-                except Exception as e:
-                    self.logger.error(f"Exception in subscribe() at point b: {e}")
-
-            else:
-                self.logger.error(f"subscribe(): Error in subscribe for endpoint {self._endpoint}: self._event not valid")
-        if debug:
-            self.logger.dbghigh(f"subscribe() {self._endpoint}: lock released. Self._service is {self._service}")
+            self.active = True
+            if not event_listener.subscribe(self):
+                self.logger.error(f"subscribe(): Error in subscribe for {self.name}, subscription will be retried by the event listener")
 
     def unsubscribe(self):
-        self.logger.dbglow(f"unsubscribe(): start for endpoint {self._endpoint}")
-        if 'eventAvTransport' in self._threadName:
-            self.logger.dbghigh(f"unsubscribe: endpoint av event detected. Enabling debugging logs")
-            debug = 1
-        else:
-            debug = 0
-        if debug:
-            self.logger.dbghigh(f"unsubscribe(): start for endpoint {self._endpoint}")
-
+        self.logger.dbglow(f"unsubscribe(): start for {self.name}")
         with self._lock:
-            if self._event:
-                # try to unsubscribe first
-                try:
-                    self._event.unsubscribe()
-                    self.logger.info(f"Event {self._endpoint} unsubscribed")
-                except Exception as e:
-                    self.logger.warning(f"Exception in unsubscribe(): {e}")
-            else:
-                if debug: 
-                    self.logger.warning(f"unsubscribe(): Endpoint: {self._endpoint}, Thread: {self._threadName}, self._event not valid")
-            
-            self._signal.set()
-            if self._thread:
-                self.logger.dbglow("Preparing to terminate thread")
-                if debug:
-                    self.logger.dbghigh(f"unsubscribe(): Preparing to terminate thread for endpoint {self._endpoint}")
-                self._thread.join(timeout=4)
-                if debug:
-                    self.logger.dbghigh(f"unsubscribe(): Thread joined for endpoint {self._endpoint}")
-
-                if not self._thread.is_alive(): 
-                    self.logger.dbglow("Thread killed for endpoint {self._endpoint}")
-                    if debug:
-                        self.logger.dbghigh(f"Thread killed for endpoint {self._endpoint}")
-                else:
-                    self.logger.warning("unsubscribe(): Error, thread is still alive after termination (join timed-out)")
-                self._thread = None
-                self.logger.info(f"Event {self._endpoint} thread terminated")
+            self.active = False
+            subscribed = self._event is not None
+            event_listener.unsubscribe(self)
+            if subscribed:
+                self.logger.info(f"Event {self.name} unsubscribed")
 
-                if debug:
-                    self.logger.dbghigh(f"unsubscribe(): Event {self._endpoint} unsubscribed and thread terminated")
-            
-        if debug:
-            self.logger.dbghigh(f"unsubscribe(): {self._endpoint}: lock released")
-
-    @property
-    def eventSignalIsSet(self):
-        if self._signal:
-            return self._signal.is_set()
-        return False
-
-    @property
-    def subscriptionThreadIsActive(self):
-        if self._thread:
-            return self._thread.is_alive()
-        return False
-
-    @property
-    def signal(self):
-        return self._signal
+    def dispatch(self, event):
+        """
+        Called by the dispatcher thread of the event listener for every received event
+        """
+        self.event_count += 1
+        self.last_event = time.time()
+        self._endpoint(event)
 
     @property
     def service(self):
@@ -321,12 +230,22 @@ class SubscriptionHandler(object):
     def event(self):
         return self._event
 
+    @event.setter
+    def event(self, value):
+        self._event = value
+
     @property
     def is_subscribed(self):
         if self._event:
             return self._event.is_subscribed
         return False
 
+    @property
+    def time_left(self):
+        if self._event:
+            return int(self._event.time_left)
+        return 0
+
 
 class Speaker(object):
     def __init__(self, uid, logger, plugin_shortname):
@@ -442,25 +361,29 @@ class Speaker(object):
             self.household_id = self.soco.household_id
 
             # self.logger.debug(f"uid: {self.uid}: soco set to {value}")
+            if self._events:
+                # subscriptions of the previous soco object would be renewed forever
+                for subscription in self._events:
+                    subscription.unsubscribe()
             if self._soco:
                 self.render_subscription = \
                     SubscriptionHandler(endpoint=self._rendering_control_event, service=self._soco.renderingControl,
-                                        logger=self.logger, threadName=f"sonos_{self.uid}_eventRenderingControl")
+                                        logger=self.logger, name=f"sonos_{self.uid}_eventRenderingControl")
                 self.av_subscription = \
                     SubscriptionHandler(endpoint=self._av_transport_event, service=self._soco.avTransport,
-                                        logger=self.logger, threadName=f"sonos_{self.uid}_eventAvTransport")
+                                        logger=self.logger, name=f"sonos_{self.uid}_eventAvTransport")
                 self.system_subscription = \
                     SubscriptionHandler(endpoint=self._system_properties_event, service=self._soco.systemProperties,
-                                        logger=self.logger, threadName=f"sonos_{self.uid}_eventSystemProperties")
+                                        logger=self.logger, name=f"sonos_{self.uid}_eventSystemProperties")
                 self.zone_subscription = \
                     SubscriptionHandler(endpoint=self._zone_topology_event, service=self._soco.zoneGroupTopology,
-                                        logger=self.logger, threadName=f"sonos_{self.uid}_eventZoneTopology")
+                                        logger=self.logger, name=f"sonos_{self.uid}_eventZoneTopology")
                 self.alarm_subscription = \
                     SubscriptionHandler(endpoint=self._alarm_event, service=self._soco.alarmClock,
-                                        logger=self.logger, threadName=f"sonos_{self.uid}_eventAlarmEvent")
+                                        logger=self.logger, name=f"sonos_{self.uid}_eventAlarmEvent")
                 self.device_subscription = \
                     SubscriptionHandler(endpoint=self._device_properties_event, service=self._soco.deviceProperties,
-                                        logger=self.logger, threadName=f"sonos_{self.uid}_eventDeviceProperties")
+                                        logger=self.logger, name=f"sonos_{self.uid}_eventDeviceProperties")
 
                 # just to have a list for disposing all events
                 self._events = [
@@ -533,328 +456,253 @@ class Speaker(object):
         self.favorite_radio_stations()
 
     def check_subscriptions(self) -> None:
-
+        """
+        Subscribes the requested subscriptions that are not subscribed, e.g. after the speaker was offline.
+        Renewal of the subscriptions is done by the event listener.
+        """
         self.logger.debug("Start check_subscriptions fct")
+        if not self._events:
+            return
 
-        self.zone_subscription.unsubscribe()
-        self.zone_subscription.subscribe()
-
-        self.system_subscription.unsubscribe()
-        self.system_subscription.subscribe()
-
-        self.alarm_subscription.unsubscribe()
-        self.alarm_subscription.subscribe()
-
-        self.render_subscription.unsubscribe()
-        self.render_subscription.subscribe()
-
-        self.av_subscription.unsubscribe()
-        self.av_subscription.subscribe()
-
-        # sometimes a discover fails --> coordinator is empty --> resubscribe zone topology event
-        self.zone_subscription.unsubscribe()
-        self.zone_subscription.subscribe()
+        for subscription in self._events:
+            if subscription.active and not subscription.is_subscribed:
+                subscription.subscribe()
 
         self.logger.debug(f"{self.uid}: Event subscriptions done")
 
     # Event Handler routines ###########################################################################################
 
-    def _rendering_control_event(self, sub_handler: SubscriptionHandler) -> None:
+    def _rendering_control_event(self, event) -> None:
         """
         Rendering Control event handling
-        :param sub_handler: SubscriptionHandler for the rendering control event
+        :param event: received event
         """
         try:
-            self.logger.debug(f"{self.uid}: rendering control event handler active")
-            while not sub_handler.signal.wait(1):
-                try:
-                    event = sub_handler.event.events.get(timeout=0.5)
-                    if 'mute' in event.variables:
-                        self.mute = int(event.variables['mute']['Master'])
-                    if 'volume' in event.variables:
-                        volume = int(event.variables['volume']['Master'])
-                        self.volume = volume
-                    if 'bass' in event.variables:
-                        self.bass = int(event.variables['bass'])
-                    if 'loudness' in event.variables:
-                        self.loudness = int(event.variables['loudness']['Master'])
-                    if 'night_mode' in event.variables:
-                        self.night_mode = event.variables['night_mode']
-                    if 'dialog_mode' in event.variables:
-                        self.dialog_mode = event.variables['dialog_mode']
-                    self.logger.debug(f"rendering_control_event: {self.uid}: event variables: {event.variables}")
-                    sub_handler.event.events.task_done()
-                    del event
-                except Empty:
-                    pass
+            if 'mute' in event.variables:
+                self.mute = int(event.variables['mute']['Master'])
+            if 'volume' in event.variables:
+                volume = int(event.variables['volume']['Master'])
+                self.volume = volume
+            if 'bass' in event.variables:
+                self.bass = int(event.variables['bass'])
+            if 'loudness' in event.variables:
+                self.loudness = int(event.variables['loudness']['Master'])
+            if 'night_mode' in event.variables:
+                self.night_mode = event.variables['night_mode']
+            if 'dialog_mode' in event.variables:
+                self.dialog_mode = event.variables['dialog_mode']
+            self.logger.debug(f"rendering_control_event: {self.uid}: event variables: {event.variables}")
         except Exception as ex:
             self.logger.error(f"_rendering_control_event: Error {ex} occurred.")
 
-    def _alarm_event(self, sub_handler: SubscriptionHandler) -> None:
+    def _alarm_event(self, event) -> None:
         """
         AlarmClock event handling
-        :param sub_handler: SubscriptionHandler for the alarm event
+        :param event: received event
         """
-        try:
-            self.logger.debug(f"{self.uid}: alarm clock event handler active")
-            while not sub_handler.signal.wait(1):
-                try:
-                    event = sub_handler.event.events.get(timeout=0.5)
-                    # self.logger.debug(f"Sonos alarms: {self.uid}: event variables: {event.variables}")
-                    sub_handler.event.events.task_done()
-                    del event
-                except Empty:
-                    pass
-        except Exception as ex:
-            self.logger.error(f"_alarm_event: Error {ex} occurred.")
+        # self.logger.debug(f"Sonos alarms: {self.uid}: event variables: {event.variables}")
+        pass
 
-    def _system_properties_event(self, sub_handler: SubscriptionHandler) -> None:
+    def _system_properties_event(self, event) -> None:
         """
         System properties event handling
-        :param sub_handler: SubscriptionHandler for the system properties event
+        :param event: received event
         """
-        try:
-            self.logger.debug(f"{self.uid}: system properties event handler active")
-            while not sub_handler.signal.wait(1):
-                try:
-                    event = sub_handler.event.events.get(timeout=0.5)
-                    # self.logger.debug(f"Sonos props: {self.uid}: event variables: {event.variables}")
-                    sub_handler.event.events.task_done()
-                    del event
-                except Empty:
-                    pass
-        except Exception as ex:
-            self.logger.error(f"_system_properties_event: Error {ex} occurred.")
+        # self.logger.debug(f"Sonos props: {self.uid}: event variables: {event.variables}")
+        pass
 
-    def _device_properties_event(self, sub_handler: SubscriptionHandler) -> None:
+    def _device_properties_event(self, event) -> None:
         """
         Device properties event handling
-        :param sub_handler: SubscriptionHandler for the device properties event
+        :param event: received event
         """
         try:
-            self.logger.debug(f"{self.uid}: device properties event handler active")
-            while not sub_handler.signal.wait(1):
-                try:
-                    event = sub_handler.event.events.get(timeout=0.5)
-                    if 'zone_name' in event.variables:
-                        if event.variables['zone_name']:
-                            self.player_name = event.variables['zone_name']
-                        else:
-                            self.player_name = "unknown"
-                    sub_handler.event.events.task_done()
-                    del event
-                except Empty:
-                    pass
+            if 'zone_name' in event.variables:
+                if event.variables['zone_name']:
+                    self.player_name = event.variables['zone_name']
+                else:
+                    self.player_name = "unknown"
         except Exception as ex:
             self.logger.error(f"_device_properties_event: Error {ex} occurred.")
 
-    def _zone_topology_event(self, sub_handler: SubscriptionHandler) -> None:
+    def _zone_topology_event(self, event) -> None:
         """
         Zone topology event handling
-        :param sub_handler: SubscriptionHandler for the zone topology event
+        :param event: received event
         """
         try:
-            self.logger.debug(f"{self.uid}: topology event handler active")
-            while not sub_handler.signal.wait(1):
-                try:
-                    event = sub_handler.event.events.get(timeout=0.5)
-                    if 'zone_group_state' in event.variables:
-                        tree = XML.fromstring(event.variables['zone_group_state'].encode('utf-8'))
-                        # find group where our uid is located
-                        for group_element in tree.find('ZoneGroups').findall('ZoneGroup'):
-                            coordinator_uid = group_element.attrib['Coordinator'].lower()
-                            zone_group_member = []
-                            uid_found = False
-                            for member_element in group_element.findall('ZoneGroupMember'):
-                                member_uid = member_element.attrib['UUID'].lower()
-                                _initialize_speaker(member_uid, self.logger, self.plugin_shortname)
-                                zone_group_member.append(sonos_speaker[member_uid])
-                                if member_uid == self._uid:
-                                    uid_found = True
-                            if uid_found:
-                                # set coordinator
-                                self.coordinator = coordinator_uid
-                                if coordinator_uid == self._uid:
-                                    self.is_coordinator = True
-                                else:
-                                    self.is_coordinator = False
-                                # set member
-                                self._zone_group_members = zone_group_member
-
-                                # get some other properties
-                                self.status_light = self.get_status_light()
-                                self.buttons_enabled = self.get_buttons_enabled()
-                                self.sonos_playlists()
-                                self.sonos_favorites()
-                                self.favorite_radio_stations()
-
-                    sub_handler.event.events.task_done()
-                    del event
-                except Empty:
-                    pass
+            if 'zone_group_state' in event.variables:
+                tree = XML.fromstring(event.variables['zone_group_state'].encode('utf-8'))
+                # find group where our uid is located
+                for group_element in tree.find('ZoneGroups').findall('ZoneGroup'):
+                    coordinator_uid = group_element.attrib['Coordinator'].lower()
+                    zone_group_member = []
+                    uid_found = False
+                    for member_element in group_element.findall('ZoneGroupMember'):
+                        member_uid = member_element.attrib['UUID'].lower()
+                        _initialize_speaker(member_uid, self.logger, self.plugin_shortname)
+                        zone_group_member.append(sonos_speaker[member_uid])
+                        if member_uid == self._uid:
+                            uid_found = True
+                    if uid_found:
+                        # set coordinator
+                        self.coordinator = coordinator_uid
+                        if coordinator_uid == self._uid:
+                            self.is_coordinator = True
+                        else:
+                            self.is_coordinator = False
+                        # set member
+                        self._zone_group_members = zone_group_member
+
+                        # get some other properties
+                        self.status_light = self.get_status_light()
+                        self.buttons_enabled = self.get_buttons_enabled()
+                        self.sonos_playlists()
+                        self.sonos_favorites()
+                        self.favorite_radio_stations()
         except Exception as ex:
             self.logger.error(f"_zone_topology_event: Error {ex} occurred.")
 
-    def _av_transport_event(self, sub_handler: SubscriptionHandler) -> None:
+    def _av_transport_event(self, event) -> None:
         """
         AV event handling
-        :param sub_handler: SubscriptionHandler for the av transport event
+        :param event: received event
         """
-        if sub_handler is None:
-            self.logger.error(f"_av_transport_event: SubscriptionHandler is None.")
+        self.logger.dbghigh(f"_av_transport_event: {self.uid}: received event")
 
-        self.logger.dbghigh(f"_av_transport_event: {self.uid}: av transport event handler active.")
-        while not sub_handler.signal.wait(1):
-            # self.logger.dbglow(f"_av_transport_event: {self.uid}: start try")
-
-            try:
-                event = sub_handler.event.events.get(timeout=0.5)
-            except Empty:
-                # self.logger.dbglow(f"av_transport_event: got empty exception, which is normal")
-                pass
-            except Exception as e:
-                self.logger.error(f"_av_tranport_event: Exception during events.get(): {e}")
+        # set streaming type
+        try:
+            is_playing_line_in = self.soco.is_playing_line_in
+            is_playing_tv = self.soco.is_playing_tv
+            is_playing_radio = self.soco.is_playing_radio
+        except Exception as e:
+            self.logger.error(f"_av_tranport_event: Exception during soco.get functions: {e}")
+        else:
+            if is_playing_line_in:
+                self.streamtype = "line_in"
+            elif is_playing_tv:
+                self.streamtype = "tv"
+            elif is_playing_radio:
+                self.streamtype = "radio"
             else:
-
-                self.logger.dbghigh(f"_av_transport_event: {self.uid}: received event")
-
-                # set streaming type
-                try:
-                    is_playing_line_in = self.soco.is_playing_line_in
-                    is_playing_tv = self.soco.is_playing_tv
-                    is_playing_radio = self.soco.is_playing_radio
-                except Exception as e:
-                    self.logger.error(f"_av_tranport_event: Exception during soco.get functions: {e}")
+                self.streamtype = "music"
+
+        if 'transport_state' in event.variables:
+            transport_state = event.variables['transport_state']
+            if transport_state:
+                self.handle_transport_state(transport_state)
+        if 'current_crossfade_mode' in event.variables:
+            self.cross_fade = bool(event.variables['current_crossfade_mode'])
+        if 'sleep_timer_generation' in event.variables:
+            if int(event.variables['sleep_timer_generation']) > 0:
+                self.snooze = self.get_snooze()
+            else:
+                self.snooze = 0
+        if 'current_play_mode' in event.variables:
+            self.play_mode = event.variables['current_play_mode']
+        if 'current_track_uri' in event.variables:
+            track_uri = event.variables['current_track_uri']
+            if re.match(r'^x-rincon:RINCON_', track_uri) is not None:
+                # slave call, set uri to the coordinator track uri
+                if self._check_property():
+                    self.track_uri = sonos_speaker[self.coordinator].track_uri
+                else:
+                    self.track_uri = ''
+            else:
+                self.track_uri = track_uri
+            # empty track is a trigger to reset some other props
+            if not self.track_uri:
+                self.track_artist = ''
+                self.track_album = ''
+                self.track_album_art = ''
+                self.track_title = ''
+                self.radio_show = ''
+                self.radio_station = ''
+        if 'current_track' in event.variables:
+            self.current_track = event.variables['current_track']
+        else:
+            self.current_track = 0
+        if 'number_of_tracks' in event.variables:
+            self.number_of_tracks = event.variables['number_of_tracks']
+        else:
+            self.number_of_tracks = 0
+        if 'current_track_duration' in event.variables:
+            self.current_track_duration = event.variables['current_track_duration']
+        else:
+            self.current_track_duration = ''
+
+        # don't do an else here: these value won't always be updated
+        if 'current_transport_actions' in event.variables:
+            self.current_transport_actions = event.variables['current_transport_actions']
+        if 'current_valid_play_modes' in event.variables:
+            self.current_valid_play_modes = event.variables['current_valid_play_modes']
+        if 'current_track_meta_data' in event.variables:
+            if event.variables['current_track_meta_data']:
+                # we have some different data structures, handle it
+                if isinstance(event.variables['current_track_meta_data'], DidlMusicTrack):
+                    metadata = event.variables['current_track_meta_data'].__dict__
+                elif isinstance(event.variables['current_track_meta_data'], DidlItem):
+                    metadata = event.variables['current_track_meta_data'].__dict__
+                else:
+                    metadata = event.variables['current_track_meta_data'].metadata
+                if 'creator' in metadata:
+                    self.track_artist = metadata['creator']
+                else:
+                    self.track_artist = ''
+                if 'title' in metadata:
+                    # ignore x-sonos-api-stream: radio played, title seems wrong
+                    if re.match(r"^x-sonosapi-stream:", metadata['title']) is None:
+                        self.track_title = metadata['title']
+                else:
+                    self.track_title = ''
+                if 'album' in metadata:
+                    self.track_album = metadata['album']
                 else:
-                    if is_playing_line_in:
-                        self.streamtype = "line_in"
-                    elif is_playing_tv:
-                        self.streamtype = "tv"
-                    elif is_playing_radio:
-                        self.streamtype = "radio"
+                    self.track_album = ''
+                if 'album_art_uri' in metadata:
+                    cover_url = metadata['album_art_uri']
+                    if not cover_url.startswith(('http:', 'https:')):
+                        self.track_album_art = 'http://' + self.soco.ip_address + ':1400' + cover_url
                     else:
-                        self.streamtype = "music"
-
-                if 'transport_state' in event.variables:
-                    transport_state = event.variables['transport_state']
-                    if transport_state:
-                        self.handle_transport_state(transport_state)
-                if 'current_crossfade_mode' in event.variables:
-                    self.cross_fade = bool(event.variables['current_crossfade_mode'])
-                if 'sleep_timer_generation' in event.variables:
-                    if int(event.variables['sleep_timer_generation']) > 0:
-                        self.snooze = self.get_snooze()
+                        self.track_album_art = cover_url
+                else:
+                    self.track_album_art = ''
+
+                if 'stream_content' in metadata:
+                    stream_content = metadata['stream_content'].title()
+                    if not stream_content.lower() in \
+                            ['zpstr_buffering', 'zpstr_connecting', 'x-sonosapi-stream']:
+                        self.stream_content = stream_content
                     else:
-                        self.snooze = 0
-                if 'current_play_mode' in event.variables:
-                    self.play_mode = event.variables['current_play_mode']
-                if 'current_track_uri' in event.variables:
-                    track_uri = event.variables['current_track_uri']
-                    if re.match(r'^x-rincon:RINCON_', track_uri) is not None:
-                        # slave call, set uri to the coordinator track uri
-                        if self._check_property():
-                            self.track_uri = sonos_speaker[self.coordinator].track_uri
-                        else:
-                            self.track_uri = ''
+                        self.stream_content = ""
+                else:
+                    self.stream_content = ''
+                if 'radio_show' in metadata:
+                    radio_show = metadata['radio_show']
+                    if radio_show:
+                        radio_show = radio_show.split(',p', 1)
+                        if len(radio_show) > 1:
+                            self.radio_show = radio_show[0]
                     else:
-                        self.track_uri = track_uri
-                    # empty track is a trigger to reset some other props
-                    if not self.track_uri:
-                        self.track_artist = ''
-                        self.track_album = ''
-                        self.track_album_art = ''
-                        self.track_title = ''
                         self.radio_show = ''
-                        self.radio_station = ''
-                if 'current_track' in event.variables:
-                    self.current_track = event.variables['current_track']
                 else:
-                    self.current_track = 0
-                if 'number_of_tracks' in event.variables:
-                    self.number_of_tracks = event.variables['number_of_tracks']
+                    self.radio_show = ''
+
+        if self.streamtype == 'radio':
+            # we need the title from 'enqueued_transport_uri_meta_data'
+            if 'enqueued_transport_uri_meta_data' in event.variables:
+                radio_metadata = event.variables['enqueued_transport_uri_meta_data']
+                if isinstance(radio_metadata, str):
+                    radio_station = radio_metadata[radio_metadata.find('<dc:title>') + 10:radio_metadata.find('</dc:title>')]
+                elif hasattr(radio_metadata, 'title'):
+                    radio_station = str(radio_metadata.title)
                 else:
-                    self.number_of_tracks = 0
-                if 'current_track_duration' in event.variables:
-                    self.current_track_duration = event.variables['current_track_duration']
-                else:
-                    self.current_track_duration = ''
-
-                # don't do an else here: these value won't always be updated
-                if 'current_transport_actions' in event.variables:
-                    self.current_transport_actions = event.variables['current_transport_actions']
-                if 'current_valid_play_modes' in event.variables:
-                    self.current_valid_play_modes = event.variables['current_valid_play_modes']
-                if 'current_track_meta_data' in event.variables:
-                    if event.variables['current_track_meta_data']:
-                        # we have some different data structures, handle it
-                        if isinstance(event.variables['current_track_meta_data'], DidlMusicTrack):
-                            metadata = event.variables['current_track_meta_data'].__dict__
-                        elif isinstance(event.variables['current_track_meta_data'], DidlItem):
-                            metadata = event.variables['current_track_meta_data'].__dict__
-                        else:
-                            metadata = event.variables['current_track_meta_data'].metadata
-                        if 'creator' in metadata:
-                            self.track_artist = metadata['creator']
-                        else:
-                            self.track_artist = ''
-                        if 'title' in metadata:
-                            # ignore x-sonos-api-stream: radio played, title seems wrong
-                            if re.match(r"^x-sonosapi-stream:", metadata['title']) is None:
-                                self.track_title = metadata['title']
-                        else:
-                            self.track_title = ''
-                        if 'album' in metadata:
-                            self.track_album = metadata['album']
-                        else:
-                            self.track_album = ''
-                        if 'album_art_uri' in metadata:
-                            cover_url = metadata['album_art_uri']
-                            if not cover_url.startswith(('http:', 'https:')):
-                                self.track_album_art = 'http://' + self.soco.ip_address + ':1400' + cover_url
-                            else:
-                                self.track_album_art = cover_url
-                        else:
-                            self.track_album_art = ''
-
-                        if 'stream_content' in metadata:
-                            stream_content = metadata['stream_content'].title()
-                            if not stream_content.lower() in \
-                                    ['zpstr_buffering', 'zpstr_connecting', 'x-sonosapi-stream']:
-                                self.stream_content = stream_content
-                            else:
-                                self.stream_content = ""
-                        else:
-                            self.stream_content = ''
-                        if 'radio_show' in metadata:
-                            radio_show = metadata['radio_show']
-                            if radio_show:
-                                radio_show = radio_show.split(',p', 1)
-                                if len(radio_show) > 1:
-                                    self.radio_show = radio_show[0]
-                            else:
-                                self.radio_show = ''
-                        else:
-                            self.radio_show = ''
-
-                if self.streamtype == 'radio':
-                    # we need the title from 'enqueued_transport_uri_meta_data'
-                    if 'enqueued_transport_uri_meta_data' in event.variables:
-                        radio_metadata = event.variables['enqueued_transport_uri_meta_data']
-                        if isinstance(radio_metadata, str):
-                            radio_station = radio_metadata[radio_metadata.find('<dc:title>') + 10:radio_metadata.find('</dc:title>')]
-                        elif hasattr(radio_metadata, 'title'):
-                            radio_station = str(radio_metadata.title)
-                        else:
-                            radio_station = ""
-                        self.radio_station = radio_station
-                else:
-                    self.radio_station = ''
-    
-                sub_handler.event.events.task_done()
-                del event
-                self.logger.dbghigh(f"av_transport_event() for {self.uid}: task_done()")
+                    radio_station = ""
+                self.radio_station = radio_station
+        else:
+            self.radio_station = ''
 
-        self.logger.dbghigh(f"av_transport_event(): {self.uid}: while loop terminated.")
+        self.logger.dbghigh(f"av_transport_event() for {self.uid}: event handled")
 
     def _check_property(self):
         if not self.is_initialized:
@@ -1442,18 +1290,14 @@ class Speaker(object):
                     # Register AV event for coordinator speakers: 
                     # self.logger.dbglow(f"Un/Subscribe av event for uid '{self.uid}' in fct zone_group_members")
 
-                    active = member.av_subscription.subscriptionThreadIsActive
+                    active = member.av_subscription.active
                     is_subscribed = member.av_subscription.is_subscribed
-                    self.logger.dbghigh(f"zone_group_members(): Subscribe av event for uid '{self.uid}': Status before measure: AV Thread is {active}, subscription is {is_subscribed}, Eventflag: {member.av_subscription.eventSignalIsSet}")
-
-                    if active is False:
-                        self.logger.dbghigh(f"zone_group_members: Subscribe av event for uid '{self.uid}' because thread is not active")
-                        #member.av_subscription.unsubscribe()
-                        #
-                        # Workaround:
-                        # member.av_subscription.update_endpoint(endpoint=self._av_transport_event)
+                    self.logger.dbghigh(f"zone_group_members(): Subscribe av event for uid '{self.uid}': Status before measure: AV subscription requested {active}, subscription is {is_subscribed}")
+
+                    if not active or not is_subscribed:
+                        self.logger.dbghigh(f"zone_group_members: Subscribe av event for uid '{self.uid}' because it is not subscribed")
                         member.av_subscription.subscribe()
-                        self.logger.dbghigh(f"zone_group_members: Subscribe av event for uid '{self.uid}': Status after measure: AV thread is {member.av_subscription.subscriptionThreadIsActive}, subscription {member.av_subscription.is_subscribed}, Eventflag: {member.av_subscription.eventSignalIsSet}")
+                        self.logger.dbghigh(f"zone_group_members: Subscribe av event for uid '{self.uid}': Status after measure: subscription {member.av_subscription.is_subscribed}")
 
     @property
     def streamtype(self) -> str:
@@ -2645,7 +2489,13 @@ class Speaker(object):
         for item in self.favorite_radio_stations_items:
             item(favorite_radio_station_list, self.plugin_shortname)
 
-    def _play_snippet(self, file_path: str, webservice_url: str, volume: int = -1, duration_offset: float = 0, fade_in: bool = False) -> None:
+    def _play_snippet(self, file_path: str, webservice_url: str, volume: int = -1, duration_offset: float = 0, fade_in: bool = False,
+                      duration: float = None, started=None) -> None:
+        """
+        Plays an audio file and restores the state of the speaker afterwards
+        :param duration: duration of the audio file in seconds, read from the file if None
+        :param started: function called when the playback was started
+        """
         self.logger.debug(f"_play_snippet with volume {volume}")
 
         # Already done in method which called this one
@@ -2669,12 +2519,13 @@ class Speaker(object):
                 if member != '':
                     volumes[member] = sonos_speaker[member].volume
 
-            tag = TinyTag.get(file_path)
-            self.logger.debug(f"tag-duration {tag.duration}, duration_offset {duration_offset}")
-            if not tag.duration:
+            if duration is None:
+                duration = TinyTag.get(file_path).duration
+            self.logger.debug(f"duration {duration}, duration_offset {duration_offset}")
+            if not duration:
                 self.logger.error("TinyTag duration is none.")
             else:
-                duration = tag.duration + duration_offset
+                duration = duration + duration_offset
                 self.logger.debug(f"TTS track duration: {duration}s, TTS track duration offset: {duration_offset}s")
                 file_name = quote(os.path.split(file_path)[1])
                 snippet_url = f"{webservice_url}/{file_name}"
@@ -2694,6 +2545,8 @@ class Speaker(object):
 
                 self.set_volume(volume, group_command=True)
                 self.soco.play_uri(snippet_url, title="snippet")
+                if started is not None:
+                    started()
                 time.sleep(duration)
                 if 'Stop' in currentActions:
                     self.set_stop()
@@ -2730,25 +2583,29 @@ class Speaker(object):
                 return
             self._play_snippet(file_path, webservice_url, volume, duration_offset, fade_in)
 
-    def play_tts(self, tts: str, tts_language: str, local_webservice_path: str, webservice_url: str, volume: int = -1, duration_offset: float = 0, fade_in=False) -> None:
+    def play_tts(self, tts: str, tts_language: str, tts_cache: TTSCache, webservice_url: str, volume: int = -1, duration_offset: float = 0, fade_in=False) -> None:
         if not self._check_property():
             return
         if not self.is_coordinator:
-            sonos_speaker[self.coordinator].play_tts(tts, tts_language, local_webservice_path, webservice_url, volume, duration_offset, fade_in)
+            sonos_speaker[self.coordinator].play_tts(tts, tts_language, tts_cache, webservice_url, volume, duration_offset, fade_in)
         else:
-            file_path = utils.get_tts_local_file_path(local_webservice_path, tts, tts_language)
+            requested = time.time()
 
-            # only do a tts call if file does not exist
-            if not os.path.exists(file_path):
-                tts = gTTS(tts, lang=tts_language)
-                try:
-                    tts.save(file_path)
-                except Exception as ex:
-                    self.logger.error(f"Could not obtain TTS file from Google. Error: {ex}")
-                    return
-            else:
+            # only do a tts call if the text is not cached
+            try:
+                file_path, duration, cached = tts_cache.get(tts, tts_language)
+            except Exception as ex:
+                self.logger.error(f"Could not obtain TTS file from Google. Error: {ex}")
+                return
+            if cached:
                 self.logger.debug(f"File {file_path} already exists. No TTS request necessary.")
-            self._play_snippet(file_path, webservice_url, volume, duration_offset, fade_in)
+
+            def started():
+                latency = time.time() - requested
+                tts_cache.add_latency(latency, cached)
+                self.logger.debug(f"TTS playback started after {latency:.2f}s (cached: {cached})")
+
+            self._play_snippet(file_path, webservice_url, volume, duration_offset, fade_in, duration, started)
 
     def load_sonos_playlist(self, name: str, start: bool = False, clear_queue: bool = False, track: int = 0) -> None:
         """
@@ -2994,7 +2851,7 @@ class Sonos(SmartPlugin):
     """
     Main class of the Plugin. Does all plugin specific stuff
     """
-    PLUGIN_VERSION = "1.8.10"
+    PLUGIN_VERSION = "1.8.12"
 
     def __init__(self, sh):
         """Initializes the plugin."""
@@ -3005,6 +2862,8 @@ class Sonos(SmartPlugin):
         # get the parameters for the plugin (as defined in metadata plugin.yaml):
         try:
             self._tts = self.get_parameter_value("tts")
+            self._tts_cache_size = self.get_parameter_value("tts_cache_size")
+            self._tts_cache_age = self.get_parameter_value("tts_cache_age")
             self._snippet_duration_offset = float(self.get_parameter_value("snippet_duration_offset"))
             self._discover_cycle = self.get_parameter_value("discover_cycle")
             local_webservice_path = self.get_parameter_value("local_webservice_path")
@@ -3028,6 +2887,8 @@ class Sonos(SmartPlugin):
         self.zones = {}                     # dict to hold zone information via soco objects
         self.alive = False                  # plugin alive property
         self.webservice = None              # webservice thread
+        self.tts_cache = None               # index of the generated TTS files
+        self._tts_phrase_items = []         # play_tts items with phrases to be cached at start
         
         # handle fixed speaker ips
         if speaker_ips:
@@ -3059,6 +2920,13 @@ class Sonos(SmartPlugin):
         if self._pause_item:
             self._pause_item(False, self.get_fullname())
         
+        # start the event listener for the subscriptions of all speakers
+        event_listener.start(self.logger)
+
+        # generate the files of the declared TTS phrases in the background
+        if self.tts_cache is not None:
+            self.tts_cache.prefetch(self._get_tts_phrases())
+
         # do initial speaker discovery and set scheduler
         self._discover()
         self.scheduler_add("sonos_discover_scheduler", self._discover, prio=3, cron=None, cycle=self._discover_cycle, value=None, offset=None, next=None)
@@ -3082,6 +2950,9 @@ class Sonos(SmartPlugin):
             speaker.dispose()
         
         event_listener.stop()
+
+        if self.tts_cache is not None:
+            self.tts_cache.close()
         
         self.alive = False
 
@@ -3130,6 +3001,8 @@ class Sonos(SmartPlugin):
             if self.has_iattr(item.conf, 'sonos_send'):
                 item_attribute = self.get_iattr_value(item.conf, 'sonos_send')
                 item_config.update({'sonos_send': item_attribute})
+                if item_attribute == 'play_tts' and self.has_iattr(item.conf, 'sonos_tts_phrases'):
+                    self._tts_phrase_items.append(item)
                 self.logger.debug(f"Item {item.property.path} registered to 'sonos_send' commands with '{item_attribute}'.")
 
             if 'sonos_recv' in item_config or 'sonos_send' in item_config:
@@ -3399,9 +3272,26 @@ class Sonos(SmartPlugin):
         
         # Init webservice
         self._init_webservice()
-        
+
+        # Init cache of the generated files
+        self.tts_cache = TTSCache(self._local_webservice_path, self.logger, self._tts_cache_size, self._tts_cache_age)
+
         return True
 
+    def _get_tts_phrases(self) -> list:
+        """
+        Returns the phrases and templates of the attribute sonos_tts_phrases with the language of the play_tts item
+        """
+        phrases = []
+        for item in self._tts_phrase_items:
+            language = self._resolve_child_command_str(item, 'tts_language', 'de')
+            values = self.get_iattr_value(item.conf, 'sonos_tts_phrases')
+            if isinstance(values, str):
+                values = [values]
+            for phrase in values:
+                phrases.append((str(phrase), language))
+        return phrases
+
     def _parse_speaker_ips(self, speaker_ips: list) -> list:
         """
         check user specified sonos speaker ips
@@ -3421,7 +3311,7 @@ class Sonos(SmartPlugin):
         self.logger.warning(f"debug_speaker: check sonos_speaker[uid].av.subscription: {sonos_speaker[uid].av_subscription}")
         # Event objekt is not callable:
         # sonos_speaker[uid]._av_transport_event(sonos_speaker[uid].av_subscription)
-        self.logger.warning(f"debug_speaker: av_subscription: thread active {sonos_speaker[uid].av_subscription.subscriptionThreadIsActive}, eventSignal: {sonos_speaker[uid].av_subscription.eventSignalIsSet}")
+        self.logger.warning(f"debug_speaker: av_subscription: requested {sonos_speaker[uid].av_subscription.active}, subscribed {sonos_speaker[uid].av_subscription.is_subscribed}, time left {sonos_speaker[uid].av_subscription.time_left}, events {sonos_speaker[uid].av_subscription.event_count}")
 
     def get_soco_version(self) -> str:
         """
@@ -3553,10 +3443,13 @@ class Sonos(SmartPlugin):
                     if item() == "":
                         self.logger.error("No item value when executing 'play_tts' command")
                         return
+                    if self.tts_cache is None:
+                        self.logger.error("TTS is not enabled, cannot execute 'play_tts' command")
+                        return
                     language = self._resolve_child_command_str(item, 'tts_language', 'de')
                     volume = self._resolve_child_command_int(item, 'tts_volume', -1)
                     fade_in = self._resolve_child_command_bool(item, 'tts_fade_in')
-                    sonos_speaker[uid].play_tts(item(), language, self._local_webservice_path, self._webservice_url, volume, self._snippet_duration_offset, fade_in)
+                    sonos_speaker[uid].play_tts(item(), language, self.tts_cache, self._webservice_url, volume, self._snippet_duration_offset, fade_in)
 
                 elif command == 'play_snippet':
                     if item() == "":
@@ -3791,10 +3684,8 @@ class Sonos(SmartPlugin):
                             sonos_speaker[uid].subscribe_base_events()
                         else:
                             self.logger.dbglow(f"SoCo instance {zone} already initiated, skipping.")
-                            # The following check subscriptions functions triggers an unsubscribe/subscribe. However, this causes
-                            # a massive memory leak increasing with every check_subscription call.
-                            # self.logger.debug("checking subscriptions")
-                            # sonos_speaker[uid].check_subscriptions()
+                            # The subscriptions are renewed by the event listener, only lost subscriptions are restored here
+                            sonos_speaker[uid].check_subscriptions()
                 else:
                     self.logger.warning(f"Initializing new speaker with uid={uid} and ip={zone.ip_address}")
                     _initialize_speaker(uid, self.logger, self.get_fullname())
@@ -3883,6 +3774,13 @@ class Sonos(SmartPlugin):
         """
         return sonos_speaker
 
+    @property
+    def event_listener(self):
+        """
+        Returns the event listener of the subscriptions
+        """
+        return event_listener
+
     @property
     def log_level(self):
         """
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2016-       pfischi, aschwith, sisamiwe                    #
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3
+#  of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#  Central event listener of the Sonos plugin
+#
+#  All subscriptions of all speakers use one asyncio event loop running in one thread with
+#  the event listener of soco.events_asyncio (one http server for all NOTIFY requests). The
+#  received events are passed to a small pool of dispatcher threads which call the event
+#  handlers of the speakers, so the handlers may block (e.g. call soco functions) without
+#  delaying the listener. The events of one speaker are handled one after the other in the
+#  order received, a speaker blocking its handler doesn't delay the events of the other
+#  speakers (unless all dispatcher threads are blocked). The subscriptions are renewed
+#  centrally before they expire, a subscription that cannot be renewed is subscribed again.
+#
+#########################################################################
+
+import asyncio
+import collections
+import functools
+import logging
+import queue
+import threading
+import time
+
+from .soco import events_asyncio
+
+RENEW_CHECK = 60            # seconds between the checks for subscriptions to be renewed
+RENEW_MARGIN = 0.15         # renew when less than this part of the subscription timeout is left
+REQUEST_TIMEOUT = 15        # seconds to wait for subscribe and unsubscribe requests
+RATE_PERIOD = 60            # period of the event rate in seconds
+DISPATCH_THREADS = 4        # number of dispatcher threads
+
+
+class EventListener(object):
+    """
+    Event loop, listener and dispatcher for the subscriptions of all speakers
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._loop = None
+        self._loop_thread = None
+        self._dispatchers = []
+        self._ready = queue.Queue()             # speakers with pending events, each queued at most once
+        self._pending = {}                      # speaker uid -> deque of (handler, event), present while queued or handled
+        self._pending_lock = threading.Lock()
+        self._speakers = {}                     # handler -> speaker uid
+        self._handlers = set()
+        self._handlers_lock = threading.Lock()
+        self._renew_task = None
+        self._event_times = collections.deque()
+        self.events = 0
+        self.renewals = 0
+        self.renewal_failures = 0
+        self.resubscriptions = 0
+
+    @property
+    def running(self):
+        return self._loop is not None and self._loop.is_running()
+
+    def start(self, logger=None):
+        """
+        Starts the event loop and the dispatcher threads
+        """
+        if logger is not None:
+            self.logger = logger
+        if self.running:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._run_loop, name='sonos_event_loop', daemon=True)
+        self._loop_thread.start()
+        self._dispatchers = [threading.Thread(target=self._dispatch, name=f'sonos_event_dispatcher_{number}', daemon=True)
+                             for number in range(DISPATCH_THREADS)]
+        for dispatcher in self._dispatchers:
+            dispatcher.start()
+        self._renew_task = asyncio.run_coroutine_threadsafe(self._renew_loop(), self._loop)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def stop(self):
+        """
+        Cancels all subscriptions, stops the listener, the event loop and the dispatcher threads
+
+        The subscriptions are cancelled concurrently, speakers not answering delay the stop by
+        REQUEST_TIMEOUT at most.
+        """
+        if self._loop is None:
+            return
+        with self._handlers_lock:
+            handlers = list(self._handlers)
+            self._handlers.clear()
+            self._speakers.clear()
+        if self.running:
+            if self._renew_task is not None:
+                self._renew_task.cancel()
+            try:
+                self._run(self._unsubscribe_all(handlers), timeout=REQUEST_TIMEOUT + 1)
+            except Exception as e:
+                self.logger.warning(f"Unsubscribing the Sonos events failed: {e}")
+            try:
+                self._run(events_asyncio.event_listener.async_stop())
+            except Exception as e:
+                self.logger.warning(f"Stopping the Sonos event listener failed: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+        # the lock of the soco listener belongs to the stopped loop
+        events_asyncio.event_listener.start_lock = None
+        for _ in self._dispatchers:
+            self._ready.put(None)
+        deadline = time.time() + 5
+        for dispatcher in self._dispatchers:
+            dispatcher.join(timeout=max(deadline - time.time(), 0))
+        self._dispatchers = []
+
+    def _run(self, coro, timeout=REQUEST_TIMEOUT):
+        """
+        Runs a coroutine in the event loop and waits for its result, must not be called from the event loop
+        """
+        if not self.running:
+            coro.close()
+            self.logger.warning("Sonos event listener is not running")
+            return None
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("EventListener._run() called from the event loop")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    # ------------------------------------ subscriptions ------------------------------------
+
+    def subscribe(self, handler):
+        """
+        Subscribes (again) the service of a SubscriptionHandler, the handler is kept subscribed until unsubscribe() is called
+
+        :return: True if subscribed
+        """
+        speaker = self._speaker(handler)
+        with self._handlers_lock:
+            self._handlers.add(handler)
+            self._speakers[handler] = speaker
+        try:
+            return self._run(self._subscribe(handler)) is not None
+        except Exception as e:
+            handler.logger.error(f"Subscribe {handler.name} failed: {e}")
+            return False
+
+    def unsubscribe(self, handler):
+        with self._handlers_lock:
+            self._handlers.discard(handler)
+            self._speakers.pop(handler, None)
+        if handler.event is None:
+            return
+        try:
+            self._run(self._unsubscribe(handler))
+        except Exception as e:
+            handler.logger.warning(f"Unsubscribe {handler.name} failed: {e}")
+
+    async def _subscribe(self, handler):
+        await self._unsubscribe(handler)
+        subscription = events_asyncio.Subscription(handler.service)
+        subscription.callback = functools.partial(self._received, handler)
+        # renewal failures are counted and logged by _renew()
+        subscription.auto_renew_fail = lambda exception: None
+        await subscription.subscribe(auto_renew=False, strict=True)
+        handler.event = subscription
+        handler.logger.debug(f"{handler.name} subscribed, sid {subscription.sid}, timeout {subscription.timeout}")
+        return subscription
+
+    async def _unsubscribe(self, handler):
+        subscription = handler.event
+        handler.event = None
+        if subscription is not None and subscription.is_subscribed:
+            await subscription.unsubscribe(strict=False)
+
+    async def _unsubscribe_all(self, handlers):
+        results = await asyncio.wait_for(asyncio.gather(*(self._unsubscribe(handler) for handler in handlers),
+                                                        return_exceptions=True), REQUEST_TIMEOUT)
+        for handler, result in zip(handlers, results):
+            if isinstance(result, Exception):
+                handler.logger.warning(f"Unsubscribe {handler.name} failed: {result}")
+
+    async def _renew(self, handler):
+        subscription = handler.event
+        if subscription is not None and subscription.is_subscribed:
+            timeout = subscription.timeout
+            if timeout is None or subscription.time_left > max(timeout * RENEW_MARGIN, 2 * RENEW_CHECK):
+                return
+            try:
+                await subscription.renew(strict=True)
+                self.renewals += 1
+                return
+            except Exception as e:
+                self.renewal_failures += 1
+                handler.logger.warning(f"Renewal of {handler.name} failed: {e}, subscribing again")
+        try:
+            await self._subscribe(handler)
+            self.resubscriptions += 1
+        except Exception as e:
+            self.renewal_failures += 1
+            handler.logger.warning(f"Subscribing {handler.name} again failed: {e}")
+
+    async def _renew_loop(self):
+        while True:
+            await asyncio.sleep(RENEW_CHECK)
+            with self._handlers_lock:
+                handlers = list(self._handlers)
+            # concurrently, a speaker not answering doesn't delay the renewal of the others
+            results = await asyncio.gather(*(self._renew(handler) for handler in handlers), return_exceptions=True)
+            for handler, result in zip(handlers, results):
+                if isinstance(result, Exception):
+                    handler.logger.warning(f"Renewal of {handler.name} failed: {result}")
+
+    # --------------------------------------- events ----------------------------------------
+
+    @staticmethod
+    def _speaker(handler):
+        """
+        :return: uid of the speaker of a handler, the events of a speaker are handled in order
+        """
+        soco = getattr(handler.service, 'soco', None)
+        try:
+            return soco.uid
+        except Exception:
+            # unknown uid (e.g. speaker not reachable), the soco instance identifies the speaker as well
+            return id(soco) if soco is not None else id(handler)
+
+    def _received(self, handler, event):
+        """
+        Callback of the subscriptions, called in the event loop
+        """
+        speaker = self._speakers.get(handler)
+        if speaker is None:
+            speaker = id(handler)
+        with self._pending_lock:
+            events = self._pending.get(speaker)
+            if events is None:
+                self._pending[speaker] = collections.deque([(handler, event)])
+                self._ready.put(speaker)
+            else:
+                events.append((handler, event))
+
+    def _dispatch(self):
+        while True:
+            speaker = self._ready.get()
+            if speaker is None:
+                break
+            with self._pending_lock:
+                handler, event = self._pending[speaker].popleft()
+                self.events += 1
+                self._event_times.append(time.time())
+            try:
+                handler.dispatch(event)
+            except Exception as e:
+                handler.logger.error(f"{handler.name}: Error {e} occurred while handling event.")
+            with self._pending_lock:
+                if self._pending[speaker]:
+                    # next event of the speaker, queued behind the other speakers
+                    self._ready.put(speaker)
+                else:
+                    del self._pending[speaker]
+
+    # ------------------------------------- statistics --------------------------------------
+
+    @property
+    def event_rate(self):
+        """
+        :return: events per minute during the last RATE_PERIOD seconds
+        """
+        times = self._event_times
+        limit = time.time() - RATE_PERIOD
+        while times and times[0] < limit:
+            times.popleft()
+        return len(times) * 60 / RATE_PERIOD
+
+    @property
+    def queued_events(self):
+        with self._pending_lock:
+            return sum(len(events) for events in self._pending.values())
+
+    @property
+    def subscriptions(self):
+        with self._handlers_lock:
+            return sorted(self._handlers, key=lambda handler: handler.name)
+
+    def statistics(self):
+        plugin_threads = [thread.name for thread in threading.enumerate() if thread.name.lower().startswith('sonos')]
+        return {'threads': threading.active_count(),
+                'plugin_threads': len(plugin_threads),
+                'subscriptions': len(self._handlers),
+                'events': self.events,
+                'event_rate': round(self.event_rate, 1),
+                'queued_events': self.queued_events,
+                'renewals': self.renewals,
+                'renewal_failures': self.renewal_failures,
+                'resubscriptions': self.resubscriptions}
+
+
+event_listener = EventListener()
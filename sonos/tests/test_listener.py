@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2016-       pfischi, aschwith, sisamiwe                    #
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Tests of the central event listener of the Sonos plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3
+#  of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import asyncio
+import logging
+import threading
+import time
+import unittest
+from unittest import mock
+
+from plugins.sonos import listener
+from plugins.sonos.listener import EventListener
+
+
+class Soco(object):
+
+    def __init__(self, uid):
+        self.uid = uid
+
+
+class Service(object):
+
+    def __init__(self, soco):
+        self.soco = soco
+
+
+class Subscription(object):
+    """ subscription whose unsubscribe and renew requests hang or fail """
+
+    def __init__(self, error=None, delay=0):
+        self.is_subscribed = True
+        self.timeout = 100
+        self.time_left = 10
+        self.renewed = False
+        self._error = error
+        self._delay = delay
+
+    async def renew(self, strict=False):
+        await asyncio.sleep(self._delay)
+        if self._error is not None:
+            raise self._error
+        self.renewed = True
+
+    async def unsubscribe(self, strict=False):
+        await asyncio.sleep(self._delay)
+        if self._error is not None:
+            raise self._error
+        self.is_subscribed = False
+
+
+class Handler(object):
+    """ SubscriptionHandler recording the events it gets """
+
+    def __init__(self, name, soco, block=None):
+        self.name = name
+        self.service = Service(soco)
+        self.logger = logging.getLogger(__name__)
+        self.event = None
+        self.events = []
+        self.done = threading.Event()
+        self._block = block
+
+    def dispatch(self, event):
+        if self._block is not None:
+            self._block.wait(5)
+        self.events.append(event)
+        if event == 'last':
+            self.done.set()
+
+
+async def subscribe(self, handler):
+    handler.event = Subscription()
+    return handler.event
+
+
+class TestEventListener(unittest.TestCase):
+
+    def setUp(self):
+        self.listener = EventListener()
+        self.listener.start(logging.getLogger(__name__))
+        patcher = mock.patch.object(EventListener, '_subscribe', subscribe)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.listener.stop()
+
+    def receive(self, handler, event):
+        # the subscriptions call _received in the event loop
+        self.listener._loop.call_soon_threadsafe(self.listener._received, handler, event)
+
+    def test_order_per_speaker(self):
+        kitchen = Soco('RINCON_1')
+        handlers = [Handler('kitchen.av_transport', kitchen), Handler('kitchen.rendering_control', kitchen)]
+        for handler in handlers:
+            self.assertTrue(self.listener.subscribe(handler))
+        for number in range(200):
+            self.receive(handlers[number % 2], (number, 'kitchen'))
+        self.receive(handlers[1], 'last')
+        self.assertTrue(handlers[1].done.wait(5))
+        events = sorted(handlers[0].events[:] + handlers[1].events[:-1])
+        self.assertEqual(events, [(number, 'kitchen') for number in range(200)])
+        self.assertEqual(handlers[0].events, [(number, 'kitchen') for number in range(0, 200, 2)])
+        self.assertEqual(self.listener.events, 201)
+        self.assertEqual(self.listener.queued_events, 0)
+
+    def test_blocking_speaker(self):
+        # a speaker blocking its handler doesn't delay the events of the other speakers
+        release = threading.Event()
+        blocked = Handler('bath.av_transport', Soco('RINCON_1'), block=release)
+        other = Handler('kitchen.av_transport', Soco('RINCON_2'))
+        self.listener.subscribe(blocked)
+        self.listener.subscribe(other)
+        self.receive(blocked, 'first')
+        self.receive(blocked, 'last')
+        self.receive(other, 'last')
+        self.assertTrue(other.done.wait(5))
+        self.assertEqual(blocked.events, [])
+        release.set()
+        self.assertTrue(blocked.done.wait(5))
+        self.assertEqual(blocked.events, ['first', 'last'])
+
+    def test_speaker_without_uid(self):
+        class Offline(object):
+            @property
+            def uid(self):
+                raise OSError('not reachable')
+
+        soco = Offline()
+        self.assertEqual(EventListener._speaker(Handler('a', soco)), EventListener._speaker(Handler('b', soco)))
+
+    def test_stop_concurrent(self):
+        handlers = [Handler(f'speaker{number}.av_transport', Soco(f'RINCON_{number}')) for number in range(4)]
+        for handler in handlers:
+            self.listener.subscribe(handler)
+        handlers[0].event = Subscription(error=OSError('no route to host'))
+        for handler in handlers[1:3]:
+            handler.event = Subscription(delay=60)
+        dispatchers = self.listener._dispatchers
+        start = time.time()
+        with mock.patch.object(listener, 'REQUEST_TIMEOUT', 0.5), self.assertLogs(logging.getLogger(__name__), 'WARNING'):
+            self.listener.stop()
+        self.assertLess(time.time() - start, 3)
+        self.assertFalse(self.listener.running)
+        self.assertFalse(any(dispatcher.is_alive() for dispatcher in dispatchers))
+        for handler in handlers:
+            self.assertIsNone(handler.event)
+
+    def test_renew_concurrent(self):
+        # a speaker not answering doesn't delay the renewal of the other speakers
+        handlers = [Handler(f'speaker{number}.av_transport', Soco(f'RINCON_{number}')) for number in range(6)]
+        for handler in handlers:
+            self.listener.subscribe(handler)
+        handlers[0].event = Subscription(delay=60)
+        handlers[1].event = Subscription(error=OSError('no route to host'))
+        for handler in handlers[2:]:
+            handler.event = Subscription(delay=0.3)
+        self.listener._renew_task.cancel()
+        with mock.patch.object(listener, 'RENEW_CHECK', 0.05):
+            start = time.time()
+            self.listener._renew_task = asyncio.run_coroutine_threadsafe(self.listener._renew_loop(), self.listener._loop)
+            while self.listener.renewals < 4 and time.time() < start + 3:
+                time.sleep(0.01)
+        # one after the other the renewals would take 1.2 s at least
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(self.listener.renewals, 4)
+        self.assertTrue(all(handler.event.renewed for handler in handlers[2:]))
+        # the failed subscription is subscribed again
+        self.assertEqual(self.listener.resubscriptions, 1)
+        self.assertFalse(handlers[0].event.renewed)
+        handlers[0].event._delay = 0
+
+
+if __name__ == '__main__':
+    unittest.main()
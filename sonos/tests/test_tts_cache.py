@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2016-       pfischi, aschwith, sisamiwe                    #
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Tests of the TTS cache of the Sonos plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3
+#  of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from plugins.sonos.tts_cache import TTSCache
+
+
+class FakeTTS(object):
+    """ gTTS writing the text instead of mp3 data """
+
+    requests = []
+    delay = 0
+
+    def __init__(self, text, lang):
+        self.text = text
+        FakeTTS.requests.append(text)
+
+    def save(self, path):
+        time.sleep(FakeTTS.delay)
+        with open(path, 'wb') as f:
+            f.write(self.text.encode('utf-8'))
+
+
+class FakeTag(object):
+    """ TinyTag giving a duration of 0.1 s per byte """
+
+    @staticmethod
+    def get(path):
+        tag = mock.Mock()
+        tag.duration = os.path.getsize(path) / 10
+        return tag
+
+
+class TestTTSCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        FakeTTS.requests = []
+        FakeTTS.delay = 0
+        for name, fake in (('gTTS', FakeTTS), ('TinyTag', FakeTag)):
+            patcher = mock.patch(f'plugins.sonos.tts_cache.{name}', fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.cache = TTSCache(self.directory, logging.getLogger(__name__))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def content(self, path):
+        with open(path, 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def test_hit_miss(self):
+        path, duration, cached = self.cache.get('Hallo', 'de')
+        self.assertFalse(cached)
+        self.assertEqual(self.content(path), 'Hallo')
+        self.assertEqual(duration, 0.5)
+        path2, duration, cached = self.cache.get('Hallo', 'de')
+        self.assertTrue(cached)
+        self.assertEqual(path2, path)
+        self.assertEqual(FakeTTS.requests, ['Hallo'])
+        self.assertNotEqual(self.cache.get('Hallo', 'en')[0], path)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_template(self):
+        self.cache.add_template('Es sind {temperatur} Grad')
+        path, duration, cached = self.cache.get('Es sind 21 Grad', 'de')
+        self.assertFalse(cached)
+        self.assertEqual(self.content(path), 'Es sind21Grad')
+        self.assertEqual(FakeTTS.requests, ['Es sind', '21', 'Grad'])
+        self.assertAlmostEqual(duration, 1.3)
+        # only the variable part is requested for another value
+        path, duration, cached = self.cache.get('es sind 22,5 grad', 'de')
+        self.assertEqual(self.content(path), 'Es sind22,5Grad')
+        self.assertEqual(FakeTTS.requests[3:], ['22,5'])
+        # texts not matching a template are requested as a whole
+        self.cache.get('Es sind Grad', 'de')
+        self.assertEqual(FakeTTS.requests[4:], ['Es sind Grad'])
+
+    def test_evict_size(self):
+        for text in ('aaaaa', 'bbbbb', 'ccccc'):
+            self.cache.get(text, 'de')
+        self.cache.get('aaaaa', 'de')
+        self.cache.max_size = 12
+        self.cache.evict()
+        self.assertTrue(os.path.isfile(self.cache.file_path('aaaaa', 'de')))
+        self.assertFalse(os.path.isfile(self.cache.file_path('bbbbb', 'de')))
+        self.assertTrue(os.path.isfile(self.cache.file_path('ccccc', 'de')))
+        self.assertEqual(self.cache.evicted, 1)
+        self.assertFalse(self.cache.get('bbbbb', 'de')[2])
+
+    def test_evict_age(self):
+        path = self.cache.get('alt', 'de')[0]
+        self.cache._entries[os.path.basename(path)]['last_used'] -= 91 * 86400
+        self.cache.get('neu', 'de')
+        self.assertFalse(os.path.isfile(path))
+        self.assertEqual(self.cache.statistics()['files'], 1)
+
+    def test_index(self):
+        path = self.cache.get('Hallo', 'de')[0]
+        # file of an older version without index entry
+        with open(os.path.join(self.directory, '0123456789abcdef0123456789abcdef.mp3'), 'wb') as f:
+            f.write(b'old')
+        self.cache.close()
+        self.cache = TTSCache(self.directory, logging.getLogger(__name__))
+        self.assertEqual(self.cache.statistics()['files'], 2)
+        self.assertEqual(self.cache.get('Hallo', 'de'), (path, 0.5, True))
+
+    def test_prefetch(self):
+        self.cache.prefetch([('Es sind {temperatur} Grad', 'de'), ('Guten Morgen', 'de')])
+        self.cache._prefetch_thread.join(5)
+        self.assertEqual(sorted(FakeTTS.requests), ['Es sind', 'Grad', 'Guten Morgen'])
+        self.assertTrue(self.cache.get('Guten Morgen', 'de')[2])
+        self.cache.get('Es sind 3 Grad', 'de')
+        self.assertEqual(FakeTTS.requests[3:], ['3'])
+
+    def test_concurrent(self):
+        self.cache.add_template('Es sind {temperatur} Grad')
+        FakeTTS.delay = 0.05
+        results = []
+
+        def request():
+            results.append(self.cache.get('Es sind 21 Grad', 'de'))
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(len(results), 8)
+        self.assertEqual(len(set(path for path, duration, cached in results)), 1)
+        self.assertEqual(self.content(results[0][0]), 'Es sind21Grad')
+        # every part is requested once, no temporary file is left
+        self.assertEqual(sorted(FakeTTS.requests), ['21', 'Es sind', 'Grad'])
+        self.assertEqual([name for name in os.listdir(self.directory) if name.endswith('.tmp')], [])
+        self.assertEqual(self.cache.hits + self.cache.misses, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
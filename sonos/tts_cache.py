@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2016-       pfischi, aschwith, sisamiwe                    #
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3
+#  of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#  TTS cache of the Sonos plugin
+#
+#  The mp3 files generated by gTTS are kept in the tts folder of the webservice. An index
+#  (file '.tts_index.json' in the same folder) maps text and language to the file and keeps
+#  size, audio duration and the time of the last use of every file. Files are removed least
+#  recently used first when the cache exceeds its size, and when they were not used for the
+#  maximum age.
+#
+#  Templates are phrases with placeholders, e.g. 'Es sind {temperatur} Grad'. A text matching
+#  a template is composed of the cached static parts and the synthesized variable parts, so
+#  only the variable parts need a request to Google.
+#
+#########################################################################
+
+import json
+import os
+import re
+import threading
+import time
+
+from gtts import gTTS
+from tinytag import TinyTag
+
+from . import utils
+
+INDEX_FILE = '.tts_index.json'
+PLACEHOLDER = re.compile(r'{[^{}]*}')
+TTS_FILE = re.compile(r'^[0-9a-f]{32}\.mp3$')
+SAVE_DELAY = 10             # seconds to collect index changes before the index is written
+
+
+class TTSCache(object):
+    """
+    Index of the generated TTS files with LRU eviction by size and age
+    """
+
+    def __init__(self, directory, logger, max_size=100, max_age=90):
+        """
+        :param directory: tts folder of the webservice
+        :param max_size: maximum size of all cached files in MB, 0 for unlimited
+        :param max_age: maximum days since the last use of a file, 0 for unlimited
+        """
+        self.directory = directory
+        self.logger = logger
+        self.max_size = max_size * 1024 * 1024
+        self.max_age = max_age * 86400
+        self._lock = threading.RLock()
+        self._synth_lock = threading.Lock()
+        self._entries = {}
+        self._templates = []
+        self._save_timer = None
+        self._prefetch_thread = None
+        self.hits = 0
+        self.misses = 0
+        self.synth_time = 0.0
+        self.evicted = 0
+        self.latency = {True: [], False: []}
+        self._load()
+
+    # ------------------------------------ index ------------------------------------
+
+    def _load(self):
+        filename = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries = {}
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"TTS cache index {filename} could not be read, rebuilding it: {e}")
+            entries = {}
+        for file_name, entry in entries.items():
+            if os.path.isfile(os.path.join(self.directory, file_name)):
+                self._entries[file_name] = entry
+        # files generated before the index existed are adopted, their text is unknown
+        for file_name in os.listdir(self.directory):
+            if TTS_FILE.match(file_name) and file_name not in self._entries:
+                path = os.path.join(self.directory, file_name)
+                stat = os.stat(path)
+                self._entries[file_name] = {'text': None, 'language': None, 'size': stat.st_size,
+                                            'duration': None, 'last_used': stat.st_mtime, 'hits': 0}
+        self.evict()
+
+    def _save(self):
+        with self._lock:
+            self._save_timer = None
+            data = json.dumps(self._entries, ensure_ascii=False)
+        filename = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with open(filename + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(filename + '.tmp', filename)
+        except OSError as e:
+            self.logger.warning(f"TTS cache index {filename} could not be written: {e}")
+
+    def _changed(self):
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(SAVE_DELAY, self._save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def close(self):
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+        self._save()
+
+    def evict(self):
+        """
+        Removes the files not used for max_age and the least recently used files exceeding max_size
+        """
+        with self._lock:
+            now = time.time()
+            entries = sorted(self._entries.items(), key=lambda entry: entry[1]['last_used'])
+            size = sum(entry['size'] for file_name, entry in entries)
+            removed = 0
+            for file_name, entry in entries:
+                too_old = self.max_age and now - entry['last_used'] > self.max_age
+                too_big = self.max_size and size > self.max_size
+                if not too_old and not too_big:
+                    continue
+                try:
+                    os.remove(os.path.join(self.directory, file_name))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.logger.warning(f"Could not remove TTS file {file_name}: {e}")
+                    continue
+                del self._entries[file_name]
+                size -= entry['size']
+                removed += 1
+            if removed:
+                self.evicted += removed
+                self._changed()
+
+    # ------------------------------------ lookup ------------------------------------
+
+    def file_path(self, text, language):
+        return utils.get_tts_local_file_path(self.directory, text, language)
+
+    def _lookup(self, file_name):
+        entry = self._entries.get(file_name)
+        if entry is None:
+            return None
+        if not os.path.isfile(os.path.join(self.directory, file_name)):
+            # removed from the folder by someone else
+            del self._entries[file_name]
+            self._changed()
+            return None
+        if entry['duration'] is None:
+            entry['duration'] = self._probe(os.path.join(self.directory, file_name))
+        entry['last_used'] = time.time()
+        entry['hits'] += 1
+        self._changed()
+        return entry
+
+    def _probe(self, path):
+        try:
+            return TinyTag.get(path).duration
+        except Exception as e:
+            self.logger.warning(f"Could not read duration of {path}: {e}")
+            return None
+
+    def _add(self, file_name, text, language, duration):
+        size = os.path.getsize(os.path.join(self.directory, file_name))
+        self._entries[file_name] = {'text': text, 'language': language, 'size': size, 'duration': duration,
+                                    'last_used': time.time(), 'hits': 0}
+        self._changed()
+
+    def _synthesize(self, text, language):
+        """
+        Requests the mp3 file of a text from Google, if it is not cached
+
+        :return: tuple (path, duration)
+        """
+        path = self.file_path(text, language)
+        file_name = os.path.basename(path)
+        with self._lock:
+            entry = self._lookup(file_name)
+        if entry is not None:
+            return path, entry['duration']
+        with self._synth_lock:
+            with self._lock:
+                entry = self._lookup(file_name)
+            if entry is not None:
+                # synthesized by another thread in the meantime
+                return path, entry['duration']
+            start = time.time()
+            gTTS(text, lang=language).save(path + '.tmp')
+            os.replace(path + '.tmp', path)
+            synth_time = time.time() - start
+            duration = self._probe(path)
+            with self._lock:
+                self.synth_time += synth_time
+                self._add(file_name, text, language, duration)
+        return path, duration
+
+    def _compose(self, text, language, parts):
+        """
+        Concatenates the mp3 files of the parts of a text matching a template
+
+        The file is written to a temporary file of the calling thread, so concurrent requests of
+        the same text don't write to the same file.
+        """
+        path = self.file_path(text, language)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        duration = 0
+        try:
+            with open(temp_path, 'wb') as target:
+                for part in parts:
+                    part_path, part_duration = self._synthesize(part, language)
+                    with open(part_path, 'rb') as source:
+                        target.write(source.read())
+                    duration = None if duration is None or part_duration is None else duration + part_duration
+            os.replace(temp_path, path)
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._add(os.path.basename(path), text, language, duration)
+        return path, duration
+
+    def get(self, text, language):
+        """
+        Returns the mp3 file of a text, generates it if it is not cached
+
+        :return: tuple (path, duration in seconds or None, True if the file was cached)
+        """
+        path = self.file_path(text, language)
+        with self._lock:
+            entry = self._lookup(os.path.basename(path))
+            if entry is not None:
+                self.hits += 1
+                return path, entry['duration'], True
+            self.misses += 1
+        parts = self._template_parts(text)
+        if parts is not None:
+            path, duration = self._compose(text, language, parts)
+        else:
+            path, duration = self._synthesize(text, language)
+        self.evict()
+        return path, duration, False
+
+    # ---------------------------------- templates -----------------------------------
+
+    def add_template(self, template):
+        """
+        Adds a phrase with placeholders, e.g. 'Es sind {temperatur} Grad'
+        """
+        static = [part.strip() for part in PLACEHOLDER.split(template)]
+        if len(static) < 2:
+            return
+        pattern = r'\s*(\S.*?)\s*'.join(re.escape(part) for part in static)
+        self._templates.append((re.compile(pattern, re.IGNORECASE | re.DOTALL), static))
+
+    def _template_parts(self, text):
+        """
+        :return: list of the static and variable parts of text if it matches a template, otherwise None
+        """
+        text = text.strip()
+        for pattern, static in self._templates:
+            match = pattern.fullmatch(text)
+            if match is None:
+                continue
+            parts = []
+            for i, part in enumerate(static):
+                if part:
+                    parts.append(part)
+                if i < len(match.groups()) and match.group(i + 1):
+                    parts.append(match.group(i + 1))
+            return parts
+        return None
+
+    # ---------------------------------- prefetch ------------------------------------
+
+    def prefetch(self, phrases):
+        """
+        Generates the files of phrases in the background
+
+        :param phrases: list of tuples (phrase or template, language)
+        """
+        phrases = list(phrases)
+        for phrase, language in phrases:
+            if PLACEHOLDER.search(phrase):
+                self.add_template(phrase)
+        if not phrases:
+            return
+        self._prefetch_thread = threading.Thread(target=self._prefetch, args=(phrases,), name='sonos_tts_prefetch', daemon=True)
+        self._prefetch_thread.start()
+
+    def _prefetch(self, phrases):
+        count = 0
+        for phrase, language in phrases:
+            parts = [part.strip() for part in PLACEHOLDER.split(phrase)]
+            for part in parts:
+                if not part:
+                    continue
+                try:
+                    self._synthesize(part, language)
+                    count += 1
+                except Exception as e:
+                    self.logger.warning(f"Prefetch of TTS phrase '{part}' failed: {e}")
+        self.evict()
+        self.logger.info(f"TTS prefetch done, {count} phrases cached")
+
+    # --------------------------------- statistics -----------------------------------
+
+    def add_latency(self, latency, cached):
+        """
+        Records the time from the TTS request to the start of the playback
+        """
+        with self._lock:
+            latencies = self.latency[cached]
+            latencies.append(latency)
+            del latencies[:-100]
+
+    def statistics(self):
+        with self._lock:
+            size = sum(entry['size'] for entry in self._entries.values())
+            count = len(self._entries)
+            latency_cached = list(self.latency[True])
+            latency_uncached = list(self.latency[False])
+
+        def average(values):
+            return round(sum(values) / len(values), 2) if values else None
+
+        return {'files': count,
+                'size': utils.file_size(size),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evicted': self.evicted,
+                'synth_time': round(self.synth_time, 1),
+                'latency_cached': average(latency_cached),
+                'latency_uncached': average(latency_uncached)}
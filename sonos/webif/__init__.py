@@ -110,6 +110,9 @@ class WebInterface(SmartPluginWebIf):
                 data['items'][item.property.path]['last_change'] = item.property.last_change.strftime('%d.%m.%Y %H:%M:%S')
             
             data['maintenance'] = True if self.plugin.log_level <= 20 else False
+            data['events'] = self.plugin.event_listener.statistics()
+            if self.plugin.tts_cache is not None:
+                data['tts'] = self.plugin.tts_cache.statistics()
 
             try:
                 return json.dumps(data, default=str)
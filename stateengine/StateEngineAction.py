@@ -20,6 +20,7 @@
 #########################################################################
 from . import StateEngineTools
 from . import StateEngineEval
+from . import StateEngineExpressions
 from . import StateEngineValue
 from . import StateEngineDefaults
 import datetime
@@ -283,7 +284,7 @@ class SeActionBase(StateEngineTools.SeItemChild):
                                      'issueorigin': [{'state': self._state.id, 'action': self._function}]}}
                     self._log_warning(_text, check_item)
                     _, _, item = item.partition(":")
-                item = eval(item)
+                item = StateEngineExpressions.evaluate(item, globals(), locals())
                 if item is not None:
                     check_item, _issue = self._abitem.return_item(item)
                     _issue = {
@@ -1126,9 +1127,9 @@ class SeActionRun(SeActionBase):
             try:
                 if returnvalue:
                     self._log_decrease_indent()
-                    return eval(self.__eval)
+                    return StateEngineExpressions.evaluate(self.__eval, globals(), locals())
                 log_conditions()
-                eval_result = eval(self.__eval)
+                eval_result = StateEngineExpressions.evaluate(self.__eval, globals(), locals())
                 self.update_webif_actionstatus(state, self._name, 'True')
                 self._log_decrease_indent()
             except Exception as ex:
@@ -22,6 +22,7 @@ from . import StateEngineTools
 from . import StateEngineCurrent
 from . import StateEngineValue
 from . import StateEngineEval
+from . import StateEngineExpressions
 
 from lib.item.item import Item
 import datetime
@@ -128,6 +129,8 @@ class SeCondition(StateEngineTools.SeItemChild):
                     eval_issue = "Your eval configuration '{0}' is wrong!".format(value)
                     value = None
                 self.__eval = value
+                if value is not None:
+                    eval_issue = StateEngineExpressions.precompile(value)
             eval_value = value
         if check == "se_status_eval" or (check == "attribute" and self.__status_eval is None):
             if check == "attribute":
@@ -144,6 +147,8 @@ class SeCondition(StateEngineTools.SeItemChild):
                     status_eval_issue = "Your status eval configuration '{0}' is wrong!".format(value)
                     value = None
                 self.__status_eval = value
+                if value is not None:
+                    status_eval_issue = StateEngineExpressions.precompile(value)
             status_eval_value = value
         return item_value, status_value, eval_value, status_eval_value, item_issue, status_issue, eval_issue, status_eval_issue
 
@@ -852,7 +857,7 @@ class SeCondition(StateEngineTools.SeItemChild):
                     # noinspection PyUnusedLocal
                     stateengine_eval = se_eval = StateEngineEval.SeEval(self._abitem)
                 try:
-                    eval_result = eval(eval_or_status_eval)
+                    eval_result = StateEngineExpressions.evaluate(eval_or_status_eval, globals(), locals())
                     if isinstance(eval_result, self.__itemClass):
                         value = eval_result.property.last_change_age if eval_type == 'age' else \
                             eval_result.property.last_change_by if eval_type == 'changedby' else \
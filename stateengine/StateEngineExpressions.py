@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2014-2018 Thomas Ernst                       offline@gmx.net
+#  Copyright 2019- Onkel Andy                       onkelandy@hotmail.com
+#########################################################################
+#  Finite state machine plugin for SmartHomeNG
+#
+#  This plugin is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This plugin is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this plugin. If not, see <http://www.gnu.org/licenses/>.
+#########################################################################
+import threading
+import time
+
+# Compiled code objects of all eval expressions, keyed by source string
+_code = {}
+
+# Runtime statistics per expression: [count, total seconds, max seconds, errors]
+_stats = {}
+
+_lock = threading.Lock()
+
+
+# Return the compiled code object for an eval expression
+# expression: source string of the eval expression
+# returns: code object, compiled on first request only
+def compiled(expression):
+    code = _code.get(expression)
+    if code is None:
+        code = compile(expression.strip(), '<se_eval>', 'eval')
+        with _lock:
+            _code[expression] = code
+    return code
+
+
+# Compile an expression in advance (e.g. while parsing the configuration)
+# expression: source string of the eval expression
+# returns: None if compilation worked, otherwise the problem as string
+def precompile(expression):
+    if not isinstance(expression, str):
+        return None
+    try:
+        compiled(expression)
+    except SyntaxError as ex:
+        return "Syntax error in eval expression '{0}': {1}".format(expression, ex)
+    return None
+
+
+# Evaluate an expression with the namespace of the caller and record its runtime
+# expression: source string of the eval expression
+# global_vars: globals of the caller
+# local_vars: locals of the caller (sh, shtime, se_eval, self, ...)
+# returns: result of the expression
+def evaluate(expression, global_vars, local_vars):
+    code = compiled(expression)
+    start = time.perf_counter()
+    try:
+        result = eval(code, global_vars, local_vars)
+    except Exception:
+        _record(expression, time.perf_counter() - start, True)
+        raise
+    _record(expression, time.perf_counter() - start, False)
+    return result
+
+
+def _record(expression, duration, error):
+    with _lock:
+        entry = _stats.get(expression)
+        if entry is None:
+            entry = _stats[expression] = [0, 0.0, 0.0, 0]
+        if error:
+            entry[3] += 1
+            return
+        entry[0] += 1
+        entry[1] += duration
+        if duration > entry[2]:
+            entry[2] = duration
+
+
+# Drop all compiled expressions and statistics, e.g. when the configuration is reloaded
+def clear():
+    with _lock:
+        _code.clear()
+        _stats.clear()
+
+
+# Return runtime statistics of all evaluated expressions, slowest (by total time) first
+# limit: maximum number of entries to return
+# returns: list of dicts with expression, count, total, average and max time in ms and error count
+def get_statistics(limit=None):
+    with _lock:
+        entries = [(expression, list(entry)) for expression, entry in _stats.items()]
+    result = []
+    for expression, (count, total, maximum, errors) in sorted(entries, key=lambda e: e[1][1], reverse=True):
+        result.append({'expression': expression,
+                       'count': count,
+                       'total': round(total * 1000, 3),
+                       'average': round(total * 1000 / count, 3) if count else 0,
+                       'max': round(maximum * 1000, 3),
+                       'errors': errors})
+    return result[:limit] if limit else result
@@ -21,6 +21,7 @@
 #########################################################################
 from . import StateEngineTools
 from . import StateEngineEval
+from . import StateEngineExpressions
 from . import StateEngineStruct
 from . import StateEngineStructs
 
@@ -892,7 +893,8 @@ class SeValue(StateEngineTools.SeItemChild):
                 return result
             self._log_increase_indent()
             try:
-                _newvalue, _issue = self.__do_cast(eval(eval_get))
+                _newvalue, _issue = self.__do_cast(
+                    StateEngineExpressions.evaluate(eval_get, globals(), locals()))
                 _issue_dict = {StateEngineTools.get_eval_name(eval_get): _issue}
                 if _issue not in [[], None, [None]] and _issue_dict not in self.__get_issues['eval']:
                     self.__get_issues['eval'].append(_issue_dict)
@@ -939,7 +941,8 @@ class SeValue(StateEngineTools.SeItemChild):
                             # noinspection PyUnusedLocal
                             stateengine_eval = se_eval = StateEngineEval.SeEval(self._abitem)
                         try:
-                            _newvalue, _issue = self.__do_cast(eval(val))
+                            _newvalue, _issue = self.__do_cast(
+                                StateEngineExpressions.evaluate(val, globals(), locals()))
                             _issue_dict = {val: _issue}
                             if _issue not in [[], None, [None]] and _issue_dict not in self.__get_issues['eval']:
                                 self.__get_issues['eval'].append(_issue_dict)
@@ -29,6 +29,7 @@ from . import StateEngineFunctions
 from . import StateEngineValue
 from . import StateEngineWebif
 from . import StateEngineStructs
+from . import StateEngineExpressions
 import logging
 import os
 import copy
@@ -48,7 +49,7 @@ logging.addLevelName(StateEngineDefaults.VERBOSE, 'DEVELOP')
 
 
 class StateEngine(SmartPlugin):
-    PLUGIN_VERSION = '2.2.1'
+    PLUGIN_VERSION = '2.2.2'
 
     # Constructor
     # noinspection PyUnusedLocal,PyMissingConstructor
@@ -133,6 +134,7 @@ class StateEngine(SmartPlugin):
     def run(self):
         # Initialize
         StateEngineStructs.global_struct = copy.deepcopy(self.itemsApi.return_struct_definitions())
+        StateEngineExpressions.clear()
         self.logger.info("Init StateEngine items")
         for item in self.itemsApi.find_items("se_plugin"):
             if item.conf["se_plugin"] == "active":
@@ -168,6 +170,7 @@ class StateEngine(SmartPlugin):
 
         self.alive = False
         self.__sh.stateengine_plugin_functions.ab_alive = False
+        StateEngineExpressions.clear()
         self.logger.debug("stop method finished")
 
     # Determine if caller/source are contained in changed_by list
@@ -209,6 +212,15 @@ class StateEngine(SmartPlugin):
             finallist.append(self._items[i])
         return finallist
 
+    def get_eval_statistics(self, limit=None):
+        """
+        Getting runtime statistics of all evaluated se_eval expressions
+
+        :param limit:   maximum number of expressions to return
+        :return:        list of dicts, expressions with highest total runtime first
+        """
+        return StateEngineExpressions.get_statistics(limit)
+
     def get_graph(self, abitem, graphtype='link', width=1, height=1):
         if isinstance(abitem, str):
             abitem = self._items[abitem]
@@ -25,6 +25,8 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 
 from lib.model.mqttplugin import MqttPlugin
+from .topic_dispatch import replay
+from .publish_queue import PublishQueue
 from lib.item.item import Item
 from .webif import WebInterface
 
@@ -34,7 +36,7 @@ class Tasmota(MqttPlugin):
     Main class of the Plugin. Does all plugin specific stuff and provides the update functions for the items
     """
 
-    PLUGIN_VERSION = '1.6.0'
+    PLUGIN_VERSION = '1.6.2'
 
     LIGHT_MSG = ['HSBColor', 'Dimmer', 'Color', 'CT', 'Scheme', 'Fade', 'Speed', 'LedTable', 'White']
 
@@ -87,6 +89,10 @@ class Tasmota(MqttPlugin):
                'ENERGY',
                ]
 
+    # message types of STATE/RESULT payloads, only the first matching exclusive type is handled
+    MSG_EXCLUSIVE = ['teleperiod', 'module', 'light', 'power', 'rf', 'setting', 'zbconfig', 'zbstatus']
+    MSG_ADDITIONAL = ['wifi', 'uptime', 'uptime_sec', 'button']
+
     def __init__(self, sh):
         """
         Initializes the plugin.
@@ -110,11 +116,34 @@ class Tasmota(MqttPlugin):
         self.tasmota_zb_bridge_topics = set()       # to hold all defined topics representing a zigbee bridge
         self.tasmota_zigbee_devices = {}            # to hold tasmota zigbee device information for web interface
         self.topics_of_retained_messages = []       # to hold all topics of retained messages
+        self._subscriptions = []                    # (topic, callback, payload_type, bool_values) for replay_capture()
+        self._msg_type_of_key = {}                  # payload key -> message type, filled on first occurrence of a key
+
+        # outbound publishes are coalesced and rate limited
+        self._publish_queue = PublishQueue(self, self.get_parameter_value('publish_rate_limits'), self.get_parameter_value('publish_dedup'))
+        self._publish_queue_item_path = self.get_parameter_value('publish_queue_item')
+
+        # handlers for the message types of STATE/RESULT payloads
+        self._msg_handlers = {
+            'teleperiod': lambda tasmota_topic, info_topic, payload: self._handle_teleperiod(tasmota_topic, payload['TelePeriod']),
+            'module':     lambda tasmota_topic, info_topic, payload: self._handle_module(tasmota_topic, payload['Module']),
+            'light':      self._handle_lights,
+            'power':      self._handle_power,
+            'rf':         lambda tasmota_topic, info_topic, payload: self._handle_rf(tasmota_topic, info_topic, payload['RfReceived']),
+            'setting':    lambda tasmota_topic, info_topic, payload: self._handle_setting(tasmota_topic, payload),
+            'zbconfig':   lambda tasmota_topic, info_topic, payload: self._handle_zbconfig(tasmota_topic, payload['ZbConfig']),
+            'zbstatus':   lambda tasmota_topic, info_topic, payload: self._handle_zbstatus(tasmota_topic, payload),
+            'wifi':       lambda tasmota_topic, info_topic, payload: self._handle_wifi(tasmota_topic, payload['Wifi']),
+            'uptime':     lambda tasmota_topic, info_topic, payload: self._handle_uptime(tasmota_topic, payload['Uptime']),
+            'uptime_sec': lambda tasmota_topic, info_topic, payload: self._handle_uptime_sec(tasmota_topic, payload['UptimeSec']),
+            'button':     self._handle_button,
+        }
 
         self.alive = None
 
         # Add subscription to get device discovery
         self.add_subscription('tasmota/discovery/#', 'dict', callback=self.on_mqtt_discovery_message)
+        self._subscriptions.append(('tasmota/discovery/#', self.on_mqtt_discovery_message, 'dict', None))
         # Add subscription to get device LWT
         self.add_tasmota_subscription('tele', '+', 'LWT', 'bool', bool_values=['Offline', 'Online'], callback=self.on_mqtt_lwt_message)
         # Add subscription to get device status
@@ -133,6 +162,7 @@ class Tasmota(MqttPlugin):
 
         # start subscription to all defined topics
         self.start_subscriptions()
+        self._publish_queue.start()
 
         self.logger.debug("Scheduler: 'check_online_status' created")
         dt = self.shtime.now() + timedelta(seconds=(self.telemetry_period - 3))
@@ -153,6 +183,7 @@ class Tasmota(MqttPlugin):
 
         # stop subscription to all topics
         self.stop_subscriptions()
+        self._publish_queue.stop()
 
     def parse_item(self, item):
         """
@@ -168,6 +199,11 @@ class Tasmota(MqttPlugin):
                         can be sent to the knx with a knx write function within the knx plugin.
         """
 
+        if self._publish_queue_item_path and item.property.path == self._publish_queue_item_path:
+            self.logger.debug(f"publish queue item {item.property.path} registered")
+            self._publish_queue.depth_item = item
+            return
+
         if self.has_iattr(item.conf, 'tasmota_topic'):
             tasmota_topic = self.get_iattr_value(item.conf, 'tasmota_topic')
             self.logger.info(f"parsing item: {item.property.path} with tasmota_topic={tasmota_topic}")
@@ -288,7 +324,11 @@ class Tasmota(MqttPlugin):
         :param dest: if given it represents the dest
         """
 
-        if self.alive and caller != self.get_shortname():
+        if caller == self.get_shortname():
+            # value has been received from the device
+            self._publish_queue.confirm(item)
+
+        elif self.alive:
 
             # get tasmota attributes of item
             tasmota_admin = self.get_iattr_value(item.conf, 'tasmota_admin')
@@ -867,7 +907,7 @@ class Tasmota(MqttPlugin):
 
             try:
                 (topic_type, tasmota_topic, info_topic) = topic.split('/')
-                self.logger.info(f"topic_type={topic_type}, tasmota_topic={tasmota_topic}, info_topic={info_topic}, payload={payload}")
+                self.logger.debug(f"topic_type={topic_type}, tasmota_topic={tasmota_topic}, info_topic={info_topic}, payload={payload}")
             except ValueError:
                 self.logger.error(f"received topic {topic} is not in correct format.")
                 return
@@ -882,70 +922,21 @@ class Tasmota(MqttPlugin):
 
             # handle message
             if info_topic in ['STATE', 'RESULT']:
+                msg_types = self._get_msg_types(payload)
+
+                for msg_type in self.MSG_EXCLUSIVE:
+                    if msg_type in msg_types:
+                        self.logger.debug(f"Received Message decoded as {msg_type} message.")
+                        self._msg_handlers[msg_type](tasmota_topic, info_topic, payload)
+                        break
 
-                # Handling of TelePeriod
-                if 'TelePeriod' in payload:
-                    self.logger.info("Received Message decoded as teleperiod message.")
-                    self._handle_teleperiod(tasmota_topic, payload['TelePeriod'])
-
-                # Handling of Module
-                elif 'Module' in payload:
-                    self.logger.info("Received Message decoded as Module message.")
-                    self._handle_module(tasmota_topic, payload['Module'])
-
-                # Handling of Light messages
-                elif any([i in payload for i in self.LIGHT_MSG]):
-                    self.logger.info("Received Message decoded as light message.")
-                    self._handle_lights(tasmota_topic, info_topic, payload)
-
-                # Handling of Power messages
-                elif any(item.startswith("POWER") for item in payload.keys()):
-                    self.logger.info("Received Message decoded as power message.")
-                    self._handle_power(tasmota_topic, info_topic, payload)
-
-                # Handling of RF messages payload={'Time': '2022-11-21T11:22:55', 'RfReceived': {'Sync': 10120, 'Low': 330, 'High': 980, 'Data': '3602B8', 'RfKey': 'None'}}
-                elif 'RfReceived' in payload:
-                    self.logger.info("Received Message decoded as RF message.")
-                    self._handle_rf(tasmota_topic, info_topic, payload['RfReceived'])
-
-                # Handling of Setting messages
-                elif next(iter(payload)).startswith("SetOption"):
-                    # elif any(item.startswith("SetOption") for item in payload.keys()):
-                    self.logger.info("Received Message decoded as Tasmota Setting message.")
-                    self._handle_setting(tasmota_topic, payload)
-
-                # Handling of Zigbee Bridge Config messages
-                elif 'ZbConfig' in payload:
-                    self.logger.info("Received Message decoded as Zigbee Config message.")
-                    self._handle_zbconfig(tasmota_topic, payload['ZbConfig'])
-
-                # Handling of Zigbee Bridge Status messages
-                elif any(item.startswith("ZbStatus") for item in payload.keys()):
-                    self.logger.info("Received Message decoded as Zigbee ZbStatus message.")
-                    self._handle_zbstatus(tasmota_topic, payload)
-
-                # Handling of Wi-Fi
-                if 'Wifi' in payload:
-                    self.logger.info("Received Message contains Wifi information.")
-                    self._handle_wifi(tasmota_topic, payload['Wifi'])
-
-                # Handling of Uptime
-                if 'Uptime' in payload:
-                    self.logger.info("Received Message contains Uptime information.")
-                    self._handle_uptime(tasmota_topic, payload['Uptime'])
-
-                # Handling of UptimeSec
-                if 'UptimeSec' in payload:
-                    self.logger.info("Received Message contains UptimeSec information.")
-                    self._handle_uptime_sec(tasmota_topic, payload['UptimeSec'])
-
-                # Handling of Button messages
-                if any(item.startswith("Button") for item in payload.keys()):
-                    self.logger.info("Received Message decoded as button message.")
-                    self._handle_button(tasmota_topic, info_topic, payload)
+                for msg_type in self.MSG_ADDITIONAL:
+                    if msg_type in msg_types:
+                        self.logger.debug(f"Received Message contains {msg_type} information.")
+                        self._msg_handlers[msg_type](tasmota_topic, info_topic, payload)
 
             elif info_topic == 'SENSOR':
-                self.logger.info("Received Message contains sensor information.")
+                self.logger.debug("Received Message contains sensor information.")
                 self._handle_sensor(tasmota_topic, info_topic, payload)
 
             else:
@@ -998,6 +989,64 @@ class Tasmota(MqttPlugin):
             self.logger.exception(f"Exception {e.__class__.__name__}: {e}")
             return
 
+    def _get_msg_types(self, payload: dict) -> set:
+        """
+        Return the message types contained in a STATE/RESULT payload
+
+        The type of each payload key is determined once and cached.
+        """
+        msg_types = set()
+        for key in payload:
+            msg_type = self._msg_type_of_key.get(key, '')
+            if msg_type == '':
+                msg_type = self._msg_type_of_key[key] = self._classify_key(key)
+            if msg_type is not None:
+                msg_types.add(msg_type)
+
+        # settings are only handled, if the payload starts with a SetOption
+        if 'setting' in msg_types and self._msg_type_of_key[next(iter(payload))] != 'setting':
+            msg_types.discard('setting')
+        return msg_types
+
+    def _classify_key(self, key: str):
+        """ Return the message type of a payload key (None, if the key does not determine a message type) """
+        if key == 'TelePeriod':
+            return 'teleperiod'
+        if key == 'Module':
+            return 'module'
+        if key in self.LIGHT_MSG:
+            return 'light'
+        if key.startswith('POWER'):
+            return 'power'
+        if key == 'RfReceived':
+            return 'rf'
+        if key.startswith('SetOption'):
+            return 'setting'
+        if key == 'ZbConfig':
+            return 'zbconfig'
+        if key.startswith('ZbStatus'):
+            return 'zbstatus'
+        if key == 'Wifi':
+            return 'wifi'
+        if key == 'Uptime':
+            return 'uptime'
+        if key == 'UptimeSec':
+            return 'uptime_sec'
+        if key.startswith('Button'):
+            return 'button'
+        return None
+
+    def replay_capture(self, filename, repeat=1):
+        """
+        Replay a recorded message capture through the subscriptions of the plugin and measure messages/s
+
+        Items are updated as for received messages, so use it on a test system only.
+
+        :param filename: capture file (output of 'mosquitto_sub -v -t "#"' or json lines)
+        :param repeat: number of times the capture is replayed
+        """
+        return replay(self.get_fullname(), filename, self._subscriptions, repeat, self.logger)
+
     ############################################################
     #   Parse detailed messages
     ############################################################
@@ -1502,6 +1551,7 @@ class Tasmota(MqttPlugin):
         tpc = tpc.replace("%topic%", topic)
         tpc += detail
         self.add_subscription(tpc, payload_type, bool_values=bool_values, callback=callback)
+        self._subscriptions.append((tpc, callback, payload_type, bool_values))
 
     def publish_tasmota_topic(self, prefix: str, topic: str, detail: str, payload=None, item: Item|None = None, qos: int|None = None, retain: bool = False, bool_values: list|None = None) -> None:
         """
@@ -1521,7 +1571,7 @@ class Tasmota(MqttPlugin):
         tpc = tpc.replace("%topic%", topic)
         tpc += detail
 
-        self.publish_topic(tpc, payload, item, qos, retain, bool_values)
+        self._publish_queue.publish(tpc, payload, item, qos, retain, bool_values)
 
     def interview_all_devices(self):
 
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2017-2018  Martin Sinn                         m.sinn@gmx.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Outbound publish queue for MQTT based plugins (mqtt, zigbee2mqtt, tasmota, shelly)
+#
+#  Plugins must not import modules of other plugins, every plugin using the publish queue
+#  has its own copy of this file. Keep the copies identical.
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Outbound publish queue
+
+Publishes for the same item and topic are coalesced while they wait in the queue (the last value wins).
+Publishes without an item are never coalesced. Rate limits are configured per topic prefix, a '+' in
+the prefix gives every device its own limit (e.g. 'zigbee2mqtt/+': 2 -> 2 messages/s per device).
+"""
+
+import itertools
+import threading
+import time
+
+_MISSING = object()
+
+
+class PublishQueue:
+
+    def __init__(self, plugin, rate_limits=None, dedup=False, depth_item=None):
+        """
+        :param plugin: MqttPlugin instance, whose publish_topic() is used for sending
+        :param rate_limits: dict of topic prefix -> max. messages per second
+        :param dedup: skip publishes of values equal to the last state confirmed by the device
+        :param depth_item: item that receives the number of waiting publishes
+        """
+        self.plugin = plugin
+        self.logger = plugin.logger
+        self.dedup = dedup
+        self.depth_item = depth_item
+
+        self._rules = []
+        for prefix, rate in (rate_limits or {}).items():
+            try:
+                rate = float(rate)
+            except (TypeError, ValueError):
+                self.logger.warning(f"PublishQueue: Invalid rate limit '{rate}' for '{prefix}' ignored")
+                continue
+            if rate > 0:
+                self._rules.append((prefix.rstrip('/#').split('/'), rate))
+        # longest prefixes first
+        self._rules.sort(key=lambda r: len(r[0]), reverse=True)
+
+        self._lock = threading.Condition()
+        self._pending = {}              # key -> [topic, payload, item, qos, retain, bool_values, bucket, for_item]
+        self._buckets = {}              # bucket key -> [rate, tokens, timestamp]
+        self._confirmed = {}            # item path -> value last confirmed by the device
+        self._unique = itertools.count()
+        self._thread = None
+        self._running = False
+        self._depth = 0
+        self.stats = {'queued': 0, 'published': 0, 'coalesced': 0, 'deduplicated': 0, 'max_depth': 0}
+
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._worker, name=self.plugin.get_fullname() + '.publish_queue')
+        self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            if self._pending:
+                self.logger.info(f"PublishQueue: Discarding {len(self._pending)} waiting publishes")
+            self._pending.clear()
+            self._lock.notify()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        self._update_depth()
+
+
+    def publish(self, topic, payload, item=None, qos=None, retain=False, bool_values=None, for_item=None):
+        """
+        Queue a publish, a waiting publish for the same item and topic is replaced
+
+        :param for_item: item the publish is made for, if it is not passed to publish_topic() as item
+        """
+        if not self._running:
+            self.plugin.publish_topic(topic, payload, item, qos, retain, bool_values)
+            return
+
+        if for_item is None:
+            for_item = item
+        with self._lock:
+            if for_item is not None:
+                key = (topic, for_item.property.path)
+                if self.dedup and self._confirmed.get(for_item.property.path, _MISSING) == for_item():
+                    # device already has this state, a waiting (older) value is obsolete as well
+                    self.stats['deduplicated'] += 1
+                    self._pending.pop(key, None)
+                    self._set_depth()
+                    return
+            else:
+                key = next(self._unique)
+
+            if key in self._pending:
+                self.stats['coalesced'] += 1
+                self._pending[key][1] = payload
+            else:
+                self._pending[key] = [topic, payload, item, qos, retain, bool_values, self._get_bucket(topic), for_item]
+            self.stats['queued'] += 1
+            self._set_depth()
+            self._lock.notify()
+        self._update_depth()
+
+
+    def confirm(self, item, value=_MISSING):
+        """
+        Store the state of an item as confirmed by the device (called when the plugin sets the item value)
+        """
+        if self.dedup:
+            self._confirmed[item.property.path] = item() if value is _MISSING else value
+
+
+    def depth(self):
+        return self._depth
+
+
+    def _get_bucket(self, topic):
+        levels = topic.split('/')
+        for prefix, rate in self._rules:
+            if len(levels) >= len(prefix) and all(level in ('+', topic_level) for level, topic_level in zip(prefix, levels)):
+                bucket_key = '/'.join(levels[:len(prefix)])
+                if bucket_key not in self._buckets:
+                    self._buckets[bucket_key] = [rate, max(1.0, rate), time.monotonic()]
+                return bucket_key
+        return None
+
+    def _take_token(self, bucket_key, now):
+        """
+        :return: 0 if a token was taken, otherwise the time in seconds until a token is available
+        """
+        if bucket_key is None:
+            return 0
+        bucket = self._buckets[bucket_key]
+        rate = bucket[0]
+        bucket[1] = min(max(1.0, rate), bucket[1] + (now - bucket[2]) * rate)
+        bucket[2] = now
+        if bucket[1] >= 1:
+            bucket[1] -= 1
+            return 0
+        return (1 - bucket[1]) / rate
+
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                send = []
+                wait = None
+                while self._running and not send:
+                    now = time.monotonic()
+                    wait = None
+                    blocked = set()
+                    for key, entry in list(self._pending.items()):
+                        bucket_key = entry[6]
+                        if bucket_key in blocked:
+                            continue
+                        delay = self._take_token(bucket_key, now)
+                        if delay == 0:
+                            send.append(self._pending.pop(key))
+                        else:
+                            blocked.add(bucket_key)
+                            wait = delay if wait is None else min(wait, delay)
+                    if not send:
+                        self._lock.wait(wait)
+                if not self._running:
+                    return
+                self._set_depth()
+
+            self._update_depth()
+            for topic, payload, item, qos, retain, bool_values, bucket_key, for_item in send:
+                if for_item is not None:
+                    # the state of the device is unknown until it confirms the new value
+                    self._confirmed.pop(for_item.property.path, None)
+                try:
+                    self.plugin.publish_topic(topic, payload, item, qos, retain, bool_values)
+                    self.stats['published'] += 1
+                except Exception as ex:
+                    self.logger.error(f"PublishQueue: Publishing topic '{topic}' failed: {ex}")
+
+
+    def _set_depth(self):
+        self._depth = len(self._pending)
+        if self._depth > self.stats['max_depth']:
+            self.stats['max_depth'] = self._depth
+
+    def _update_depth(self):
+        if self.depth_item is not None and self.depth_item() != self._depth:
+            self.depth_item(self._depth, self.plugin.get_shortname())
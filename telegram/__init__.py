@@ -29,6 +29,7 @@ import datetime
 import time
 import logging
 import asyncio
+import functools
 import queue
 import re
 import requests
@@ -39,12 +40,13 @@ from queue import Queue
 from lib.logic import Logics
 from lib.model.smartplugin import SmartPlugin
 
+from .outbox import Outbox, Entry, Photo
 from .webif import WebInterface
 
 try:
     from telegram import Update
     from telegram.ext import Updater, Application, CommandHandler, ContextTypes, MessageHandler, filters
-    from telegram.error import TelegramError
+    from telegram.error import TelegramError, RetryAfter
     REQUIRED_PACKAGE_IMPORTED = True
 except Exception as e:
     REQUIRED_PACKAGE_IMPORTED = e
@@ -58,6 +60,7 @@ ITEM_ATTR_MATCHREGEX      = 'telegram_value_match_regex'  # check a value agains
 ITEM_ATTR_CHAT_IDS        = 'telegram_chat_ids'           # specifying chat IDs and write access
 ITEM_ATTR_MSG_ID          = 'telegram_message_chat_id'    # chat_id the message should be sent to
 ITEM_ATTR_CONTROL         = 'telegram_control'            # control(=change) item-values (bool/num)
+ITEM_ATTR_DIAGNOSTIC      = 'telegram_diagnostic'         # diagnostic values of the outbound queue (queue_latency, queue_length)
 
 MESSAGE_TAG_ID            = '[ID]'
 MESSAGE_TAG_NAME          = '[NAME]'
@@ -68,7 +71,7 @@ MESSAGE_TAG_DEST          = '[DEST]'
 
 class Telegram(SmartPlugin):
 
-    PLUGIN_VERSION = '2.0.3'
+    PLUGIN_VERSION = '2.0.4'
 
     _items = []               # all items using attribute ``telegram_message``
     _items_info = {}          # dict used whith the info-command: key = attribute_value, val= item_list telegram_info
@@ -77,6 +80,8 @@ class Telegram(SmartPlugin):
     _chat_ids_item = {}       # an item with a dict of chat_id and write access
     _waitAnswer = None        # wait a specific answer Yes/No - or num (change_item)
     _queue = None             # queue for the messages to be sent
+    _outbox = None            # messages taken from the queue, waiting for the rate limits
+    _diagnostic_items = {}    # dict of diagnostic items: key = attribute_value, val = item_list
     _cHandlers = []           # CommandHandler from parse_item
 
     def __init__(self, sh):
@@ -117,12 +122,19 @@ class Telegram(SmartPlugin):
         self._pretty_thread_names = self.get_parameter_value('pretty_thread_names')
         self._resend_delay = self.get_parameter_value('resend_delay')
         self._resend_attemps = self.get_parameter_value('resend_attemps')
+        self._rate_limit = self.get_parameter_value('rate_limit')
+        self._rate_limit_chat = self.get_parameter_value('rate_limit_chat')
+        self._merge_messages = self.get_parameter_value('merge_messages')
 
         self._pause_item = None
         self._pause_item_path = self.get_parameter_value('pause_item')
 
         self._bot =  None
         self._queue = Queue()
+        self._outbox = Outbox(self._rate_limit, self._rate_limit_chat, self._merge_messages)
+        self._outbox_event = None
+        self._diagnostic_items = {}
+        self._queue_latency = None
 
         self.init_webinterface()
         if not self.init_webinterface(WebInterface):
@@ -209,9 +221,9 @@ class Telegram(SmartPlugin):
         except Exception as e:
             self.logger.error(f"could not send bye message [{e}]")
 
-        if not self._queue.empty():
+        if self._pending():
             time.sleep(5)
-            if not self._queue.empty():
+            if self._pending():
                 try:
                     self.alive = False # Clears the infiniti loop in sendQueue
                     self.remove_all_events()
@@ -241,8 +253,28 @@ class Telegram(SmartPlugin):
         while not self._queue.empty():
             self._queue.get_nowait()  # Entfernt das Event aus der Queue
             self._queue.task_done()  # Markiert die Aufgabe als erledigt
+        self._outbox.clear()
         self.logger.debug("all events removed")
 
+    def _pending(self):
+        """
+        True if there are messages in the queue or in the outbox
+        """
+        return not self._queue.empty() or len(self._outbox) > 0
+
+    def _put(self, q_msg):
+        """
+        Puts a message into the queue and wakes up sendQueue, may be called from any thread
+        """
+        q_msg["queued"] = time.time()
+        self._queue.put(q_msg)
+        event = self._outbox_event
+        if event is not None:
+            try:
+                self._loop.call_soon_threadsafe(event.set)
+            except RuntimeError:        # loop already closed
+                pass
+
     def _start_loop(self):
         self._loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self._loop)
@@ -307,57 +339,126 @@ class Telegram(SmartPlugin):
         The queue expects a dictionary with various parameters
         dict txt:   {"msgType":"Text", "msg":msg, "chat_id":chat_id, "reply_markup":reply_markup, "parse_mode":parse_mode }
         dict photo: {"msgType":"Photo", "photofile_or_url":photofile_or_url, "chat_id":chat_id, "caption":caption, "local_prepare":local_prepare}
+
+        The messages are moved into the outbox with one entry per chat. The outbox decides which message
+        may be sent next without exceeding the global and the per chat rate limits.
         """
         if self.logger.isEnabledFor(logging.DEBUG):
             self.logger.debug(f"sendQueue called - queue: [{self._queue}]")
+        self._outbox_event = asyncio.Event()
         while self.alive:           # infinite loop until self.alive = False
+            self._outbox_event.clear()
+            self._fill_outbox()
+            entry, wait = self._outbox.next(time.monotonic())
+            if entry is None:
+                try:
+                    await asyncio.wait_for(self._outbox_event.wait(), timeout=1 if wait is None else min(wait, 1))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._send_entry(entry)
+
+        self._outbox_event = None
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("sendQueue method end")
+
+    def _fill_outbox(self):
+        """
+        Moves the messages of the queue into the outbox
+        """
+        while True:
             try:
                 message = self._queue.get_nowait()
             except queue.Empty:     # no message to send in the queue
-                await asyncio.sleep(1)
+                break
             except Exception as e:
                 self.logger.debug(f"messageQueue Exception [{e}]")
-            else:                   # message to be sent in the queue
-                resendDelay = 0
-                resendAttemps = 0
-                if "resendDelay" in message:
-                    resendDelay = message["resendDelay"]
-                if "resendAttemps" in message:
-                    resendAttemps =  message["resendAttemps"]
-
-                if resendDelay <= 0:
-                    if self.logger.isEnabledFor(logging.DEBUG):
-                        self.logger.debug(f"message queue {message}")
-                    if message["msgType"] == "Text":
-                        result = await self.async_msg_broadcast(message["msg"], message["chat_id"], message["reply_markup"], message["parse_mode"])
-                    elif message["msgType"] == "Photo":
-                        result = await self.async_photo_broadcast(message["photofile_or_url"], message["caption"], message["chat_id"], message["local_prepare"])
-
-                    # An error occurred while sending - result: list containing the dic of the failed send attempt
-                    if result:
-                        for res in result:
-                            resendAttemps+=1
-                            if resendAttemps > self._resend_attemps:
-                                if self.logger.isEnabledFor(logging.DEBUG):
-                                    self.logger.debug(f"don't initiate any further send attempts for: {res}")
-                                break
-                            else:
-                                resendDelay =  self._resend_delay
-
-                            # Including the sendDelay and sendAttempts in the queue message for the next send attempt.
-                            res["resendDelay"] = resendDelay
-                            res["resendAttemps"] = resendAttemps
+                break
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"message queue {message}")
+            queued = message.get("queued", time.time())
+            if message["msgType"] == "Text":
+                for cid in self.get_chat_id_list(message["chat_id"]):
+                    self._outbox.put(Entry("Text", cid, queued, msg=message["msg"], reply_markup=message["reply_markup"], parse_mode=message["parse_mode"]))
+            elif message["msgType"] == "Photo":
+                photo = Photo(message["photofile_or_url"], message["caption"], message["local_prepare"])
+                for cid in self.get_chat_id_list(message["chat_id"]):
+                    self._outbox.put(Entry("Photo", cid, queued, photo=photo))
+        self._update_diagnostic('queue_length', len(self._outbox))
+
+    async def _send_entry(self, entry):
+        """
+        Sends one entry of the outbox, on error the entry is put back into the outbox for a new send attempt
+        """
+        self._outbox.sent(entry, time.monotonic())
+        try:
+            if entry.msgType == "Text":
+                response = await self._bot.sendMessage(chat_id=entry.chat_id, text=entry.msg, reply_markup=entry.reply_markup, parse_mode=entry.parse_mode)
+            else:
+                response = await self._send_photo(entry.photo, entry.chat_id)
+        except RetryAfter as e:
+            # flood limit exceeded: wait as long as requested by Telegram, this does not count as send attempt
+            retry_after = e.retry_after.total_seconds() if isinstance(e.retry_after, datetime.timedelta) else e.retry_after
+            self.logger.warning(f"flood control of Telegram, waiting {retry_after} seconds before sending to chat id [{entry.chat_id}]")
+            self._outbox.hold(time.monotonic() + retry_after)
+            self._outbox.retry(entry, 0)
+            return
+        except TelegramError as e:
+            self.logger.error(f"could not broadcast to chat id [{entry.chat_id}] due to error {e}")
+            response = None
+        except Exception as e:
+            self.logger.error(f"Error '{e}' could not send {entry.msgType} to chat id [{entry.chat_id}]")
+            response = None
 
-                            if self.logger.isEnabledFor(logging.DEBUG):
-                                self.logger.debug(f"new send attempt by placing it in the queue. sendAttemps:{resendAttemps} sendDelay:{resendDelay} [{res}]")
-                            self._queue.put(res) # new send attempt by replacing the message in the queue
-                else:
-                    message["resendDelay"] = resendDelay - 1
-                    await asyncio.sleep(1)
-                    self._queue.put(message)    # new send attempt by replacing the message in the queue
+        if response:
+            self._queue_latency = time.time() - entry.queued
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"{entry.msgType} sent to Chat_ID:[{entry.chat_id}] after {self._queue_latency:.3f} seconds, response:[{response}]")
+            self._update_diagnostic('queue_latency', round(self._queue_latency, 3))
+            self._update_diagnostic('queue_length', len(self._outbox))
+            return
 
+        entry.attempts += 1
+        if entry.attempts > self._resend_attemps:
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"don't initiate any further send attempts for: {entry.msgType} to chat id [{entry.chat_id}]")
+            return
         if self.logger.isEnabledFor(logging.DEBUG):
-            self.logger.debug("sendQueue method end")
+            self.logger.debug(f"new send attempt in {self._resend_delay} seconds. sendAttemps:{entry.attempts} {entry.msgType} to chat id [{entry.chat_id}]")
+        self._outbox.retry(entry, time.monotonic() + self._resend_delay)
+
+    async def _fetch_photo(self, photo):
+        """
+        Reads the image of a local file or a URL without blocking the event loop
+        """
+        loop = asyncio.get_running_loop()
+        if photo.photofile_or_url.startswith("http"):
+            response = await loop.run_in_executor(None, functools.partial(requests.get, photo.photofile_or_url, timeout=30))
+            return response.content
+        with open(str(photo.photofile_or_url), 'rb') as f:
+            return await loop.run_in_executor(None, f.read)
+
+    async def _send_photo(self, photo, cid):
+        """
+        Sends an image to one chat, the image is uploaded only for the first chat and then reused by its file_id
+        """
+        if photo.file_id is not None:
+            source = photo.file_id
+        elif photo.photofile_or_url.startswith("http") and not photo.local_prepare:
+            source = photo.photofile_or_url
+        else:
+            if photo.data is None:
+                photo.data = await self._fetch_photo(photo)
+            source = BytesIO(photo.data)
+        response = await self._bot.send_photo(chat_id=cid, photo=source, caption=photo.caption)
+        if response and photo.file_id is None and getattr(response, 'photo', None):
+            photo.file_id = response.photo[-1].file_id
+            photo.data = None
+        return response
+
+    def _update_diagnostic(self, key, value):
+        for item in self._diagnostic_items.get(key, []):
+            item(value, self.get_shortname())
 
     async def disconnect(self):
         """
@@ -391,6 +492,12 @@ class Telegram(SmartPlugin):
             else:
                 self._chat_ids_item = item
 
+        if self.has_iattr(item.conf, ITEM_ATTR_DIAGNOSTIC):
+            key = self.get_iattr_value(item.conf, ITEM_ATTR_DIAGNOSTIC)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"parse item: {item} diagnostic {key}")
+            self._diagnostic_items.setdefault(key, []).append(item)
+
         if self.has_iattr(item.conf, ITEM_ATTR_MESSAGE):
             if self.logger.isEnabledFor(logging.DEBUG):
                 self.logger.debug(f"parse item: {item}")
@@ -625,7 +732,7 @@ class Telegram(SmartPlugin):
                 self.logger.debug(f"msg_broadcast called")
             q_msg= {"msgType":"Text", "msg":msg, "chat_id":chat_id, "reply_markup":reply_markup, "parse_mode":parse_mode }
             try:
-                self._queue.put(q_msg)
+                self._put(q_msg)
             except Exception as e:
                 self.logger.debug(f"Exception '{e}' occurred, please inform plugin maintainer!")
 
@@ -639,17 +746,10 @@ class Telegram(SmartPlugin):
         :param chat_id: a chat id or a list of chat ids to identificate the chat(s)
         """
         sendResult = []
+        photo = Photo(photofile_or_url, caption, local_prepare)
         for cid in self.get_chat_id_list(chat_id):
             try:
-                if photofile_or_url.startswith("http"):
-                    if local_prepare:
-                        photo_raw = requests.get(photofile_or_url)
-                        photo_data = BytesIO(photo_raw.content)
-                        response = await self._bot.send_photo(chat_id=cid, photo=photo_data, caption=caption)
-                    else:
-                        response = await self._bot.send_photo(chat_id=cid, photo=photofile_or_url, caption=caption)
-                else:
-                    response = await self._bot.send_photo(chat_id=cid, photo=open(str(photofile_or_url), 'rb'), caption=caption)
+                response = await self._send_photo(photo, cid)
                 if response:
                     if self.logger.isEnabledFor(logging.DEBUG):
                         self.logger.debug(f"Photo sent to Chat_ID:[{cid}] Bot:[{self._bot.bot}] response:[{response}]")
@@ -678,7 +778,7 @@ class Telegram(SmartPlugin):
                 self.logger.debug(f"photo_broadcast called")
             q_msg= {"msgType":"Photo", "photofile_or_url":photofile_or_url, "chat_id":chat_id, "caption":caption, "local_prepare":local_prepare }
             try:
-                self._queue.put(q_msg)
+                self._put(q_msg)
             except Exception as e:
                 self.logger.debug(f"Exception '{e}' occurred, please inform plugin maintainer!")
 
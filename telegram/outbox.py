@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+# Copyright 2017 Markus Garscha                 http://knx-user-forum.de/
+#           2018-2024 Ivan De Filippis
+#           2018-2021 Bernd Meiners                 Bernd.Meiners@mail.de
+#########################################################################
+#
+#  This file is part of SmartHomeNG.
+#
+#  Telegram Plugin for querying and updating items or sending messages via Telegram
+#
+#  Outbound message scheduling with respect to the flood limits of Telegram
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import collections
+
+MAX_MESSAGE_LENGTH = 4096       # maximum length of a text message
+GROUP_LIMIT = (20, 60)          # Telegram allows 20 messages per minute to the same group
+
+
+class RateLimiter(object):
+    """
+    Sliding window limit of count events per period seconds
+    """
+
+    def __init__(self, count, period=1.0):
+        self.count = max(int(count), 1)
+        self.period = period
+        self._times = collections.deque()
+
+    def delay(self, now):
+        """
+        :return: seconds to wait until the next event is allowed, 0 if it is allowed now
+        """
+        times = self._times
+        while times and now - times[0] >= self.period:
+            times.popleft()
+        if len(times) < self.count:
+            return 0
+        return times[0] + self.period - now
+
+    def add(self, now):
+        self._times.append(now)
+
+
+class Photo(object):
+    """
+    Image sent to one or more chats
+
+    The image is fetched once. After the first upload the file_id returned by Telegram is used
+    for the other chats, so the image is uploaded only once.
+    """
+
+    def __init__(self, photofile_or_url, caption=None, local_prepare=True):
+        self.photofile_or_url = photofile_or_url
+        self.caption = caption
+        self.local_prepare = local_prepare
+        self.data = None
+        self.file_id = None
+
+
+class Entry(object):
+    """
+    Message waiting to be sent to one chat
+    """
+    __slots__ = ('msgType', 'chat_id', 'msg', 'reply_markup', 'parse_mode', 'photo', 'queued', 'due', 'attempts')
+
+    def __init__(self, msgType, chat_id, queued, msg=None, reply_markup=None, parse_mode=None, photo=None):
+        self.msgType = msgType
+        self.chat_id = chat_id
+        self.msg = msg
+        self.reply_markup = reply_markup
+        self.parse_mode = parse_mode
+        self.photo = photo
+        self.queued = queued
+        self.due = 0
+        self.attempts = 0
+
+    def merge(self, other):
+        """
+        Appends the text of other if both are text messages with the same options and the result is not too long
+
+        :return: True if merged
+        """
+        if self.msgType != 'Text' or other.msgType != 'Text' or self.attempts or \
+                self.reply_markup is not None or other.reply_markup is not None or self.parse_mode != other.parse_mode:
+            return False
+        if len(self.msg) + len(other.msg) + 1 > MAX_MESSAGE_LENGTH:
+            return False
+        self.msg = self.msg + '\n' + other.msg
+        return True
+
+
+class Outbox(object):
+    """
+    Messages to be sent, kept per chat
+
+    The messages of a chat are sent in order, between the chats the message queued first is sent
+    first. The global limit and the limit per chat are respected. If merge is True, text messages
+    queued to a chat while the chat has to wait are merged into one message.
+    """
+
+    def __init__(self, rate_limit=25, rate_limit_chat=1, merge=False):
+        self._global = RateLimiter(rate_limit)
+        self._rate_limit_chat = rate_limit_chat
+        self._merge = merge
+        self._chats = collections.OrderedDict()     # chat_id -> deque of entries
+        self._limits = {}                           # chat_id -> list of RateLimiter
+        self._hold = 0                              # no message before this time (flood wait reported by Telegram)
+        self.merged = 0
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._chats.values())
+
+    def _chat_limits(self, chat_id):
+        limits = self._limits.get(chat_id)
+        if limits is None:
+            limits = [RateLimiter(self._rate_limit_chat)]
+            try:
+                if int(chat_id) < 0:
+                    limits.append(RateLimiter(*GROUP_LIMIT))
+            except (TypeError, ValueError):
+                pass
+            self._limits[chat_id] = limits
+        return limits
+
+    def put(self, entry):
+        entries = self._chats.setdefault(entry.chat_id, collections.deque())
+        if self._merge and entries and entries[-1].merge(entry):
+            self.merged += 1
+            return
+        entries.append(entry)
+
+    def retry(self, entry, due):
+        """
+        Puts an entry back to the front of its chat to be sent again at due
+        """
+        entry.due = due
+        self._chats.setdefault(entry.chat_id, collections.deque()).appendleft(entry)
+
+    def hold(self, until):
+        self._hold = max(self._hold, until)
+
+    def next(self, now):
+        """
+        :return: tuple (entry to be sent now or None, seconds to wait for the next entry or None if empty)
+        """
+        wait = None
+        best = None
+        global_delay = max(self._global.delay(now), self._hold - now, 0)
+        for chat_id, entries in self._chats.items():
+            if not entries:
+                continue
+            head = entries[0]
+            delay = max([global_delay, head.due - now] + [limit.delay(now) for limit in self._chat_limits(chat_id)])
+            if delay <= 0:
+                if best is None or head.queued < best.queued:
+                    best = head
+            elif wait is None or delay < wait:
+                wait = delay
+        if best is None:
+            return None, wait
+        entries = self._chats[best.chat_id]
+        entries.popleft()
+        if not entries:
+            del self._chats[best.chat_id]
+        return best, 0
+
+    def sent(self, entry, now):
+        """
+        Counts an attempt to send entry for the rate limits
+        """
+        self._global.add(now)
+        for limit in self._chat_limits(entry.chat_id):
+            limit.add(now)
+
+    def clear(self):
+        self._chats.clear()
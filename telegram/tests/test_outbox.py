@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+# Copyright 2017 Markus Garscha                 http://knx-user-forum.de/
+#           2018-2024 Ivan De Filippis
+#           2018-2021 Bernd Meiners                 Bernd.Meiners@mail.de
+#########################################################################
+#
+#  This file is part of SmartHomeNG.
+#
+#  Tests of the outbound message scheduling of the telegram plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import unittest
+
+from plugins.telegram.outbox import Entry, Outbox, RateLimiter, MAX_MESSAGE_LENGTH
+
+
+def text(chat_id, msg, queued, **kwargs):
+    return Entry('Text', chat_id, queued, msg=msg, **kwargs)
+
+
+def drain(outbox, now=0.0, limit=10000):
+    """
+    sends all entries as the sender loop does, returns a list of (time, chat_id, msg)
+    """
+    sent = []
+    for _ in range(limit):
+        entry, wait = outbox.next(now)
+        if entry is None:
+            if wait is None:
+                return sent
+            now += wait
+            continue
+        outbox.sent(entry, now)
+        sent.append((now, entry.chat_id, entry.msg))
+    raise AssertionError('outbox not drained')
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_window(self):
+        limiter = RateLimiter(2, 1.0)
+        self.assertEqual(limiter.delay(0.0), 0)
+        limiter.add(0.0)
+        limiter.add(0.2)
+        self.assertAlmostEqual(limiter.delay(0.5), 0.5)
+        self.assertEqual(limiter.delay(1.0), 0)
+        limiter.add(1.0)
+        self.assertAlmostEqual(limiter.delay(1.1), 0.1)
+
+    def test_minimum_count(self):
+        self.assertEqual(RateLimiter(0).count, 1)
+
+
+class TestOutbox(unittest.TestCase):
+
+    def test_no_merge_by_default(self):
+        outbox = Outbox()
+        for n in range(3):
+            outbox.put(text(1, 'msg {}'.format(n), n))
+        self.assertEqual(len(outbox), 3)
+        self.assertEqual([msg for time, chat_id, msg in drain(outbox)], ['msg 0', 'msg 1', 'msg 2'])
+        self.assertEqual(outbox.merged, 0)
+
+    def test_merge(self):
+        outbox = Outbox(merge=True)
+        outbox.put(text(1, 'a', 0))
+        outbox.put(text(1, 'b', 1))
+        outbox.put(text(1, 'c', 2, reply_markup={'keyboard': []}))
+        outbox.put(text(1, 'd', 3))
+        outbox.put(text(1, 'e', 4, parse_mode='HTML'))
+        self.assertEqual(outbox.merged, 1)
+        self.assertEqual([msg for time, chat_id, msg in drain(outbox)], ['a\nb', 'c', 'd', 'e'])
+
+    def test_merge_length(self):
+        outbox = Outbox(merge=True)
+        outbox.put(text(1, 'x' * (MAX_MESSAGE_LENGTH - 1), 0))
+        outbox.put(text(1, 'y', 1))
+        self.assertEqual(len(outbox), 2)
+
+    def test_chat_order(self):
+        # order within a chat is kept, between the chats the entry queued first goes first
+        outbox = Outbox(rate_limit=100, rate_limit_chat=1)
+        outbox.put(text(1, '1a', 0))
+        outbox.put(text(1, '1b', 1))
+        outbox.put(text(2, '2a', 2))
+        outbox.put(text(2, '2b', 3))
+        sent = drain(outbox)
+        self.assertEqual([msg for time, chat_id, msg in sent], ['1a', '2a', '1b', '2b'])
+        self.assertEqual([time for time, chat_id, msg in sent], [0.0, 0.0, 1.0, 1.0])
+
+    def test_global_limit(self):
+        outbox = Outbox(rate_limit=2, rate_limit_chat=10)
+        for n in range(5):
+            outbox.put(text(n + 1, str(n), n))
+        sent = drain(outbox)
+        self.assertEqual([time for time, chat_id, msg in sent], [0.0, 0.0, 1.0, 1.0, 2.0])
+
+    def test_group_limit(self):
+        outbox = Outbox(rate_limit=100, rate_limit_chat=100)
+        for n in range(25):
+            outbox.put(text(-100, str(n), n))
+            outbox.put(text(100, str(n), n))
+        sent = drain(outbox)
+        group = [time for time, chat_id, msg in sent if chat_id == -100]
+        private = [time for time, chat_id, msg in sent if chat_id == 100]
+        self.assertEqual(group[19], 0.0)
+        self.assertEqual(group[20], 60.0)
+        self.assertEqual(private[-1], 0.0)
+
+    def test_hold(self):
+        outbox = Outbox()
+        outbox.put(text(1, 'a', 0))
+        outbox.hold(5.0)
+        entry, wait = outbox.next(0.0)
+        self.assertIsNone(entry)
+        self.assertEqual(wait, 5.0)
+        self.assertEqual(drain(outbox), [(5.0, 1, 'a')])
+
+    def test_retry(self):
+        outbox = Outbox(merge=True)
+        outbox.put(text(1, 'a', 0))
+        outbox.put(text(2, 'x', 1))
+        entry, wait = outbox.next(0.0)
+        outbox.sent(entry, 0.0)
+        entry.attempts += 1
+        outbox.retry(entry, 3.0)
+        outbox.put(text(1, 'b', 2))
+        # the entry is sent again first in its chat and isn't merged with the following text
+        sent = drain(outbox)
+        self.assertEqual(sent, [(0.0, 2, 'x'), (3.0, 1, 'a'), (4.0, 1, 'b')])
+
+    def test_clear(self):
+        outbox = Outbox()
+        outbox.put(text(1, 'a', 0))
+        outbox.clear()
+        self.assertEqual(len(outbox), 0)
+        self.assertEqual(outbox.next(0.0), (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
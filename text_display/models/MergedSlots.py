@@ -0,0 +1,31 @@
+from collections.abc import Sequence
+
+
+class MergedSlots(Sequence):
+    """
+    Read-only view of the slots of a ring merger
+
+    The merged slot list is not built, slots are computed from the rings when they are accessed.
+    """
+
+    def __init__(self, merger):
+        self.__merger = merger
+
+    def __len__(self):
+        return self.__merger.get_slot_count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        count = self.__merger.get_slot_count()
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("slot index out of range")
+        return self.__merger.get_slot(index)
+
+    def __iter__(self):
+        return self.__merger.iter_slots()
+
+    def __repr__(self):
+        return repr(list(self))
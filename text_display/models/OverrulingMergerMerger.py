@@ -1,3 +1,4 @@
+from .MergedSlots import MergedSlots
 from .MessageSourceProxy import MessageSourceProxy
 
 
@@ -7,27 +8,53 @@ class OverrulingMergerMerger():
         self.__base_merger = base_merger
         self.__overruling_merger = overruling_merger
         self.__overruler = overruler
-        self.__slots_cache = None
+        self.__proxies = {}
+
+    def __proxy(self, base_slot):
+        proxy = self.__proxies.get(base_slot)
+        if proxy is None:
+            proxy = self.__proxies[base_slot] = MessageSourceProxy(base_slot, self.__overruler)
+        return proxy
+
+    def get_slot_count(self):
+        return self.__base_merger.get_slot_count() + self.__overruling_merger.get_slot_count()
+
+    def get_slot(self, index):
+        base_count = self.__base_merger.get_slot_count()
+        if index < base_count:
+            return self.__proxy(self.__base_merger.get_slot(index))
+        return self.__overruling_merger.get_slot(index - base_count)
+
+    def iter_slots(self):
+        for base_slot in self.__base_merger.iter_slots():
+            yield self.__proxy(base_slot)
+        yield from self.__overruling_merger.iter_slots()
+
+    def find_slot(self, start, stop, accept):
+        """
+        Find the first slot in [start, stop) that is accepted
+
+        :return: tuple (index, slot) or None
+        """
+        base_count = self.__base_merger.get_slot_count()
+        # while the overruling rings contain relevant messages, no slot of the base merger is relevant
+        if start < base_count and self.__overruler() is None:
+            found = self.__base_merger.find_slot(start, min(stop, base_count),
+                                                 lambda base_slot: accept(self.__proxy(base_slot)))
+            if found is not None:
+                return found[0], self.__proxy(found[1])
+        if stop > base_count:
+            found = self.__overruling_merger.find_slot(max(start - base_count, 0), stop - base_count, accept)
+            if found is not None:
+                return base_count + found[0], found[1]
+        return None
 
     def get_slots(self):
-        if not self.__slots_cache is None:
-            return self.__slots_cache
-
-        temp = []
-        for base_slot in self.__base_merger.get_slots():
-            slot = MessageSourceProxy(base_slot, self.__overruler)
-            temp.append(slot)
-
-        for slot in self.__overruling_merger.get_slots():
-            temp.append(slot)
-
-        self.__slots_cache = temp
-        return temp
+        return MergedSlots(self)
 
     def reset(self):
         self.__base_merger.reset()
         self.__overruling_merger.reset()
-        self.__slots_cache = None
 
     def introspect(self):
         content = ", ".join(map(lambda s: str(s), self.get_slots()))
@@ -1,45 +1,118 @@
+from .MergedSlots import MergedSlots
+
+
 class PrioritizedRingMerger:
+    """
+    Merges rings by priority (first ring has the highest priority)
+
+    Before every message of a ring, all messages of the rings with higher priority are shown:
+    for rings [A, B] with messages A = (a1, a2) and B = (b1, b2) the merged slots are
+    (a1, a2, b1, a1, a2, b2, a1, a2). The merged slots are not built, their number grows
+    multiplicatively with the number of rings. Slots are computed from the rings on access.
+    """
+
     def __init__(self, rings=None):
         if rings is None:
             self.__rings = []
         else:
             self.__rings = rings
-        self.__slots_cache = None
 
     def append_ring_model(self, ring_model):
         if not ring_model is None:
             self.__rings.append(ring_model)
-            self.__slots_cache = None
-
-    def traverse(self, liste, start_index, count, selector):
-        result = []
-        if(count > 1):
-            higher_prios = self.traverse(
-                liste, start_index + 1, count - 1, selector)
-            this_level = selector(liste[start_index])
-            for this_level_item in this_level:
-                result.extend(higher_prios)
-                result.append(this_level_item)
+
+    def __get_levels(self):
+        """
+        Returns the rings ordered from lowest to highest priority and the number of merged slots
+        from each level up to the highest priority
+        """
+        levels = list(reversed(self.__rings))
+        counts = [0] * len(levels)
+        count = 0
+        for level in range(len(levels) - 1, -1, -1):
+            size = levels[level].get_ring_size()
+            if level == len(levels) - 1:
+                count = size
             else:
-                result.extend(higher_prios)
-        else:
-            this_level = selector(liste[start_index])
-            for this_level_item in this_level:
-                result.append(this_level_item)
-        return result
+                count = (size + 1) * count + size
+            counts[level] = count
+        return levels, counts
 
-    def get_slots(self):
-        if not self.__slots_cache is None:
-            return self.__slots_cache
+    def get_slot_count(self):
+        levels, counts = self.__get_levels()
+        return counts[0] if counts else 0
+
+    def get_slot(self, index):
+        levels, counts = self.__get_levels()
+        for level in range(len(levels) - 1):
+            higher_count = counts[level + 1]
+            block, offset = divmod(index, higher_count + 1)
+            if offset == higher_count:
+                return levels[level].get_slots()[block]
+            index = offset
+        return levels[-1].get_slots()[index]
 
-        reversed_rings = list(reversed(self.__rings))
-        temp = self.traverse(reversed_rings, 0, len(
-            reversed_rings), lambda ring_model: ring_model.get_slots())
-        self.__slots_cache = temp
-        return temp
+    def iter_slots(self):
+        levels = list(reversed(self.__rings))
+        if levels:
+            yield from self.__iter_level(levels, 0)
+
+    def __iter_level(self, levels, level):
+        if level == len(levels) - 1:
+            yield from levels[level].get_slots()
+            return
+        for slot in levels[level].get_slots():
+            yield from self.__iter_level(levels, level + 1)
+            yield slot
+        yield from self.__iter_level(levels, level + 1)
+
+    def find_slot(self, start, stop, accept):
+        """
+        Find the first slot in [start, stop) that is accepted
+
+        Rings without a relevant message are skipped, so accept() must only accept relevant slots.
+
+        :return: tuple (index, slot) or None
+        """
+        levels, counts = self.__get_levels()
+        if not levels:
+            return None
+        relevant = [False] * (len(levels) + 1)
+        for level in range(len(levels) - 1, -1, -1):
+            relevant[level] = relevant[level + 1] or levels[level].contains_relevant_message()
+        return self.__find(levels, counts, relevant, 0, start, min(stop, counts[0]), accept)
+
+    def __find(self, levels, counts, relevant, level, start, stop, accept):
+        if not relevant[level] or start >= stop:
+            return None
+        slots = levels[level].get_slots()
+        if level == len(levels) - 1:
+            for index in range(start, stop):
+                if accept(slots[index]):
+                    return index, slots[index]
+            return None
+
+        higher_count = counts[level + 1]
+        block, offset = divmod(start, higher_count + 1)
+        base = block * (higher_count + 1)
+        while block <= len(slots) and base < stop:
+            if offset < higher_count:
+                found = self.__find(levels, counts, relevant, level + 1, offset, min(higher_count, stop - base), accept)
+                if found is not None:
+                    return base + found[0], found[1]
+            if block < len(slots) and base + higher_count < stop and accept(slots[block]):
+                return base + higher_count, slots[block]
+            block += 1
+            offset = 0
+            base += higher_count + 1
+        return None
+
+    def get_slots(self):
+        return MergedSlots(self)
 
     def reset(self):
-        self.__slots_cache = None
+        # nothing is cached, the slots are computed from the current state of the rings
+        pass
 
     def introspect(self):
         content = ", ".join(map(lambda s: str(s), self.get_slots()))
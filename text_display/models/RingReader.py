@@ -33,7 +33,8 @@ class RingReader:
         return slots
 
     def has_relevant_messages(self):
-        return any(slot.is_relevant for slot in self.__ring_merger.get_slots())
+        merger = self.__ring_merger
+        return merger.find_slot(0, merger.get_slot_count(), lambda slot: slot.is_relevant) is not None
 
     def read(self):
         slots = self.__ring_merger.get_slots()
@@ -43,25 +44,31 @@ class RingReader:
 
     def read_next(self) -> MessageSourceModel:
         last_slot_num = self.__current_index
+        last_value = self.__last_value
         self.__current_index += 1
-        slots = self.__ring_merger.get_slots()
+        merger = self.__ring_merger
+        slot_count = merger.get_slot_count()
 
-        if len(slots) <= self.__current_index:
+        if slot_count <= self.__current_index:
             self.__current_index = 0
 
-        for slot_num in range(self.__current_index, len(slots)):
-            slot = slots[slot_num]
-            if slot.is_relevant and (slot.content != self.__last_value or slot_num == last_slot_num):
-                self.__current_index = slot_num
-                self.__last_value = slot.content
-                return slot
-
-        for slot_num in range(0, self.__current_index):
-            slot = slots[slot_num]
-            if slot.is_relevant and (slot.content != self.__last_value or slot_num == last_slot_num):
-                self.__current_index = slot_num
-                self.__last_value = slot.content
-                return slot
+        # the next relevant slot with a different message, searching from the current index and wrapping around
+        def accept(slot):
+            return slot.is_relevant and slot.content != last_value
+
+        found = merger.find_slot(self.__current_index, slot_count, accept)
+        if found is None:
+            found = merger.find_slot(0, self.__current_index, accept)
+        if found is None and 0 <= last_slot_num < slot_count:
+            # the last shown message is shown again, if it is the only relevant one
+            slot = merger.get_slot(last_slot_num)
+            if slot.is_relevant:
+                found = (last_slot_num, slot)
+
+        if found is not None:
+            self.__current_index, slot = found
+            self.__last_value = slot.content
+            return slot
 
         self.__current_index = -1
         self.__last_value = None
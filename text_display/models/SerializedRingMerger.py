@@ -1,27 +1,63 @@
+from .MergedSlots import MergedSlots
+
+
 class SerializedRingMerger:
+    """
+    Merges rings one after the other, slots are computed from the rings on access
+    """
+
     def __init__(self, rings=None):
         if rings is None:
             self.__rings = []
         else:
             self.__rings = rings
-        self.__slots_cache = None
 
     def append_ring_model(self, ring_model):
         if not ring_model is None:
             self.__rings.append(ring_model)
-            self.__slots_cache = None
+
+    def get_slot_count(self):
+        return sum(ring.get_ring_size() for ring in self.__rings)
+
+    def get_slot(self, index):
+        for ring in self.__rings:
+            size = ring.get_ring_size()
+            if index < size:
+                return ring.get_slots()[index]
+            index -= size
+        raise IndexError("slot index out of range")
+
+    def iter_slots(self):
+        for ring in self.__rings:
+            yield from ring.get_slots()
+
+    def find_slot(self, start, stop, accept):
+        """
+        Find the first slot in [start, stop) that is accepted
+
+        Rings without a relevant message are skipped, so accept() must only accept relevant slots.
+
+        :return: tuple (index, slot) or None
+        """
+        base = 0
+        for ring in self.__rings:
+            size = ring.get_ring_size()
+            if base >= stop:
+                break
+            if base + size > start and ring.contains_relevant_message():
+                slots = ring.get_slots()
+                for index in range(max(start - base, 0), min(stop - base, size)):
+                    if accept(slots[index]):
+                        return base + index, slots[index]
+            base += size
+        return None
 
     def get_slots(self):
-        if self.__slots_cache is None:
-            result = []
-            for ring in self.__rings:
-                for slot in ring.get_slots():
-                    result.append(slot)
-            self.__slots_cache = result
-        return self.__slots_cache
+        return MergedSlots(self)
 
     def reset(self):
-        self.__slots_cache = None
+        # nothing is cached, the slots are computed from the current state of the rings
+        pass
 
     def introspect(self):
         content = ", ".join(map(lambda s: str(s), self.get_slots()))
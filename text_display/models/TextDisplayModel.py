@@ -75,7 +75,7 @@ class TextDisplayModel():
 
     def update_source_relevance(self, source_is_relevant_path):
         ring_name = self._source_to_ring[source_is_relevant_path]
-        readers = self._ring_to_readers[ring_name]
+        readers = self._ring_to_readers.get(ring_name, [])
         for reader in readers:
             reader.reset()
 
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      Jens Höppner         mail[AT]jens-hoeppner[DOT]de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  Tests of the lazily merged message rings of the text_display plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import random
+import time
+import unittest
+from unittest import mock
+
+from plugins.text_display.models import TextDisplayModel as display_model
+from plugins.text_display.models.MessageSourceProxy import MessageSourceProxy
+from plugins.text_display.models.TextDisplayModel import TextDisplayModel
+
+
+class ReferencePrioritizedRingMerger:
+    """ builds the complete list of merged slots, as the plugin did before the slots were computed lazily """
+
+    def __init__(self, rings=None):
+        self.__rings = [] if rings is None else rings
+        self.__slots_cache = None
+
+    def append_ring_model(self, ring_model):
+        if not ring_model is None:
+            self.__rings.append(ring_model)
+            self.__slots_cache = None
+
+    def traverse(self, liste, start_index, count, selector):
+        result = []
+        if(count > 1):
+            higher_prios = self.traverse(liste, start_index + 1, count - 1, selector)
+            this_level = selector(liste[start_index])
+            for this_level_item in this_level:
+                result.extend(higher_prios)
+                result.append(this_level_item)
+            else:
+                result.extend(higher_prios)
+        else:
+            this_level = selector(liste[start_index])
+            for this_level_item in this_level:
+                result.append(this_level_item)
+        return result
+
+    def get_slots(self):
+        if self.__slots_cache is None:
+            reversed_rings = list(reversed(self.__rings))
+            self.__slots_cache = self.traverse(reversed_rings, 0, len(reversed_rings), lambda ring_model: ring_model.get_slots())
+        return self.__slots_cache
+
+    def reset(self):
+        self.__slots_cache = None
+
+
+class ReferenceSerializedRingMerger:
+
+    def __init__(self, rings=None):
+        self.__rings = [] if rings is None else rings
+        self.__slots_cache = None
+
+    def append_ring_model(self, ring_model):
+        if not ring_model is None:
+            self.__rings.append(ring_model)
+            self.__slots_cache = None
+
+    def get_slots(self):
+        if self.__slots_cache is None:
+            self.__slots_cache = [slot for ring in self.__rings for slot in ring.get_slots()]
+        return self.__slots_cache
+
+    def reset(self):
+        self.__slots_cache = None
+
+
+class ReferenceOverrulingMergerMerger:
+
+    def __init__(self, base_merger, overruling_merger, overruler):
+        self.__base_merger = base_merger
+        self.__overruling_merger = overruling_merger
+        self.__overruler = overruler
+        self.__slots_cache = None
+
+    def get_slots(self):
+        if self.__slots_cache is None:
+            self.__slots_cache = [MessageSourceProxy(base_slot, self.__overruler) for base_slot in self.__base_merger.get_slots()] + \
+                list(self.__overruling_merger.get_slots())
+        return self.__slots_cache
+
+    def reset(self):
+        self.__base_merger.reset()
+        self.__overruling_merger.reset()
+        self.__slots_cache = None
+
+
+class ReferenceRingReader:
+
+    def __init__(self, ring_merger):
+        self.__current_index = -1
+        self.__last_value = None
+        self.__ring_merger = ring_merger
+
+    def __get_merger(self):
+        return self.__ring_merger
+
+    def __set_merger(self, x):
+        self.__ring_merger = x
+        self.reset()
+    merger = property(__get_merger, __set_merger)
+
+    def reset(self):
+        self.__current_index = -1
+        self.__last_value = None
+        self.__ring_merger.reset()
+
+    def dump(self):
+        return self.__ring_merger.get_slots()
+
+    def has_relevant_messages(self):
+        return any(slot.is_relevant for slot in self.__ring_merger.get_slots())
+
+    def read_next(self):
+        last_slot_num = self.__current_index
+        self.__current_index += 1
+        slots = self.__ring_merger.get_slots()
+
+        if len(slots) <= self.__current_index:
+            self.__current_index = 0
+
+        for slot_num in list(range(self.__current_index, len(slots))) + list(range(0, self.__current_index)):
+            slot = slots[slot_num]
+            if slot.is_relevant and (slot.content != self.__last_value or slot_num == last_slot_num):
+                self.__current_index = slot_num
+                self.__last_value = slot.content
+                return slot
+
+        self.__current_index = -1
+        self.__last_value = None
+        return None
+
+
+class Setup:
+    """
+    Random rings and sinks, built the same way into the model and into the reference model
+    """
+
+    def __init__(self, seed, rings, messages, sinks, relevant=0.3, serialized=0.3, fixed_size=False):
+        self.random = random.Random(seed)
+        self.relevance = {}
+        self.paths = {}
+        self.sources = []
+        for ring in range(rings):
+            for msg in range(messages if fixed_size else self.random.randint(0, messages)):
+                path = f"ring{ring}.msg{msg}.relevant"
+                self.relevance[path] = self.random.random() < relevant
+                self.paths[f"Message {msg} of ring {ring}"] = path
+                self.sources.append((f"ring{ring}", f"ring{ring}.msg{msg}.text", f"Message {msg} of ring {ring}", path))
+        self.sinks = []
+        for sink in range(sinks):
+            source_rings = [f"ring{ring}" for ring in self.random.sample(range(rings), self.random.randint(1, rings))]
+            overruling = [f"ring{self.random.randrange(rings)}"] if self.random.random() < 0.3 else None
+            self.sinks.append((f"sink{sink}", source_rings, self.random.random() >= serialized, overruling))
+
+    def build(self, model):
+        for sink, source_rings, prioritized_mode, overruling in self.sinks:
+            model.append_message_sink_to_rings(sink, source_rings, "nothing to show", prioritized_mode)
+            if overruling:
+                model.append_message_sink_to_overruling_rings(sink, overruling)
+        for ring, content_path, content, path in self.sources:
+            model.append_message_source_to_ring(ring, content_source_path=content_path, content_source=lambda content=content: content,
+                                                is_relevant_path=path, is_relevant=lambda path=path: self.relevance[path])
+        model.reset_sinks()
+        return model
+
+    def models(self):
+        """ the model and a reference model using the mergers and the reader building the merged slots """
+        with mock.patch.multiple(display_model, PrioritizedRingMerger=ReferencePrioritizedRingMerger,
+                                 SerializedRingMerger=ReferenceSerializedRingMerger,
+                                 OverrulingMergerMerger=ReferenceOverrulingMergerMerger, RingReader=ReferenceRingReader):
+            reference = self.build(TextDisplayModel())
+        return self.build(TextDisplayModel()), reference
+
+    def toggle(self, *models):
+        path = self.random.choice(list(self.relevance))
+        self.relevance[path] = not self.relevance[path]
+        for model in models:
+            model.update_source_relevance(path)
+
+
+def contents(slots):
+    return [(slot.content, slot.is_relevant) for slot in slots]
+
+
+class TestMergedSlots(unittest.TestCase):
+
+    def test_slots(self):
+        for seed in range(40):
+            setup = Setup(seed, rings=4, messages=4, sinks=6)
+            model, reference = setup.models()
+            for _ in range(5):
+                for sink, _, _, _ in setup.sinks:
+                    with self.subTest(seed=seed, sink=sink):
+                        slots = model.dump_sink(sink)
+                        expected = reference.dump_sink(sink)
+                        self.assertEqual(len(slots), len(expected))
+                        self.assertEqual(contents(slots), contents(expected))
+                        self.assertEqual(contents(slots[i] for i in range(len(slots))), contents(expected))
+                        if expected:
+                            self.assertEqual(contents([slots[-1]]), contents([expected[-1]]))
+                            self.assertEqual(contents(slots[1:-1:2]), contents(expected[1:-1:2]))
+                        self.assertEqual(model.sink_has_messages_present(sink), reference.sink_has_messages_present(sink))
+                setup.toggle(model, reference)
+
+    def test_find_slot(self):
+        for seed in range(20):
+            setup = Setup(seed, rings=4, messages=4, sinks=6)
+            model, reference = setup.models()
+            for sink, _, _, _ in setup.sinks:
+                merger = model.get_sink_model(sink).reader.merger
+                expected = contents(reference.dump_sink(sink))
+                ranges = [(start, stop) for start in range(len(expected) + 1) for stop in range(start, len(expected) + 2, 3)]
+                found = []
+                for start, stop in ranges:
+                    slot = merger.find_slot(start, stop, lambda slot: slot.is_relevant)
+                    found.append(None if slot is None else (slot[0], slot[1].content))
+                first = []
+                for start, stop in ranges:
+                    index = next((index for index in range(start, min(stop, len(expected))) if expected[index][1]), None)
+                    first.append(None if index is None else (index, expected[index][0]))
+                with self.subTest(seed=seed, sink=sink):
+                    self.assertEqual(found, first)
+
+    def test_empty(self):
+        model = TextDisplayModel()
+        model.append_message_sink_to_rings('sink', ['a', 'b'], 'nothing to show')
+        model.append_message_source_to_ring('c', 'c.text', lambda: 'c', 'c.relevant', lambda: True)
+        self.assertEqual(list(model.dump_sink('sink')), [])
+        self.assertEqual(model.tick_sink('sink'), 'nothing to show')
+        self.assertFalse(model.sink_has_messages_present('sink'))
+        # the ring is not read by any sink
+        model.update_source_relevance('c.relevant')
+        with self.assertRaises(IndexError):
+            model.dump_sink('sink')[0]
+
+
+class TestReadNext(unittest.TestCase):
+
+    def compare_ticks(self, setup, model, reference, ticks, toggle_every):
+        sinks = [sink for sink, _, _, _ in setup.sinks]
+        for tick in range(ticks):
+            if tick % toggle_every == 0:
+                setup.toggle(model, reference)
+            sink = sinks[tick % len(sinks)]
+            self.assertEqual(model.tick_sink(sink), reference.tick_sink(sink), f"tick {tick} of {sink}")
+
+    def test_read_next(self):
+        for seed in range(40):
+            setup = Setup(seed, rings=4, messages=4, sinks=6, relevant=0.2)
+            with self.subTest(seed=seed):
+                self.compare_ticks(setup, *setup.models(), ticks=600, toggle_every=7)
+
+    def test_single_relevant_message(self):
+        # the only relevant message is shown again
+        setup = Setup(1, rings=2, messages=3, sinks=2, relevant=0)
+        model, reference = setup.models()
+        path = next(iter(setup.relevance))
+        setup.relevance[path] = True
+        for sink, _, _, _ in setup.sinks:
+            expected = [reference.tick_sink(sink) for _ in range(5)]
+            self.assertEqual([model.tick_sink(sink) for _ in range(5)], expected)
+
+    def test_many_sinks_and_sources(self):
+        # the former benchmark: 3 rings of 20 messages read by 50 sinks, while the sources change their relevance
+        setup = Setup(42, rings=3, messages=20, sinks=50, serialized=0, fixed_size=True)
+        model, reference = setup.models()
+        sinks = [sink for sink, _, _, _ in setup.sinks]
+        self.assertGreater(max(len(reference.dump_sink(sink)) for sink in sinks), 5000)
+
+        def run(model):
+            setup.random.seed(7)
+            start = time.perf_counter()
+            results = []
+            for tick in range(500):
+                if tick % 10 == 0:
+                    setup.toggle(model)
+                results.append(model.tick_sink(sinks[tick % len(sinks)]))
+            return time.perf_counter() - start, results
+
+        relevance = dict(setup.relevance)
+        reference_duration, expected = run(reference)
+        setup.relevance.update(relevance)
+        model.reset_sinks()
+        duration, results = run(model)
+        self.assertEqual(results, expected)
+        self.assertLess(duration, reference_duration)
+
+    def test_many_rings(self):
+        # 5 rings of 20 messages give millions of merged slots, which are never built
+        setup = Setup(42, rings=5, messages=20, sinks=50, serialized=0, fixed_size=True)
+        setup.sinks[0] = ('sink0', [f"ring{ring}" for ring in range(5)], True, None)
+        model = setup.build(TextDisplayModel())
+        self.assertEqual(len(model.dump_sink('sink0')), 21 ** 5 - 1)
+        sinks = list(model.get_sinks())
+        start = time.perf_counter()
+        for tick in range(5000):
+            if tick % 10 == 0:
+                setup.toggle(model)
+            content = model.tick_sink(sinks[tick % len(sinks)])
+            self.assertTrue(content == 'nothing to show' or setup.relevance[setup.paths[content]])
+        self.assertLess(time.perf_counter() - start, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
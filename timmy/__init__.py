@@ -27,6 +27,8 @@ from lib.item import Items
 from datetime import timedelta
 
 from .models.TimmyModel import TimmyModel
+from .timer_wheel import TimerWheel
+from .webif import WebInterface
 
 
 # If a needed package is imported, which might be not installed in the Python environment,
@@ -39,7 +41,7 @@ class Timmy(SmartPlugin):
     """
 
     # (must match the version specified in plugin.yaml), use '1.0.0' for your initial plugin Release
-    PLUGIN_VERSION = '1.8.1'
+    PLUGIN_VERSION = '1.9.0'
 
     def __init__(self, sh):
         """
@@ -59,9 +61,12 @@ class Timmy(SmartPlugin):
 
         self._model = TimmyModel()
         self._shng_items = Items.get_instance()
-        self.__delay_scheduler_names = []
-        self.__blink_scheduler_names = []
 
+        # all delays and blinks run on one timer wheel instead of one scheduler entry per item
+        self._timer_wheel = TimerWheel(self.get_parameter_value('timer_resolution'),
+                                       self.get_fullname() + '.timer_wheel', self.logger)
+
+        self.init_webinterface(WebInterface)
         return
 
     def run(self):
@@ -69,9 +74,7 @@ class Timmy(SmartPlugin):
         Run method for the plugin
         """
         self.logger.debug("Run method called")
-        """
-        Create relevant Schedulers
-        """
+        self._timer_wheel.start()
 
         self.alive = True
 
@@ -89,7 +92,7 @@ class Timmy(SmartPlugin):
 
         Remove Sink Schedulers
         """
-        # self.scheduler_remove('poll_device')
+        self._timer_wheel.stop()
         self.alive = False
 
     def parse_item(self, item):
@@ -115,11 +118,6 @@ class Timmy(SmartPlugin):
             target_item = self.get_iattr_value(
                 item.conf, 'timmy_delay_target_item')
 
-            scheduler_name = f"delay-{item.property.path}"
-            self.scheduler_add(
-                scheduler_name, self.__perform_last_intent, value=None)
-            self.__delay_scheduler_names.append(scheduler_name)
-
             self._model.append_delay_item(
                 item.property.path, target_item, on_seconds, off_seconds)
             self.logger.debug(
@@ -153,11 +151,6 @@ class Timmy(SmartPlugin):
                     f"{item.property.path} - length of timmy_blink_cycles ({len(blink_cycles)} entries) must match length of timmy_blink_pattern ({len(blink_pattern)} entries)")
                 return
 
-            scheduler_name = f"blink-{item.property.path}"
-            self.scheduler_add(
-                scheduler_name, self.__perform_blink, offset=0, value=None)
-            self.__blink_scheduler_names.append(scheduler_name)
-
             self._model.append_blink_item(
                 item.property.path, target_item, blink_pattern, blink_cycles, blink_loops)
             self.logger.debug(
@@ -177,14 +170,13 @@ class Timmy(SmartPlugin):
         if blink_model.enabled:
             next_value, seconds, index = blink_model.tick()
             targetted_item(next_value)
-            self.scheduler_change(
-                f"blink-{source_item_path}", next=self.now() + timedelta(seconds=seconds), prio=1, value={"source_item_path": source_item_path})
+            self._timer_wheel.arm(
+                f"blink-{source_item_path}", seconds, self.__perform_blink, source_item_path)
             self.logger.debug(
                 f"__perform_blink from '{source_item_path}' Cycle {index} to {next_value}")
         else:
             targetted_item(blink_model.return_to)
-            self.scheduler_change(
-                f"blink-{source_item_path}", next=None, value={"source_item_path": source_item_path})
+            self._timer_wheel.cancel(f"blink-{source_item_path}")
             self.logger.debug(
                 f"__perform_blink from '{source_item_path}' ended to {blink_model.return_to}")
 
@@ -208,10 +200,11 @@ class Timmy(SmartPlugin):
             f"__perform_last_intent towards '{targetted_item}' target_state: '{delay_model.intended_target_state}'")
 
     def schedule_delayed_trigger_in(self, seconds, source_item_path):
-        next_time = self.now() + timedelta(seconds=seconds)
+        now = self.now()
+        next_time = now + timedelta(seconds=seconds)
         next_time = next_time - timedelta(microseconds=next_time.microsecond)
-        self.scheduler_change(
-            f"delay-{source_item_path}", next=next_time, value={"source_item_path": source_item_path})
+        self._timer_wheel.arm(
+            f"delay-{source_item_path}", (next_time - now).total_seconds(), self.__perform_last_intent, source_item_path)
         return next_time
 
     def __update_item_trigger_blink(self, item, caller=None, source=None, dest=None):
@@ -234,8 +227,8 @@ class Timmy(SmartPlugin):
                 blink_model.target_item)
             if blink_model.enabled:
                 blink_model.return_to = targetted_item()
-            self.scheduler_change(
-                f"blink-{item.property.path}", next=self.now(), value={"source_item_path": item.property.path})
+            self._timer_wheel.arm(
+                f"blink-{item.property.path}", 0, self.__perform_blink, item.property.path)
 
     def __update_item_trigger_delay(self, item, caller=None, source=None, dest=None):
         """
@@ -41,3 +41,15 @@ class TimmyModel():
         Returns number of added items
         """
         return len(self._items_with_delay)
+
+    def get_delay_items(self) -> dict:
+        """
+        Returns the delay models by item path
+        """
+        return self._items_with_delay
+
+    def get_blink_items(self) -> dict:
+        """
+        Returns the blink models by item path
+        """
+        return self._blink_models
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2020-      Jens Höppner         shng[AT]jens-hoeppner[DOT]de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#  https://www.smarthomeNG.de
+#  https://knx-user-forum.de/forum/supportforen/smarthome-py
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import threading
+import time
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS          # slots per level
+SLOT_MASK = SLOTS - 1
+LEVELS = 4                      # 64^4 ticks (about 19 days at 0.1 s per tick)
+
+
+class _Timer():
+    __slots__ = ('key', 'expires', 'callback', 'args', 'slot')
+
+    def __init__(self, key, expires, callback, args):
+        self.key = key
+        self.expires = expires      # tick in which the timer fires
+        self.callback = callback
+        self.args = args
+        self.slot = None            # dict of the wheel slot the timer is stored in
+
+
+class TimerWheel():
+    """
+    Hierarchical timer wheel
+
+    Timers are identified by a key, arming a key that is already armed re-arms it. Arming,
+    cancelling and re-arming are O(1). The wheel is advanced by one thread with a fixed tick,
+    all timers that are due in the same tick are fired together (in the order they became due).
+    """
+
+    def __init__(self, tick=0.1, name='timer_wheel', logger=None):
+        """
+        :param tick: resolution of the wheel in seconds
+        :param name: name of the thread that advances the wheel
+        """
+        self.tick = float(tick)
+        self.name = name
+        self.logger = logger
+        self._wheel = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self._timers = {}           # key -> _Timer
+        self._current = 0           # last processed tick
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.fired = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._lag_sum = 0.0
+
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+
+    def arm(self, key, seconds, callback, *args):
+        """
+        Arm (or re-arm) the timer with the given key
+
+        :param key: key of the timer
+        :param seconds: delay in seconds
+        :param callback: function to call, when the timer fires
+        :param args: arguments for the callback
+        """
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is not None:
+                del timer.slot[key]
+            expires = int((time.monotonic() - self._start + seconds) / self.tick + 0.999999)
+            timer = _Timer(key, max(expires, self._current + 1), callback, args)
+            self._timers[key] = timer
+            self._insert(timer)
+
+    def cancel(self, key):
+        """
+        Cancel the timer with the given key
+
+        :return: True, if the timer was armed
+        """
+        with self._lock:
+            timer = self._timers.pop(key, None)
+            if timer is None:
+                return False
+            del timer.slot[key]
+            return True
+
+    def is_armed(self, key):
+        return key in self._timers
+
+    def active_count(self):
+        return len(self._timers)
+
+
+    def _insert(self, timer):
+        delta = timer.expires - self._current
+        for level in range(LEVELS):
+            if delta < (1 << (SLOT_BITS * (level + 1))) or level == LEVELS - 1:
+                # timers beyond the last level are cascaded again until they are due
+                index = (timer.expires >> (SLOT_BITS * level)) & SLOT_MASK
+                break
+        timer.slot = self._wheel[level][index]
+        timer.slot[timer.key] = timer
+
+    def _cascade(self, level):
+        """
+        Move the timers of the current slot of a level to the lower levels
+        """
+        index = (self._current >> (SLOT_BITS * level)) & SLOT_MASK
+        slot = self._wheel[level][index]
+        if index == 0 and level < LEVELS - 1:
+            self._cascade(level + 1)
+        timers = list(slot.values())
+        slot.clear()
+        for timer in timers:
+            self._insert(timer)
+
+    def advance(self, now=None):
+        """
+        Process all ticks up to now and fire the timers that are due
+
+        :return: number of fired timers
+        """
+        if now is None:
+            now = time.monotonic()
+        target = int((now - self._start) / self.tick)
+        due = []
+        with self._lock:
+            while self._current < target:
+                self._current += 1
+                if self._current & SLOT_MASK == 0:
+                    self._cascade(1)
+                slot = self._wheel[0][self._current & SLOT_MASK]
+                if slot:
+                    for timer in slot.values():
+                        del self._timers[timer.key]
+                        due.append(timer)
+                    slot.clear()
+
+        for timer in due:
+            lag = now - (self._start + timer.expires * self.tick)
+            self.fired += 1
+            self.last_lag = lag
+            self._lag_sum += lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            try:
+                timer.callback(*timer.args)
+            except Exception as ex:
+                if self.logger is not None:
+                    self.logger.exception(f"TimerWheel: Timer '{timer.key}' failed: {ex}")
+        return len(due)
+
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop_event.is_set():
+            self.advance()
+            next_tick += self.tick
+            wait = next_tick - time.monotonic()
+            if wait < 0:
+                # the callbacks took longer than a tick, do not try to catch up
+                next_tick = time.monotonic()
+                wait = 0
+            self._stop_event.wait(wait)
+
+
+    def get_statistics(self):
+        """
+        :return: dict with number of active timers, fired timers and firing lag in ms
+        """
+        return {'active': self.active_count(),
+                'fired': self.fired,
+                'lag_last_ms': round(self.last_lag * 1000, 1),
+                'lag_avg_ms': round(self._lag_sum * 1000 / self.fired, 1) if self.fired else 0,
+                'lag_max_ms': round(self.max_lag * 1000, 1),
+                }
@@ -75,19 +75,21 @@
 # ]})
 
 import functools
+from bisect import bisect_left, bisect_right
 from lib.model.smartplugin import SmartPlugin
 from lib.item import Items
 from lib.shtime import Shtime
 
 from datetime import datetime, timedelta
-from time import sleep
+from time import perf_counter
 from dateutil.rrule import rrulestr
 from dateutil import parser
-from dateutil.tz import tzutc
 from unittest import mock
 from collections import OrderedDict
 import html
 import json
+from .ephemeris import SunEphemeris, parse_sun_rule, parse_clock, cached_rrule
+from .occurrences import Occurrences, OccurrenceIndex, entry_key, next_in, previous_in, interpolation_arrays
 from .webif import WebInterface
 
 ITEM_TAG = ['uzsu_item']
@@ -101,7 +103,7 @@ class UZSU(SmartPlugin):
 
     ALLOW_MULTIINSTANCE = False
 
-    PLUGIN_VERSION = "2.1.0"      # item buffer for all uzsu enabled items
+    PLUGIN_VERSION = "2.1.2"      # item buffer for all uzsu enabled items
 
     def __init__(self, smarthome):
         """
@@ -129,6 +131,8 @@ class UZSU(SmartPlugin):
         self._webdata = {'sunCalculated': {}, 'items': {}}
         self._update_count = {'todo': 0, 'done': 0}
         self._itpl = {}
+        self._ephemeris = SunEphemeris(smarthome, self._timezone, self.logger)
+        self._occurrences = {}
         self.init_webinterface(WebInterface)
         self.logger.info(f'Init with timezone {self._timezone}')
 
@@ -214,12 +218,17 @@ class UZSU(SmartPlugin):
         :param caller:  if given it represents the callers name
         :type caller:   str
         """
+        start = perf_counter()
+        hits, misses = self._ephemeris.hits, self._ephemeris.misses
         for item in self._items:
             success = self._update_sun(item, caller="update_all_suns")
             if success:
                 self._update_item(item,  'update_all_suns')
                 self.logger.debug(f'Updated sun info for item {item}. Caller: {caller}')
                 self._write_dict_to_item(item, 'update_all_suns')
+        self.logger.info(f'Updated sun info for {len(self._items)} items in {(perf_counter() - start) * 1000:.1f} ms, '
+                         f'{self._ephemeris.misses - misses} sun calculations, {self._ephemeris.hits - hits} taken from cache. '
+                         f'Caller: {caller}')
 
     def _update_sun(self, item, caller=None):
         """
@@ -232,12 +241,8 @@ class UZSU(SmartPlugin):
         if caller != "_update_item":
             self._items[item] = item()
         try:
-            _sunrise = self._sh.sun.rise()
-            _sunset = self._sh.sun.set()
-            if _sunrise.tzinfo == tzutc():
-                _sunrise = _sunrise.astimezone(self._timezone)
-            if _sunset.tzinfo == tzutc():
-                _sunset = _sunset.astimezone(self._timezone)
+            _sunrise = self._ephemeris.next('sunrise')
+            _sunset = self._ephemeris.next('sunset')
             self._items[item]['sunrise'] = f'{_sunrise.hour:02}:{_sunrise.minute:02}'
             self._items[item]['sunset'] = f'{_sunset.hour:02}:{_sunset.minute:02}'
             self.logger.debug(f'Updated sun entries for item {item}, triggered by {caller}. '
@@ -612,6 +617,29 @@ class UZSU(SmartPlugin):
                 self._planned.update({item: None})
                 self._webdata['items'][item.property.path].update({'planned': {'value': '-', 'next': '-'}})
 
+    def _parse_entries(self, item):
+        """
+        Parse the time strings of all entries, so the scheduler calculation uses the parsed rules
+        :param item:    uzsu item
+        :type item:     item
+        """
+        for entry in self._items[item].get('list') or []:
+            if not isinstance(entry, dict):
+                continue
+            times = [entry.get('time')]
+            if isinstance(entry.get('series'), dict):
+                times += [entry['series'].get('timeSeriesMin'), entry['series'].get('timeSeriesMax')]
+            for tstr in times:
+                if not isinstance(tstr, str) or tstr == '' or 'serie' in tstr:
+                    continue
+                try:
+                    if 'sun' in tstr:
+                        parse_sun_rule(tstr)
+                    else:
+                        parse_clock(tstr)
+                except ValueError as e:
+                    self.logger.warning(f'Item {item}: Could not parse time "{tstr}" of entry {entry}: {e}')
+
     def update_item(self, item, caller=None, source='', dest=None):
         """
         This is called by smarthome engine when the item changes, e.g. by Visu or by the command line interface
@@ -626,6 +654,8 @@ class UZSU(SmartPlugin):
         self.logger.debug(f'Update Item {item}, Caller {caller}, Source {source}, Dest {dest}. Will update: {cond}')
         if not source == 'create_rrule':
             self._check_rruleandplanned(item)
+        if cond:
+            self._parse_entries(item)
         # Removing Duplicates
         if self._remove_duplicates is True and self._items[item].get('list') and cond:
             self._remove_dupes(item)
@@ -689,27 +719,27 @@ class UZSU(SmartPlugin):
         if not comment.startswith('schedule_'):
             self._write_dict_to_item(item, comment)
 
-    def _interpolate(self, data: dict, time: float, linear=True, use_precision=True):
+    def _interpolate(self, data, time: float, linear=True, use_precision=True):
         """
         Returns linear / cubic interpolation for series data at specified time
+        :param data:    dict of timestamp -> value or tuple of sorted arrays (timestamps, values)
         """
-        ts_last = 0
-        ts_next = -1
-        for ts in data.keys():
-            if ts <= time and ts > ts_last:
-                ts_last = ts
-            # use <= to get last data value for series of identical timestamps
-            if ts >= time and (ts <= ts_next or ts_next == -1):
-                ts_next = ts
-        if ts_next <= 0 or ts_last <= 0 or len(data.keys()) <= 1:
+        times, values = interpolation_arrays(data) if isinstance(data, dict) else data
+        if len(times) <= 1:
+            return None
+        # use the last data value for series of identical timestamps
+        i_next = bisect_left(times, time)
+        i_last = bisect_right(times, time) - 1
+        if i_next >= len(times) or i_last < 0 or times[i_next] <= 0 or times[i_last] <= 0:
             return None
+        ts_last, ts_next = times[i_last], times[i_next]
         if time == ts_next:
-            value = float(data[ts_next])
+            value = float(values[i_next])
         elif time == ts_last:
-            value = float(data[ts_last])
+            value = float(values[i_last])
         else:
-            d_last = float(data[ts_last])
-            d_next = float(data[ts_next])
+            d_last = float(values[i_last])
+            d_next = float(values[i_next])
 
             if linear:
                 # linear interpolation
@@ -800,6 +830,8 @@ class UZSU(SmartPlugin):
                     self._series[item][i] = "waiting"
                     update = 'schedule_once'
                     self._update_item(item, update)
+            if item in self._occurrences:
+                self._occurrences[item].prune(len(self._items[item]['list']))
             tz_text =  '' if _next is None else f' and tzinfo {_next.tzinfo}'
             self.logger.debug(f'uzsu for item {item} final next {_next}, value {_value}{tz_text}')
 
@@ -871,8 +903,9 @@ class UZSU(SmartPlugin):
                     _interpolated = True if _next > _nextinterpolation else False
                     _next = _nextinterpolation if _next > _nextinterpolation else _next
                     _oldvalue = _value
-                    _value = self._interpolate(self._itpl[item], _next.timestamp() * 1000.0, _interpolation.lower() == 'linear')
-                    _value_now = self._interpolate(self._itpl[item], entry_now, _interpolation.lower() == 'linear')
+                    _itpl_arrays = interpolation_arrays(self._itpl[item])
+                    _value = self._interpolate(_itpl_arrays, _next.timestamp() * 1000.0, _interpolation.lower() == 'linear')
+                    _value_now = self._interpolate(_itpl_arrays, entry_now, _interpolation.lower() == 'linear')
                     if _caller != "dry_run" and _interpolated and _value:
                         self._set(item=item, value=_value_now, caller=_caller, interpolated=_interpolated)
                         self.logger.info(f'Updated: {item}, {_interpolation.lower()} interpolation value: {_value_now}, '
@@ -954,6 +987,22 @@ class UZSU(SmartPlugin):
         if not caller or caller == "Scheduler":
             self._schedule(item, caller='set')
 
+    def _get_occurrences(self, item, entryindex, kind, key, build):
+        """
+        Returns the precomputed occurrences of an entry from the occurrence index of the item
+        :param item:        uzsu item, if None the occurrences are calculated without index
+        :param entryindex:  index of the entry in the uzsu list
+        :param kind:        kind of the occurrences ('rrule', 'series' or 'calculated')
+        :param key:         key of the entry and date, the occurrences are rebuilt if it changes
+        :param build:       function calculating the occurrences
+        """
+        if item is None or entryindex is None:
+            return build()
+        index = self._occurrences.get(item)
+        if index is None:
+            index = self._occurrences[item] = OccurrenceIndex()
+        return index.get(kind, entryindex, key, build)
+
     def _get_time(self, entry, timescan, item=None, entryindex=None, caller=None):
         """
         Returns the next and previous execution time and value
@@ -998,40 +1047,40 @@ class UZSU(SmartPlugin):
                 if entry['rrule'] == '':
                     entry['rrule'] = 'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR,SA,SU'
                 if 'dtstart' in entry:
-                    rrule = rrulestr(entry['rrule'], dtstart=entry['dtstart'])
+                    rrule = cached_rrule(entry['rrule'], entry['dtstart'])
                 else:
                     try:
-                        rrule = rrulestr(entry['rrule'], dtstart=datetime.combine(
-                            weekbefore, parser.parse(time.strip()).time()))
+                        rrule = cached_rrule(entry['rrule'], datetime.combine(weekbefore, parse_clock(time)))
                         rstr = str(rrule).replace('\n', ';')
                         self.logger.debug(f"{item}: Created rrule: '{rstr}' for time: '{time}'")
                     except ValueError:
                         self.logger.debug(f"{item}: Could not create rrule from rrule: '{entry['rrule']}' and time: '{time}'")
                         if 'sun' in time:
-                            rrule = rrulestr(entry['rrule'], dtstart=datetime.combine(
+                            rrule = cached_rrule(entry['rrule'], datetime.combine(
                                 weekbefore, self._sun(datetime.combine(weekbefore.date(),
                                                                        datetime.min.time()).replace(tzinfo=self._timezone),
                                                       time, timescan).time()))
                             rstr = str(rrule).replace('\n', ';')
                             self.logger.debug(f'{item}: Looking for {timescan} sun-related time. Found rrule: {rstr}')
                         else:
-                            rrule = rrulestr(entry['rrule'], dtstart=datetime.combine(weekbefore, datetime.min.time()))
+                            rrule = cached_rrule(entry['rrule'], datetime.combine(weekbefore, datetime.min.time()))
                             rstr = str(rrule).replace('\n', ';')
                             self.logger.debug(f'{item}: Looking for {timescan} time. Found rrule: {rstr}')
+                occurrences = self._get_occurrences(item, entryindex, 'rrule', (str(rrule), today.date()),
+                                                    lambda: Occurrences(rrule, today.date()))
                 dt = datetime.now()
                 while self.alive:
-                    dt = rrule.before(dt) if timescan == 'previous' else rrule.after(dt)
+                    dt = occurrences.before(dt) if timescan == 'previous' else occurrences.after(dt)
                     if dt is None:
                         return None, None, None
                     if 'sun' in time:
-                        sleep(0.01)
                         next = self._sun(datetime.combine(dt.date(),datetime.min.time()).replace(tzinfo=self._timezone),
                                          time, timescan)
                         self.logger.debug(f'{item}: Result parsing time (rrule) {time}: {next}')
                         if entryindex is not None and timescan == 'next':
                             self._update_suncalc(item, entry, entryindex, next.strftime("%H:%M"))
                     else:
-                        next = datetime.combine(dt.date(), parser.parse(time.strip()).time()).replace(tzinfo=self._timezone)
+                        next = datetime.combine(dt.date(), parse_clock(time)).replace(tzinfo=self._timezone)
                         self._update_suncalc(item, entry, entryindex, None)
                     if next and next.date() == dt.date():
                         cond_istoday = next.date() == datetime.now().date()
@@ -1060,15 +1109,15 @@ class UZSU(SmartPlugin):
                         tzinfo=self._timezone), time, timescan)
                     self.logger.debug(f'{item}: Result parsing time tomorrow (sun) {time}: {next}')
             elif 'series' not in time:
-                next = datetime.combine(today, parser.parse(time.strip()).time()).replace(tzinfo=self._timezone)
+                next = datetime.combine(today, parse_clock(time)).replace(tzinfo=self._timezone)
                 cond_future = next > datetime.now(self._timezone)
                 if caller != "dry_run" and not cond_future:
                     self._itpl[item][next.timestamp() * 1000.0] = value
                     self.logger.debug(f'{item}: Include {timescan} today: {next}, value {value} for interpolation.')
-                    next = datetime.combine(tomorrow, parser.parse(time.strip()).time()).replace(tzinfo=self._timezone)
+                    next = datetime.combine(tomorrow, parse_clock(time)).replace(tzinfo=self._timezone)
             if 'series' in time:
                 # Get next Time for Series
-                next = self._series_get_time(entry, timescan)
+                next = self._series_get_time(entry, timescan, item, entryindex)
                 if next is None:
                     return None, None, False
                 cond_istoday = next.date() == datetime.now().date()
@@ -1126,7 +1175,6 @@ class UZSU(SmartPlugin):
             issue = f'No list entry in UZSU dict for item {item}'
             return issue
         try:
-            mydays = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
             for i, mydict in enumerate(self._items[item]['list']):
                 try:
                     del mydict['seriesCalculated']
@@ -1135,158 +1183,14 @@ class UZSU(SmartPlugin):
                 if mydict.get('series', None) is None:
                     continue
                 try:
-                    #####################
-                    seriesbegin, seriesend, daycount, mydict = self._fix_empty_values(mydict)
-                    interval = mydict['series'].get('timeSeriesIntervall', None)
-                    seriesstart = seriesbegin
-                    endtime = None
-
-                    if interval is None or interval == "":
-                        issue = f'Could not calculate serie for item {item} - because interval is None - {mydict}'
-                        self.logger.warning(issue)
-                        return issue
-
-                    if (daycount == '' or daycount is None) and seriesend is None:
-                        issue = "Could not calculate series because timeSeriesCount is NONE and TimeSeriesMax is NONE"
-                        self.logger.warning(issue)
-                        return issue
-
-                    interval = int(interval.split(":")[0]) * 60 + int(mydict['series']['timeSeriesIntervall'].split(":")[1])
-
-                    if interval == 0:
-                        issue = f'Could not calculate serie because interval is ZERO - {mydict}'
-                        self.logger.warning(issue)
-                        return issue
-
-                    if daycount is not None and daycount != '':
-                        if int(daycount) * interval >= 1440:
-                            org_daycount = daycount
-                            daycount = int(1439 / interval)
-                            self.logger.warning(f'Cut your SerieCount to {daycount} - because interval {interval} '
-                                                f'x SerieCount {org_daycount} is more than 24h')
-
-                    if 'sun' not in mydict['series']['timeSeriesMin']:
-                        starttime = datetime.strptime(mydict['series']['timeSeriesMin'], "%H:%M")
-                    else:
-                        mytime = self._sun(datetime.now().replace(hour=0, minute=0, second=0).astimezone(self._timezone), seriesstart, "next")
-                        starttime = (f'{mytime.hour:02d}:{mytime.minute:02d}')
-                        starttime = datetime.strptime(starttime, "%H:%M")
-
-                    # calculate End of Serie by Count
-                    if seriesend is None:
-                        endtime = starttime
-                        endtime += timedelta(minutes=interval * int(daycount))
-
-                    if seriesend is not None and 'sun' in seriesend:
-                        mytime = self._sun(datetime.now().replace(hour=0, minute=0, second=0).astimezone(self._timezone), seriesend, "next")
-                        endtime = (f'{mytime.hour:02d}:{mytime.minute:02d}')
-                        endtime = datetime.strptime(endtime, "%H:%M")
-                    elif seriesend is not None and 'sun' not in seriesend:
-                        endtime = datetime.strptime(seriesend, "%H:%M")
-
-                    if seriesend is None and endtime:
-                        seriesend = str(endtime.time())[:5]
-
-                    if not endtime:
-                        endtime = starttime
-
-                    if endtime <= starttime:
-                        endtime += timedelta(days=1)
-
-                    timediff = endtime - starttime
-                    original_daycount = daycount
-
-                    if daycount is None:
-                        daycount = int((timediff.total_seconds() // 60) // interval + 1)
-                    else:
-                        new_daycount = int((timediff.total_seconds() // 60) // interval + 1)
-                        if int(daycount) > new_daycount:
-                            self.logger.warning(f'Cut your SerieCount to {new_daycount} - because interval {interval} '
-                                                f'x SerieCount {daycount} is not possible between {starttime} and {endtime}')
-                            daycount = new_daycount
-
-                    #####################
-                    # advanced rule including all sun times, start and end times  and calculated max counts, etc.
-                    rrule = rrulestr(mydict['rrule'] + ";COUNT=7",
-                                     dtstart=datetime.combine(datetime.now(),
-                                     parser.parse(str(starttime.hour) + ':' +
-                                     str(starttime.minute)).time()))
-                    mynewlist = []
-
-                    interval = int(mydict['series']['timeSeriesIntervall'].split(":")[0]) * 60 + \
-                        int(mydict['series']['timeSeriesIntervall'].split(":")[1])
-                    exceptions = 0
-                    for day in list(rrule):
-                        if not mydays[day.weekday()] in mydict['rrule']:
-                            continue
-                        myrulenext = f'FREQ=MINUTELY;COUNT={daycount};INTERVAL={interval}'
-
-                        if 'sun' not in mydict['series']['timeSeriesMin']:
-                            starttime = datetime.strptime(mydict['series']['timeSeriesMin'], "%H:%M")
-                        else:
-                            seriesstart = mydict['series']['timeSeriesMin']
-                            mytime = self._sun(day.replace(hour=0, minute=0, second=0).astimezone(self._timezone),
-                                               seriesstart, "next")
-                            starttime = (f'{mytime.hour:02d}:{mytime.minute:02d}')
-                            starttime = datetime.strptime(starttime, "%H:%M")
-                        dayrule = rrulestr(myrulenext, dtstart=day.replace(hour=starttime.hour,
-                                                                           minute=starttime.minute, second=0))
-                        dayrule.after(day.replace(hour=0, minute=0))    # First Entry for this day
-                        count = 0
-
-                        try:
-                            actday = mydays[list(dayrule)[0].weekday()]
-                        except Exception:
-                            max_interval = endtime - starttime
-                            if exceptions == 0:
-                                self.logger.info(f'Item {item}: Between starttime {datetime.strftime(starttime, "%H:%M")} '
-                                                 f'and endtime {datetime.strftime(endtime, "%H:%M")} is a maximum '
-                                                 f'valid interval of {max_interval.seconds // 3600:02d}:{max_interval.seconds % 3600//60:02d}. '
-                                                 f'{mydict["series"]["timeSeriesIntervall"]} is set too high for a continuous series trigger. '
-                                                 f'The UZSU will only be scheduled for the start time.')
-                            exceptions += 1
-                            max_interval = int(max_interval.total_seconds() / 60)
-                            myrulenext = f'FREQ=MINUTELY;COUNT=1;INTERVAL={max_interval}'
-                            dayrule = rrulestr(myrulenext, dtstart=day.replace(hour=starttime.hour,
-                                                                               minute=starttime.minute, second=0))
-                            dayrule.after(day.replace(hour=0, minute=0))
-                            actday = mydays[day.weekday()] if list(dayrule) is None else mydays[list(dayrule)[0].weekday()]
-                        seriestarttime = None
-                        for time in list(dayrule):
-                            if mydays[time.weekday()] != actday:
-                                if seriestarttime is not None:
-                                    mytpl = {'seriesMin': str(seriestarttime.time())[:5]}
-                                    if original_daycount is not None:
-                                        mytpl['seriesMax'] = str((seriestarttime + timedelta(minutes=interval * count)).time())[:5]
-                                    else:
-                                        mytpl['seriesMax'] = f'{endtime.hour:02d}:{endtime.minute:02d}'
-                                    mytpl['seriesDay'] = actday
-                                    mytpl['maxCountCalculated'] = count if exceptions == 0 else 0
-                                    self.logger.debug(f'Mytpl: {mytpl}, count {count}, daycount {daycount}, interval {interval}')
-                                    mynewlist.append(mytpl)
-                                count = 0
-                                seriestarttime = None
-                                actday = mydays[time.weekday()]
-                            if time.time() < datetime.now().time() and time.date() <= datetime.now().date():
-                                continue
-                            if time >= datetime.now() + timedelta(days=7):
-                                continue
-                            if seriestarttime is None:
-                                seriestarttime = time
-                            count += 1
-                        # add the last Time for this day
-                        if seriestarttime is not None:
-                            mytpl = {'seriesMin': str(seriestarttime.time())[:5]}
-                            if original_daycount is not None:
-                                mytpl['seriesMax'] = str((seriestarttime + timedelta(minutes=interval * count)).time())[:5]
-                            else:
-                                mytpl['seriesMax'] = f'{endtime.hour:02d}:{endtime.minute:02d}'
-                            mytpl['maxCountCalculated'] = count if exceptions == 0 else 0
-                            mytpl['seriesDay'] = actday
-                            self.logger.debug(f'Mytpl for last time of day: {mytpl}, count {count} daycount '
-                                              f'{original_daycount}, interval {interval}')
-                            mynewlist.append(mytpl)
-
+                    # the calculated series only changes with the entry and the current minute
+                    self._fix_empty_values(mydict)
+                    key = (entry_key(mydict, 'rrule', 'series'), datetime.now().replace(second=0, microsecond=0))
+                    mynewlist = self._get_occurrences(item, i, 'calculated', key,
+                                                      lambda: self._series_calculate_entry(item, mydict))
+                    if isinstance(mynewlist, str):
+                        return mynewlist
+                    mynewlist = [dict(mytpl) for mytpl in mynewlist]
                     if mynewlist:
                         self._items[item]['list'][i]['seriesCalculated'] = mynewlist
                         self.logger.debug(f'Series for item {item} calculated: {self._items[item]["list"][i]["seriesCalculated"]}')
@@ -1299,6 +1203,167 @@ class UZSU(SmartPlugin):
         except Exception as e:
             self.logger.warning(f'Series for item {item} could not be calculated for list {self._items[item]["list"]}. Error: {e}')
 
+    def _series_calculate_entry(self, item, mydict):
+        """
+                Calculate the serie-entries of one list entry for the next 7 days
+                :param item:      an item with series entry
+                :param mydict:    list entry with series
+                :return:          list of calculated series or the issue as string
+        """
+        mydays = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+        #####################
+        seriesbegin, seriesend, daycount, mydict = self._fix_empty_values(mydict)
+        interval = mydict['series'].get('timeSeriesIntervall', None)
+        seriesstart = seriesbegin
+        endtime = None
+
+        if interval is None or interval == "":
+            issue = f'Could not calculate serie for item {item} - because interval is None - {mydict}'
+            self.logger.warning(issue)
+            return issue
+
+        if (daycount == '' or daycount is None) and seriesend is None:
+            issue = "Could not calculate series because timeSeriesCount is NONE and TimeSeriesMax is NONE"
+            self.logger.warning(issue)
+            return issue
+
+        interval = int(interval.split(":")[0]) * 60 + int(mydict['series']['timeSeriesIntervall'].split(":")[1])
+
+        if interval == 0:
+            issue = f'Could not calculate serie because interval is ZERO - {mydict}'
+            self.logger.warning(issue)
+            return issue
+
+        if daycount is not None and daycount != '':
+            if int(daycount) * interval >= 1440:
+                org_daycount = daycount
+                daycount = int(1439 / interval)
+                self.logger.warning(f'Cut your SerieCount to {daycount} - because interval {interval} '
+                                    f'x SerieCount {org_daycount} is more than 24h')
+
+        if 'sun' not in mydict['series']['timeSeriesMin']:
+            starttime = datetime.strptime(mydict['series']['timeSeriesMin'], "%H:%M")
+        else:
+            mytime = self._sun(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).astimezone(self._timezone), seriesstart, "next")
+            starttime = (f'{mytime.hour:02d}:{mytime.minute:02d}')
+            starttime = datetime.strptime(starttime, "%H:%M")
+
+        # calculate End of Serie by Count
+        if seriesend is None:
+            endtime = starttime
+            endtime += timedelta(minutes=interval * int(daycount))
+
+        if seriesend is not None and 'sun' in seriesend:
+            mytime = self._sun(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).astimezone(self._timezone), seriesend, "next")
+            endtime = (f'{mytime.hour:02d}:{mytime.minute:02d}')
+            endtime = datetime.strptime(endtime, "%H:%M")
+        elif seriesend is not None and 'sun' not in seriesend:
+            endtime = datetime.strptime(seriesend, "%H:%M")
+
+        if seriesend is None and endtime:
+            seriesend = str(endtime.time())[:5]
+
+        if not endtime:
+            endtime = starttime
+
+        if endtime <= starttime:
+            endtime += timedelta(days=1)
+
+        timediff = endtime - starttime
+        original_daycount = daycount
+
+        if daycount is None:
+            daycount = int((timediff.total_seconds() // 60) // interval + 1)
+        else:
+            new_daycount = int((timediff.total_seconds() // 60) // interval + 1)
+            if int(daycount) > new_daycount:
+                self.logger.warning(f'Cut your SerieCount to {new_daycount} - because interval {interval} '
+                                    f'x SerieCount {daycount} is not possible between {starttime} and {endtime}')
+                daycount = new_daycount
+
+        #####################
+        # advanced rule including all sun times, start and end times  and calculated max counts, etc.
+        rrule = rrulestr(mydict['rrule'] + ";COUNT=7",
+                         dtstart=datetime.combine(datetime.now(),
+                         parser.parse(str(starttime.hour) + ':' +
+                         str(starttime.minute)).time()))
+        mynewlist = []
+
+        interval = int(mydict['series']['timeSeriesIntervall'].split(":")[0]) * 60 + \
+            int(mydict['series']['timeSeriesIntervall'].split(":")[1])
+        exceptions = 0
+        for day in list(rrule):
+            if not mydays[day.weekday()] in mydict['rrule']:
+                continue
+            myrulenext = f'FREQ=MINUTELY;COUNT={daycount};INTERVAL={interval}'
+
+            if 'sun' not in mydict['series']['timeSeriesMin']:
+                starttime = datetime.strptime(mydict['series']['timeSeriesMin'], "%H:%M")
+            else:
+                seriesstart = mydict['series']['timeSeriesMin']
+                mytime = self._sun(day.replace(hour=0, minute=0, second=0).astimezone(self._timezone),
+                                   seriesstart, "next")
+                starttime = (f'{mytime.hour:02d}:{mytime.minute:02d}')
+                starttime = datetime.strptime(starttime, "%H:%M")
+            dayrule = rrulestr(myrulenext, dtstart=day.replace(hour=starttime.hour,
+                                                               minute=starttime.minute, second=0))
+            dayrule.after(day.replace(hour=0, minute=0))    # First Entry for this day
+            count = 0
+
+            try:
+                actday = mydays[list(dayrule)[0].weekday()]
+            except Exception:
+                max_interval = endtime - starttime
+                if exceptions == 0:
+                    self.logger.info(f'Item {item}: Between starttime {datetime.strftime(starttime, "%H:%M")} '
+                                     f'and endtime {datetime.strftime(endtime, "%H:%M")} is a maximum '
+                                     f'valid interval of {max_interval.seconds // 3600:02d}:{max_interval.seconds % 3600//60:02d}. '
+                                     f'{mydict["series"]["timeSeriesIntervall"]} is set too high for a continuous series trigger. '
+                                     f'The UZSU will only be scheduled for the start time.')
+                exceptions += 1
+                max_interval = int(max_interval.total_seconds() / 60)
+                myrulenext = f'FREQ=MINUTELY;COUNT=1;INTERVAL={max_interval}'
+                dayrule = rrulestr(myrulenext, dtstart=day.replace(hour=starttime.hour,
+                                                                   minute=starttime.minute, second=0))
+                dayrule.after(day.replace(hour=0, minute=0))
+                actday = mydays[day.weekday()] if list(dayrule) is None else mydays[list(dayrule)[0].weekday()]
+            seriestarttime = None
+            for time in list(dayrule):
+                if mydays[time.weekday()] != actday:
+                    if seriestarttime is not None:
+                        mytpl = {'seriesMin': str(seriestarttime.time())[:5]}
+                        if original_daycount is not None:
+                            mytpl['seriesMax'] = str((seriestarttime + timedelta(minutes=interval * count)).time())[:5]
+                        else:
+                            mytpl['seriesMax'] = f'{endtime.hour:02d}:{endtime.minute:02d}'
+                        mytpl['seriesDay'] = actday
+                        mytpl['maxCountCalculated'] = count if exceptions == 0 else 0
+                        self.logger.debug(f'Mytpl: {mytpl}, count {count}, daycount {daycount}, interval {interval}')
+                        mynewlist.append(mytpl)
+                    count = 0
+                    seriestarttime = None
+                    actday = mydays[time.weekday()]
+                if time.time() < datetime.now().time() and time.date() <= datetime.now().date():
+                    continue
+                if time >= datetime.now() + timedelta(days=7):
+                    continue
+                if seriestarttime is None:
+                    seriestarttime = time
+                count += 1
+            # add the last Time for this day
+            if seriestarttime is not None:
+                mytpl = {'seriesMin': str(seriestarttime.time())[:5]}
+                if original_daycount is not None:
+                    mytpl['seriesMax'] = str((seriestarttime + timedelta(minutes=interval * count)).time())[:5]
+                else:
+                    mytpl['seriesMax'] = f'{endtime.hour:02d}:{endtime.minute:02d}'
+                mytpl['maxCountCalculated'] = count if exceptions == 0 else 0
+                mytpl['seriesDay'] = actday
+                self.logger.debug(f'Mytpl for last time of day: {mytpl}, count {count} daycount '
+                                  f'{original_daycount}, interval {interval}')
+                mynewlist.append(mytpl)
+        return mynewlist
+
     def _get_sun4week(self, item, caller=None):
         """
         Getting the values for sunrise and sunset for the whole upcoming 7 days - relevant for time series
@@ -1308,11 +1373,10 @@ class UZSU(SmartPlugin):
         :type caller:   string
         :return:        True at the end of the method
         """
-        dayrule = rrulestr("FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR,SA,SU" + ";COUNT=7",
-                           dtstart=datetime.now().replace(hour=0, minute=0, second=0))
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         self.logger.debug(f'Get sun4week for item {item} called by {caller}')
         mynewdict = {'sunrise': {}, 'sunset': {}}
-        for day in (list(dayrule)):
+        for day in (today + timedelta(days=i) for i in range(7)):
             actday = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU'][day.weekday()]
             mysunrise = self._sun(day.astimezone(self._timezone), "sunrise", "next")
             mysunset = self._sun(day.astimezone(self._timezone), "sunset", "next")
@@ -1340,14 +1404,46 @@ class UZSU(SmartPlugin):
             mydict['series']['timeSeriesCount'] = daycount
         return seriesbegin, seriesend, daycount, mydict
 
-    def _series_get_time(self, mydict, timescan=''):
+    def _series_get_time(self, mydict, timescan='', item=None, entryindex=None):
         """
                 Returns the next time/date for a serie
                 :param mydict:      list-Item from UZSU-dict
                 :param timescan:    direction to search for next/previous
+                :param item:        uzsu item, if given the times of the serie are taken from the occurrence index
+                :param entryindex:  index of the entry in the uzsu list
         """
+        self._fix_empty_values(mydict)
+        key = (entry_key(mydict, 'rrule', 'series'), datetime.now().date())
+        series = self._get_occurrences(item, entryindex, 'series', key, lambda: self._series_times(mydict))
+        if series is None:
+            return None
+        times, starttime = series
+
+        now = datetime.now()
+        if timescan == 'next':
+            returnvalue = next_in(times, now)
+        else:
+            returnvalue = previous_in(times, now)
 
-        returnvalue = None
+        # Get correct "sun" for this Day
+        if 'sun' in mydict['series']['timeSeriesMin'] and returnvalue is not None:
+            mytime = self._sun(returnvalue.replace(hour=0, minute=0, second=0).astimezone(self._timezone),
+                               mydict['series']['timeSeriesMin'], "next")
+            delta_dt1 = returnvalue.replace(hour=mytime.hour, minute=mytime.minute, second=0)
+            delta_dt2 = returnvalue.replace(hour=starttime.hour, minute=starttime.minute, second=0)
+            delta_time = delta_dt1.minute - delta_dt2.minute
+            returnvalue += timedelta(minutes=delta_time)
+        if returnvalue is not None:
+            returnvalue = returnvalue.replace(tzinfo=self._timezone)
+
+        return returnvalue
+
+    def _series_times(self, mydict):
+        """
+                Returns all times of a serie from a week ago up to the next days
+                :param mydict:      list-Item from UZSU-dict
+                :return:            tuple (sorted list of times, starttime of today) or None
+        """
         seriesbegin, seriesend, daycount, mydict = self._fix_empty_values(mydict)
         interval = mydict['series'].get('timeSeriesIntervall', None)
         seriesstart = seriesbegin
@@ -1355,22 +1451,22 @@ class UZSU(SmartPlugin):
         if interval is not None and interval != "":
             interval = int(interval.split(":")[0]) * 60 + int(mydict['series']['timeSeriesIntervall'].split(":")[1])
         else:
-            return returnvalue
+            return None
         if interval == 0:
             self.logger.warning(f'Could not calculate serie because interval is ZERO - {mydict}')
-            return returnvalue
+            return None
 
         if 'sun' not in mydict['series']['timeSeriesMin']:
             starttime = datetime.strptime(mydict['series']['timeSeriesMin'], "%H:%M")
         else:
-            mytime = self._sun(datetime.now().replace(hour=0, minute=0, second=0).astimezone(self._timezone),
+            mytime = self._sun(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).astimezone(self._timezone),
                                seriesstart, "next")
             starttime = f'{mytime.hour:02d}:{mytime.minute:02d}'
             starttime = datetime.strptime(starttime, "%H:%M")
 
         if daycount is None and seriesend is not None:
             if 'sun' in seriesend:
-                mytime = self._sun(datetime.now().replace(hour=0, minute=0, second=0).astimezone(self._timezone),
+                mytime = self._sun(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).astimezone(self._timezone),
                                    seriesend, "next")
                 seriesend = (f'{mytime.hour:02d}:{mytime.minute:02d}')
                 endtime = datetime.strptime(seriesend, "%H:%M")
@@ -1418,28 +1514,7 @@ class UZSU(SmartPlugin):
                 timestamp = timestamp + timedelta(minutes=interval)
                 mylist[timestamp] = 'x'
                 mycount += 1
-
-        now = datetime.now()
-        mylist[now] = 'now'
-        mysortedlist = sorted(mylist)
-        myindex = mysortedlist.index(now)
-        if timescan == 'next':
-            returnvalue = mysortedlist[myindex + 1]
-        else:
-            returnvalue = mysortedlist[myindex - 1]
-
-        # Get correct "sun" for this Day
-        if 'sun' in mydict['series']['timeSeriesMin'] and returnvalue is not None:
-            mytime = self._sun(returnvalue.replace(hour=0, minute=0, second=0).astimezone(self._timezone),
-                               mydict['series']['timeSeriesMin'], "next")
-            delta_dt1 = returnvalue.replace(hour=mytime.hour, minute=mytime.minute, second=0)
-            delta_dt2 = returnvalue.replace(hour=starttime.hour, minute=starttime.minute, second=0)
-            delta_time = delta_dt1.minute - delta_dt2.minute
-            returnvalue += timedelta(minutes=delta_time)
-        if returnvalue is not None:
-            returnvalue = returnvalue.replace(tzinfo=self._timezone)
-
-        return returnvalue
+        return sorted(mylist), starttime
 
     def _sun(self, dt, tstr, timescan):
         """
@@ -1456,86 +1531,31 @@ class UZSU(SmartPlugin):
         # now start into parsing details
         self.logger.debug(f'Examine param time string: {tstr}')
 
-        # find min/max times
-        tabs = tstr.split('<')
-        if len(tabs) == 1:
-            smin = None
-            cron = tabs[0].strip()
-            smax = None
-        elif len(tabs) == 2:
-            if tabs[0].startswith('sun'):
-                smin = None
-                cron = tabs[0].strip()
-                smax = tabs[1].strip()
-            else:
-                smin = tabs[0].strip()
-                cron = tabs[1].strip()
-                smax = None
-        elif len(tabs) == 3:
-            smin = tabs[0].strip()
-            cron = tabs[1].strip()
-            smax = tabs[2].strip()
-        else:
-            self.logger.error(f'Wrong syntax: {tstr} - wrong amount of tabs. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
+        # the time string is parsed once, the sun times are calculated once per day
+        try:
+            rule = parse_sun_rule(tstr)
+        except ValueError as err:
+            self.logger.error(err)
             return
-        # calculate the time offset
-        doff = 0  # degree offset
-        moff = 0  # minute offset
-        _, op, offs = cron.rpartition('+')
-        if op:
-            if offs.endswith('m'):
-                moff = int(offs.strip('m'))
-            else:
-                doff = float(offs)
-        else:
-            _, op, offs = cron.rpartition('-')
-            if op:
-                if offs.endswith('m'):
-                    moff = -int(offs.strip('m'))
-                else:
-                    doff = -float(offs)
-        # see if sunset or sunrise are included in give tstr param
         dmin = None
         dmax = None
-        if cron.startswith('sunrise'):
-            next_time = self._sh.sun.rise(doff, moff, dt=dt)
-            self.logger.debug(f'{timescan} time for sunrise: {next_time}')
-            # time in next_time will be in utctime. So we need to adjust it
-            if next_time.tzinfo == tzutc():
-                next_time = next_time.astimezone(self._timezone)
-            else:
-                self.logger.warning("next_time.tzinfo was not given as utc!")
-            self.logger.debug(f'next_time.tzinfo gives {next_time.tzinfo}')
-            self.logger.debug(f'Sunrise is included and calculated as {next_time}')
-        elif cron.startswith('sunset'):
-            next_time = self._sh.sun.set(doff, moff, dt=dt)
-            self.logger.debug(f'{timescan} time for sunset: {next_time}')
-            # time in next_time will be in utctime. So we need to adjust it
-            if next_time.tzinfo == tzutc():
-                next_time = next_time.astimezone(self._timezone)
-            else:
-                self.logger.warning("next_time.tzinfo was not given as utc!")
-            self.logger.debug(f'Sunset is included and calculated as {next_time}')
-        else:
-            self.logger.error(f'Wrong syntax: {tstr} not starting with sunrise/set. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
-            return
-        if smin is not None:
-            h, _, m = smin.partition(':')
+        next_time = self._ephemeris.get(rule.event, dt, rule.doff, rule.moff)
+        self.logger.debug(f'{timescan} time for {rule.event}: {next_time}')
+        if rule.smin is not None:
             try:
-                dmin = next_time.replace(day=dt.day, hour=int(h), minute=int(m), second=0, tzinfo=self._timezone)
+                dmin = next_time.replace(day=dt.day, hour=rule.smin[0], minute=rule.smin[1], second=0, tzinfo=self._timezone)
             except Exception as err:
                 self.logger.error(f'Problems assigning dmin: {err}. Wrong syntax: {tstr}. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
                 return
-        elif smax is None:
+        elif rule.smax is None:
             dmin = next_time
-        if smax is not None:
-            h, _, m = smax.partition(':')
+        if rule.smax is not None:
             try:
-                dmax = next_time.replace(day=dt.day, hour=int(h), minute=int(m), second=0, tzinfo=self._timezone)
+                dmax = next_time.replace(day=dt.day, hour=rule.smax[0], minute=rule.smax[1], second=0, tzinfo=self._timezone)
             except Exception as err:
                 self.logger.error(f'Problems assigning dmax: {err}. Wrong syntax: {tstr}. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
                 return
-        elif smin is None:
+        elif rule.smin is None:
             dmax = next_time
         if dmin is not None and dmax is not None and dmin > dmax:
             self.logger.error(f'Wrong times: the earliest time should be smaller than the latest time in {tstr}')
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+######################################################################################
+# Copyright 2011-2013 Niko Will
+# Copyright 2017,2022 Bernd Meiners                              Bernd.Meiners@mail.de
+# Copyright 2018 Andreas Künz                                    onkelandy66@gmail.com
+# Copyright 2021 extension for series Andre Kohler       andre.kohler01@googlemail.com
+######################################################################################
+#  This file is part of SmartHomeNG.    https://github.com/smarthomeNG//
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG.  If not, see <http://www.gnu.org/licenses/>.
+##########################################################################
+
+import functools
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from dateutil import parser
+from dateutil.rrule import rrulestr
+from dateutil.tz import tzutc
+
+
+# parsed form of a time string like '6:00<sunrise+30m<8:00'
+SunRule = namedtuple('SunRule', ['smin', 'event', 'doff', 'moff', 'smax'])
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_sun_rule(tstr):
+    """
+    parses a string with a time range '[H:M<](sunrise|sunset)[+|-][offset][<H:M]'
+
+    :param tstr:    time string like '6:00<sunrise<8:00'
+    :return:        SunRule with smin and smax as (hour, minute) tuples or None
+    :raises ValueError: if the string has a wrong syntax
+    """
+    tabs = tstr.split('<')
+    if len(tabs) == 1:
+        smin = None
+        cron = tabs[0].strip()
+        smax = None
+    elif len(tabs) == 2:
+        if tabs[0].startswith('sun'):
+            smin = None
+            cron = tabs[0].strip()
+            smax = tabs[1].strip()
+        else:
+            smin = tabs[0].strip()
+            cron = tabs[1].strip()
+            smax = None
+    elif len(tabs) == 3:
+        smin = tabs[0].strip()
+        cron = tabs[1].strip()
+        smax = tabs[2].strip()
+    else:
+        raise ValueError(f'Wrong syntax: {tstr} - wrong amount of tabs. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
+
+    # calculate the time offset
+    doff = 0  # degree offset
+    moff = 0  # minute offset
+    _, op, offs = cron.rpartition('+')
+    if op:
+        if offs.endswith('m'):
+            moff = int(offs.strip('m'))
+        else:
+            doff = float(offs)
+    else:
+        _, op, offs = cron.rpartition('-')
+        if op:
+            if offs.endswith('m'):
+                moff = -int(offs.strip('m'))
+            else:
+                doff = -float(offs)
+
+    if cron.startswith('sunrise'):
+        event = 'sunrise'
+    elif cron.startswith('sunset'):
+        event = 'sunset'
+    else:
+        raise ValueError(f'Wrong syntax: {tstr} not starting with sunrise/set. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
+
+    def hour_minute(limit, name):
+        h, _, m = limit.partition(':')
+        try:
+            return int(h), int(m)
+        except ValueError as err:
+            raise ValueError(f'Problems assigning {name}: {err}. Wrong syntax: {tstr}. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
+
+    return SunRule(None if smin is None else hour_minute(smin, 'dmin'), event, doff, moff,
+                   None if smax is None else hour_minute(smax, 'dmax'))
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_clock(tstr):
+    try:
+        return parser.parse(tstr.strip()).time()
+    except (ValueError, OverflowError):
+        return None
+
+
+def parse_clock(tstr):
+    """
+    parses a time string like '17:00' (cached, the strings of the uzsu entries rarely change)
+
+    :return:        time object
+    :raises ValueError: if the string is no time (e.g. a sun-based time)
+    """
+    result = _parse_clock(tstr)
+    if result is None:
+        raise ValueError(f'Unknown string format: {tstr}')
+    return result
+
+
+@functools.lru_cache(maxsize=512)
+def cached_rrule(rule, dtstart):
+    """
+    returns the rrule object for rule and dtstart (rrules are immutable, so they can be shared)
+    """
+    return rrulestr(rule, dtstart=dtstart)
+
+
+class SunEphemeris():
+    """
+    Memoized sunrise and sunset times, shared by all uzsu items
+
+    The times are calculated by the sun object of SmartHomeNG once per date, horizon (degree offset)
+    and minute offset. Entries for dates before yesterday are dropped when the date changes.
+    """
+
+    def __init__(self, smarthome, timezone, logger=None):
+        self._sh = smarthome
+        self._timezone = timezone
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._table = {}            # (event, dt, doff, moff) -> datetime in local timezone
+        self._next = {}             # event -> next sunrise/sunset from now
+        self._date = None
+        self.hits = 0
+        self.misses = 0
+
+
+    def _to_local(self, next_time):
+        # time from the sun object will be in utctime. So we need to adjust it
+        if next_time.tzinfo == tzutc():
+            return next_time.astimezone(self._timezone)
+        if self.logger is not None:
+            self.logger.warning("next_time.tzinfo was not given as utc!")
+        return next_time
+
+    def _purge(self):
+        today = datetime.now().date()
+        if today != self._date:
+            self._date = today
+            yesterday = today - timedelta(days=1)
+            self._table = {key: value for key, value in self._table.items() if key[1].date() >= yesterday}
+
+
+    def get(self, event, dt, doff=0, moff=0):
+        """
+        returns the first sunrise/sunset after dt in local time
+
+        :param event:   'sunrise' or 'sunset'
+        :param dt:      timezone aware datetime (usually midnight of the day)
+        :param doff:    degree offset of the horizon
+        :param moff:    minute offset
+        """
+        key = (event, dt, doff, moff)
+        with self._lock:
+            self._purge()
+            result = self._table.get(key)
+            if result is not None:
+                self.hits += 1
+                return result
+        if event == 'sunrise':
+            result = self._to_local(self._sh.sun.rise(doff, moff, dt=dt))
+        else:
+            result = self._to_local(self._sh.sun.set(doff, moff, dt=dt))
+        with self._lock:
+            self.misses += 1
+            self._table[key] = result
+        return result
+
+
+    def next(self, event):
+        """
+        returns the next sunrise/sunset from now in local time (recalculated after it has passed)
+        """
+        with self._lock:
+            result = self._next.get(event)
+            if result is not None and result > datetime.now(result.tzinfo):
+                self.hits += 1
+                return result
+        result = self._to_local(self._sh.sun.rise() if event == 'sunrise' else self._sh.sun.set())
+        with self._lock:
+            self.misses += 1
+            self._next[event] = result
+        return result
+
+
+    def clear(self):
+        with self._lock:
+            self._table = {}
+            self._next = {}
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+######################################################################################
+# Copyright 2011-2013 Niko Will
+# Copyright 2017,2022 Bernd Meiners                              Bernd.Meiners@mail.de
+# Copyright 2018 Andreas Künz                                    onkelandy66@gmail.com
+# Copyright 2021 extension for series Andre Kohler       andre.kohler01@googlemail.com
+######################################################################################
+#  This file is part of SmartHomeNG.    https://github.com/smarthomeNG//
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG.  If not, see <http://www.gnu.org/licenses/>.
+##########################################################################
+
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+
+# days before and after today covered by the occurrence index
+HORIZON_DAYS = 8
+
+
+def entry_key(entry, *fields):
+    """
+    returns a hashable key of the given fields of an uzsu entry, used to detect edited entries
+    """
+    return json.dumps([entry.get(field) for field in fields], sort_keys=True, default=str)
+
+
+class Occurrences():
+    """
+    Sorted occurrences of a rrule for a rolling horizon around today
+
+    Queries inside the horizon are answered by binary search, queries outside the horizon
+    are passed to the rrule.
+    """
+
+    def __init__(self, rrule, today=None):
+        today = datetime.combine(today or datetime.now().date(), datetime.min.time())
+        self._rrule = rrule
+        self.start = today - timedelta(days=HORIZON_DAYS)
+        self.end = today + timedelta(days=HORIZON_DAYS + 1)
+        self.dts = rrule.between(self.start, self.end, inc=True)
+
+    def after(self, dt):
+        """
+        returns the first occurrence after dt (like rrule.after) or None
+        """
+        if self.start <= dt < self.end:
+            i = bisect_right(self.dts, dt)
+            if i < len(self.dts):
+                return self.dts[i]
+            return self._rrule.after(self.end)
+        return self._rrule.after(dt)
+
+    def before(self, dt):
+        """
+        returns the last occurrence before dt (like rrule.before) or None
+        """
+        if self.start < dt <= self.end:
+            i = bisect_left(self.dts, dt)
+            if i > 0:
+                return self.dts[i - 1]
+            return self._rrule.before(self.start)
+        return self._rrule.before(dt)
+
+
+def next_in(times, dt):
+    """
+    returns the first time in the sorted list after dt or None
+    """
+    i = bisect_right(times, dt)
+    return times[i] if i < len(times) else None
+
+
+def previous_in(times, dt):
+    """
+    returns the last time in the sorted list before dt or None
+    """
+    i = bisect_left(times, dt)
+    return times[i - 1] if i > 0 else None
+
+
+class OccurrenceIndex():
+    """
+    Precomputed occurrences of the entries of one uzsu item
+
+    Every entry of the uzsu list has its own slots (rrule occurrences, series times and the
+    calculated series). A slot is identified by a key built from the entry and the date (or the
+    minute) it has been calculated for, it is only rebuilt when the key changes. So editing one
+    entry in the visu only recalculates this entry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots = {}            # (kind, entryindex) -> (key, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, entryindex, key, build):
+        """
+        returns the value of a slot, build() is called if the slot is missing or outdated
+
+        :param kind:        'rrule', 'series' or 'calculated'
+        :param entryindex:  index of the entry in the uzsu list
+        :param key:         key of the entry, a changed key invalidates the slot
+        :param build:       function returning the value of the slot
+        """
+        with self._lock:
+            slot = self._slots.get((kind, entryindex))
+            if slot is not None and slot[0] == key:
+                self.hits += 1
+                return slot[1]
+        value = build()
+        with self._lock:
+            self.misses += 1
+            self._slots[(kind, entryindex)] = (key, value)
+        return value
+
+    def prune(self, count):
+        """
+        drops the slots of entries that have been removed from the uzsu list
+        """
+        with self._lock:
+            self._slots = {slot: value for slot, value in self._slots.items() if slot[1] < count}
+
+    def clear(self):
+        with self._lock:
+            self._slots = {}
+
+
+def interpolation_arrays(data):
+    """
+    returns the interpolation points as sorted arrays (timestamps, values)
+
+    :param data:    dict of timestamp (ms) -> value
+    """
+    times = sorted(data)
+    return times, [data[ts] for ts in times]
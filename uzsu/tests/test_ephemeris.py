@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+######################################################################################
+# Copyright 2011-2013 Niko Will
+# Copyright 2017,2022 Bernd Meiners                              Bernd.Meiners@mail.de
+# Copyright 2018 Andreas Künz                                    onkelandy66@gmail.com
+# Copyright 2021 extension for series Andre Kohler       andre.kohler01@googlemail.com
+######################################################################################
+#  This file is part of SmartHomeNG.    https://github.com/smarthomeNG//
+#
+#  Tests of the sun ephemeris of the uzsu plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG.  If not, see <http://www.gnu.org/licenses/>.
+##########################################################################
+
+import logging
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import dateutil.tz
+
+from plugins.uzsu import UZSU
+from plugins.uzsu.ephemeris import SunEphemeris, SunRule, parse_sun_rule
+
+TZ = dateutil.tz.gettz('Europe/Berlin')
+
+# time strings of the user documentation and of the visu, some of them with wrong syntax
+TIMES = ['sunrise', 'sunset', 'sunrise+30m', 'sunset-15m', 'sunrise+6', 'sunset-6.5', 'sunrise-0.5',
+         '6:00<sunrise', 'sunrise<8:00', 'sunset<18:00', '6:00<sunrise+30m<8:00', '17:00<sunset-1<21:30',
+         '05:30<sunrise-30m', ' 6:00 < sunrise < 8:00 ', '20:00<sunset', 'sunset+10m<19:00',
+         # dmin after dmax, wrong limits and wrong events
+         '8:00<sunrise<6:00', 'x:00<sunrise', 'sunrise<8:x', '6<sunrise', '1:00<sunrise<2:00<3:00', 'noon', 'sunrise+m']
+
+# days across the changes of the daylight saving time
+DAYS = [datetime(2024, 3, 29) + timedelta(days=day) for day in range(5)] + \
+       [datetime(2024, 10, 25) + timedelta(days=day) for day in range(5)] + [datetime(2024, 6, 21), datetime(2024, 12, 21)]
+
+
+class Sun():
+    """ sun object of SmartHomeNG with plausible times in UTC and call counting """
+
+    def __init__(self):
+        self.calls = 0
+
+    def _time(self, hour, doff, moff, dt, sign):
+        self.calls += 1
+        dt = dt or datetime.now(timezone.utc)
+        day = dt.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        # about two hours more daylight in summer, 4 minutes per degree
+        season = 60 * abs(day.timetuple().tm_yday - 172) / 91
+        result = day + timedelta(hours=hour, minutes=sign * season + sign * 4 * doff + moff)
+        if result <= dt:
+            result += timedelta(days=1)
+        return result.replace(tzinfo=dateutil.tz.tzutc())
+
+    def rise(self, doff=0, moff=0, dt=None):
+        return self._time(4, doff, moff, dt, 1)
+
+    def set(self, doff=0, moff=0, dt=None):
+        return self._time(19, doff, moff, dt, -1)
+
+
+class ReferenceUZSU(UZSU):
+    """ _sun() before the ephemeris, parsing the string and calculating the sun time on every call """
+
+    def _sun(self, dt, tstr, timescan):
+        tabs = tstr.split('<')
+        if len(tabs) == 1:
+            smin = None
+            cron = tabs[0].strip()
+            smax = None
+        elif len(tabs) == 2:
+            if tabs[0].startswith('sun'):
+                smin = None
+                cron = tabs[0].strip()
+                smax = tabs[1].strip()
+            else:
+                smin = tabs[0].strip()
+                cron = tabs[1].strip()
+                smax = None
+        elif len(tabs) == 3:
+            smin = tabs[0].strip()
+            cron = tabs[1].strip()
+            smax = tabs[2].strip()
+        else:
+            self.logger.error(f'Wrong syntax: {tstr} - wrong amount of tabs. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
+            return
+        doff = 0
+        moff = 0
+        _, op, offs = cron.rpartition('+')
+        if op:
+            if offs.endswith('m'):
+                moff = int(offs.strip('m'))
+            else:
+                doff = float(offs)
+        else:
+            _, op, offs = cron.rpartition('-')
+            if op:
+                if offs.endswith('m'):
+                    moff = -int(offs.strip('m'))
+                else:
+                    doff = -float(offs)
+        dmin = None
+        dmax = None
+        if cron.startswith('sunrise'):
+            next_time = self._sh.sun.rise(doff, moff, dt=dt)
+            if next_time.tzinfo == dateutil.tz.tzutc():
+                next_time = next_time.astimezone(self._timezone)
+        elif cron.startswith('sunset'):
+            next_time = self._sh.sun.set(doff, moff, dt=dt)
+            if next_time.tzinfo == dateutil.tz.tzutc():
+                next_time = next_time.astimezone(self._timezone)
+        else:
+            self.logger.error(f'Wrong syntax: {tstr} not starting with sunrise/set. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
+            return
+        if smin is not None:
+            h, _, m = smin.partition(':')
+            try:
+                dmin = next_time.replace(day=dt.day, hour=int(h), minute=int(m), second=0, tzinfo=self._timezone)
+            except Exception as err:
+                self.logger.error(f'Problems assigning dmin: {err}. Wrong syntax: {tstr}. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
+                return
+        elif smax is None:
+            dmin = next_time
+        if smax is not None:
+            h, _, m = smax.partition(':')
+            try:
+                dmax = next_time.replace(day=dt.day, hour=int(h), minute=int(m), second=0, tzinfo=self._timezone)
+            except Exception as err:
+                self.logger.error(f'Problems assigning dmax: {err}. Wrong syntax: {tstr}. Should be [H:M<](sunrise|sunset)[+|-][offset][<H:M]')
+                return
+        elif smin is None:
+            dmax = next_time
+        if dmin is not None and dmax is not None and dmin > dmax:
+            self.logger.error(f'Wrong times: the earliest time should be smaller than the latest time in {tstr}')
+            return
+        try:
+            next_time = max(dmin, next_time)
+        except Exception:
+            pass
+        try:
+            next_time = min(dmax, next_time)
+        except Exception:
+            pass
+        return next_time
+
+
+def create_plugin(cls, sun):
+    plugin = cls.__new__(cls)
+    plugin.logger = logging.getLogger(__name__)
+    plugin._timezone = TZ
+    plugin._sh = type('SmartHome', (), {'sun': sun})()
+    plugin._ephemeris = SunEphemeris(plugin._sh, TZ, plugin.logger)
+    return plugin
+
+
+class TestParseSunRule(unittest.TestCase):
+
+    def test_rules(self):
+        self.assertEqual(parse_sun_rule('sunrise'), SunRule(None, 'sunrise', 0, 0, None))
+        self.assertEqual(parse_sun_rule('6:00<sunrise+30m<8:00'), SunRule((6, 0), 'sunrise', 0, 30, (8, 0)))
+        self.assertEqual(parse_sun_rule('17:00<sunset-1<21:30'), SunRule((17, 0), 'sunset', -1.0, 0, (21, 30)))
+        self.assertEqual(parse_sun_rule('sunset-15m<19:00'), SunRule(None, 'sunset', 0, -15, (19, 0)))
+        self.assertEqual(parse_sun_rule('05:30<sunrise+6.5'), SunRule((5, 30), 'sunrise', 6.5, 0, None))
+
+    def test_wrong_syntax(self):
+        for tstr in ('noon', '1:00<sunrise<2:00<3:00', 'x:00<sunrise', 'sunrise<8:x', '6<sunrise', 'sunrise+m'):
+            with self.subTest(tstr=tstr):
+                self.assertRaises(ValueError, parse_sun_rule, tstr)
+
+    def test_sun_times(self):
+        # the same times as the former _sun() for offsets, limits and degrees, across changes of the daylight saving time
+        plugin = create_plugin(UZSU, Sun())
+        reference = create_plugin(ReferenceUZSU, Sun())
+        for day in DAYS:
+            dt = day.replace(tzinfo=TZ)
+            for tstr in TIMES:
+                with self.subTest(day=day, tstr=tstr):
+                    expected = self.sun(reference, dt, tstr)
+                    result = self.sun(plugin, dt, tstr)
+                    self.assertEqual(result, expected)
+                    if expected is not None:
+                        self.assertEqual(result.utcoffset(), expected.utcoffset())
+        self.assertIsNone(self.sun(plugin, DAYS[0].replace(tzinfo=TZ), '8:00<sunrise<6:00'))
+        self.assertIsNotNone(self.sun(plugin, DAYS[0].replace(tzinfo=TZ), '6:00<sunrise<8:00'))
+
+    def test_wrong_syntax_logged(self):
+        plugin = create_plugin(UZSU, Sun())
+        for tstr in ('noon', '8:00<sunrise<6:00', 'sunrise<8:x'):
+            with self.subTest(tstr=tstr), self.assertLogs(logging.getLogger(__name__), 'ERROR'):
+                self.assertIsNone(plugin._sun(DAYS[0].replace(tzinfo=TZ), tstr, 'next'))
+
+    @staticmethod
+    def sun(plugin, dt, tstr):
+        logging.disable(logging.CRITICAL)
+        try:
+            return plugin._sun(dt, tstr, 'next')
+        except ValueError:
+            # the former _sun() raised on wrong offsets instead of logging them
+            if isinstance(plugin, ReferenceUZSU):
+                return None
+            raise
+        finally:
+            logging.disable(logging.NOTSET)
+
+
+class TestSunEphemeris(unittest.TestCase):
+
+    def test_cached(self):
+        sun = Sun()
+        ephemeris = SunEphemeris(type('SmartHome', (), {'sun': sun})(), TZ)
+        dt = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=TZ)
+        first = ephemeris.get('sunrise', dt, 0, 30)
+        self.assertEqual(ephemeris.get('sunrise', dt, 0, 30), first)
+        self.assertEqual(first.tzinfo, TZ)
+        self.assertEqual((sun.calls, ephemeris.hits, ephemeris.misses), (1, 1, 1))
+        # other offsets, events and days are calculated
+        ephemeris.get('sunrise', dt, 6, 0)
+        ephemeris.get('sunset', dt, 0, 30)
+        ephemeris.get('sunrise', dt + timedelta(days=1), 0, 30)
+        self.assertEqual(sun.calls, 4)
+
+    def test_purge(self):
+        sun = Sun()
+        ephemeris = SunEphemeris(type('SmartHome', (), {'sun': sun})(), TZ)
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=TZ)
+        for days in range(-3, 2):
+            ephemeris.get('sunset', today + timedelta(days=days))
+        self.assertEqual(len(ephemeris._table), 5)
+        ephemeris._date = None
+        ephemeris.get('sunset', today)
+        # entries before yesterday are dropped when the date changes
+        self.assertEqual(sorted(key[1] for key in ephemeris._table), [today + timedelta(days=days) for days in range(-1, 2)])
+
+    def test_next(self):
+        sun = Sun()
+        ephemeris = SunEphemeris(type('SmartHome', (), {'sun': sun})(), TZ)
+        sunrise = ephemeris.next('sunrise')
+        self.assertGreater(sunrise, datetime.now(TZ))
+        self.assertEqual(ephemeris.next('sunrise'), sunrise)
+        self.assertEqual(sun.calls, 1)
+        # recalculated after it has passed
+        ephemeris._next['sunrise'] = sunrise - timedelta(days=1)
+        self.assertEqual(ephemeris.next('sunrise'), sunrise)
+        self.assertEqual(sun.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
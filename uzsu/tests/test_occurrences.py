@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+######################################################################################
+# Copyright 2011-2013 Niko Will
+# Copyright 2017,2022 Bernd Meiners                              Bernd.Meiners@mail.de
+# Copyright 2018 Andreas Künz                                    onkelandy66@gmail.com
+# Copyright 2021 extension for series Andre Kohler       andre.kohler01@googlemail.com
+######################################################################################
+#  This file is part of SmartHomeNG.    https://github.com/smarthomeNG//
+#
+#  Tests of the occurrence index of the uzsu plugin
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG.  If not, see <http://www.gnu.org/licenses/>.
+##########################################################################
+
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from dateutil.rrule import rrulestr
+
+from plugins.uzsu.occurrences import HORIZON_DAYS, Occurrences, OccurrenceIndex, next_in, previous_in, interpolation_arrays
+
+# days of the changes of the daylight saving time and ordinary days
+TODAYS = [datetime(2024, 3, 31), datetime(2024, 10, 27), datetime(2024, 3, 25), datetime(2024, 11, 3), datetime(2024, 6, 15)]
+
+# rrules relative to today: (rule, days of dtstart from today, time of dtstart)
+RULES = [('FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR,SA,SU', -7, (6, 30)),
+         ('FREQ=WEEKLY;BYDAY=MO,FR', -7, (22, 15)),
+         ('FREQ=DAILY;BYHOUR=2;BYMINUTE=30', -7, (0, 0)),
+         ('FREQ=HOURLY;INTERVAL=5', -3, (1, 0)),
+         ('FREQ=MINUTELY;INTERVAL=45;COUNT=200', -1, (23, 0)),
+         # series ending within and before the horizon, starting after the horizon
+         ('FREQ=DAILY;COUNT=5', 2, (7, 0)),
+         ('FREQ=DAILY;COUNT=3', -20, (7, 0)),
+         ('FREQ=DAILY;UNTIL={until}', -30, (18, 0)),
+         ('FREQ=DAILY', 20, (8, 0)),
+         ('FREQ=MONTHLY;BYMONTHDAY=31', -40, (12, 0))]
+
+
+def rrules(today):
+    for rule, days, (hour, minute) in RULES:
+        dtstart = today + timedelta(days=days, hours=hour, minutes=minute)
+        until = (today + timedelta(days=3, hours=12)).strftime('%Y%m%dT%H%M%S')
+        yield rule.format(until=until), dtstart
+
+
+def queries(today, occurrences):
+    """
+    times before, within and after the horizon, its limits and the occurrences themselves
+    """
+    dt = today - timedelta(days=HORIZON_DAYS + 3)
+    while dt < today + timedelta(days=HORIZON_DAYS + 4):
+        yield dt
+        dt += timedelta(minutes=97)
+    for dt in [occurrences.start, occurrences.end] + occurrences.dts:
+        yield from (dt - timedelta(microseconds=1), dt, dt + timedelta(microseconds=1))
+
+
+class TestOccurrences(unittest.TestCase):
+
+    def test_after_before(self):
+        # the same results as the rrule, across changes of the daylight saving time and the end of series
+        for today in TODAYS:
+            for rule, dtstart in rrules(today):
+                occurrences = Occurrences(rrulestr(rule, dtstart=dtstart), today.date())
+                # a separate caching rrule, as the queries are answered by the rrule outside of the horizon
+                rrule = rrulestr(rule, dtstart=dtstart, cache=True)
+                with self.subTest(today=today, rule=rule):
+                    for dt in queries(today, occurrences):
+                        self.assertEqual(occurrences.after(dt), rrule.after(dt), dt)
+                        self.assertEqual(occurrences.before(dt), rrule.before(dt), dt)
+
+    def test_horizon(self):
+        today = TODAYS[0]
+        rrule = rrulestr('FREQ=HOURLY', dtstart=today - timedelta(days=30))
+        occurrences = Occurrences(rrule, today.date())
+        self.assertEqual(occurrences.start, today - timedelta(days=HORIZON_DAYS))
+        self.assertEqual(occurrences.end, today + timedelta(days=HORIZON_DAYS + 1))
+        self.assertEqual(len(occurrences.dts), (2 * HORIZON_DAYS + 1) * 24 + 1)
+        # queries within the horizon don't ask the rrule
+        with mock.patch.object(rrule, 'after') as after, mock.patch.object(rrule, 'before') as before:
+            occurrences.after(today)
+            occurrences.before(today)
+        after.assert_not_called()
+        before.assert_not_called()
+
+    def test_sorted_arrays(self):
+        times = [10, 20, 30]
+        self.assertEqual([next_in(times, dt) for dt in (5, 10, 25, 30)], [10, 20, 30, None])
+        self.assertEqual([previous_in(times, dt) for dt in (5, 10, 25, 35)], [None, None, 20, 30])
+        self.assertEqual(interpolation_arrays({30: 'c', 10: 'a', 20: 'b'}), ([10, 20, 30], ['a', 'b', 'c']))
+
+
+class TestOccurrenceIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = OccurrenceIndex()
+        self.builds = []
+
+    def get(self, kind, entryindex, key):
+        def build():
+            self.builds.append((kind, entryindex, key))
+            return (kind, entryindex, key)
+        return self.index.get(kind, entryindex, key, build)
+
+    def test_get(self):
+        self.assertEqual(self.get('rrule', 0, 'a'), ('rrule', 0, 'a'))
+        self.assertEqual(self.get('rrule', 0, 'a'), ('rrule', 0, 'a'))
+        self.assertEqual(len(self.builds), 1)
+        # other entries and kinds have their own slots
+        self.get('rrule', 1, 'a')
+        self.get('series', 0, 'a')
+        self.assertEqual(len(self.builds), 3)
+        self.assertEqual((self.index.hits, self.index.misses), (1, 3))
+
+    def test_changed_key(self):
+        # an edited entry or the next day rebuilds only the slot of this entry
+        self.get('rrule', 0, 'a')
+        self.get('rrule', 1, 'b')
+        self.assertEqual(self.get('rrule', 0, 'c'), ('rrule', 0, 'c'))
+        self.get('rrule', 1, 'b')
+        self.assertEqual(self.builds, [('rrule', 0, 'a'), ('rrule', 1, 'b'), ('rrule', 0, 'c')])
+
+    def test_prune(self):
+        for entryindex in range(4):
+            self.get('rrule', entryindex, 'a')
+            self.get('series', entryindex, 'a')
+        self.index.prune(2)
+        self.assertEqual(sorted(self.index._slots), [('rrule', 0), ('rrule', 1), ('series', 0), ('series', 1)])
+        self.get('rrule', 3, 'a')
+        self.assertEqual(len(self.builds), 9)
+        self.index.clear()
+        self.get('rrule', 0, 'a')
+        self.assertEqual(len(self.builds), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
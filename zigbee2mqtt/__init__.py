@@ -28,6 +28,8 @@ import json
 from logging import DEBUG
 
 from lib.model.mqttplugin import MqttPlugin
+from .topic_dispatch import replay
+from .publish_queue import PublishQueue
 
 from .rgbxy import Converter
 from .webif import WebInterface
@@ -48,7 +50,7 @@ HANDLE_ATTR = 'attr_'
 class Zigbee2Mqtt(MqttPlugin):
     """ Main class of the Plugin. Does all plugin specific stuff and provides the update functions for the items """
 
-    PLUGIN_VERSION = '2.0.2'
+    PLUGIN_VERSION = '2.0.4'
 
     def __init__(self, sh, **kwargs):
         """ Initializes the plugin. """
@@ -66,6 +68,10 @@ class Zigbee2Mqtt(MqttPlugin):
         self.read_at_init = self.get_parameter_value('read_at_init')
         self._z2m_gui = self.get_parameter_value('z2m_gui')
         self._pause_item_path = self.get_parameter_value('pause_item')
+        self._publish_queue_item_path = self.get_parameter_value('publish_queue_item')
+
+        # outbound publishes are coalesced and rate limited, the coordinator can only handle a few commands per second
+        self._publish_queue = PublishQueue(self, self.get_parameter_value('publish_rate_limits'), self.get_parameter_value('publish_dedup'))
 
         # bool_values is only good if used internally, because MQTT data is
         # usually sent in JSON. So just make this easy...
@@ -73,6 +79,13 @@ class Zigbee2Mqtt(MqttPlugin):
 
         self._items_read = []
         self._items_write = []
+        self._subscriptions = []            # (topic, callback, payload_type, bool_values) for replay_capture()
+
+        # handler tables, built once instead of probing with hasattr() for every message/attribute
+        self._handlers_in_dev = self._get_handlers(HANDLE_IN_PREFIX + HANDLE_DEV)
+        self._handlers_in_attr = self._get_handlers(HANDLE_IN_PREFIX + HANDLE_ATTR)
+        self._handlers_out_dev = self._get_handlers(HANDLE_OUT_PREFIX + HANDLE_DEV)
+        self._handlers_out_attr = self._get_handlers(HANDLE_OUT_PREFIX + HANDLE_ATTR)
         self._devices = {'bridge': {}}
         # {
         #   'dev1': {
@@ -124,6 +137,7 @@ class Zigbee2Mqtt(MqttPlugin):
 
         # start subscription to all topics
         self.start_subscriptions()
+        self._publish_queue.start()
 
         self.scheduler_add('z2m_cycle', self.poll_bridge, cycle=self.cycle)
         self.publish_z2m_topic('bridge', 'config', 'devices', 'get')
@@ -147,6 +161,7 @@ class Zigbee2Mqtt(MqttPlugin):
 
         # stop subscription to all topics
         self.stop_subscriptions()
+        self._publish_queue.stop()
 
     def parse_item(self, item):
         """
@@ -169,6 +184,12 @@ class Zigbee2Mqtt(MqttPlugin):
             self.add_item(item, updating=True)
             return self.update_item
 
+        # check for publish queue item
+        if self._publish_queue_item_path and item.property.path == self._publish_queue_item_path:
+            self.logger.debug(f'publish queue item {item.property.path} registered')
+            self._publish_queue.depth_item = item
+            return
+
         if self.has_iattr(item.conf, Z2M_ATTR):
             self.logger.debug(f"parsing item: {item}")
 
@@ -255,6 +276,7 @@ class Zigbee2Mqtt(MqttPlugin):
 
         # ignore calls explicitly coming from self (typicalls from on_mqtt_msg -> caller = self.get_fullname() + ":" + device)
         if caller == self.get_fullname() or (type(caller) is str and caller.startswith(self.get_fullname())):
+            self._publish_queue.confirm(item)
             return
 
         # check for pause item
@@ -306,15 +328,17 @@ class Zigbee2Mqtt(MqttPlugin):
                         return
 
                 # check device handler
-                if hasattr(self, HANDLE_OUT_PREFIX + HANDLE_DEV + device):
-                    attr, value, topic_3, topic_4, topic_5, abort = getattr(self, HANDLE_OUT_PREFIX + HANDLE_DEV + device)(item, value, topic_3, topic_4, topic_5, device, attr)
+                handler = self._handlers_out_dev.get(device)
+                if handler:
+                    attr, value, topic_3, topic_4, topic_5, abort = handler(item, value, topic_3, topic_4, topic_5, device, attr)
                     if abort:
                         self.logger.debug(f'processing of item {item} stopped due to abort statement from handler {HANDLE_OUT_PREFIX + HANDLE_DEV + device}')
                         return
 
                 # check attribute handler
-                if hasattr(self, HANDLE_OUT_PREFIX + HANDLE_ATTR + attr):
-                    attr, value, topic_3, topic_4, topic_5, abort = getattr(self, HANDLE_OUT_PREFIX + HANDLE_ATTR + attr)(item, value, topic_3, topic_4, topic_5, device, attr)
+                handler = self._handlers_out_attr.get(attr)
+                if handler:
+                    attr, value, topic_3, topic_4, topic_5, abort = handler(item, value, topic_3, topic_4, topic_5, device, attr)
                     if abort:
                         self.logger.debug(f'processing of item {item} stopped due to abort statement from handler {HANDLE_OUT_PREFIX + HANDLE_ATTR + attr}')
                         return
@@ -347,12 +371,13 @@ class Zigbee2Mqtt(MqttPlugin):
 
         tpc = self._build_topic_str(device, topic_3, topic_4, topic_5)
         self.add_subscription(tpc, payload_type, bool_values=bool_values, callback=callback)
+        self._subscriptions.append((tpc, callback, payload_type, bool_values))
 
     def publish_z2m_topic(self, device: str, topic_3: str = '', topic_4: str = '', topic_5: str = '', payload='', item=None, qos: int = 0, retain: bool = False, bool_values=None):
         """ build the topic in zigbee2mqtt style and publish to mqtt """
 
         tpc = self._build_topic_str(device, topic_3, topic_4, topic_5)
-        self.publish_topic(tpc, payload, item, qos, retain, bool_values)
+        self._publish_queue.publish(tpc, payload, item, qos, retain, bool_values)
 
     def on_mqtt_msg(self, topic: str, payload, qos=None, retain=None):
         """
@@ -372,8 +397,9 @@ class Zigbee2Mqtt(MqttPlugin):
             return
 
         # check / call handlers
-        if hasattr(self, HANDLE_IN_PREFIX + HANDLE_DEV + device):
-            result = getattr(self, HANDLE_IN_PREFIX + HANDLE_DEV + device)(device, topic_3, topic_4, topic_5, payload, qos, retain)
+        handler = self._handlers_in_dev.get(device)
+        if handler:
+            result = handler(device, topic_3, topic_4, topic_5, payload, qos, retain)
             if not isinstance(result, dict):
                 if result:
                     return
@@ -420,31 +446,44 @@ class Zigbee2Mqtt(MqttPlugin):
         self._devices[device]['data'].update(payload)
 
         # Setzen des Itemwertes
+        _device = self._devices[device]
+        caller = self.get_fullname() + ':' + device
+        debug = self.logger.isEnabledFor(DEBUG)
         for attr in payload:
-            if attr in self._devices[device]:
-                item = self._devices[device][attr].get('item')
-                caller = self.get_fullname() + ':' + device
-
-                # check handlers
-                if hasattr(self, HANDLE_IN_PREFIX + HANDLE_ATTR + attr):
-                    if getattr(self, HANDLE_IN_PREFIX + HANDLE_ATTR + attr)(device, attr, payload, item):
-                        continue
-
-                value = payload[attr]
-                self._devices[device][attr]['value'] = value
-                self.logger.debug(f"attribute: {attr}, value: {value}, item: {item}")
-
-                if item is not None:
-                    item(value, caller)
-                    if device == 'bridge' and (isinstance(value, list) or isinstance(value, dict)):
-                        if self.logger.isEnabledFor(DEBUG):
-                            self.logger.debug(f"{device}: Item '{item}' set to value {value}")
-                        else:
-                            self.logger.info(f"{device}: Item '{item}' set to value {str(value)[:80]}[...] (enable debug log for full output)")
-                    else:
-                        self.logger.info(f"{device}: Item '{item}' set to value {value}")
-                else:
-                    self.logger.info(f"{device}: No item for attribute '{attr}' defined to set to {value}")
+            _attr = _device.get(attr)
+            if _attr is None or not isinstance(_attr, dict):
+                continue
+            item = _attr.get('item')
+
+            # check handlers
+            handler = self._handlers_in_attr.get(attr)
+            if handler and handler(device, attr, payload, item):
+                continue
+
+            value = payload[attr]
+            _attr['value'] = value
+
+            if item is not None:
+                item(value, caller)
+                if debug:
+                    self.logger.debug(f"{device}: Item '{item}' set to value {value}")
+            elif debug:
+                self.logger.debug(f"{device}: No item for attribute '{attr}' defined to set to {value}")
+
+    def replay_capture(self, filename, repeat=1):
+        """
+        Replay a recorded message capture through the subscriptions of the plugin and measure messages/s
+
+        Items are updated as for received messages, so use it on a test system only.
+
+        :param filename: capture file (output of 'mosquitto_sub -v -t "#"' or json lines)
+        :param repeat: number of times the capture is replayed
+        """
+        return replay(self.get_fullname(), filename, self._subscriptions, repeat, self.logger)
+
+    def _get_handlers(self, prefix: str) -> dict:
+        """ Return the handler methods with the given prefix, keyed by device/attribute name """
+        return {name[len(prefix):]: getattr(self, name) for name in dir(type(self)) if name.startswith(prefix)}
 
     def _build_topic_str(self, device: str, topic_3: str, topic_4: str, topic_5: str) -> str:
         """ Build the mqtt topic as string """
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2017-2018  Martin Sinn                         m.sinn@gmx.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Topic dispatching for MQTT based plugins (mqtt, zigbee2mqtt, tasmota)
+#
+#  Plugins must not import modules of other plugins, every plugin using the topic dispatching
+#  has its own copy of this file. Keep the copies identical.
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""
+Helpers to dispatch received MQTT messages without walking all subscriptions/items:
+
+- TopicTrie: compiled trie of (wildcard) topic patterns, matches a received topic in O(topic levels)
+- JsonPath: compiled path into a JSON payload, to route one message to many items
+- replay(): replay a recorded message capture through the callbacks of a plugin and report messages/s
+"""
+
+import json
+import logging
+import time
+
+
+def topic_covers(pattern, other):
+    """
+    Check, if every topic matched by 'other' is matched by 'pattern' as well
+
+    :param pattern: topic pattern (may contain + and # wildcards)
+    :param other: topic pattern (may contain + and # wildcards)
+    :return: True, if 'pattern' covers 'other'
+    """
+    levels = pattern.split('/')
+    other_levels = other.split('/')
+    for i, level in enumerate(levels):
+        if level == '#':
+            return True
+        if i >= len(other_levels):
+            return False
+        if other_levels[i] == '#':
+            return False
+        if level != '+' and level != other_levels[i]:
+            return False
+    return len(levels) == len(other_levels)
+
+
+class TopicTrie:
+    """
+    Trie of topic patterns, each pattern holds a list of handler entries
+
+    Matches of received topics are cached, the cache is cleared when patterns are added.
+    """
+
+    _MAX_CACHE = 4096
+
+    def __init__(self):
+        self._root = {}
+        self._patterns = {}
+        self._cache = {}
+
+    def add(self, pattern, entry):
+        """
+        Add a handler entry for a topic pattern
+
+        :param pattern: topic pattern (may contain + and # wildcards)
+        :param entry: handler entry, returned by match() for matching topics
+        """
+        entries = self._patterns.get(pattern)
+        if entries is None:
+            node = self._root
+            for level in pattern.split('/'):
+                node = node.setdefault(level, {})
+            entries = self._patterns[pattern] = []
+            node[None] = entries
+        entries.append(entry)
+        self._cache.clear()
+
+    def remove(self, pattern, entry):
+        entries = self._patterns.get(pattern, [])
+        if entry in entries:
+            entries.remove(entry)
+            self._cache.clear()
+
+    def patterns(self):
+        return list(self._patterns)
+
+    def entries(self, pattern):
+        return self._patterns.get(pattern, [])
+
+    def match(self, topic):
+        """
+        Return the handler entries of all patterns matching a received topic
+
+        :param topic: received topic (without wildcards)
+        :return: list of handler entries
+        """
+        result = self._cache.get(topic)
+        if result is None:
+            result = []
+            self._match(self._root, topic.split('/'), 0, result)
+            if len(self._cache) >= self._MAX_CACHE:
+                self._cache.clear()
+            self._cache[topic] = result
+        return result
+
+    def _match(self, node, levels, index, result):
+        if '#' in node:
+            result.extend(node['#'].get(None, []))
+        if index == len(levels):
+            result.extend(node.get(None, []))
+            return
+        child = node.get(levels[index])
+        if child is not None:
+            self._match(child, levels, index + 1, result)
+        child = node.get('+')
+        if child is not None:
+            self._match(child, levels, index + 1, result)
+
+
+class JsonPath:
+    """
+    Compiled path into a (decoded) JSON payload
+
+    The path is given as keys separated by '.', list elements are addressed by their index
+    (e.g. 'ENERGY.Power' or 'sensors.0.temp'). An empty path returns the whole payload.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._keys = []
+        for key in path.split('.') if path else []:
+            self._keys.append(int(key) if key.lstrip('-').isdigit() else key)
+
+    def extract(self, payload):
+        """
+        Extract the value from a decoded payload
+
+        :return: value, raises KeyError if the path does not exist in the payload
+        """
+        value = payload
+        for key in self._keys:
+            try:
+                value = value[key]
+            except (IndexError, TypeError):
+                raise KeyError(key)
+        return value
+
+    def __repr__(self):
+        return f"JsonPath('{self.path}')"
+
+
+def decode_payload(raw, payload_type, bool_values=None):
+    """
+    Decode a raw payload (as recorded) like the mqtt module does for subscriptions
+    """
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8', errors='replace')
+    if payload_type in ('dict', 'list'):
+        try:
+            return json.loads(raw)
+        except (ValueError, TypeError):
+            return raw
+    if payload_type == 'bool':
+        if bool_values:
+            return raw == str(bool_values[1])
+        return raw.lower() in ('1', 'true', 'on', 'yes')
+    if payload_type == 'num':
+        try:
+            return float(raw) if '.' in raw else int(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def read_capture(filename):
+    """
+    Read a recorded message capture
+
+    Supported formats (one message per line):
+    - output of 'mosquitto_sub -v -t "#"':  <topic> <payload>
+    - json lines: {"topic": "...", "payload": "...", "retain": false}
+
+    :return: list of tuples (topic, raw payload, retain)
+    """
+    messages = []
+    with open(filename, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            if line.startswith('{'):
+                try:
+                    msg = json.loads(line)
+                    payload = msg.get('payload', '')
+                    if not isinstance(payload, str):
+                        payload = json.dumps(payload)
+                    messages.append((msg['topic'], payload, msg.get('retain', False)))
+                    continue
+                except (ValueError, KeyError):
+                    pass
+            topic, _, payload = line.partition(' ')
+            messages.append((topic, payload, False))
+    return messages
+
+
+def replay(name, capture, routes, repeat=1, logger=None):
+    """
+    Replay a recorded message capture through the callbacks of a plugin and measure the throughput
+
+    The callbacks are called exactly as for received messages, so items are updated. Use a test system.
+
+    :param name: name of the plugin (for the report)
+    :param capture: filename of the capture or list of tuples (topic, raw payload, retain)
+    :param routes: list of tuples (topic pattern, callback, payload_type, bool_values)
+    :param repeat: number of times the capture is replayed
+    :return: dict with number of messages, dispatched callbacks, unrouted messages, duration and messages/s
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    if isinstance(capture, str):
+        capture = read_capture(capture)
+
+    trie = TopicTrie()
+    for pattern, callback, payload_type, bool_values in routes:
+        trie.add(pattern, (callback, payload_type, bool_values))
+
+    messages = dispatched = unrouted = errors = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for topic, raw, retain in capture:
+            messages += 1
+            entries = trie.match(topic)
+            if not entries:
+                unrouted += 1
+                continue
+            for callback, payload_type, bool_values in entries:
+                dispatched += 1
+                try:
+                    callback(topic, decode_payload(raw, payload_type, bool_values), 0, retain)
+                except Exception as ex:
+                    errors += 1
+                    logger.debug(f"replay {name}: callback for topic {topic} failed: {ex}")
+    duration = time.perf_counter() - start
+
+    result = {'plugin': name,
+              'messages': messages,
+              'dispatched': dispatched,
+              'unrouted': unrouted,
+              'errors': errors,
+              'duration': round(duration, 3),
+              'messages_per_second': round(messages / duration) if duration else 0}
+    logger.info(f"replay {name}: {result}")
+    return result